@@ -3,12 +3,14 @@ from rest_framework import routers
 from kawaz.apps.stars.api.views import StarViewSet
 from kawaz.apps.blogs.api.views import CategoryViewSet
 from kawaz.apps.attachments.api.views import MaterialViewSet
+from kawaz.apps.trendings.api.views import TrendingViewSet
 
 # Routers provide an easy way of automatically determining the URL conf.
 router = routers.DefaultRouter(trailing_slash=False)
 router.register(r'stars', StarViewSet)
 router.register(r'materials', MaterialViewSet)
 router.register(r'blogs', CategoryViewSet)
+router.register(r'trendings', TrendingViewSet, base_name='trending')
 
 
 # Wire up our API using automatic URL routing.
@@ -0,0 +1,11 @@
+# coding=utf-8
+"""
+manage.py audit_query_plans で実行計画を監査する QuerySet の登録
+"""
+from kawaz.core.db.explain import registry
+from .models import Announcement
+
+registry.register('announcements.Announcement.published',
+                  lambda user: Announcement.objects.published(user))
+registry.register('announcements.Announcement.draft',
+                  lambda user: Announcement.objects.draft(user))
@@ -8,6 +8,7 @@ from django.core.urlresolvers import reverse_lazy
 from django.utils.translation import ugettext_lazy as _
 from permission.decorators import permission_required
 from kawaz.core.views.delete import DeleteSuccessMessageMixin
+from kawaz.core.views.pagination import ApproximateCountPaginator
 from .models import Announcement
 from .forms import AnnouncementForm
 
@@ -61,6 +62,7 @@ class AnnouncementDetailView(DetailView):
 class AnnouncementListView(ListView):
     model = Announcement
     paginate_by = 5
+    paginator_class = ApproximateCountPaginator
 
     def get_queryset(self):
         return Announcement.objects.published(self.request.user)
@@ -1,8 +1,13 @@
 from activities.mediator import ActivityMediator
+from kawaz.core.activities.utils import get_related_user_pks
 from django_comments.models import Comment
 
 
 class EntryActivityMediator(ActivityMediator):
+    def get_recipients(self, activity):
+        # ブログ記事の作者の受信箱に配信する
+        return get_related_user_pks(activity, ('author',))
+
     def alter(self, instance, activity, **kwargs):
         # 状態がdraftの場合は通知しない
         if activity and instance.pub_state == 'draft':
@@ -0,0 +1,13 @@
+# coding=utf-8
+"""
+manage.py audit_query_plans で実行計画を監査する QuerySet の登録
+"""
+from kawaz.core.db.explain import registry
+from .models import Entry
+
+registry.register('blogs.Entry.published',
+                  lambda user: Entry.objects.published(user))
+registry.register('blogs.Entry.draft',
+                  lambda user: Entry.objects.draft(user))
+registry.register('blogs.Entry.related',
+                  lambda user: Entry.objects.related(user))
@@ -24,6 +24,9 @@ class EntryActivityMediatorTestCase(BaseActivityMediatorTestCase):
     def test_comment_added(self):
         self._test_comment_added()
 
+    def test_recipients(self):
+        self._test_recipients((self.object.author,))
+
     def test_entry_is_published(self):
         draft_entry = EntryFactory(pub_state='draft')
 
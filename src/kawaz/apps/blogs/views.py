@@ -16,6 +16,7 @@ from permission.decorators import permission_required
 from kawaz.core.views.preview import SingleObjectPreviewViewMixin
 from kawaz.core.personas.models import Persona
 from kawaz.core.views.delete import DeleteSuccessMessageMixin
+from kawaz.core.views.pagination import KeysetPaginationMixin
 
 from .forms import EntryForm
 from .models import Entry, Category
@@ -32,8 +33,10 @@ class EntryMultipleObjectMixin(MultipleObjectMixin):
 
 
 @permission_required('blogs.view_entry')
-class EntryListView(ListView, EntryMultipleObjectMixin):
+class EntryListView(KeysetPaginationMixin, ListView,
+                    EntryMultipleObjectMixin):
     model = Entry
+    keyset_ordering = ('-updated_at', '-pk')
 
 
 @permission_required('blogs.view_entry')
@@ -8,6 +8,8 @@ from django.contrib.contenttypes.models import ContentType
 from kawaz.core.personas.models import Persona
 from activities.models import Activity
 from activities.mediator import ActivityMediator
+from kawaz.core.activities.utils import get_change_remarks
+from kawaz.core.activities.utils import get_related_user_pks
 
 
 class EventActivityMediator(ActivityMediator):
@@ -16,43 +18,27 @@ class EventActivityMediator(ActivityMediator):
         'attendees',
     )
 
+    def get_recipients(self, activity):
+        # 主催者と参加者の受信箱に配信する
+        return get_related_user_pks(activity, ('organizer', 'attendees'))
+
     def alter(self, instance, activity, **kwargs):
         # 状態が draft の場合は通知しない
         if activity and instance.pub_state == 'draft':
             return None
         if activity and activity.status == 'updated':
             # 通知が必要な状態の変更を詳細に記録する
-            if activity.previous:
-                previous = activity.previous.snapshot
-                is_created = lambda x: (
-                    not getattr(previous, x) and
-                    getattr(instance, x)
-                )
-                is_updated = lambda x: (
-                    getattr(previous, x) and
-                    getattr(instance, x) and
-                    getattr(previous, x) != getattr(instance, x)
-                )
-                is_deleted = lambda x: (
-                    getattr(previous, x) and
-                    not getattr(instance, x)
-                )
-                remarks = []
-                attributes = (
-                    'period_start',
-                    'period_end',
-                    'place',
-                    'category',
-                    'number_restriction',
-                    'attendance_deadline',
-                )
-                for attribute in attributes:
-                    if is_created(attribute):
-                        remarks.append(attribute + '_created')
-                    elif is_updated(attribute):
-                        remarks.append(attribute + '_updated')
-                    elif is_deleted(attribute):
-                        remarks.append(attribute + '_deleted')
+            remarks = get_change_remarks(instance, activity, (
+                'period_start',
+                'period_end',
+                'place',
+                'category',
+                'number_restriction',
+                'attendance_deadline',
+                # 下書きからの公開なども通知する
+                'pub_state',
+            ))
+            if remarks is not None:
                 if not remarks:
                     # 通知が必要な変更ではないため通知しない
                     return None
@@ -64,11 +50,11 @@ class EventActivityMediator(ActivityMediator):
             if action not in ('post_add', 'post_remove'):
                 # 追加/削除以外は通知しない
                 return None
-            if action == 'post_add' and instance.attendees.count() == 1:
+            if action == 'post_add' and instance.is_adding():
                 # models.join_organizerシグナルによりpost_save処理より以前に
                 # 作成者参加が行われ event が作成される前に参加者が追加される
-                # したがって参加者が一人（join_organizerにより追加された直後）
-                # の場合に飛んできた m2m_signal は無視
+                # したがって Event の作成中（join_organizerにより追加された直後）
+                # に飛んできた m2m_signal は無視
                 return None
             # 追加・削除をトラックするActivityを作成
             ct = ContentType.objects.get_for_model(instance)
@@ -10,6 +10,7 @@ from django.utils import timezone
 from kawaz.core.db.decorators import validate_on_save
 from kawaz.core.publishments.models import PUB_STATES
 from kawaz.core.publishments.models import PublishmentManagerMixin
+from kawaz.core.db.tracking import FieldTrackerMixin
 
 
 class Category(models.Model):
@@ -63,7 +64,7 @@ ATTENDANCE_DEADLINE_HELP_TEXT = _("A deadline of the attendance. "
                     "No member can attend the event after this deadline.")
 
 @validate_on_save
-class Event(models.Model):
+class Event(FieldTrackerMixin, models.Model):
     # 必須フィールド
     pub_state = models.CharField(_("Publish status"),
                                  max_length=10, choices=PUB_STATES,
@@ -247,6 +248,7 @@ class Event(models.Model):
 
 from django.db.models.signals import post_save
 from django.db.models.signals import post_delete
+from django.db.models.signals import m2m_changed
 from django.dispatch import receiver
 from kawaz.core.utils.signals import disable_for_loaddata
 
@@ -263,6 +265,34 @@ def join_organizer(**kwargs):
         instance.attend(instance.organizer)
 
 
+@receiver(m2m_changed, sender=Event.attendees.through)
+def touch_event_on_attendees_changed(sender, instance, action, reverse,
+                                     pk_set, **kwargs):
+    """
+    参加者の変更時に Event の updated_at を更新するシグナルレシーバ
+
+    購読用カレンダーフィードは updated_at を元に ETag/Last-Modified を
+    生成しているため、参加者の変更もフィードの更新として扱う必要がある
+    ``QuerySet.update()`` では ``post_save`` が送出されず Google カレンダー
+    との同期などが行われないため ``save()`` で更新する
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # Persona 側から変更された場合
+        if action == 'pre_clear':
+            events = Event.objects.filter(attendees=instance)
+        else:
+            events = Event.objects.filter(pk__in=pk_set or ())
+    elif instance.is_saving():
+        # 保存中（作成時の join_organizer など）は既に更新されている
+        return
+    else:
+        events = (instance,)
+    for event in events:
+        event.save(update_fields=('updated_at',))
+
+
 from permission import add_permission_logic
 from permission.logics.staff import StaffPermissionLogic
 from .perms import EventPermissionLogic
@@ -0,0 +1,17 @@
+# coding=utf-8
+"""
+manage.py audit_query_plans で実行計画を監査する QuerySet の登録
+"""
+from kawaz.core.db.explain import registry
+from .models import Event
+
+registry.register('events.Event.published',
+                  lambda user: Event.objects.published(user))
+registry.register('events.Event.draft',
+                  lambda user: Event.objects.draft(user))
+registry.register('events.Event.related',
+                  lambda user: Event.objects.related(user))
+registry.register('events.Event.active',
+                  lambda user: Event.objects.active(user))
+registry.register('events.Event.attendable',
+                  lambda user: Event.objects.attendable(user))
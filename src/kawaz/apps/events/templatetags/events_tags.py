@@ -1,7 +1,7 @@
 from django import template
 from django.template import TemplateSyntaxError
 from django.core.urlresolvers import reverse
-from ..models import Event
+from ..models import Event, Category
 
 register = template.Library()
 
@@ -108,3 +108,34 @@ def get_monthly_archives(context):
                                 url=url,
                                ))
     return archives
+
+
+@register.assignment_tag(takes_context=True)
+def get_attending_calendar_feed_url(context):
+    """
+    ログインユーザーが参加しているイベントの購読用カレンダーフィードの URL を
+    取得し指定された<variable>に格納するテンプレートタグ
+
+    ログインしていない場合は空文字を格納する
+
+    Syntax:
+        {% get_attending_calendar_feed_url as <variable> %}
+    """
+    from ..utils.ical import get_feed_token
+    user = context['request'].user
+    if not user.is_authenticated():
+        return ''
+    return reverse('events_event_attending_calendar_feed',
+                   kwargs={'token': get_feed_token(user)})
+
+
+@register.assignment_tag
+def get_event_categories():
+    """
+    イベントのカテゴリ一覧を取得し指定された<variable>に格納するテンプレート
+    タグ
+
+    Syntax:
+        {% get_event_categories as <variable> %}
+    """
+    return Category.objects.all()
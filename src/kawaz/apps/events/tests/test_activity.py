@@ -104,3 +104,6 @@ class EventActivityMediatorTestCase(BaseActivityMediatorTestCase):
 
     def test_comment_added(self):
         self._test_comment_added()
+
+    def test_recipients(self):
+        self._test_recipients(self.object.attendees.all())
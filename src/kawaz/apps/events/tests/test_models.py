@@ -524,3 +524,25 @@ class EventValidationTestCase(TestCase):
                 attendance_deadline=standard_time-datetime.timedelta(hours=1),
             )
         self.assertRaises(ValidationError, EventFactory, **kwargs)
+
+
+class EventAttendeesChangedTestCase(TestCase):
+    def test_post_save_on_attendees_changed(self):
+        """
+        参加者が変更されると post_save が送出され updated_at が更新される
+        """
+        from django.db.models.signals import post_save
+        event = EventFactory()
+        user = PersonaFactory()
+        updated_at = event.updated_at
+        receiver = mock.MagicMock()
+        post_save.connect(receiver, sender=Event)
+        try:
+            event.attend(user)
+            self.assertEqual(receiver.call_count, 1)
+            user.events_attend.remove(event)
+            self.assertEqual(receiver.call_count, 2)
+        finally:
+            post_save.disconnect(receiver, sender=Event)
+        event = Event.objects.get(pk=event.pk)
+        self.assertGreater(event.updated_at, updated_at)
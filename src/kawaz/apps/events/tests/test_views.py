@@ -579,3 +579,121 @@ class EventCalendarViewTestCase(BaseViewPermissionTestCase):
                     for attendee, cal_attendee in zip(e.attendees.all(), component['attendee']):
                         self.assertEqual(cal_attendee.params['cn'], attendee.nickname)
                         self.assertEqual(cal_attendee.params['role'], attendee.role)
+
+
+class EventCalendarFeedViewTestCase(TestCase):
+    def test_can_reverse_events_event_calendar_feed(self):
+        """
+        URL `events_event_calendar_feed` は`/events/calendar/`を返す
+        """
+        self.assertEqual(reverse('events_event_calendar_feed'),
+                         '/events/calendar/')
+
+    def test_feed_contains_public_events(self):
+        """
+        フィードには公開されている全てのイベントが含まれる
+        """
+        e1 = EventFactory(title='public event 1')
+        e2 = EventFactory(title='public event 2')
+        e3 = EventFactory(title='protected event', pub_state='protected')
+        e4 = EventFactory(title='draft event', pub_state='draft')
+        r = self.client.get('/events/calendar/')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertTrue(r.has_header('ETag'))
+        self.assertTrue(r.has_header('Last-Modified'))
+        content = b''.join(r.streaming_content).decode('utf-8')
+        self.assertTrue(content.startswith('BEGIN:VCALENDAR'))
+        self.assertTrue(content.rstrip().endswith('END:VCALENDAR'))
+        self.assertIn(e1.title, content)
+        self.assertIn(e2.title, content)
+        self.assertNotIn(e3.title, content)
+        self.assertNotIn(e4.title, content)
+        self.assertEqual(content.count('BEGIN:VEVENT'), 2)
+
+    def test_feed_returns_304_if_not_modified(self):
+        """
+        ETagが一致する場合は304を返し、イベントが更新されると200を返す
+        """
+        e = EventFactory()
+        r = self.client.get('/events/calendar/')
+        etag = r['ETag']
+        r = self.client.get('/events/calendar/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 304)
+
+        e.attend(PersonaFactory())
+        r = self.client.get('/events/calendar/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 200)
+
+    def test_category_feed_contains_only_the_category(self):
+        """
+        カテゴリのフィードにはそのカテゴリのイベントのみが含まれる
+        """
+        category = CategoryFactory()
+        e1 = EventFactory(title='categorized event', category=category)
+        e2 = EventFactory(title='other event')
+        r = self.client.get('/events/categories/{}/calendar/'.format(
+            category.pk))
+        self.assertEqual(r.status_code, 200)
+        content = b''.join(r.streaming_content).decode('utf-8')
+        self.assertIn(e1.title, content)
+        self.assertNotIn(e2.title, content)
+
+    def test_attending_feed_contains_only_attending_events(self):
+        """
+        参加イベントのフィードにはトークンのユーザーが参加しているイベントのみ
+        が含まれる（ログインしていなくても protected なものも含まれる）
+        """
+        from ..utils.ical import get_feed_token
+        user = PersonaFactory()
+        e1 = EventFactory(title='attending event', pub_state='protected')
+        e1.attend(user)
+        e2 = EventFactory(title='other event')
+        url = reverse('events_event_attending_calendar_feed',
+                      kwargs={'token': get_feed_token(user)})
+        r = self.client.get(url)
+        self.assertEqual(r.status_code, 200)
+        content = b''.join(r.streaming_content).decode('utf-8')
+        self.assertIn(e1.title, content)
+        self.assertNotIn(e2.title, content)
+
+    def test_attending_feed_with_invalid_token_returns_404(self):
+        """
+        不正なトークンの場合は404を返す
+        """
+        r = self.client.get('/events/calendar/invalid-token/')
+        self.assertEqual(r.status_code, 404)
+
+    def test_attending_feed_with_expired_token_returns_404(self):
+        """
+        有効期限を過ぎたトークンの場合は404を返す
+        """
+        from ..utils.ical import get_feed_token
+        user = PersonaFactory()
+        url = reverse('events_event_attending_calendar_feed',
+                      kwargs={'token': get_feed_token(user)})
+        with self.settings(KAWAZ_EVENTS_FEED_TOKEN_MAX_AGE=-1):
+            r = self.client.get(url)
+        self.assertEqual(r.status_code, 404)
+
+    def test_attending_feed_token_is_revoked_by_password_change(self):
+        """
+        パスワードを変更すると発行済みのトークンは無効になる
+        """
+        from ..utils.ical import get_feed_token
+        user = PersonaFactory()
+        url = reverse('events_event_attending_calendar_feed',
+                      kwargs={'token': get_feed_token(user)})
+        self.assertEqual(self.client.get(url).status_code, 200)
+        user.set_password('new password')
+        user.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_event_list_links_category_feeds(self):
+        """
+        イベント一覧にはカテゴリごとのフィードへのリンクが含まれる
+        """
+        category = CategoryFactory()
+        r = self.client.get('/events/')
+        self.assertContains(r, reverse('events_event_category_calendar_feed',
+                                       kwargs={'pk': category.pk}))
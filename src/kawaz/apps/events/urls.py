@@ -1,11 +1,15 @@
 from django.conf.urls import url
 
 from .views import EventListView, EventCreateView, EventDetailView, EventUpdateView, EventDeleteView, EventAttendView, EventQuitView, EventYearListView, EventMonthListView, EventPreviewView, EventCalendarView
+from .views import EventCalendarFeedView, EventCategoryCalendarFeedView, EventAttendingCalendarFeedView
 
 urlpatterns = [
     url(r'^$', EventListView.as_view(), name='events_event_list'),
     url(r'^(?P<pk>\d+)/$', EventDetailView.as_view(), name='events_event_detail'),
     url(r'^(?P<pk>\d+)/calendar/$', EventCalendarView.as_view(), name='events_event_calendar'),
+    url(r'^calendar/$', EventCalendarFeedView.as_view(), name='events_event_calendar_feed'),
+    url(r'^categories/(?P<pk>\d+)/calendar/$', EventCategoryCalendarFeedView.as_view(), name='events_event_category_calendar_feed'),
+    url(r'^calendar/(?P<token>[\w\-:]+)/$', EventAttendingCalendarFeedView.as_view(), name='events_event_attending_calendar_feed'),
     url(r'^create/$', EventCreateView.as_view(), name='events_event_create'),
     url(r'^preview/$', EventPreviewView.as_view(), name='events_event_preview'),
     url(r'^(?P<pk>\d+)/update/$', EventUpdateView.as_view(), name='events_event_update'),
@@ -1,18 +1,38 @@
-
-
-from icalendar import Calendar
-from icalendar import Event as CalEvent
-from icalendar import vCalAddress, vText, vDatetime
+# icalendar はカレンダーの出力時にしか使わないため各関数内で読み込む
 from django.conf import settings
+from django.core import signing
+from django.utils.crypto import salted_hmac, constant_time_compare
 from django.contrib.sites.models import Site
 
-def generate_ical(object):
-    cal = Calendar()
-    cal['PRODID'] = 'Kawaz'
-    cal['VERSION'] = '2.0'
-    site = Site.objects.get(pk=settings.SITE_ID)
+# 購読用フィードで一度に読み込むイベントの数
+FEED_CHUNK_SIZE = 100
+# 「参加しているイベント」フィードのトークンの署名に使うsalt
+FEED_TOKEN_SALT = 'kawaz.apps.events.calendar'
+# 「参加しているイベント」フィードのトークンの有効期限（秒）
+DEFAULT_FEED_TOKEN_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def _create_vaddress(user):
+    from icalendar import vCalAddress, vText
+    va = vCalAddress('MAILTO:{}'.format(user.email))
+    va.params['cn'] = vText(user.nickname)
+    va.params['ROLE'] = vText(user.role)
+    return va
+
+
+def generate_ical_event(object, site=None):
+    """
+    指定されたイベントの VEVENT コンポーネントを返す
+
+    organizer/category/attendees は予め select_related/prefetch_related
+    されていることを想定している
+    """
+    from icalendar import Event as CalEvent
+    from icalendar import vDatetime
+    site = site or Site.objects.get_current()
 
     event = CalEvent()
+    event['uid'] = 'event-{}@{}'.format(object.pk, site.domain)
     event['summary'] = object.title
     event['description'] = object.body
     event['class'] = 'PUBLIC' if object.pub_state == 'public' else 'PRIVATE'
@@ -25,19 +45,91 @@ def generate_ical(object):
     if object.period_end:
         event['dtend'] = vDatetime(object.period_end).to_ical()
 
-    def create_vaddress(user):
-        va = vCalAddress('MAILTO:{}'.format(user.email))
-        va.params['cn'] = vText(user.nickname)
-        va.params['ROLE'] = vText(user.role)
-        return va
-
-    organizer = create_vaddress(object.organizer)
+    organizer = _create_vaddress(object.organizer)
     event['organizer'] = organizer
     event['URL'] = 'http://{}{}'.format(site.domain, object.get_absolute_url())
 
     for attendee in object.attendees.all():
-        event.add('attendee', create_vaddress(attendee), encode=0)
+        event.add('attendee', _create_vaddress(attendee), encode=0)
+    return event
 
-    cal.add_component(event)
 
+def generate_ical(object):
+    from icalendar import Calendar
+    cal = Calendar()
+    cal['PRODID'] = 'Kawaz'
+    cal['VERSION'] = '2.0'
+    cal.add_component(generate_ical_event(object))
     return cal
+
+
+def iter_ical_feed(queryset, name=None):
+    """
+    指定されたイベントの QuerySet を一つのカレンダーとしてストリーミングする
+    ためのイテレータを返す
+
+    イベントは FEED_CHUNK_SIZE 件ずつ organizer/category/attendees をまとめて
+    取得しながら VEVENT ごとに出力されるため、イベント数に比例したクエリも
+    カレンダー全体のメモリ確保も発生しない
+    """
+    from icalendar import Calendar
+    site = Site.objects.get_current()
+    header = Calendar()
+    header['PRODID'] = 'Kawaz'
+    header['VERSION'] = '2.0'
+    if name:
+        header['X-WR-CALNAME'] = name
+    # 空のカレンダーの END:VCALENDAR の前に VEVENT を差し込む
+    begin, end = header.to_ical().split(b'END:VCALENDAR')
+    yield begin
+    pks = list(queryset.values_list('pk', flat=True))
+    model = queryset.model
+    for i in range(0, len(pks), FEED_CHUNK_SIZE):
+        chunk = pks[i:i + FEED_CHUNK_SIZE]
+        events = model.objects.filter(pk__in=chunk)
+        events = events.select_related('organizer', 'category')
+        events = events.prefetch_related('attendees')
+        for event in events:
+            yield generate_ical_event(event, site=site).to_ical()
+    yield b'END:VCALENDAR' + end
+
+
+def get_feed_token_max_age():
+    return getattr(settings, 'KAWAZ_EVENTS_FEED_TOKEN_MAX_AGE',
+                   DEFAULT_FEED_TOKEN_MAX_AGE)
+
+
+def _get_feed_token_hash(user):
+    # パスワードが変更されると一致しなくなるため、それまでに発行された
+    # トークンは全て無効になる
+    return salted_hmac(FEED_TOKEN_SALT, user.password).hexdigest()[:16]
+
+
+def get_feed_token(user):
+    """
+    指定されたユーザーの「参加しているイベント」フィード用のトークンを返す
+
+    トークンは ``KAWAZ_EVENTS_FEED_TOKEN_MAX_AGE`` 秒で失効し、ユーザーが
+    パスワードを変更すると発行済みのトークンは全て無効になる
+    """
+    return signing.dumps([user.pk, _get_feed_token_hash(user)],
+                         salt=FEED_TOKEN_SALT)
+
+
+def get_user_from_feed_token(token):
+    """
+    トークンからアクティブなユーザーを返す。不正・失効したトークンの場合は
+    None を返す
+    """
+    from kawaz.core.personas.models import Persona
+    try:
+        pk, token_hash = signing.loads(token, salt=FEED_TOKEN_SALT,
+                                       max_age=get_feed_token_max_age())
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    user = Persona.actives.filter(pk=pk).first()
+    if user is None:
+        return None
+    if not constant_time_compare(token_hash, _get_feed_token_hash(user)):
+        return None
+    return user
@@ -1,4 +1,6 @@
 import io
+import hashlib
+from django.views.generic.base import View
 from django.views.generic.detail import DetailView
 from django.views.generic.list import ListView, MultipleObjectMixin
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
@@ -6,6 +8,7 @@ from django.views.generic.dates import YearArchiveView, MonthArchiveView, BaseAr
 from django.contrib import messages
 from django.contrib.messages.views import SuccessMessageMixin
 from django.http.response import HttpResponseNotFound
+from django.http import Http404
 from django.core.urlresolvers import reverse_lazy
 from django.core.exceptions import PermissionDenied
 from django.http.response import HttpResponseRedirect, HttpResponseForbidden, HttpResponseNotAllowed
@@ -13,6 +16,10 @@ from django_filters.views import FilterView
 from django.utils.translation import ugettext as _
 from .filters import EventFilter
 from django.http.response import StreamingHttpResponse
+from django.db.models import Count, Max
+from django.shortcuts import get_object_or_404
+from django.contrib.auth.models import AnonymousUser
+from django.views.decorators.http import condition
 
 from wsgiref.util import FileWrapper
 
@@ -20,10 +27,13 @@ from permission.decorators import permission_required
 from kawaz.core.views.delete import DeleteSuccessMessageMixin
 
 from kawaz.core.views.preview import SingleObjectPreviewViewMixin
+from kawaz.core.views.pagination import ApproximateCountPaginator
 
-from .models import Event
+from .models import Event, Category
 from .forms import EventForm, EventUpdateForm, EventCreationForm
 from .utils.ical import generate_ical
+from .utils.ical import iter_ical_feed
+from .utils.ical import get_user_from_feed_token
 
 class EventPublishedQuerySetMixin(MultipleObjectMixin):
     def get_queryset(self):
@@ -155,6 +165,7 @@ class EventYearListView(YearArchiveView, EventPublishedQuerySetMixin, EventDateA
     allow_future = True
     make_object_list = True
     paginate_by = 10
+    paginator_class = ApproximateCountPaginator
 
 
 class EventMonthListView(MonthArchiveView, EventPublishedQuerySetMixin, EventDateArchiveMixin):
@@ -193,3 +204,111 @@ class EventCalendarView(DetailView):
         response = StreamingHttpResponse(FileWrapper(file), content_type=self.MIMETYPE)
         response['Content-Disposition'] = 'attachment; filename={}.ics'.format(object.pk)
         return response
+
+
+class EventCalendarFeedViewBase(View):
+    """
+    複数のEventを購読可能なiCal形式のフィードとしてストリーミングするView
+
+    カレンダーアプリは数分おきにポーリングするため、フィードに含まれる
+    Eventの最終更新日時と件数からETag/Last-Modifiedを生成し、変更がなければ
+    304を返す
+    """
+    MIMETYPE = 'text/calendar; charset=utf-8'
+    feed_name = None
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def get_feed_name(self):
+        return self.feed_name
+
+    def get_feed_queryset(self):
+        if not hasattr(self, '_feed_queryset'):
+            qs = self.get_queryset()
+            qs = qs.exclude(period_start=None).exclude(pub_state='draft')
+            self._feed_queryset = qs
+        return self._feed_queryset
+
+    def get_feed_state(self):
+        """
+        フィードに含まれるEventの最終更新日時と件数を1クエリで取得する
+        """
+        if not hasattr(self, '_feed_state'):
+            qs = self.get_feed_queryset().order_by()
+            self._feed_state = qs.aggregate(updated_at=Max('updated_at'),
+                                            count=Count('pk'))
+        return self._feed_state
+
+    def get_etag(self):
+        state = self.get_feed_state()
+        key = '{}:{}:{}'.format(self.request.path,
+                                state['updated_at'], state['count'])
+        return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+    def get_last_modified(self):
+        return self.get_feed_state()['updated_at']
+
+    def render_feed(self):
+        return StreamingHttpResponse(
+            iter_ical_feed(self.get_feed_queryset(), self.get_feed_name()),
+            content_type=self.MIMETYPE)
+
+    def get(self, request, *args, **kwargs):
+        @condition(etag_func=lambda *args, **kwargs: self.get_etag(),
+                   last_modified_func=(
+                       lambda *args, **kwargs: self.get_last_modified()))
+        def conditional_get(request, *args, **kwargs):
+            return self.render_feed()
+        return conditional_get(request, *args, **kwargs)
+
+
+class EventCalendarFeedView(EventCalendarFeedViewBase):
+    """
+    公開されている全てのEventのフィード
+    """
+    feed_name = 'Kawaz'
+
+    def get_queryset(self):
+        # カレンダーアプリはログインしないため常に一般公開のもののみ
+        return Event.objects.published(AnonymousUser())
+
+
+class EventCategoryCalendarFeedView(EventCalendarFeedViewBase):
+    """
+    指定されたカテゴリの公開されているEventのフィード
+    """
+    def get_category(self):
+        if not hasattr(self, '_category'):
+            self._category = get_object_or_404(Category,
+                                               pk=self.kwargs['pk'])
+        return self._category
+
+    def get_feed_name(self):
+        return 'Kawaz ({})'.format(self.get_category().label)
+
+    def get_queryset(self):
+        qs = Event.objects.published(AnonymousUser())
+        return qs.filter(category=self.get_category())
+
+
+class EventAttendingCalendarFeedView(EventCalendarFeedViewBase):
+    """
+    トークンで指定されたユーザーが参加しているEventのフィード
+
+    カレンダーアプリはログインできないため、URLに含まれる署名付きトークンで
+    ユーザーを特定する。トークンは期限付きでパスワードの変更により失効する
+    """
+    def get_user(self):
+        if not hasattr(self, '_user'):
+            self._user = get_user_from_feed_token(self.kwargs['token'])
+            if self._user is None:
+                raise Http404
+        return self._user
+
+    def get_feed_name(self):
+        return 'Kawaz ({})'.format(self.get_user().nickname)
+
+    def get_queryset(self):
+        user = self.get_user()
+        return Event.objects.published(user).filter(attendees=user)
@@ -0,0 +1,107 @@
+"""
+Kawaz Flavored Markdown のブロック単位での描画
+
+文書を空行区切りのブロック（フェンスで囲まれたコードブロックは一つの
+ブロック）に分割し、ブロックごとに描画した HTML をブロックのハッシュを
+キーとしてキャッシュする。ライブプレビューのように少しずつ変更される文書を
+繰り返し描画する場合、変更されたブロックのみが描画される（Pygments による
+シンタックスハイライトも含む）
+
+脚注や参照形式のリンクのようにブロックを跨いで参照される定義が含まれる
+文書は分割せずに一つのブロックとして描画する
+"""
+import re
+import hashlib
+from django.core.cache import cache
+from .parser import parse_kfm
+
+
+CACHE_KEY_PREFIX = 'kawaz.apps.kfm.blocks'
+# メンションや添付ファイルの変更は反映されないためプレビュー用に短めにする
+CACHE_TIMEOUT = 60 * 60
+
+FENCE_PATTERN = re.compile(r'^\s{0,3}(?P<fence>```|~~~)')
+LIST_PATTERN = re.compile(r'^\s{0,3}([*+\-]|\d+\.)\s')
+# 脚注（[^label]: ...）および参照形式のリンク（[label]: ...）の定義
+DEFINITION_PATTERN = re.compile(r'^\s{0,3}\[[^\]]+\]:', flags=re.MULTILINE)
+
+
+def split_blocks(value):
+    """
+    指定された文字列をブロックのリストに分割する
+
+    インデントされたブロック（リストの継続やインデントされたコード）と
+    連続するリストは直前のブロックに結合される
+    """
+    value = value.replace('\r\n', '\n')
+    if DEFINITION_PATTERN.search(value):
+        return [value] if value.strip() else []
+    blocks = []
+    current = []
+    fence = None
+    for line in value.split('\n'):
+        if fence:
+            current.append(line)
+            if line.strip().startswith(fence):
+                fence = None
+            continue
+        m = FENCE_PATTERN.match(line)
+        if m:
+            fence = m.group('fence')
+            current.append(line)
+        elif line.strip():
+            current.append(line)
+        elif current:
+            blocks.append(current)
+            current = []
+    if current:
+        blocks.append(current)
+    merged = []
+    for block in blocks:
+        if merged and (block[0][:1] in (' ', '\t') or (
+                LIST_PATTERN.match(block[0]) and
+                LIST_PATTERN.match(merged[-1][0]))):
+            merged[-1] = merged[-1] + [''] + block
+        else:
+            merged.append(block)
+    return ['\n'.join(block) for block in merged]
+
+
+def get_block_hash(block):
+    return hashlib.sha1(block.encode('utf-8')).hexdigest()
+
+
+def _get_cache_key(block_hash):
+    return '{}:{}'.format(CACHE_KEY_PREFIX, block_hash)
+
+
+def render_blocks(value, known=()):
+    """
+    指定された文字列をブロックごとに描画する
+
+    描画済みのブロックはキャッシュから取得され、キャッシュに無いブロックのみ
+    が描画される
+
+    Args:
+        value (str): Kawaz Flavored Markdown の文字列
+        known (iterable): 描画が不要な（クライアントが HTML を保持している）
+            ブロックのハッシュ
+
+    Returns:
+        list: ``(<hash>, <html>)`` のリスト。``known`` に含まれるブロックの
+            html は None
+    """
+    known = set(known)
+    blocks = [(get_block_hash(block), block) for block in split_blocks(value)]
+    keys = {_get_cache_key(h): h for h, block in blocks if h not in known}
+    rendered = {keys[key]: html for key, html
+                in cache.get_many(list(keys.keys())).items()}
+    misses = {}
+    for block_hash, block in blocks:
+        if block_hash in known or block_hash in rendered:
+            continue
+        rendered[block_hash] = misses[block_hash] = parse_kfm(block)
+    if misses:
+        cache.set_many({_get_cache_key(h): html for h, html in misses.items()},
+                       CACHE_TIMEOUT)
+    return [(h, rendered.get(h)) for h, block in blocks]
@@ -1,32 +1,164 @@
+"""
+@username のユーザーリンク展開
+
+展開された HTML はユーザー名ごとにキャッシュ（存在しないユーザー名も含む）
+され、一つのリクエスト内で解決済みのユーザー名はメモリ上で再利用される。
+キャッシュはペルソナのユーザー名・ニックネーム・アバターが変更された際に
+``invalidate_mentions()`` により破棄される
+"""
 import re
-from django.template.loader import render_to_string
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from django.core.cache import cache
+from django.core.signals import request_started, request_finished
+from django.template.loader import get_template
 from .utils import is_quoated
 
 
 PATTERN = re.compile(r'@(?P<username>[0-9a-zA-Z_\-]+)', flags=re.MULTILINE)
 TEMPLATE_NAME = 'kfm/extras/mention.html'
 
+CACHE_KEY_PREFIX = 'kawaz.apps.kfm.mention'
+CACHE_TIMEOUT = 60 * 60 * 24
+# 存在しないユーザー名を表すキャッシュの値
+MISSING = ''
+# メモに保持するメンションの最大数
+MEMO_SIZE = 1000
+
+
+class RequestMemo(threading.local):
+    """
+    リクエスト中に解決されたメンションを保持するスレッドローカルな辞書
+
+    リクエストの開始時・終了時に破棄される。リクエスト外（管理コマンド等）
+    で長く生存するスレッドでも肥大化しないよう ``MEMO_SIZE`` を超える場合は
+    破棄してから保持する
+    """
+    def __init__(self):
+        self.mentions = {}
+
+    def update(self, mentions):
+        if len(self.mentions) + len(mentions) > MEMO_SIZE:
+            self.mentions = {}
+        if len(mentions) <= MEMO_SIZE:
+            self.mentions.update(mentions)
+
+    def clear(self):
+        self.mentions = {}
+
+
+_memo = RequestMemo()
+
+
+def clear_request_memo(**kwargs):
+    _memo.clear()
+request_started.connect(clear_request_memo,
+                        dispatch_uid='kawaz.apps.kfm.extras.mention')
+request_finished.connect(clear_request_memo,
+                         dispatch_uid='kawaz.apps.kfm.extras.mention')
+
+
+@contextmanager
+def request_memo():
+    """
+    リクエスト外でメモを利用する範囲を指定するコンテキストマネージャ
+
+        >>> with request_memo():
+        ...     prefetch_mentions(bodies)
+        ...     html = [parse_mentions(body) for body in bodies]
+    """
+    _memo.clear()
+    try:
+        yield _memo
+    finally:
+        _memo.clear()
+
+
+@lru_cache()
+def _get_template():
+    return get_template(TEMPLATE_NAME)
+
+
+def _get_cache_key(username):
+    return '{}:{}'.format(CACHE_KEY_PREFIX, username)
+
+
+def render_mention(user):
+    """
+    指定されたユーザーのメンションを HTML に変換する
+    """
+    return _get_template().render({'user': user}).strip()
+
+
+def resolve_mentions(usernames):
+    """
+    指定されたユーザー名のメンションの HTML をまとめて解決する
+
+    リクエスト内のメモ、キャッシュ、データベースの順に解決され、データベース
+    へのクエリは高々一度しか発行されない
+
+    Returns:
+        dict: ``{<username>: <html>}`` 存在しないユーザー名は含まれない
+    """
+    from kawaz.core.personas.models import Persona
+    usernames = set(usernames)
+    resolved = {u: _memo.mentions[u] for u in usernames
+                if u in _memo.mentions}
+    missing = usernames - set(resolved)
+    if missing:
+        keys = {_get_cache_key(u): u for u in missing}
+        for key, html in cache.get_many(list(keys.keys())).items():
+            resolved[keys[key]] = html
+        missing -= set(resolved)
+    if missing:
+        qs = Persona.objects.filter(username__in=missing)
+        found = {u.username: render_mention(u) for u in qs}
+        found.update({u: MISSING for u in missing if u not in found})
+        cache.set_many({_get_cache_key(u): html for u, html in found.items()},
+                       CACHE_TIMEOUT)
+        resolved.update(found)
+    _memo.update(resolved)
+    return {u: html for u, html in resolved.items() if html != MISSING}
+
+
+def prefetch_mentions(values):
+    """
+    複数の文字列に含まれるメンションをまとめて解決し、以降の
+    ``parse_mentions()`` で再利用できるようにする
+    """
+    usernames = set()
+    for value in values:
+        usernames.update(PATTERN.findall(value or ''))
+    if usernames:
+        resolve_mentions(usernames)
+
+
+def invalidate_mentions(*usernames):
+    """
+    指定されたユーザー名のメンションのキャッシュを破棄する
+    """
+    for username in usernames:
+        _memo.mentions.pop(username, None)
+    cache.delete_many([_get_cache_key(u) for u in usernames])
+
 
 def parse_mentions(value):
     """
     指定された文字列から @username という部分を探しリンク文字列に変換
     """
-    from kawaz.core.personas.models import Persona
     usernames_specified = PATTERN.findall(value)
-    # 指定されているユーザー限定でQuerySetを取得し変換用辞書を作成
-    qs = Persona.objects.filter(username__in=usernames_specified)
-    users = {u.username: u for u in qs}
-    usernames_exists = users.keys()
+    if not usernames_specified:
+        return value
+    # 指定されているユーザー限定で変換用辞書を作成
+    mentions = resolve_mentions(usernames_specified)
     def repl(m):
         if is_quoated(m.string, m.start(), m.end()):
             # クォートされているので無視
             return m.group()
         username = m.group('username')
-        if username in usernames_exists:
-            html = render_to_string(TEMPLATE_NAME, {
-                'user': users[username],
-            })
-            return html.strip()
+        if username in mentions:
+            return mentions[username]
         else:
             # 存在しないユーザーなので無視
             return m.group()
@@ -1,4 +1,4 @@
-import markdown2
+import threading
 from .extras.youtube import parse_youtube_urls
 from .extras.nicovideo import parse_nicovideo_urls
 from .extras.mention import parse_mentions
@@ -6,14 +6,40 @@ from .extras.strikethrough import parse_strikethroughs
 from .extras.autolink import parse_autolinks
 
 
-
-_markdown = markdown2.Markdown(extras=[
+EXTRAS = [
     'cuddled-lists',        # リスト記法でパラグラフの分断を可能に
     'code-friendly',        # _, __ による em, strong を無効化
     'fenced-code-blocks',   # ``` で囲まれた部分をソースコードとして扱う
     'footnotes',            # 脚注シンタックス（[^label]）を追加
     'tables',               # GFM的なテーブルシンタックスを追加
-])
+]
+
+
+class MarkdownLocal(threading.local):
+    """
+    スレッドごとの Markdown パーサーを保持する
+
+    markdown2.Markdown は変換中の状態（脚注・リンク参照・ハッシュなど）を
+    インスタンスに保持するため、スレッド間で共有すると同時に変換された
+    文書の状態が混ざる
+    """
+    markdown = None
+
+
+_local = MarkdownLocal()
+
+
+def get_markdown():
+    """
+    現在のスレッドの Markdown パーサーを返す
+
+    kfm のテンプレートタグは起動時に読み込まれるため markdown2 は初回の
+    パース時に読み込む。パーサーはスレッドごとに一度だけ生成される
+    """
+    if _local.markdown is None:
+        import markdown2
+        _local.markdown = markdown2.Markdown(extras=EXTRAS)
+    return _local.markdown
 
 
 def parse_kfm(value):
@@ -43,7 +69,7 @@ def parse_kfm(value):
     value = parse_mentions(value)
     value = parse_attachments(value)
     # GitHub Flavored Markdown + Alpha
-    value = _markdown.convert(value)
+    value = get_markdown().convert(value)
     value = parse_strikethroughs(value)
     # Markdownが提要されていないURLのプレイヤー展開
     value = parse_youtube_urls(value)
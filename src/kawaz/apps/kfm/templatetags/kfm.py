@@ -73,3 +73,22 @@ class KFMNode(template.Node):
         value = self.nodelist.render(context)
         value = parse_kfm(value)
         return mark_safe(value)
+
+
+@register.simple_tag
+def prefetch_mentions(object_list, attr):
+    """
+    指定されたオブジェクトのリストの各要素の属性に含まれる @username を
+    まとめて解決しておくタグ。コメント一覧などで同じユーザーへのメンションを
+    一度のクエリ（もしくはキャッシュ参照）で展開するために利用する
+
+    Usage:
+        {% prefetch_mentions comments "comment" %}
+        {% for comment in comments %}
+            {{ comment.comment | kfm }}
+        {% endfor %}
+
+    """
+    from ..extras.mention import prefetch_mentions
+    prefetch_mentions(getattr(o, attr, '') for o in object_list)
+    return ''
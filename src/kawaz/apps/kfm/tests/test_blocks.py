@@ -0,0 +1,56 @@
+from unittest.mock import patch
+from django.test import TestCase
+from django.core.cache import cache
+from ..blocks import split_blocks, render_blocks, get_block_hash
+from ..parser import parse_kfm
+
+
+class SplitBlocksTestCase(TestCase):
+    def test_split_blocks(self):
+        """空行区切りでブロックに分割される"""
+        value = "# Title\n\nfoo\nbar\n\n\nhoge"
+        self.assertEqual(split_blocks(value), ["# Title", "foo\nbar", "hoge"])
+
+    def test_split_blocks_fenced(self):
+        """フェンスで囲まれたコードブロックは空行を含んでも分割されない"""
+        value = "foo\n\n```python\na = 1\n\nb = 2\n```\n\nbar"
+        self.assertEqual(split_blocks(value), [
+            "foo", "```python\na = 1\n\nb = 2\n```", "bar",
+        ])
+
+    def test_split_blocks_lists(self):
+        """連続するリストとインデントされたブロックは結合される"""
+        value = "- foo\n\n- bar\n\n    baz\n\nhoge"
+        self.assertEqual(split_blocks(value), [
+            "- foo\n\n- bar\n\n    baz", "hoge",
+        ])
+
+    def test_split_blocks_with_definitions(self):
+        """脚注や参照リンクの定義を含む文書は分割されない"""
+        value = "foo[^1]\n\nbar\n\n[^1]: footnote"
+        self.assertEqual(split_blocks(value), [value])
+
+
+class RenderBlocksTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_render_blocks(self):
+        """ブロックごとに描画された HTML を返す"""
+        value = "**foo**\n\nbar"
+        self.assertEqual(render_blocks(value), [
+            (get_block_hash("**foo**"), parse_kfm("**foo**")),
+            (get_block_hash("bar"), parse_kfm("bar")),
+        ])
+
+    def test_render_blocks_only_changed(self):
+        """変更されたブロックのみが描画される"""
+        render_blocks("foo\n\nbar")
+        with patch('kawaz.apps.kfm.blocks.parse_kfm',
+                   side_effect=parse_kfm) as m:
+            blocks = render_blocks("foo\n\nbaz", known=[get_block_hash("foo")])
+        m.assert_called_once_with("baz")
+        self.assertEqual(blocks, [
+            (get_block_hash("foo"), None),
+            (get_block_hash("baz"), parse_kfm("baz")),
+        ])
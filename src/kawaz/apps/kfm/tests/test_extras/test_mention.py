@@ -1,7 +1,14 @@
 from django.test import TestCase
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db import close_old_connections
 from django.template.loader import render_to_string
 from kawaz.core.personas.tests.factories import PersonaFactory
 from ...extras.mention import parse_mentions
+from ...extras.mention import prefetch_mentions
+from ...extras.mention import clear_request_memo
+from ...extras.mention import request_memo
+from ...extras import mention
 
 
 class ParseMentionsTestCase(TestCase):
@@ -83,3 +90,76 @@ class ParseMentionsTestCase(TestCase):
             self._render_template(self.users[2]),
             "invalid_username",
         ))
+
+
+class MentionCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_request_memo()
+        self.users = (
+            PersonaFactory(),
+            PersonaFactory(),
+        )
+
+    def tearDown(self):
+        clear_request_memo()
+
+    def test_parse_mentions_cached(self):
+        """一度展開されたメンションはクエリを発行せずに展開される"""
+        value = "@{} @{}".format(self.users[0].username, 'invalid_username')
+        expected = parse_mentions(value)
+        clear_request_memo()
+        with self.assertNumQueries(0):
+            self.assertEqual(parse_mentions(value), expected)
+
+    def test_prefetch_mentions(self):
+        """複数の文字列に含まれるメンションを一度のクエリで解決する"""
+        values = ["@{}".format(u.username) for u in self.users]
+        with self.assertNumQueries(1):
+            prefetch_mentions(values)
+        with self.assertNumQueries(0):
+            for value in values:
+                parse_mentions(value)
+
+    def test_invalidate_on_nickname_changed(self):
+        """ニックネームが変更された場合キャッシュは破棄される"""
+        user = self.users[0]
+        value = "@{}".format(user.username)
+        parse_mentions(value)
+        user.nickname = 'new nickname'
+        user.save()
+        with self.assertNumQueries(1):
+            parse_mentions(value)
+
+    def test_invalidate_on_created(self):
+        """存在しなかったユーザーが作成された場合キャッシュは破棄される"""
+        value = "@kawaz_new_user"
+        self.assertEqual(parse_mentions(value), value)
+        PersonaFactory(username='kawaz_new_user')
+        self.assertNotEqual(parse_mentions(value), value)
+
+    def test_memo_cleared_on_request_finished(self):
+        """リクエストの終了時にメモは破棄される"""
+        parse_mentions("@{}".format(self.users[0].username))
+        self.assertTrue(mention._memo.mentions)
+        # テストのトランザクションを閉じないよう Client と同様に切断する
+        request_finished.disconnect(close_old_connections)
+        try:
+            request_finished.send(sender=self.__class__)
+        finally:
+            request_finished.connect(close_old_connections)
+        self.assertEqual(mention._memo.mentions, {})
+
+    def test_memo_size(self):
+        """メモは MEMO_SIZE を超えて保持されない"""
+        memo = mention.RequestMemo()
+        for i in range(mention.MEMO_SIZE + 1):
+            memo.update({'user{}'.format(i): ''})
+        self.assertLessEqual(len(memo.mentions), mention.MEMO_SIZE)
+
+    def test_request_memo(self):
+        """request_memo() の範囲外ではメモが残らない"""
+        with request_memo():
+            parse_mentions("@{}".format(self.users[0].username))
+            self.assertTrue(mention._memo.mentions)
+        self.assertEqual(mention._memo.mentions, {})
@@ -1,10 +1,11 @@
+import threading
 from django.test import TestCase
 from django.template import Template, Context
 from django.template.loader import render_to_string
 from kawaz.core.personas.tests.factories import PersonaFactory
 from kawaz.core.personas.tests.factories import ProfileFactory
 from kawaz.apps.attachments.tests.factories import MaterialFactory
-from ..parser import parse_kfm
+from ..parser import parse_kfm, get_markdown
 
 
 # TODO: シンタックス展開順テスト
@@ -226,3 +227,40 @@ class ParseKFMTestCase(TestCase):
             '</a></p>'
         )
         self.assertIn(expected, value)
+
+
+class MarkdownPerThreadTestCase(TestCase):
+
+    def test_get_markdown_per_thread(self):
+        """Markdown パーサーはスレッドごとに生成され再利用される"""
+        markdowns = []
+        thread = threading.Thread(
+            target=lambda: markdowns.extend([get_markdown(), get_markdown()]))
+        thread.start()
+        thread.join()
+        self.assertIs(markdowns[0], markdowns[1])
+        self.assertIs(get_markdown(), get_markdown())
+        self.assertIsNot(get_markdown(), markdowns[0])
+
+    def test_convert_concurrently(self):
+        """複数のスレッドで同時に変換しても脚注が混ざらない"""
+        results = {}
+
+        def convert(i):
+            original = "note{0}[^n{0}]\n\n[^n{0}]: footnote{0}\n".format(i)
+            for j in range(20):
+                value = get_markdown().convert(original)
+                if 'footnote{}'.format(i) not in value or any(
+                        'footnote{}'.format(k) in value
+                        for k in range(8) if k != i):
+                    results[i] = value
+                    return
+            results[i] = None
+
+        threads = [threading.Thread(target=convert, args=(i,))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, dict.fromkeys(range(8)))
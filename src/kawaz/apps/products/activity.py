@@ -3,44 +3,29 @@ from django_comments.models import Comment
 from django.conf import settings
 from kawaz.apps.products.models import AbstractRelease, Screenshot
 from activities.mediator import ActivityMediator
+from kawaz.core.activities.utils import get_change_remarks
+from kawaz.core.activities.utils import get_related_user_pks
 
 
 class ProductActivityMediator(ActivityMediator):
     notifiers = settings.ACTIVITIES_DEFAULT_NOTIFIERS + ('twitter_kawaz_official',)
 
+    def get_recipients(self, activity):
+        # 管理者の受信箱に配信する（リリース・スクリーンショットの追加も
+        # プロダクトのアクティビティとして配信される）
+        return get_related_user_pks(activity, ('administrators',))
+
     def alter(self, instance, activity, **kwargs):
         # 状態がdraftの場合は通知しない
         if activity and activity.status == 'updated':
-            if activity.previous:
-                # 通知が必要な状態の変更を詳細に記録する
-                previous = activity.previous.snapshot
-                is_created = lambda x: (
-                    not getattr(previous, x) and
-                    getattr(instance, x)
-                )
-                is_updated = lambda x: (
-                    getattr(previous, x) and
-                    getattr(instance, x) and
-                    getattr(previous, x) != getattr(instance, x)
-                )
-                is_deleted = lambda x: (
-                    getattr(previous, x) and
-                    not getattr(instance, x)
-                )
-                remarks = []
-                attributes = (
-                    'title',
-                    'description',
-                    'thumbnail',
-                    'trailer'
-                )
-                for attribute in attributes:
-                    if is_created(attribute):
-                        remarks.append(attribute + '_created')
-                    elif is_updated(attribute):
-                        remarks.append(attribute + '_updated')
-                    elif is_deleted(attribute):
-                        remarks.append(attribute + '_deleted')
+            # 通知が必要な状態の変更を詳細に記録する
+            remarks = get_change_remarks(instance, activity, (
+                'title',
+                'description',
+                'thumbnail',
+                'trailer',
+            ))
+            if remarks is not None:
                 if not remarks:
                     # 通知が必要な変更ではないため通知しない
                     return None
@@ -0,0 +1,77 @@
+"""
+プロダクト一覧のフィルタに表示するファセットごとのプロダクト数の集計
+
+マイグレーションからも利用されるため、モデルは引数として受け取る
+（マイグレーションでは履歴上のモデルが渡される）
+"""
+from itertools import product as cartesian_product
+
+# 絞り込まないことを表すキー（pk は 1 から始まるため衝突しない）
+ALL = 0
+
+
+def to_facet_key(pk):
+    """
+    Platform/Category の pk（絞り込まない場合は None）を保存するキーに変換する
+    """
+    return ALL if pk is None else pk
+
+
+def from_facet_key(key):
+    """
+    保存されたキーを Platform/Category の pk（絞り込まない場合は None）に
+    変換する
+    """
+    return None if key == ALL else key
+
+
+def get_facet_keys(platform_ids, category_ids, total=False):
+    """
+    指定された Platform/Category の組み合わせに対応するファセットのキーを返す
+
+    Args:
+        platform_ids (iterable): Platform の pk のリスト
+        category_ids (iterable): Category の pk のリスト
+        total (bool): 全件数を表すキー ``(None, None)`` を含めるか否か
+
+    Returns:
+        list: ``(platform_id, category_id)`` のリスト
+    """
+    keys = [(None, None)] if total else []
+    keys.extend((platform_id, None) for platform_id in platform_ids)
+    keys.extend((None, category_id) for category_id in category_ids)
+    keys.extend(cartesian_product(platform_ids, category_ids))
+    return keys
+
+
+def rebuild_facet_counts(product_model, facet_count_model):
+    """
+    既存のプロダクトから全てのファセットの件数を再計算する
+
+    Args:
+        product_model (model class): Product モデル
+        facet_count_model (model class): ProductFacetCount モデル
+    """
+    through_platform = product_model.platforms.through.objects
+    through_category = product_model.categories.through.objects
+    platforms = {}
+    categories = {}
+    for product_id, platform_id in through_platform.values_list(
+            'product_id', 'platform_id'):
+        platforms.setdefault(product_id, set()).add(platform_id)
+    for product_id, category_id in through_category.values_list(
+            'product_id', 'category_id'):
+        categories.setdefault(product_id, set()).add(category_id)
+    counts = {}
+    for product_id in product_model.objects.values_list('pk', flat=True):
+        for key in get_facet_keys(platforms.get(product_id, ()),
+                                  categories.get(product_id, ()),
+                                  total=True):
+            counts[key] = counts.get(key, 0) + 1
+    facet_count_model.objects.all().delete()
+    facet_count_model.objects.bulk_create([
+        facet_count_model(platform_key=to_facet_key(platform_id),
+                          category_key=to_facet_key(category_id),
+                          count=count)
+        for (platform_id, category_id), count in counts.items()
+    ])
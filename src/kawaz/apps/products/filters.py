@@ -1,4 +1,4 @@
-from django.db.models import BLANK_CHOICE_DASH, Count
+from django.db.models import BLANK_CHOICE_DASH
 from django.utils.encoding import force_text
 from django.utils.http import urlencode
 from django.utils.translation import ugettext_lazy as _
@@ -6,20 +6,59 @@ import django_filters
 from django_filters import filters
 from .models import Product
 from .models import Category, Platform
+from .models import ProductFacetCount
 from kawaz.core.filters.widgets import ListGroupLinkWidget
 
 
-class PlatformListGroupLinkWidget(ListGroupLinkWidget):
+class FacetCountListGroupLinkWidgetMixin(object):
     """
-    プラットフォームアイコンを一覧に出すWidget
+    ProductFacetCount に保存された件数を各要素に表示するWidgetのMixin
+
+    もう一方のファセットが選択されている場合（e.g. ?categories=1）はその値
+    との組み合わせでの件数を表示する
     """
+    facet = None
+    cross_facet = None
+    cross_facet_field_name = None
+
+    def get_facet_counts(self):
+        selected = self.data.get(self.cross_facet_field_name)
+        try:
+            selected = int(selected)
+        except (TypeError, ValueError):
+            selected = None
+        counts = ProductFacetCount.objects.get_counts(
+            self.facet, **{self.cross_facet: selected})
+        return {str(k) if k is not None else None: v
+                for k, v in counts.items()}
+
     def render_options(self, choices, selected_choices, name):
-        # 1度のSQLで全てのプラットフォームが取得できるようにここで予め取得している
         # render_optionsはおそらく1度しか呼ばれないので、1度だけしか取得されない
         # __init__内で行うと実行タイミングが不定のため、ここで初期化している
-        platforms = Platform.objects.all().annotate(products_count=Count('products'))
-        self.info = {str(platform.pk): {'url': platform.icon.url, 'count': platform.products_count} for platform in platforms}
-        self.all_count = Product.objects.count()
+        self.counts = self.get_facet_counts()
+        return super().render_options(choices, selected_choices, name)
+
+    def get_count(self, option_value):
+        if option_value == '':
+            return self.counts.get(None, 0)
+        return self.counts.get(option_value, 0)
+
+
+class PlatformListGroupLinkWidget(FacetCountListGroupLinkWidgetMixin,
+                                  ListGroupLinkWidget):
+    """
+    プラットフォームアイコンを一覧に出すWidget
+    """
+    facet = 'platform'
+    cross_facet = 'category'
+    cross_facet_field_name = 'categories'
+
+    def render_options(self, choices, selected_choices, name):
+        # 1度のSQLで全てのプラットフォームが取得できるようにここで予め取得している
+        # 件数は ProductFacetCount から取得するため集計クエリは発行しない
+        platforms = Platform.objects.only('pk', 'icon')
+        self.info = {str(platform.pk): platform.icon.url
+                     for platform in platforms}
         return super().render_options(choices, selected_choices, name)
 
     def render_option(self, name, selected_choices,
@@ -37,11 +76,8 @@ class PlatformListGroupLinkWidget(ListGroupLinkWidget):
         data[name] = option_value
         selected = data == self.data or option_value in selected_choices
 
-        icon = ''
-        count = self.all_count
-        if option_value in self.info:
-            icon = self.info[option_value]['url']
-            count = self.info[option_value]['count']
+        icon = self.info.get(option_value, '')
+        count = self.get_count(option_value)
         try:
             url = data.urlencode()
         except AttributeError:
@@ -58,6 +94,25 @@ class PlatformListGroupLinkWidget(ListGroupLinkWidget):
         return '<a%(attrs)s href="?%(query_string)s"><img class="platform-icon" src="%(icon)s">%(label)s (%(count)s)</a>'
 
 
+class CategoryListGroupLinkWidget(FacetCountListGroupLinkWidgetMixin,
+                                  ListGroupLinkWidget):
+    """
+    カテゴリごとのプロダクト数を一覧に出すWidget
+    """
+    facet = 'category'
+    cross_facet = 'platform'
+    cross_facet_field_name = 'platforms'
+
+    def render_option(self, name, selected_choices,
+                      option_value, option_label):
+        if option_label == BLANK_CHOICE_DASH[0][1]:
+            option_label = _("All")
+        count = self.get_count(force_text(option_value))
+        option_label = '{} ({})'.format(force_text(option_label), count)
+        return super().render_option(name, selected_choices,
+                                     option_value, option_label)
+
+
 class ProductFilter(django_filters.FilterSet):
     platforms = filters.ModelChoiceFilter(
         label=_('Platforms'),
@@ -67,7 +122,7 @@ class ProductFilter(django_filters.FilterSet):
     categories = filters.ModelChoiceFilter(
         label=_('Categories'),
         queryset=Category.objects.all(),
-        widget=ListGroupLinkWidget(choices=[('', _('All'))]))
+        widget=CategoryListGroupLinkWidget(choices=[('', _('All'))]))
 
     class Meta:
         model = Product
@@ -0,0 +1,91 @@
+"""
+プロダクト詳細ページで利用するプロダクトとその関連オブジェクトを一定数の
+クエリでまとめて読み込むローダー
+
+読み込まれたプロダクトは関連オブジェクト（リリース・スクリーンショット・
+プラットフォーム・カテゴリ・管理者・プロジェクト・最終更新者）と共に一つの
+単位としてキャッシュされ、プロダクトやその関連オブジェクトが変更された場合に
+``invalidate_product()`` により破棄される（``models.py`` のシグナル処理を参照）
+
+関連プロダクトは他のプロダクトの変更に依存し、キャッシュを破棄する対象を
+求めることができないためキャッシュせずに毎回読み込む
+"""
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.http import Http404
+from .models import Product, PackageRelease, URLRelease
+
+CACHE_KEY_PREFIX = 'kawaz.apps.products.loaders'
+CACHE_TIMEOUT = 60 * 60
+# 関連プロダクトとして読み込む件数
+RELATED_PRODUCTS_LIMIT = 3
+
+
+def get_product_queryset(queryset=None):
+    """
+    プロダクト詳細ページで利用される関連オブジェクトを予め読み込む
+    QuerySet を返す
+    """
+    if queryset is None:
+        queryset = Product.objects.all()
+    queryset = queryset.select_related('project', 'last_modifier')
+    return queryset.prefetch_related(
+        'screenshots',
+        'platforms',
+        'categories',
+        'administrators',
+        Prefetch('urlreleases',
+                 queryset=URLRelease.objects.select_related('platform')),
+        Prefetch('packagereleases',
+                 queryset=PackageRelease.objects.select_related('platform')),
+    )
+
+
+def get_related_products(product, limit=RELATED_PRODUCTS_LIMIT):
+    """
+    指定されたプロダクトと同じカテゴリに所属するプロダクトのリストを返す
+
+    ``product.categories`` が prefetch されている場合はカテゴリの取得に
+    クエリを発行しない
+    """
+    category_pks = [c.pk for c in product.categories.all()]
+    if not category_pks:
+        return []
+    qs = Product.objects.filter(categories__in=category_pks)
+    qs = qs.exclude(pk=product.pk).distinct()
+    qs = qs.prefetch_related('platforms')
+    return list(qs[:limit])
+
+
+def _get_cache_key(slug):
+    return '{}:{}'.format(CACHE_KEY_PREFIX, slug)
+
+
+def load_product(slug, queryset=None):
+    """
+    指定されたスラッグのプロダクトを関連オブジェクトと共に読み込む
+
+    読み込まれたプロダクトの ``related_products`` には関連プロダクトの
+    リストが格納される。関連プロダクト以外はキャッシュされるため、キャッシュ
+    に存在する場合は関連プロダクトの読み込みのみクエリを発行する
+
+    Raises:
+        Http404: プロダクトが存在しない場合
+    """
+    key = _get_cache_key(slug)
+    product = cache.get(key)
+    if product is None:
+        try:
+            product = get_product_queryset(queryset).get(slug=slug)
+        except Product.DoesNotExist:
+            raise Http404
+        cache.set(key, product, CACHE_TIMEOUT)
+    product.related_products = get_related_products(product)
+    return product
+
+
+def invalidate_product(*slugs):
+    """
+    指定されたスラッグのプロダクトのキャッシュを破棄する
+    """
+    cache.delete_many([_get_cache_key(slug) for slug in slugs])
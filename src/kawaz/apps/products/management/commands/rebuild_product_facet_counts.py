@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from ...models import ProductFacetCount
+
+
+class Command(BaseCommand):
+    help = ("Command to rebuild product facet counts which are displayed "
+            "in the product list filters. "
+            "Usually the counts are updated incrementally thus this command "
+            "is only required when the counts are broken.")
+
+    def handle(self, *args, **options):
+        verbosity = int(options.get('verbosity'))
+        if verbosity > 0:
+            print("Rebuilding product facet counts...")
+        ProductFacetCount.objects.rebuild()
+        if verbosity > 0:
+            print("{} product facet counts are stored.".format(
+                ProductFacetCount.objects.count()
+            ))
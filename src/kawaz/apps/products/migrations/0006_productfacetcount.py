@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from kawaz.apps.products.facets import rebuild_facet_counts as _rebuild
+
+
+def rebuild_facet_counts(apps, schema_editor):
+    # 集計は rebuild_product_facet_counts コマンドと同じ関数で行う
+    _rebuild(apps.get_model('products', 'Product'),
+             apps.get_model('products', 'ProductFacetCount'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_auto_20150426_1532'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFacetCount',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('count', models.IntegerField(verbose_name='Count', default=0)),
+                ('platform_key', models.PositiveIntegerField(verbose_name='Platform', default=0)),
+                ('category_key', models.PositiveIntegerField(verbose_name='Category', default=0)),
+            ],
+            options={
+                'verbose_name': 'Product facet count',
+                'verbose_name_plural': 'Product facet counts',
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='productfacetcount',
+            unique_together=set([('platform_key', 'category_key')]),
+        ),
+        migrations.RunPython(rebuild_facet_counts, migrations.RunPython.noop),
+    ]
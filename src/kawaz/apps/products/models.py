@@ -1,16 +1,25 @@
 import mimetypes
 import os
 import re
+from collections import Counter
+from functools import reduce
+from itertools import product as cartesian_product
 from django.db import models
+from django.db import transaction
+from django.db import IntegrityError
+from django.db.models import F, Q
 from django.utils.translation import ugettext_lazy as _
 from django.utils.translation import pgettext_lazy
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.exceptions import PermissionDenied
 from thumbnailfield.fields import ThumbnailField
+from .facets import ALL, get_facet_keys, rebuild_facet_counts
+from .facets import to_facet_key, from_facet_key
 from kawaz.core.db.decorators import validate_on_save
 from kawaz.core.personas.models import Persona
 from kawaz.apps.projects.models import Project
+from kawaz.core.db.tracking import FieldTrackerMixin
 
 class UnsavedForeignKey(models.ForeignKey):
     # Django1.8からの仕様変更により、デフォルトでは、保存されていないオブジェクトに対するリレーションを貼れなくなった
@@ -91,7 +100,7 @@ class Category(models.Model):
 
 
 @validate_on_save
-class Product(models.Model):
+class Product(FieldTrackerMixin, models.Model):
     """
     完成したプロダクトを表すモデル
 
@@ -391,6 +400,112 @@ class Screenshot(models.Model):
         return '{}({})'.format(self.image.name, self.product.title)
 
 
+class ProductFacetCountManager(models.Manager):
+
+    def get_counts(self, facet, platform=None, category=None):
+        """
+        指定されたファセットの値ごとのプロダクト数を辞書で返す
+
+        もう一方のファセットが指定された場合はその値との組み合わせ
+        （Platform × Category）での件数を返す。キー ``None`` には指定された
+        ファセットで絞り込まない場合の件数（"All" の件数）が格納される
+
+        Args:
+            facet (str): ``'platform'`` もしくは ``'category'``
+            platform (int): 絞り込みに用いる Platform の pk（省略可）
+            category (int): 絞り込みに用いる Category の pk（省略可）
+
+        Returns:
+            dict: ``{<pk or None>: <count>}``
+        """
+        if facet == 'platform':
+            qs = self.filter(category_key=to_facet_key(category))
+        elif facet == 'category':
+            qs = self.filter(platform_key=to_facet_key(platform))
+        else:
+            raise AttributeError(
+                "'facet' must be 'platform' or 'category'")
+        return {from_facet_key(key): count for key, count in
+                qs.values_list('{}_key'.format(facet), 'count')}
+
+    def _filter_keys(self, keys):
+        q = reduce(lambda a, b: a | b, (
+            Q(platform_key=platform_key, category_key=category_key)
+            for platform_key, category_key in keys))
+        return self.filter(q)
+
+    def increment(self, keys, delta=1):
+        """
+        指定された (platform_id, category_id) のキーの件数を増減させる
+
+        存在しないキーは ``bulk_create`` でまとめて作成し、件数は ``F()`` に
+        よる一度の UPDATE で更新する（同じキーが複数回指定された場合は
+        その回数だけ増減させる）。キーは NULL を含まないため並行して同じ
+        キーが作成された場合は一意制約により ``IntegrityError`` となる
+        """
+        keys = Counter((to_facet_key(platform_id), to_facet_key(category_id))
+                       for platform_id, category_id in keys)
+        if not keys:
+            return
+        existing = set(self._filter_keys(keys).values_list(
+            'platform_key', 'category_key'))
+        missing = [key for key in keys if key not in existing]
+        if missing:
+            try:
+                with transaction.atomic():
+                    self.bulk_create([
+                        self.model(platform_key=platform_key,
+                                   category_key=category_key)
+                        for platform_key, category_key in missing
+                    ])
+            except IntegrityError:
+                # 並行して作成された場合は一つずつ作成する
+                for platform_key, category_key in missing:
+                    self.get_or_create(platform_key=platform_key,
+                                       category_key=category_key)
+        multiplicities = {}
+        for key, n in keys.items():
+            multiplicities.setdefault(n, []).append(key)
+        for n, group in multiplicities.items():
+            self._filter_keys(group).update(count=F('count') + delta * n)
+
+    def decrement(self, keys):
+        self.increment(keys, delta=-1)
+
+    def rebuild(self):
+        """
+        既存のプロダクトから全ての件数を再計算する
+        """
+        rebuild_facet_counts(Product, self.model)
+
+
+class ProductFacetCount(models.Model):
+    """
+    プロダクト一覧のフィルタに表示するファセットごとのプロダクト数
+
+    (Platform の pk, Category の pk) をキーとして件数を保持する。どちらか
+    一方が ``ALL``（0）の場合はもう一方のみで絞り込んだ件数を、両方 ``ALL``
+    の場合は全プロダクト数を表す。NULL は一意制約で重複を防げないため
+    ForeignKey ではなく pk を保持する。プロダクトの作成・削除及び
+    platforms/categories の変更時にシグナルで逐次更新されるため、一覧の
+    描画時に集計クエリを発行する必要がない
+    """
+    platform_key = models.PositiveIntegerField(_('Platform'), default=ALL)
+    category_key = models.PositiveIntegerField(_('Category'), default=ALL)
+    count = models.IntegerField(_('Count'), default=0)
+
+    objects = ProductFacetCountManager()
+
+    class Meta:
+        unique_together = (('platform_key', 'category_key'),)
+        verbose_name = _('Product facet count')
+        verbose_name_plural = _('Product facet counts')
+
+    def __str__(self):
+        return '{}({}, {})'.format(self.count, self.platform_key,
+                                   self.category_key)
+
+
 from permission import add_permission_logic
 from .perms import ProductPermissionLogic
 from kawaz.core.personas.perms import ChildrenPermissionLogic
@@ -411,3 +526,207 @@ registry.register(URLRelease, ReleaseActivityMediator())
 
 from .activity import ScreenshotActivityMediator
 registry.register(Screenshot, ScreenshotActivityMediator())
+
+from django.db.models.signals import post_save, pre_delete, m2m_changed
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+
+@receiver(post_save, sender=Product)
+def increment_product_facet_count(**kwargs):
+    """
+    プロダクト作成時に全プロダクト数を加算するシグナル処理
+
+    Note:
+        loaddata 時も m2m_changed は送信されるため、件数の整合性を保つため
+        raw での保存時も処理を行う
+    """
+    if kwargs.get('created'):
+        ProductFacetCount.objects.increment(get_facet_keys((), (), total=True))
+
+
+@receiver(pre_delete, sender=Product)
+def decrement_product_facet_count(**kwargs):
+    """
+    プロダクト削除時に関連する全てのファセットの件数を減算するシグナル処理
+
+    削除時の中間テーブルのレコード削除では m2m_changed が送信されないため
+    ここで全ての組み合わせを減算している
+    """
+    instance = kwargs.get('instance')
+    platform_ids = list(instance.platforms.values_list('pk', flat=True))
+    category_ids = list(instance.categories.values_list('pk', flat=True))
+    ProductFacetCount.objects.decrement(
+        get_facet_keys(platform_ids, category_ids, total=True))
+
+
+def _update_product_facet_count(facet, other_facet, **kwargs):
+    action = kwargs.get('action')
+    if action not in ('post_add', 'pre_remove', 'pre_clear'):
+        return
+    instance = kwargs.get('instance')
+    pk_set = kwargs.get('pk_set') or ()
+    if kwargs.get('reverse'):
+        # platform.products.add(product) のように逆方向から変更された場合は
+        # instance が Platform/Category となり pk_set が Product の pk となる
+        products = Product.objects.filter(**{facet: instance})
+        if action == 'post_add':
+            products = Product.objects.filter(pk__in=pk_set)
+        elif action == 'pre_remove':
+            products = products.filter(pk__in=pk_set)
+        changes = [(product, (instance.pk,)) for product in products]
+    else:
+        pks = getattr(instance, facet).values_list('pk', flat=True)
+        if action == 'post_add':
+            pks = pk_set
+        elif action == 'pre_remove':
+            # remove() では関連付けられていない pk も pk_set に含まれる
+            pks = pks.filter(pk__in=pk_set)
+        changes = [(instance, tuple(pks))]
+    for product, pks in changes:
+        others = tuple(getattr(product, other_facet).values_list(
+            'pk', flat=True))
+        if facet == 'platforms':
+            keys = get_facet_keys(pks, ())
+            keys.extend(cartesian_product(pks, others))
+        else:
+            keys = get_facet_keys((), pks)
+            keys.extend(cartesian_product(others, pks))
+        if action == 'post_add':
+            ProductFacetCount.objects.increment(keys)
+        else:
+            ProductFacetCount.objects.decrement(keys)
+
+
+@receiver(m2m_changed, sender=Product.platforms.through)
+def update_product_facet_count_of_platforms(**kwargs):
+    """
+    プロダクトのプラットフォームが変更された時にファセットの件数を更新する
+    シグナル処理
+    """
+    _update_product_facet_count('platforms', 'categories', **kwargs)
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+def update_product_facet_count_of_categories(**kwargs):
+    """
+    プロダクトのカテゴリが変更された時にファセットの件数を更新する
+    シグナル処理
+    """
+    _update_product_facet_count('categories', 'platforms', **kwargs)
+
+
+@receiver(post_delete, sender=Platform)
+@receiver(post_delete, sender=Category)
+def delete_product_facet_count(**kwargs):
+    """
+    プラットフォーム・カテゴリが削除された時にその件数を削除するシグナル処理
+    """
+    instance = kwargs.get('instance')
+    if isinstance(instance, Platform):
+        ProductFacetCount.objects.filter(platform_key=instance.pk).delete()
+    else:
+        ProductFacetCount.objects.filter(category_key=instance.pk).delete()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(**kwargs):
+    """
+    プロダクトが変更・削除された時にキャッシュされたプロダクトを破棄する
+    シグナル処理
+    """
+    from .loaders import invalidate_product
+    instance = kwargs.get('instance')
+    slugs = {instance.slug}
+    if instance.has_original_values() and instance.has_changed('slug'):
+        slugs.add(instance.get_original_value('slug'))
+    invalidate_product(*slugs)
+
+
+@receiver(post_save, sender=PackageRelease)
+@receiver(post_save, sender=URLRelease)
+@receiver(post_save, sender=Screenshot)
+@receiver(post_delete, sender=PackageRelease)
+@receiver(post_delete, sender=URLRelease)
+@receiver(post_delete, sender=Screenshot)
+def invalidate_product_cache_of_related(**kwargs):
+    """
+    リリース・スクリーンショットが変更・削除された時に所属するプロダクトの
+    キャッシュを破棄するシグナル処理
+    """
+    from .loaders import invalidate_product
+    instance = kwargs.get('instance')
+    slugs = Product.objects.filter(pk=instance.product_id)
+    invalidate_product(*slugs.values_list('slug', flat=True))
+
+
+@receiver(post_save, sender=Platform)
+@receiver(post_save, sender=Category)
+def invalidate_product_cache_of_facet(**kwargs):
+    """
+    プラットフォーム・カテゴリが変更された時に所属するプロダクトの
+    キャッシュを破棄するシグナル処理
+    """
+    from .loaders import invalidate_product
+    instance = kwargs.get('instance')
+    if kwargs.get('created'):
+        return
+    if isinstance(instance, Platform):
+        products = instance.products.all()
+    else:
+        products = instance.product_set.all()
+    invalidate_product(*products.values_list('slug', flat=True))
+
+
+@receiver(post_save, sender=Persona)
+@receiver(pre_delete, sender=Persona)
+def invalidate_product_cache_of_persona(**kwargs):
+    """
+    ユーザーが変更・削除された時に管理者もしくは最終更新者としてキャッシュ
+    されたプロダクトを破棄するシグナル処理
+    """
+    from .loaders import invalidate_product
+    instance = kwargs.get('instance')
+    update_fields = kwargs.get('update_fields')
+    if kwargs.get('created'):
+        return
+    # ログインごとに last_login のみ保存されるが、プロダクトには表示されない
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    products = Product.objects.filter(Q(administrators=instance) |
+                                      Q(last_modifier=instance))
+    invalidate_product(*products.values_list('slug', flat=True).distinct())
+
+
+@receiver(post_save, sender=Project)
+def invalidate_product_cache_of_project(**kwargs):
+    """
+    プロジェクトが変更された時に所属するプロダクトのキャッシュを破棄する
+    シグナル処理
+    """
+    from .loaders import invalidate_product
+    instance = kwargs.get('instance')
+    if kwargs.get('created'):
+        return
+    products = Product.objects.filter(project=instance)
+    invalidate_product(*products.values_list('slug', flat=True))
+
+
+@receiver(m2m_changed, sender=Product.platforms.through)
+@receiver(m2m_changed, sender=Product.categories.through)
+@receiver(m2m_changed, sender=Product.administrators.through)
+def invalidate_product_cache_on_m2m_changed(**kwargs):
+    """
+    プロダクトのプラットフォーム・カテゴリ・管理者が変更された時に
+    キャッシュされたプロダクトを破棄するシグナル処理
+    """
+    from .loaders import invalidate_product
+    if not kwargs.get('action', '').startswith('post_'):
+        return
+    instance = kwargs.get('instance')
+    if not kwargs.get('reverse'):
+        invalidate_product(instance.slug)
+    elif kwargs.get('pk_set'):
+        slugs = Product.objects.filter(pk__in=kwargs.get('pk_set'))
+        invalidate_product(*slugs.values_list('slug', flat=True))
@@ -0,0 +1,8 @@
+"""
+プロダクトに関するシグナル
+"""
+from django.dispatch import Signal
+
+# リリースがダウンロード（URL リリースの場合は URL へ遷移）された際に
+# 送出される。sender はリリースのモデル、release はリリースのインスタンス
+product_downloaded = Signal(providing_args=['release'])
@@ -2,7 +2,7 @@ from django import template
 from django.template import TemplateSyntaxError, Context
 from django.template.loader import render_to_string
 from django.conf import settings
-from ..models import Product, URLRelease
+from ..models import Product
 from ..models import Platform
 from ..models import Category
 
@@ -73,10 +73,14 @@ def get_relative(product):
     任意のプロダクトの関連プロダクトを取り出します。
     渡されたプロダクトと同じカテゴリに所属している物全てから、自身を抜いた
     QuerySetを返します
+    プロダクトが load_product で読み込まれている場合は読み込み済みの
+    関連プロダクトのリストを返します
 
     Syntax:
         {% get_relative <product> as <variable> %}
     """
+    if hasattr(product, 'related_products'):
+        return product.related_products
     qs = Product.objects.filter(categories__in=product.categories.all())
     return qs.exclude(pk=product.pk).distinct()
 
@@ -124,7 +128,8 @@ def render_twitter_card(context, product):
 
     """
     request = context.get('request')
-    url_releases = URLRelease.objects.filter(product=product)
+    # prefetch されている場合はクエリを発行しない
+    url_releases = product.urlreleases.all()
     apps = [release for release in url_releases if release.is_appstore or release.is_googleplay]
     c = Context({
         'product': product,
@@ -0,0 +1,114 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.http import Http404
+from ..loaders import load_product
+from kawaz.core.personas.tests.factories import PersonaFactory
+from .factories import (ProductFactory,
+                        PackageReleaseFactory,
+                        URLReleaseFactory,
+                        CategoryFactory,
+                        ScreenshotFactory)
+
+
+class LoadProductTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def _count_queries(self, slug):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            load_product(slug)
+        return len(context)
+
+    def test_load_product_in_constant_queries(self):
+        """リリース数に関わらず一定数のクエリでプロダクトを読み込む"""
+        category = CategoryFactory()
+        product = ProductFactory(categories=(category,))
+        ProductFactory(categories=(category,))
+        URLReleaseFactory(product=product)
+        PackageReleaseFactory(product=product)
+        nqueries = self._count_queries(product.slug)
+        for i in range(3):
+            URLReleaseFactory(product=product)
+            PackageReleaseFactory(product=product)
+            ScreenshotFactory(product=product)
+        self.assertEqual(self._count_queries(product.slug), nqueries)
+
+    def test_load_product_bundle(self):
+        """関連オブジェクトと関連プロダクトを読み込み済みのプロダクトを返す"""
+        category = CategoryFactory()
+        product = ProductFactory(categories=(category,))
+        other = ProductFactory(categories=(category,))
+        release = URLReleaseFactory(product=product)
+        loaded = load_product(product.slug)
+        with self.assertNumQueries(0):
+            self.assertEqual(list(loaded.urlreleases.all()), [release])
+            self.assertEqual(loaded.urlreleases.all()[0].platform,
+                             release.platform)
+            self.assertEqual(list(loaded.categories.all()), [category])
+            self.assertEqual(loaded.related_products, [other])
+
+    def test_load_product_cached(self):
+        """読み込まれたプロダクトは関連プロダクトを除きキャッシュされる"""
+        category = CategoryFactory()
+        product = ProductFactory(categories=(category,))
+        load_product(product.slug)
+        # 関連プロダクトのみ読み込まれる
+        with self.assertNumQueries(1):
+            self.assertEqual(load_product(product.slug), product)
+
+    def test_load_product_related_products_not_cached(self):
+        """関連プロダクトの変更はキャッシュ済みのプロダクトにも反映される"""
+        category = CategoryFactory()
+        product = ProductFactory(categories=(category,))
+        self.assertEqual(load_product(product.slug).related_products, [])
+        other = ProductFactory(categories=(category,))
+        self.assertEqual(load_product(product.slug).related_products,
+                         [other])
+
+    def test_load_product_invalidated(self):
+        """プロダクトやリリースが変更された場合キャッシュは破棄される"""
+        product = ProductFactory()
+        load_product(product.slug)
+        release = URLReleaseFactory(product=product)
+        loaded = load_product(product.slug)
+        self.assertEqual(list(loaded.urlreleases.all()), [release])
+
+        product.title = 'Kawaz Quest'
+        product.save()
+        self.assertEqual(load_product(product.slug).title, 'Kawaz Quest')
+
+    def test_load_product_invalidated_by_persona(self):
+        """管理者が変更された場合キャッシュは破棄される"""
+        user = PersonaFactory()
+        product = ProductFactory(administrators=(user,))
+        load_product(product.slug)
+        user.nickname = 'Kawaz Tan'
+        user.save()
+        loaded = load_product(product.slug)
+        self.assertEqual(loaded.administrators.all()[0].nickname, 'Kawaz Tan')
+
+    def test_load_product_not_invalidated_by_last_login(self):
+        """管理者の last_login のみの変更ではキャッシュは破棄されない"""
+        user = PersonaFactory()
+        product = ProductFactory(administrators=(user,))
+        load_product(product.slug)
+        user.save(update_fields=['last_login'])
+        # カテゴリが無いため関連プロダクトも読み込まれない
+        with self.assertNumQueries(0):
+            load_product(product.slug)
+
+    def test_load_product_invalidated_by_project(self):
+        """プロジェクトが変更された場合キャッシュは破棄される"""
+        product = ProductFactory()
+        load_product(product.slug)
+        product.project.title = 'Kawaz Quest Project'
+        product.project.save()
+        loaded = load_product(product.slug)
+        self.assertEqual(loaded.project.title, 'Kawaz Quest Project')
+
+    def test_load_product_not_found(self):
+        """存在しないプロダクトの場合は Http404 を送出する"""
+        self.assertRaises(Http404, load_product, 'unknown-product')
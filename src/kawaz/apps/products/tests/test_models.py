@@ -11,6 +11,7 @@ from .factories import URLReleaseFactory
 from .factories import PackageReleaseFactory
 from ..models import Category
 from ..models import Platform
+from ..models import ProductFacetCount
 from ..models import INVALID_PRODUCT_SLUGS
 
 
@@ -301,3 +302,120 @@ class ScreenshotModelTestCase(TestCase):
         ScreenshotFactory(product=product)
         self.assertIsNotNone(product.screenshots)
         self.assertEqual(product.screenshots.count(), 1)
+
+
+class ProductFacetCountModelTestCase(TestCase):
+    def setUp(self):
+        self.p0 = PlatformFactory()
+        self.p1 = PlatformFactory()
+        self.c0 = CategoryFactory()
+        self.c1 = CategoryFactory()
+
+    def assertCountsEqual(self, expected, facet, **kwargs):
+        counts = ProductFacetCount.objects.get_counts(facet, **kwargs)
+        counts = {k: v for k, v in counts.items() if v}
+        self.assertEqual(counts, expected)
+
+    def test_counts_are_updated_on_create(self):
+        """
+        プロダクトの作成と platforms/categories の追加で件数が更新される
+        """
+        ProductFactory(platforms=(self.p0, self.p1), categories=(self.c0,))
+        ProductFactory(platforms=(self.p0,), categories=(self.c1,))
+        self.assertCountsEqual({None: 2, self.p0.pk: 2, self.p1.pk: 1},
+                               'platform')
+        self.assertCountsEqual({None: 2, self.c0.pk: 1, self.c1.pk: 1},
+                               'category')
+
+    def test_counts_with_cross_facet(self):
+        """
+        もう一方のファセットを指定した場合は組み合わせでの件数が返る
+        """
+        ProductFactory(platforms=(self.p0, self.p1), categories=(self.c0,))
+        ProductFactory(platforms=(self.p0,), categories=(self.c1,))
+        self.assertCountsEqual({None: 1, self.p0.pk: 1, self.p1.pk: 1},
+                               'platform', category=self.c0.pk)
+        self.assertCountsEqual({None: 1, self.c0.pk: 1},
+                               'category', platform=self.p1.pk)
+
+    def test_counts_are_updated_on_remove_and_clear(self):
+        """
+        platforms/categories の削除で件数が更新される
+        """
+        product = ProductFactory(platforms=(self.p0, self.p1),
+                                 categories=(self.c0,))
+        product.platforms.remove(self.p1)
+        self.assertCountsEqual({None: 1, self.p0.pk: 1}, 'platform')
+        self.assertCountsEqual({None: 1, self.p0.pk: 1},
+                               'platform', category=self.c0.pk)
+        product.categories.clear()
+        self.assertCountsEqual({}, 'platform', category=self.c0.pk)
+        self.assertCountsEqual({None: 1}, 'category')
+
+    def test_counts_are_updated_on_reverse_relation(self):
+        """
+        Platform 側からの関連付けでも件数が更新される
+        """
+        product = ProductFactory(categories=(self.c0,))
+        self.p0.products.add(product)
+        self.assertCountsEqual({None: 1, self.p0.pk: 1},
+                               'platform', category=self.c0.pk)
+        self.p0.products.clear()
+        self.assertCountsEqual({None: 1}, 'platform', category=self.c0.pk)
+
+    def test_counts_are_updated_on_delete(self):
+        """
+        プロダクトの削除で関連する全ての件数が減算される
+        """
+        product = ProductFactory(platforms=(self.p0,), categories=(self.c0,))
+        ProductFactory(platforms=(self.p1,))
+        product.delete()
+        self.assertCountsEqual({None: 1, self.p1.pk: 1}, 'platform')
+        self.assertCountsEqual({None: 1}, 'category')
+
+    def test_rebuild(self):
+        """
+        rebuild() で既存のプロダクトから件数が再計算される
+        """
+        ProductFactory(platforms=(self.p0, self.p1), categories=(self.c0,))
+        ProductFacetCount.objects.all().delete()
+        ProductFacetCount.objects.rebuild()
+        self.assertCountsEqual({None: 1, self.p0.pk: 1, self.p1.pk: 1},
+                               'platform', category=self.c0.pk)
+        self.assertCountsEqual({None: 1, self.c0.pk: 1}, 'category')
+
+    def test_increment_queries(self):
+        """
+        increment() はキーの数によらず一定のクエリ数で件数を更新する
+        """
+        keys = [(None, None), (self.p0.pk, None), (self.p1.pk, None),
+                (None, self.c0.pk),
+                (self.p0.pk, self.c0.pk), (self.p1.pk, self.c0.pk)]
+        ProductFacetCount.objects.all().delete()
+        # 存在の確認・bulk_create（とセーブポイント）・UPDATE
+        with self.assertNumQueries(5):
+            ProductFacetCount.objects.increment(keys)
+        with self.assertNumQueries(2):
+            ProductFacetCount.objects.increment(keys)
+        self.assertCountsEqual({None: 2, self.p0.pk: 2, self.p1.pk: 2},
+                               'platform', category=self.c0.pk)
+
+    def test_keys_are_unique(self):
+        """
+        絞り込まないキーも一意制約により重複して作成されない
+        """
+        from django.db import IntegrityError, transaction
+        ProductFacetCount.objects.all().delete()
+        ProductFacetCount.objects.increment([(None, None)])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ProductFacetCount.objects.create()
+        self.assertEqual(ProductFacetCount.objects.count(), 1)
+
+    def test_counts_are_deleted_with_platform(self):
+        """
+        プラットフォームが削除されるとその件数も削除される
+        """
+        ProductFactory(platforms=(self.p0,), categories=(self.c0,))
+        self.p0.delete()
+        self.assertFalse(ProductFacetCount.objects.filter(
+            platform_key=self.p0.pk).exists())
@@ -14,23 +14,31 @@ from django_filters.views import FilterView
 from permission.decorators import permission_required
 from kawaz.core.views.delete import DeleteSuccessMessageMixin
 from kawaz.core.views.preview import SingleObjectPreviewViewMixin
+from kawaz.core.views.pagination import KeysetPaginationMixin
 from .forms import ProductCreateForm, ProductUpdateForm
 from .forms import PackageReleaseFormSet, URLReleaseFormSet, ScreenshotFormSet
 from .models import Product
 from .models import PackageRelease, URLRelease
+from .loaders import load_product
+from .signals import product_downloaded
 from .filters import ProductFilter
 
 
-class ProductListView(FilterView):
+class ProductListView(KeysetPaginationMixin, FilterView):
     model = Product
     filterset_class = ProductFilter
     template_name_suffix = '_list'
     paginate_by = 20
+    keyset_ordering = ('display_mode', '-published_at', '-pk')
 
 
 class ProductDetailView(DetailView):
     model = Product
 
+    def get_object(self, queryset=None):
+        # 関連オブジェクトをまとめて読み込みキャッシュされたプロダクトを返す
+        return load_product(self.kwargs.get(self.slug_url_kwarg))
+
 
 class ProductFormMixin(SuccessMessageMixin):
 
@@ -213,6 +221,7 @@ class ProductDeleteView(DeleteSuccessMessageMixin, DeleteView):
 class ProductPreviewView(SingleObjectPreviewViewMixin, DetailView):
     model = Product
     template_name = "products/components/product_detail.html"
+    kfm_fields = ('description',)
 
 
 class URLReleaseDetailView(DetailView):
@@ -223,6 +232,7 @@ class URLReleaseDetailView(DetailView):
         # ページビューを加算してURLへ飛ばす
         self.object.pageview += 1
         self.object.save()
+        product_downloaded.send(sender=URLRelease, release=self.object)
         return HttpResponseRedirect(self.object.url)
 
 
@@ -244,6 +254,8 @@ class PackageReleaseDetailView(DetailView):
             # ダウンロードを加算する
             self.object.downloads += 1
             self.object.save()
+            product_downloaded.send(sender=PackageRelease,
+                                    release=self.object)
             return response
         except FileNotFoundError:
             # DBにゴミレコードが残っている場合レコードを削除
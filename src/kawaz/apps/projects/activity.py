@@ -7,6 +7,8 @@ from django_comments.models import Comment
 from kawaz.core.personas.models import Persona
 from activities.models import Activity
 from activities.mediator import ActivityMediator
+from kawaz.core.activities.utils import get_change_remarks
+from kawaz.core.activities.utils import get_related_user_pks
 
 
 
@@ -16,42 +18,26 @@ class ProjectActivityMediator(ActivityMediator):
         'members',
     )
 
+    def get_recipients(self, activity):
+        # 管理者とメンバーの受信箱に配信する
+        return get_related_user_pks(activity, ('administrator', 'members'))
+
     def alter(self, instance, activity, **kwargs):
         # 状態が draft の場合は通知しない
         if activity and instance.pub_state == 'draft':
             return None
         if activity and activity.status == 'updated':
-            if activity.previous:
-                # 通知が必要な状態の変更を詳細に記録する
-                previous = activity.previous.snapshot
-                is_created = lambda x: (
-                    not getattr(previous, x) and
-                    getattr(instance, x)
-                )
-                is_updated = lambda x: (
-                    getattr(previous, x) and
-                    getattr(instance, x) and
-                    getattr(previous, x) != getattr(instance, x)
-                )
-                is_deleted = lambda x: (
-                    getattr(previous, x) and
-                    not getattr(instance, x)
-                )
-                remarks = []
-                attributes = (
-                    'title',
-                    'body',
-                    'icon',
-                    'status',
-                    'category',
-                )
-                for attribute in attributes:
-                    if is_created(attribute):
-                        remarks.append(attribute + '_created')
-                    elif is_updated(attribute):
-                        remarks.append(attribute + '_updated')
-                    elif is_deleted(attribute):
-                        remarks.append(attribute + '_deleted')
+            # 通知が必要な状態の変更を詳細に記録する
+            remarks = get_change_remarks(instance, activity, (
+                'title',
+                'body',
+                'icon',
+                'status',
+                'category',
+                # 下書きからの公開なども通知する
+                'pub_state',
+            ))
+            if remarks is not None:
                 if not remarks:
                     # 通知が必要な変更ではないため通知しない
                     return None
@@ -63,11 +49,12 @@ class ProjectActivityMediator(ActivityMediator):
             if action not in ('post_add', 'post_remove'):
                 # 追加/削除以外は通知しない
                 return None
-            if action == 'post_add' and instance.members.count() == 1:
+            if action == 'post_add' and instance.is_saving():
                 # models.join_administratorシグナルによりpost_save処理より以前に
-                # 作成者参加が行われ project が作成される前に参加者が追加される
-                # したがって参加者が一人（join_administratorにより追加された直後）
-                # の場合に飛んできた m2m_signal は無視
+                # 作成者参加が行われ project が作成（もしくは公開）される前に
+                # 参加者が追加される。したがって Project の保存中（
+                # join_administratorにより追加された直後）に飛んできた
+                # m2m_signal は無視
                 return None
             # 追加・削除をトラックするActivityを作成
             ct = ContentType.objects.get_for_model(instance)
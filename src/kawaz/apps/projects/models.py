@@ -4,8 +4,15 @@ from django.db import models
 from django.core.exceptions import PermissionDenied
 from django.utils.translation import ugettext_lazy as _
 from thumbnailfield.fields import ThumbnailField
+from kawaz.core.files.thumbnails import get_thumbnail_urls
+from kawaz.core.files.thumbnails import prefetch_thumbnail_urls
 from kawaz.core.publishments.models import PUB_STATES
 from kawaz.core.publishments.models import PublishmentManagerMixin
+from kawaz.core.db.tracking import FieldTrackerMixin
+
+
+# アイコンとして解決するサイズ
+ICON_SIZES = tuple(settings.THUMBNAIL_SIZE_PATTERNS.keys())
 
 
 class Category(models.Model):
@@ -69,7 +76,7 @@ class ProjectManager(models.Manager, PublishmentManagerMixin):
 
 
 # TODO: 所有権限の委託を可能にする
-class Project(models.Model):
+class Project(FieldTrackerMixin, models.Model):
     """
     現在進行形で作成しているプロジェクトを示すモデル
 
@@ -196,20 +203,36 @@ class Project(models.Model):
         filename = 'project_icon_{}.png'.format(size)
         return os.path.join('/statics', 'img', 'defaults', filename)
 
+    def get_icon_urls(self):
+        """
+        全サイズのアイコンURLを ``{<size>: <url>}`` の辞書で返します
+        URLはアイコンごとに一度だけ解決されキャッシュされます
+        """
+        return get_thumbnail_urls(self, 'icon', ICON_SIZES,
+                                  'get_default_icon')
+
     def get_icon(self, size):
         """
         渡したサイズのアイコンURLを返します
         未設定の場合や、見つからない場合はデフォルトアイコンを返します
         """
-        if self.icon:
-            try:
-                return getattr(self.icon, size).url
-            except:
-                return self.get_default_icon(size)
-        return self.get_default_icon(size)
+        url = self.get_icon_urls().get(size)
+        return url or self.get_default_icon(size)
+
+    @staticmethod
+    def prefetch_icons(projects):
+        """
+        渡したプロジェクト全てのアイコンURLを一度のキャッシュ参照で解決します
+        一覧ページなどで描画前に呼び出してください
+        """
+        return prefetch_thumbnail_urls(projects, 'icon', ICON_SIZES,
+                                       'get_default_icon')
 
     @property
     def active_members(self):
+        if 'members' in getattr(self, '_prefetched_objects_cache', {}):
+            # prefetch_related('members') されている場合はクエリを発行しない
+            return [m for m in self.members.all() if m.is_active]
         return self.members.filter(is_active=True)
 
     @property
@@ -234,6 +257,17 @@ from django.dispatch import receiver
 from kawaz.core.utils.signals import disable_for_loaddata
 
 
+@receiver(post_save, sender=Project)
+@disable_for_loaddata
+def resolve_icon_urls(**kwargs):
+    """
+    アイコンのアップロード時に全サイズのURLを予め解決しておくシグナル処理
+    """
+    instance = kwargs.get('instance')
+    if instance.icon:
+        instance.get_icon_urls()
+
+
 @receiver(post_save, sender=Project)
 @disable_for_loaddata
 def join_administrator(**kwargs):
@@ -0,0 +1,19 @@
+# coding=utf-8
+"""
+manage.py audit_query_plans で実行計画を監査する QuerySet の登録
+"""
+from kawaz.core.db.explain import registry
+from .models import Project
+
+registry.register('projects.Project.published',
+                  lambda user: Project.objects.published(user))
+registry.register('projects.Project.draft',
+                  lambda user: Project.objects.draft(user))
+registry.register('projects.Project.related',
+                  lambda user: Project.objects.related(user))
+registry.register('projects.Project.active',
+                  lambda user: Project.objects.active(user))
+registry.register('projects.Project.archived',
+                  lambda user: Project.objects.archived(user))
+registry.register('projects.Project.recently_planned',
+                  lambda user: Project.objects.recently_planned(user))
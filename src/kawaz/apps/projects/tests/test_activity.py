@@ -1,3 +1,4 @@
+from activities.models import Activity
 from .factories import ProjectFactory
 from kawaz.core.activities.tests.testcases import BaseActivityMediatorTestCase
 
@@ -16,3 +17,18 @@ class ProjectActivityMediatorTestCase(BaseActivityMediatorTestCase):
 
     def test_comment_added(self):
         self._test_comment_added()
+
+    def test_recipients(self):
+        self._test_recipients(self.object.members.all())
+
+    def test_publish(self):
+        """
+        下書きの公開は他に変更が無くても通知され、公開時の管理者の自動参加は
+        通知されない
+        """
+        project = ProjectFactory(pub_state='draft')
+        project.pub_state = 'public'
+        project.save()
+        activities = Activity.objects.get_for_object(project)
+        self.assertEqual([a.status for a in activities], ['updated'])
+        self.assertIn('pub_state_updated', activities[0].remarks)
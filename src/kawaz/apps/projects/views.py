@@ -20,15 +20,29 @@ from .forms import ProjectCreateForm
 from .forms import ProjectUpdateForm
 from kawaz.core.views.delete import DeleteSuccessMessageMixin
 from kawaz.core.views.preview import SingleObjectPreviewViewMixin
+from kawaz.core.views.pagination import ApproximateCountPaginator
 from .models import Project
 
 
-class ProjectArchiveView(ListView):
+class ProjectIconPrefetchMixin(object):
+    """
+    一覧に表示するプロジェクトのアイコンURLをまとめて解決する Mixin
+    """
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # QuerySet の評価結果はキャッシュされるためテンプレートでも同じ
+        # インスタンスが使われる
+        Project.prefetch_icons(context['object_list'])
+        return context
+
+
+class ProjectArchiveView(ProjectIconPrefetchMixin, ListView):
     """
     アーカイブ化されたプロジェクト閲覧用のビューです
     """
     template_name_suffix = '_archive'
     paginate_by = 50
+    paginator_class = ApproximateCountPaginator
     order_by = ('title', 'category', 'status', 'created_at',)
 
     def get_queryset(self):
@@ -83,17 +97,17 @@ class ProjectDetailView(DetailView):
 
     def get_queryset(self):
         qs = super().get_queryset()
-        qs.prefetch_related('members')
+        qs = qs.prefetch_related('members')
         return qs
 
 
 @permission_required('projects.view_project')
-class ProjectListView(ListView):
+class ProjectListView(ProjectIconPrefetchMixin, ListView):
     model = Project
 
     def get_queryset(self):
         qs = Project.objects.published(self.request.user)
-        qs.prefetch_related('members')
+        qs = qs.prefetch_related('members')
         return qs
 
 
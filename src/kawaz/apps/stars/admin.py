@@ -1,6 +1,8 @@
 from django.contrib import admin
+from kawaz.core.views.pagination import ApproximateCountPaginator
 from .models import Star
 
 class StarAdmin(admin.ModelAdmin):
-    pass
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
 admin.site.register(Star, StarAdmin)
@@ -1,7 +1,15 @@
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.contrib.contenttypes.models import ContentType
+from rest_framework.decorators import list_route
+from rest_framework.exceptions import ParseError, PermissionDenied
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
 from kawaz.api import mixins
 from kawaz.api.views import KawazGenericViewSet
 from .serializers import StarSerializer
 from ..models import Star
+from ..summary import can_view_stars, summarize_stars
 
 
 class StarViewSet(mixins.CreateModelMixin,
@@ -13,3 +21,27 @@ class StarViewSet(mixins.CreateModelMixin,
     serializer_class = StarSerializer
     author_field_name = 'author'
     filter_fields = ('content_type', 'object_id',)
+
+    @list_route(methods=['get'], permission_classes=(AllowAny,))
+    def summary(self, request):
+        """
+        content_type, object_id で指定されたオブジェクトに付加されたスターを
+        作者ごとに集計したサマリーを返す
+        形式は ``kawaz.apps.stars.summary.summarize_stars`` を参照
+
+        閲覧権限は付加先のオブジェクトに対して ``can_view_stars`` で調べる
+        """
+        try:
+            ct = int(request.query_params['content_type'])
+            object_id = int(request.query_params['object_id'])
+        except (KeyError, ValueError):
+            raise ParseError('content_type and object_id are required')
+        ct = get_object_or_404(ContentType, pk=ct)
+        model = ct.model_class()
+        # 削除されたモデルの ContentType が残っている場合は None となる
+        if model is None:
+            raise Http404
+        obj = get_object_or_404(model, pk=object_id)
+        if not can_view_stars(request.user, obj):
+            raise PermissionDenied
+        return Response(summarize_stars(obj, request.user))
@@ -0,0 +1,17 @@
+# coding=utf-8
+"""
+manage.py audit_query_plans で実行計画を監査する QuerySet の登録
+"""
+from kawaz.core.db.explain import registry
+from .models import Star
+
+
+def _get_for_object():
+    # 実際にスターが付いているオブジェクトを対象とする（存在しない場合は
+    # スター自身を対象とし、同じ形の QuerySet を監査する）
+    star = Star.objects.first()
+    target = star.content_object if star else None
+    return Star.objects.get_for_object(target or Star(pk=1))
+
+registry.register('stars.Star.get_for_object', _get_for_object,
+                  per_user=False)
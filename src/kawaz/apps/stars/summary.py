@@ -0,0 +1,106 @@
+"""
+オブジェクトに付加されたスターを作者ごとに集計したサマリー
+
+スターウィジェットはスターを作者ごとにまとめて表示するため、スター一つ一つ
+を描画せずに作者ごとの件数・引用付きスター・アバター・削除可否を
+一度の集計クエリ（と作者・引用付きスターの取得）で求める
+"""
+from django.db.models import Case, When, Value, Min, Sum, IntegerField
+from django.utils.translation import ugettext as _
+from kawaz.core.utils.permission import check_object_permission
+from .models import Star
+
+
+def get_tooltip_text(nickname, quote=''):
+    """
+    ``Star.tooltip_text`` と同じ形式のツールチップの文字列を返す
+    """
+    if quote:
+        return _("%(nickname)s '%(quote)s'") % {
+            'nickname': nickname,
+            'quote': quote,
+        }
+    return nickname
+
+
+def can_view_stars(user_obj, obj):
+    """
+    指定されたユーザーが指定されたオブジェクトのスターを閲覧可能か否か
+    """
+    return check_object_permission(user_obj, 'view', obj) is not False
+
+
+def summarize_stars(obj, user_obj=None):
+    """
+    指定されたオブジェクトに付加されたスターを作者ごとに集計する
+
+    Args:
+        obj (model instance): スターの付加対象のモデルインスタンス
+        user_obj (user instance): 削除可否の判定に用いるユーザー
+
+    Returns:
+        list: 最初にスターを付加した順の作者ごとの辞書のリスト
+
+            {
+                'author': {'id', 'username', 'nickname', 'avatar', 'url'},
+                # 引用の無いスターの件数とその代表（最初のスター）の pk
+                'count': <int>,
+                'star': <pk or None>,
+                # 引用付きのスター
+                'quotes': [{'id', 'quote', 'tooltip'}, ...],
+                'tooltip': <str>,
+                'deletable': <bool>,
+            }
+    """
+    from kawaz.core.personas.models import Persona
+    qs = Star.objects.get_for_object(obj)
+    groups = list(qs.order_by().values('author').annotate(
+        first=Min('pk'),
+        count=Sum(Case(When(quote='', then=Value(1)), default=Value(0),
+                       output_field=IntegerField())),
+        star=Min(Case(When(quote='', then='pk'),
+                      output_field=IntegerField())),
+    ).order_by('first'))
+    if not groups:
+        return []
+    quotes = {}
+    quoted = qs.exclude(quote='').order_by('pk')
+    for pk, author, quote in quoted.values_list('pk', 'author', 'quote'):
+        quotes.setdefault(author, []).append((pk, quote))
+    authors = Persona.objects.filter(pk__in=[g['author'] for g in groups])
+    authors = {a.pk: a for a in Persona.prefetch_avatars(authors)}
+
+    deletable_all = deletable_own = False
+    if user_obj is not None and user_obj.is_authenticated():
+        deletable_all = user_obj.has_perm('stars.delete_star', obj)
+        if not deletable_all:
+            # 自身のスターは付加先のオブジェクトの閲覧権限を持つ場合に削除
+            # 可能（StarPermissionLogic を参照）なため一度だけ判定する
+            deletable_own = (user_obj.has_perm('stars.delete_star') and
+                             can_view_stars(user_obj, obj))
+
+    summary = []
+    for group in groups:
+        author = authors.get(group['author'])
+        if author is None:
+            continue
+        summary.append({
+            'author': {
+                'id': author.pk,
+                'username': author.username,
+                'nickname': author.nickname,
+                'avatar': author.get_small_avatar(),
+                'url': author.get_absolute_url(),
+            },
+            'count': group['count'] or 0,
+            'star': group['star'],
+            'quotes': [{
+                'id': pk,
+                'quote': quote,
+                'tooltip': get_tooltip_text(author.nickname, quote),
+            } for pk, quote in quotes.get(author.pk, ())],
+            'tooltip': get_tooltip_text(author.nickname),
+            'deletable': deletable_all or (
+                deletable_own and author.pk == user_obj.pk),
+        })
+    return summary
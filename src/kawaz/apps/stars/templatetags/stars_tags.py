@@ -58,3 +58,23 @@ def get_stars(object):
     qs = Star.objects.get_for_object(object)
     qs = qs.prefetch_related('author', 'content_object')
     return qs
+
+
+@register.assignment_tag(takes_context=True)
+def get_star_summary(context, object):
+    """
+    任意の<object>についた Star を作者ごとに集計したサマリーを取得し
+    指定された<variable>に格納するテンプレートタグ
+    サマリーの形式は ``kawaz.apps.stars.summary.summarize_stars`` を参照
+
+    Syntax:
+        {% get_star_summary <object> as <variable> %}
+
+    Examples:
+        {% get_star_summary object as summary %}
+        {% for entry in summary %}
+            {{ entry.author.nickname }} ({{ entry.count }})
+        {% endfor %}
+    """
+    from ..summary import summarize_stars
+    return summarize_stars(object, context.get('user'))
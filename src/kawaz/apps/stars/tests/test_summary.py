@@ -0,0 +1,125 @@
+from django.test import TestCase, override_settings
+from django.core.urlresolvers import reverse
+from django.contrib.contenttypes.models import ContentType
+from kawaz.core.personas.tests.factories import PersonaFactory
+from kawaz.core.personas.tests.utils import create_role_users
+from ..summary import summarize_stars
+from .factories import StarFactory, ArticleFactory
+
+
+class SummarizeStarsTestCase(TestCase):
+    def setUp(self):
+        self.users = create_role_users()
+        self.article = ArticleFactory()
+        self.author0 = PersonaFactory(role='children')
+        self.author1 = PersonaFactory(role='children')
+        self.stars = (
+            StarFactory(content_object=self.article, author=self.author0,
+                        quote=''),
+            StarFactory(content_object=self.article, author=self.author1,
+                        quote=''),
+            StarFactory(content_object=self.article, author=self.author0,
+                        quote=''),
+            StarFactory(content_object=self.article, author=self.author0,
+                        quote='quote'),
+        )
+
+    def test_summarize_stars_group_by_author(self):
+        """summarize_stars は作者ごとにスターをまとめる"""
+        summary = summarize_stars(self.article)
+        self.assertEqual(len(summary), 2)
+        entry0, entry1 = summary
+        self.assertEqual(entry0['author']['id'], self.author0.pk)
+        self.assertEqual(entry0['count'], 2)
+        self.assertEqual(entry0['star'], self.stars[0].pk)
+        self.assertEqual(entry0['quotes'], [{
+            'id': self.stars[3].pk,
+            'quote': 'quote',
+            'tooltip': self.stars[3].tooltip_text,
+        }])
+        self.assertEqual(entry0['tooltip'], self.stars[0].tooltip_text)
+        self.assertEqual(entry1['author']['id'], self.author1.pk)
+        self.assertEqual(entry1['count'], 1)
+        self.assertEqual(entry1['quotes'], [])
+
+    def test_summarize_stars_quoted_only(self):
+        """引用付きのスターのみの作者は star が None となる"""
+        author = PersonaFactory(role='children')
+        StarFactory(content_object=self.article, author=author, quote='a')
+        entry = summarize_stars(self.article)[-1]
+        self.assertEqual(entry['author']['id'], author.pk)
+        self.assertEqual(entry['count'], 0)
+        self.assertIsNone(entry['star'])
+        self.assertEqual(len(entry['quotes']), 1)
+
+    def test_summarize_stars_without_stars(self):
+        """スターが無い場合は空のリストを返す"""
+        self.assertEqual(summarize_stars(ArticleFactory()), [])
+
+    def test_summarize_stars_queries(self):
+        """スターの数に関わらず一定数のクエリで集計する"""
+        for i in range(10):
+            StarFactory(content_object=self.article,
+                        author=PersonaFactory(role='children'), quote='')
+        # 集計・引用付きスター・作者の3クエリ
+        with self.assertNumQueries(3):
+            summarize_stars(self.article)
+
+    def test_summarize_stars_deletable(self):
+        """deletable は指定されたユーザーがスターを削除可能かを示す"""
+        summary = summarize_stars(self.article, self.author0)
+        self.assertTrue(summary[0]['deletable'])
+        self.assertFalse(summary[1]['deletable'])
+        summary = summarize_stars(self.article, self.users['adam'])
+        self.assertTrue(summary[0]['deletable'])
+        self.assertTrue(summary[1]['deletable'])
+        summary = summarize_stars(self.article, self.users['anonymous'])
+        self.assertFalse(summary[0]['deletable'])
+        self.assertFalse(summary[1]['deletable'])
+
+
+class StarSummaryAPITestCase(TestCase):
+    def setUp(self):
+        self.users = create_role_users()
+        self.article = ArticleFactory()
+        self.protected_article = ArticleFactory(pub_state='protected')
+        StarFactory(content_object=self.article, quote='')
+        StarFactory(content_object=self.protected_article, quote='')
+
+    def _get_summary(self, obj):
+        ct = ContentType.objects.get_for_model(obj)
+        url = '{}?content_type={}&object_id={}'.format(
+            reverse('star-summary'), ct.pk, obj.pk)
+        return self.client.get(url)
+
+    def test_api_summary(self):
+        """サマリーAPIは作者ごとに集計したスターを返す"""
+        response = self._get_summary(self.article)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['count'], 1)
+
+    def test_api_summary_protected(self):
+        """閲覧権限の無いオブジェクトのサマリーは取得できない"""
+        response = self._get_summary(self.protected_article)
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(self.client.login(username=self.users['children'],
+                                          password='password'))
+        response = self._get_summary(self.protected_article)
+        self.assertEqual(response.status_code, 200)
+
+    def test_api_summary_without_params(self):
+        """content_type, object_id が無い場合は 400 を返す"""
+        response = self.client.get(reverse('star-summary'))
+        self.assertEqual(response.status_code, 400)
+
+    # API の URL は末尾にスラッシュが無いため 404 がリダイレクトされないよう
+    # にする
+    @override_settings(APPEND_SLASH=False)
+    def test_api_summary_stale_content_type(self):
+        """モデルが存在しない ContentType の場合は 404 を返す"""
+        ct = ContentType.objects.create(app_label='stars', model='removed')
+        url = '{}?content_type={}&object_id=1'.format(
+            reverse('star-summary'), ct.pk)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
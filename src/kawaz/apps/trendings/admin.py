@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import TrendingScore
+
+
+class TrendingScoreAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'content_type', 'object_id', 'updated_at')
+    list_filter = ('content_type',)
+admin.site.register(TrendingScore, TrendingScoreAdmin)
@@ -0,0 +1,35 @@
+from django.apps import apps
+from rest_framework import viewsets
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from ..utils import get_trending
+
+# API で返すオブジェクトの最大数
+MAX_LIMIT = 30
+
+
+class TrendingViewSet(viewsets.ViewSet):
+    """
+    現在注目されているオブジェクトを返す API
+
+    Query:
+        model: 対象のモデル（``'<app_label>.<model_name>'``、省略可）
+        limit: 返すオブジェクトの数（デフォルト: 5、最大: 30）
+    """
+    renderer_classes = (JSONRenderer,)
+
+    def list(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', 5)), MAX_LIMIT)
+            model = request.query_params.get('model')
+            models = [apps.get_model(model)] if model else None
+        except (ValueError, LookupError):
+            raise ParseError('Invalid model or limit')
+        return Response([{
+            'model': obj._meta.label_lower,
+            'id': obj.pk,
+            'title': obj.title,
+            'url': obj.get_absolute_url(),
+            'score': obj.trending_score,
+        } for obj in get_trending(request.user, models, limit)])
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from ...models import TrendingScore
+
+
+class Command(BaseCommand):
+    help = ("Command to rebuild trending scores from existing stars and "
+            "comment activities. "
+            "Usually the scores are updated incrementally thus this command "
+            "is only required when the scores are broken. "
+            "Note that downloads are not restored by this command.")
+
+    def handle(self, *args, **options):
+        verbosity = int(options.get('verbosity'))
+        if verbosity > 0:
+            print("Rebuilding trending scores...")
+        TrendingScore.objects.rebuild()
+        if verbosity > 0:
+            print("{} trending scores are stored.".format(
+                TrendingScore.objects.count()
+            ))
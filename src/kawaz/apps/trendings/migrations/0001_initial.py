@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, serialize=False, primary_key=True, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField(verbose_name='Object ID')),
+                ('log_score', models.FloatField(db_index=True, verbose_name='Log score')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated at')),
+                ('content_type', models.ForeignKey(related_name='+', to='contenttypes.ContentType', verbose_name='Content type')),
+            ],
+            options={
+                'ordering': ('-log_score',),
+                'verbose_name_plural': 'Trending scores',
+                'verbose_name': 'Trending score',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='trendingscore',
+            unique_together=set([('content_type', 'object_id')]),
+        ),
+    ]
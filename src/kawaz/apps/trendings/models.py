@@ -0,0 +1,258 @@
+"""
+スター・コメント・ダウンロードによるオブジェクトの注目度（トレンドスコア）
+
+スコアはイベント（スターの付加など）の重みを半減期
+``KAWAZ_TRENDING_HALF_LIFE`` 秒で指数的に減衰させた値の総和である。
+減衰は全オブジェクトで共通のため、基準時刻 ``EPOCH`` から見た重み
+``weight * exp(λ(t - EPOCH))`` の総和の対数を保持すれば、過去の
+イベントを再集計することなくイベントごとに逐次更新でき、保持された値の
+順序がそのまま現在のスコアの順序となる
+
+Settings:
+    KAWAZ_TRENDING_HALF_LIFE (int): スコアの半減期（秒）
+    KAWAZ_TRENDING_WEIGHTS (dict): イベント（``'star'``, ``'comment'``,
+        ``'download'``）ごとの重み
+    KAWAZ_TRENDING_MODELS (tuple): スコアを記録するモデル
+        （``'<app_label>.<model_name>'``）
+"""
+import math
+import datetime
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+from django.contrib.contenttypes.models import ContentType
+
+# スコアの基準時刻
+EPOCH = datetime.datetime(2015, 1, 1, tzinfo=datetime.timezone.utc)
+DEFAULT_HALF_LIFE = 60 * 60 * 24
+DEFAULT_WEIGHTS = {
+    'star': 1.0,
+    'comment': 2.0,
+    'download': 1.0,
+}
+DEFAULT_MODELS = (
+    'blogs.entry',
+    'products.product',
+    'projects.project',
+    'events.event',
+)
+
+
+def get_half_life():
+    return getattr(settings, 'KAWAZ_TRENDING_HALF_LIFE', DEFAULT_HALF_LIFE)
+
+
+def get_weight(event):
+    weights = getattr(settings, 'KAWAZ_TRENDING_WEIGHTS', DEFAULT_WEIGHTS)
+    return weights[event]
+
+
+def get_trending_models():
+    """
+    スコアを記録するモデルのリストを返す
+    """
+    labels = getattr(settings, 'KAWAZ_TRENDING_MODELS', DEFAULT_MODELS)
+    return [apps.get_model(label) for label in labels]
+
+
+def get_trending_content_types():
+    """
+    スコアを記録するモデルの ContentType の pk の集合を返す
+    """
+    cts = ContentType.objects.get_for_models(*get_trending_models())
+    return {ct.pk for ct in cts.values()}
+
+
+def _get_elapsed(at):
+    return (at - EPOCH).total_seconds() * math.log(2) / get_half_life()
+
+
+def to_log_score(weight, at):
+    """
+    時刻 ``at`` に発生した重み ``weight`` のイベントの対数スコアを返す
+    """
+    return math.log(weight) + _get_elapsed(at)
+
+
+def from_log_score(log_score, now=None):
+    """
+    対数スコアを時刻 ``now`` （デフォルト: 現在時刻）におけるスコアに変換する
+    """
+    now = now or timezone.now()
+    return math.exp(log_score - _get_elapsed(now))
+
+
+def logaddexp(a, b):
+    """
+    ``log(exp(a) + exp(b))`` をオーバーフローさせずに求める
+    """
+    if a < b:
+        a, b = b, a
+    return a + math.log1p(math.exp(b - a))
+
+
+class TrendingScoreManager(models.Manager):
+
+    def get_for_object(self, obj):
+        ct = ContentType.objects.get_for_model(obj)
+        return self.get(content_type=ct, object_id=obj.pk)
+
+    def trending(self, models=None):
+        """
+        指定されたモデル（デフォルト: ``KAWAZ_TRENDING_MODELS``）のスコアを
+        スコアの高い順に含むクエリを返す
+        """
+        if models is None:
+            cts = get_trending_content_types()
+        else:
+            cts = [ct.pk for ct in
+                   ContentType.objects.get_for_models(*models).values()]
+        return self.filter(content_type__in=cts).order_by('-log_score')
+
+    def record(self, content_type_id, object_id, event, at=None):
+        """
+        指定されたオブジェクトにイベントを記録しスコアを加算する
+
+        Args:
+            content_type_id (int): 対象オブジェクトの ContentType の pk
+            object_id (int): 対象オブジェクトの pk
+            event (str): ``'star'``, ``'comment'`` もしくは ``'download'``
+            at (datetime): イベントの発生時刻（デフォルト: 現在時刻）
+        """
+        log_score = to_log_score(get_weight(event), at or timezone.now())
+        with transaction.atomic():
+            obj, created = self.select_for_update().get_or_create(
+                content_type_id=content_type_id,
+                object_id=object_id,
+                defaults=dict(log_score=log_score))
+            if not created:
+                obj.log_score = logaddexp(obj.log_score, log_score)
+                obj.save(update_fields=('log_score', 'updated_at'))
+        return obj
+
+    def rebuild(self):
+        """
+        既存のスター・コメントのアクティビティから全てのスコアを再計算する
+
+        ダウンロードは発生時刻が記録されていないため再計算されない
+        """
+        from activities.models import Activity
+        from kawaz.apps.stars.models import Star
+        cts = get_trending_content_types()
+        events = []
+        stars = Star.objects.filter(content_type__in=cts)
+        for ct, object_id, created_at in stars.values_list(
+                'content_type_id', 'object_id', 'created_at'):
+            events.append((ct, object_id, 'star', created_at))
+        activities = Activity.objects.filter(content_type__in=cts,
+                                             status='comment_added')
+        for ct, object_id, created_at in activities.values_list(
+                'content_type_id', 'object_id', 'created_at'):
+            events.append((ct, object_id, 'comment', created_at))
+        scores = {}
+        for ct, object_id, event, at in events:
+            log_score = to_log_score(get_weight(event), at)
+            key = (ct, object_id)
+            if key in scores:
+                log_score = logaddexp(scores[key], log_score)
+            scores[key] = log_score
+        self.all().delete()
+        self.bulk_create([
+            self.model(content_type_id=ct, object_id=object_id,
+                       log_score=log_score)
+            for (ct, object_id), log_score in scores.items()
+        ])
+
+
+class TrendingScore(models.Model):
+    """
+    オブジェクトのトレンドスコア
+
+    ``log_score`` は基準時刻 ``EPOCH`` から見た重みの総和の対数であり、
+    インデックスが張られているため ``log_score`` の降順で並べるだけで
+    現在注目されているオブジェクトを取得できる
+    """
+    content_type = models.ForeignKey(ContentType,
+                                     verbose_name=_('Content type'),
+                                     related_name='+')
+    object_id = models.PositiveIntegerField(_('Object ID'))
+    log_score = models.FloatField(_('Log score'), db_index=True)
+    updated_at = models.DateTimeField(_('Updated at'), auto_now=True)
+
+    objects = TrendingScoreManager()
+
+    class Meta:
+        ordering = ('-log_score',)
+        unique_together = (('content_type', 'object_id'),)
+        verbose_name = _('Trending score')
+        verbose_name_plural = _('Trending scores')
+
+    def __str__(self):
+        return '{}:{}({:.3f})'.format(self.content_type_id, self.object_id,
+                                      self.score)
+
+    @property
+    def score(self):
+        """
+        現在時刻におけるスコア
+        """
+        return from_log_score(self.log_score)
+
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from activities.models import Activity
+from kawaz.apps.stars.models import Star
+from kawaz.apps.products.signals import product_downloaded
+
+
+def _record(content_type_id, object_id, event):
+    if content_type_id in get_trending_content_types():
+        TrendingScore.objects.record(content_type_id, object_id, event)
+
+
+@receiver(post_save, sender=Star)
+def record_star(**kwargs):
+    """
+    スターが付加された際に付加先のスコアを加算する
+    """
+    instance = kwargs.get('instance')
+    if kwargs.get('created') and not kwargs.get('raw'):
+        _record(instance.content_type_id, instance.object_id, 'star')
+
+
+@receiver(post_save, sender=Activity)
+def record_comment(**kwargs):
+    """
+    コメントが追加された（comment_added のアクティビティが作成された）際に
+    対象のスコアを加算する
+    """
+    instance = kwargs.get('instance')
+    if (kwargs.get('created') and not kwargs.get('raw') and
+            instance.status == 'comment_added'):
+        _record(instance.content_type_id, instance.object_id, 'comment')
+
+
+@receiver(product_downloaded)
+def record_download(**kwargs):
+    """
+    リリースがダウンロードされた際にプロダクトのスコアを加算する
+    """
+    release = kwargs.get('release')
+    ct = ContentType.objects.get_for_model(release.product)
+    _record(ct.pk, release.product_id, 'download')
+
+
+@receiver(post_delete)
+def delete_trending_score(sender, **kwargs):
+    """
+    スコアを記録するモデルのオブジェクトが削除された際にスコアを削除する
+    """
+    if sender not in get_trending_models():
+        return
+    instance = kwargs.get('instance')
+    ct = ContentType.objects.get_for_model(sender)
+    TrendingScore.objects.filter(content_type=ct,
+                                 object_id=instance.pk).delete()
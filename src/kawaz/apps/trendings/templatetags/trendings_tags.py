@@ -0,0 +1,33 @@
+from django import template
+from django.apps import apps
+from ..utils import get_trending as _get_trending
+
+register = template.Library()
+
+
+@register.assignment_tag(takes_context=True)
+def get_trending(context, model=None, limit=5):
+    """
+    現在注目されている（トレンドスコアの高い）オブジェクトのうち閲覧可能な
+    ものを取得し指定された<variable>に格納するテンプレートタグ
+    各オブジェクトの ``trending_score`` には現在のスコアが格納される
+
+    Syntax:
+        {% get_trending as <variable> %}
+        {% get_trending <model> as <variable> %}
+        {% get_trending <model> <limit> as <variable> %}
+
+    Examples:
+        注目されているオブジェクトを5件描画
+
+        {% get_trending as objects %}
+        {% for object in objects %}
+            <a href="{{ object.get_absolute_url }}">{{ object }}</a>
+        {% endfor %}
+
+        注目されているプロダクトを3件取得
+
+        {% get_trending 'products.product' 3 as products %}
+    """
+    models = [apps.get_model(model)] if model else None
+    return _get_trending(context.get('user'), models, int(limit))
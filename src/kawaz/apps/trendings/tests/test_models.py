@@ -0,0 +1,108 @@
+import math
+import datetime
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from django.contrib.contenttypes.models import ContentType
+from kawaz.apps.blogs.tests.factories import EntryFactory
+from kawaz.apps.products.models import PackageRelease
+from kawaz.apps.products.signals import product_downloaded
+from kawaz.apps.products.tests.factories import ProductFactory
+from kawaz.apps.stars.tests.factories import StarFactory
+from ..models import (TrendingScore, to_log_score, from_log_score,
+                      logaddexp)
+
+HALF_LIFE = 60 * 60
+
+
+@override_settings(KAWAZ_TRENDING_HALF_LIFE=HALF_LIFE)
+class TrendingScoreFunctionTestCase(TestCase):
+    def test_from_log_score(self):
+        """スコアは半減期ごとに半分に減衰する"""
+        now = timezone.now()
+        log_score = to_log_score(4.0, now)
+        self.assertAlmostEqual(from_log_score(log_score, now), 4.0)
+        later = now + datetime.timedelta(seconds=HALF_LIFE)
+        self.assertAlmostEqual(from_log_score(log_score, later), 2.0)
+
+    def test_logaddexp(self):
+        """logaddexp は対数のまま和を求める"""
+        self.assertAlmostEqual(logaddexp(math.log(2), math.log(3)),
+                               math.log(5))
+        # 大きな値でもオーバーフローしない
+        self.assertAlmostEqual(logaddexp(1000, 1000), 1000 + math.log(2))
+
+
+@override_settings(KAWAZ_TRENDING_HALF_LIFE=HALF_LIFE)
+class TrendingScoreManagerTestCase(TestCase):
+    def setUp(self):
+        self.entry = EntryFactory()
+        self.ct = ContentType.objects.get_for_model(self.entry)
+
+    def test_record(self):
+        """record はイベントの重みをスコアに加算する"""
+        now = timezone.now()
+        TrendingScore.objects.record(self.ct.pk, self.entry.pk, 'star', now)
+        score = TrendingScore.objects.record(self.ct.pk, self.entry.pk,
+                                             'comment', now)
+        self.assertEqual(TrendingScore.objects.count(), 1)
+        self.assertAlmostEqual(from_log_score(score.log_score, now), 3.0)
+
+    def test_record_decay(self):
+        """過去のイベントは減衰した重みで加算される"""
+        now = timezone.now()
+        before = now - datetime.timedelta(seconds=HALF_LIFE)
+        score = TrendingScore.objects.record(self.ct.pk, self.entry.pk,
+                                             'star', before)
+        self.assertAlmostEqual(from_log_score(score.log_score, now), 0.5)
+
+    def test_trending(self):
+        """trending は最近注目されたオブジェクトほど前に並べる"""
+        entry = EntryFactory()
+        now = timezone.now()
+        before = now - datetime.timedelta(seconds=HALF_LIFE * 2)
+        for i in range(3):
+            TrendingScore.objects.record(self.ct.pk, self.entry.pk,
+                                         'star', before)
+        TrendingScore.objects.record(self.ct.pk, entry.pk, 'star', now)
+        pks = [s.object_id for s in TrendingScore.objects.trending()]
+        self.assertEqual(pks, [entry.pk, self.entry.pk])
+
+    def test_rebuild(self):
+        """rebuild はスターから逐次更新と同じスコアを再計算する"""
+        StarFactory(content_object=self.entry)
+        StarFactory(content_object=self.entry)
+        log_score = TrendingScore.objects.get_for_object(self.entry).log_score
+        TrendingScore.objects.rebuild()
+        self.assertAlmostEqual(
+            TrendingScore.objects.get_for_object(self.entry).log_score,
+            log_score, places=3)
+
+
+@override_settings(KAWAZ_TRENDING_HALF_LIFE=HALF_LIFE)
+class TrendingScoreReceiverTestCase(TestCase):
+    def test_record_star(self):
+        """スターが付加されると付加先のスコアが加算される"""
+        entry = EntryFactory()
+        StarFactory(content_object=entry)
+        score = TrendingScore.objects.get_for_object(entry)
+        self.assertAlmostEqual(score.score, 1.0, places=3)
+
+    def test_record_star_untracked(self):
+        """KAWAZ_TRENDING_MODELS 以外のモデルのスコアは記録されない"""
+        StarFactory()
+        self.assertFalse(TrendingScore.objects.exists())
+
+    def test_record_download(self):
+        """リリースがダウンロードされるとプロダクトのスコアが加算される"""
+        product = ProductFactory()
+        release = PackageRelease(product=product)
+        product_downloaded.send(sender=PackageRelease, release=release)
+        self.assertTrue(TrendingScore.objects.get_for_object(product))
+
+    def test_delete_trending_score(self):
+        """オブジェクトが削除されるとスコアも削除される"""
+        entry = EntryFactory()
+        StarFactory(content_object=entry)
+        entry.delete()
+        self.assertFalse(TrendingScore.objects.exists())
@@ -0,0 +1,52 @@
+from django.test import TestCase
+from django.contrib.contenttypes.models import ContentType
+from kawaz.apps.blogs.models import Entry
+from kawaz.apps.blogs.tests.factories import EntryFactory
+from kawaz.apps.products.tests.factories import ProductFactory
+from kawaz.core.personas.tests.utils import create_role_users
+from ..models import TrendingScore
+from ..utils import get_trending
+
+
+class GetTrendingTestCase(TestCase):
+    def setUp(self):
+        self.users = create_role_users()
+        self.entries = dict(
+            public=EntryFactory(pub_state='public'),
+            protected=EntryFactory(pub_state='protected'),
+            draft=EntryFactory(pub_state='draft'),
+        )
+        self.product = ProductFactory()
+        # public < protected < draft < product の順にスコアが高い
+        for i, obj in enumerate((self.entries['public'],
+                                 self.entries['protected'],
+                                 self.entries['draft'],
+                                 self.product)):
+            ct = ContentType.objects.get_for_model(obj)
+            for j in range(i + 1):
+                TrendingScore.objects.record(ct.pk, obj.pk, 'star')
+
+    def test_get_trending(self):
+        """get_trending は閲覧可能なオブジェクトをスコア順に返す"""
+        self.assertEqual(get_trending(self.users['children']), [
+            self.product,
+            self.entries['protected'],
+            self.entries['public'],
+        ])
+        self.assertEqual(get_trending(self.users['anonymous']), [
+            self.product,
+            self.entries['public'],
+        ])
+
+    def test_get_trending_models(self):
+        """models で対象のモデルを指定できる"""
+        self.assertEqual(get_trending(self.users['children'], [Entry]), [
+            self.entries['protected'],
+            self.entries['public'],
+        ])
+
+    def test_get_trending_limit(self):
+        """limit で返すオブジェクトの数を指定できる"""
+        trending = get_trending(self.users['children'], limit=1)
+        self.assertEqual(trending, [self.product])
+        self.assertAlmostEqual(trending[0].trending_score, 4.0, places=3)
@@ -0,0 +1,70 @@
+"""
+トレンドスコアの高いオブジェクトを取得するユーティリティ
+"""
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.contenttypes.models import ContentType
+from kawaz.core.db.routers import read_only
+from kawaz.core.utils.permission import has_view_permission
+from .models import TrendingScore, from_log_score
+
+# 閲覧できないオブジェクトを除外するために一度に読み込むスコアの倍率
+OVERFETCH = 3
+
+
+def is_visible(user_obj, obj):
+    """
+    指定されたオブジェクトをトレンドとして表示可能か否か
+    """
+    if getattr(obj, 'pub_state', None) == 'draft':
+        return False
+    return has_view_permission(user_obj, obj)
+
+
+def _resolve(scores):
+    """
+    スコアのリストに対応するオブジェクトを ContentType ごとにまとめて読み込む
+    """
+    pks = {}
+    for score in scores:
+        pks.setdefault(score.content_type_id, []).append(score.object_id)
+    objects = {}
+    for ct_id, object_ids in pks.items():
+        model = ContentType.objects.get_for_id(ct_id).model_class()
+        for pk, obj in read_only(model._default_manager.all()).in_bulk(
+                object_ids).items():
+            objects[(ct_id, pk)] = obj
+    for score in scores:
+        obj = objects.get((score.content_type_id, score.object_id))
+        if obj is not None:
+            yield score, obj
+
+
+def get_trending(user_obj=None, models=None, limit=5):
+    """
+    指定されたユーザーが閲覧可能なトレンドスコアの高いオブジェクトを返す
+
+    Args:
+        user_obj (user instance): 閲覧するユーザー（デフォルト: 匿名ユーザー）
+        models (list): 対象のモデルのリスト
+            （デフォルト: ``KAWAZ_TRENDING_MODELS``）
+        limit (int): 返すオブジェクトの最大数
+
+    Returns:
+        list: スコアの高い順のオブジェクトのリスト。各オブジェクトの
+            ``trending_score`` には現在のスコアが格納される
+    """
+    user_obj = user_obj or AnonymousUser()
+    qs = read_only(TrendingScore.objects.trending(models))
+    chunk = limit * OVERFETCH
+    offset = 0
+    trending = []
+    while len(trending) < limit:
+        scores = list(qs[offset:offset + chunk])
+        for score, obj in _resolve(scores):
+            if is_visible(user_obj, obj):
+                obj.trending_score = from_log_score(score.log_score)
+                trending.append(obj)
+        if len(scores) < chunk:
+            break
+        offset += chunk
+    return trending[:limit]
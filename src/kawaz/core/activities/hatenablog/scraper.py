@@ -4,11 +4,11 @@
 
 import hashlib
 import datetime
-import requests
 from bs4 import BeautifulSoup
 from .conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from .models import HatenablogEntry
+from kawaz.core.utils import transport
 
 
 # RSS2のpubDateのフォーマット
@@ -21,7 +21,7 @@ class HatenablogFeedScraper(object):
         self.verbose = verbose
 
     def fetch(self):
-        r = requests.get(self.url)
+        r = transport.get(self.url)
         r.raise_for_status()
 
         s = BeautifulSoup(r.text, 'lxml-xml')
@@ -56,7 +56,7 @@ class HatenablogFeedScraper(object):
         return ncreated, n - ncreated
 
     def _fetch_entry_thumbnail(self, entry):
-        r = requests.get(entry.link.string)
+        r = transport.get(entry.link.string)
         r.raise_for_status()
         s = BeautifulSoup(r.text, 'lxml')
         thumbnail_url = None
@@ -65,7 +65,7 @@ class HatenablogFeedScraper(object):
                 thumbnail_url = meta.get('content')
         if not thumbnail_url:
             return None
-        r = requests.get(thumbnail_url)
+        r = transport.get(thumbnail_url)
         filename = thumbnail_url.split('/')[-1]
         img = SimpleUploadedFile(filename, r.content)
         return img
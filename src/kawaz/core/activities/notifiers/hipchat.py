@@ -1,6 +1,7 @@
-import urllib
+import urllib.parse
 from django.conf import settings
 from activities.notifiers.base import ActivityNotifierBase
+from kawaz.core.utils import transport
 
 
 
@@ -67,7 +68,5 @@ class HipChatActivityNotifier(ActivityNotifierBase):
         }
 
         url = urllib.parse.urljoin(HIPCHAT_API_BASE, MESSAGE_END_POINT)
-        data = urllib.parse.urlencode(params)
-        data = data.encode('utf-8')
-        request = urllib.request.Request(url, data)
-        urllib.request.urlopen(request)
+        r = transport.post(url, data=params)
+        r.raise_for_status()
@@ -1,9 +1,9 @@
-import urllib
 import json
 import re
 import itertools
 from django.conf import settings
 from activities.notifiers.base import ActivityNotifierBase
+from kawaz.core.utils import transport
 
 DEFAULT_USERNAME = 'Kawaz'
 DEFAULT_ICON_EMOJI = ':frog:'
@@ -70,10 +70,8 @@ class SlackActivityNotifier(ActivityNotifierBase):
             params.update({'icon_emoji': self.icon_emoji})
 
         payload = {'payload': json.dumps(params)}
-        data = urllib.parse.urlencode(payload)
-        data = data.encode('utf-8')
-        request = urllib.request.Request(self.url, data)
-        urllib.request.urlopen(request)
+        r = transport.post(self.url, data=payload)
+        r.raise_for_status()
 
     def _parse_content(self, rendered_content):
         valid_tags = ('username', 'icon_url')
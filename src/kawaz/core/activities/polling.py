@@ -0,0 +1,112 @@
+"""
+新しいアクティビティを逐次取得するポーリング API のためのユーティリティ
+
+多数のクライアントが短い間隔でポーリングするため、最新のアクティビティ
+``WINDOW_SIZE`` 件（必要であれば描画済みの HTML を含む）を
+``KAWAZ_ACTIVITY_POLLING_TTL`` 秒の間共有キャッシュに保持し、各クライアント
+の ``since`` より新しいものをそこから返す。したがってクライアントの数に
+関わらずクエリ（と描画）はキャッシュの有効期間ごとに一度しか行われない
+
+キャッシュに含まれない古い ``since`` が指定された場合のみ ``pk > since`` の
+範囲検索を直接行う
+
+Settings:
+    KAWAZ_ACTIVITY_POLLING_TTL (int): 最新のアクティビティをキャッシュする
+        秒数
+"""
+from django.conf import settings
+from django.core.cache import cache
+from activities.models import Activity
+from kawaz.core.db.routers import read_only
+
+CACHE_KEY_PREFIX = 'kawaz.core.activities.polling'
+DEFAULT_TTL = 5
+# キャッシュする最新のアクティビティの件数
+WINDOW_SIZE = 50
+# 一度に返すアクティビティの最大数
+MAX_ACTIVITIES = 50
+
+
+def get_ttl():
+    return getattr(settings, 'KAWAZ_ACTIVITY_POLLING_TTL', DEFAULT_TTL)
+
+
+def serialize_activity(activity, typename=None):
+    """
+    アクティビティを JSON に変換可能な辞書に変換する
+
+    ``typename`` が指定された場合は対応するメディエーターで描画した HTML を
+    ``html`` に格納する。描画結果は全ユーザーで共有されるため、描画には
+    リクエストやユーザーを含まないコンテキストを用いる
+    """
+    data = {
+        'id': activity.pk,
+        'status': activity.status,
+        'content_type': '{}.{}'.format(activity.content_type.app_label,
+                                       activity.content_type.model),
+        'object_id': activity.object_id,
+        'created_at': activity.created_at.isoformat(),
+    }
+    if typename is not None:
+        data['html'] = activity.mediator.render(activity, {}, typename)
+    return data
+
+
+def _get_cache_key(typename):
+    return '{}:{}'.format(CACHE_KEY_PREFIX, typename or '')
+
+
+def get_recent_activities(typename=None):
+    """
+    最新のアクティビティ ``WINDOW_SIZE`` 件を新しい順に返す（キャッシュ付き）
+    """
+    key = _get_cache_key(typename)
+    recent = cache.get(key)
+    if recent is None:
+        qs = read_only(Activity.objects.order_by('-pk'))[:WINDOW_SIZE]
+        recent = [serialize_activity(activity, typename) for activity in qs]
+        cache.set(key, recent, get_ttl())
+    return recent
+
+
+def get_activities_since(since_id=None, typename=None, limit=MAX_ACTIVITIES):
+    """
+    指定された pk より新しいアクティビティを古い順に返す
+
+    Args:
+        since_id (int): クライアントが保持している最新のアクティビティの pk
+            （省略時は最新のアクティビティを返す）
+        typename (str): 描画に用いる typename（省略時は描画しない）
+        limit (int): 返すアクティビティの最大数
+
+    Returns:
+        dict: 以下の形式の辞書
+
+            {
+                'activities': [<serialized activity>, ...],
+                # 次回のポーリングで since に指定する pk
+                'latest_id': <int or None>,
+                # limit を超える新しいアクティビティが存在するか
+                'has_more': <bool>,
+            }
+    """
+    recent = get_recent_activities(typename)
+    covered = (len(recent) < WINDOW_SIZE or
+               (since_id is not None and since_id >= recent[-1]['id']))
+    if since_id is None:
+        activities = list(reversed(recent[:limit]))
+        has_more = False
+    elif covered:
+        newer = [a for a in recent if a['id'] > since_id]
+        activities = list(reversed(newer))[:limit]
+        has_more = len(newer) > limit
+    else:
+        # キャッシュより古い since が指定されたため範囲検索を行う
+        qs = read_only(Activity.objects.filter(pk__gt=since_id))
+        qs = qs.order_by('pk')[:limit + 1]
+        activities = [serialize_activity(a, typename) for a in qs]
+        has_more = len(activities) > limit
+        activities = activities[:limit]
+    latest_id = activities[-1]['id'] if activities else since_id
+    return dict(activities=activities, latest_id=latest_id,
+                has_more=has_more)
@@ -1,7 +1,6 @@
 import random
 import string
-import urllib
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 from django.test import override_settings
 from django.test import TestCase
 from kawaz.core.activities.notifiers.hipchat import HipChatActivityNotifier
@@ -17,20 +16,19 @@ class HipChatActivityNotifierTestCase(TestCase):
         auth_token = 'dummyauthtoken'
         room_id = '9999999'
 
-        def dummy_request(url, data):
+        def dummy_post(url, data=None, **kwargs):
             self.assertEqual(url, 'https://api.hipchat.com/v1/rooms/message')
-            data = data.decode('utf-8')
-            query = urllib.parse.parse_qs(data)
-            self.assertEqual(query['auth_token'][0], auth_token)
-            self.assertEqual(query['room_id'][0], room_id)
-            self.assertEqual(query['color'][0], 'random')
-            self.assertEqual(query['notify'][0], '1')
-            self.assertEqual(query['from'][0], 'Kawaz')
-            self.assertEqual(query['message'][0], randomstr)
+            self.assertEqual(data['auth_token'], auth_token)
+            self.assertEqual(data['room_id'], room_id)
+            self.assertEqual(data['color'], 'random')
+            self.assertEqual(data['notify'], 1)
+            self.assertEqual(data['from'], 'Kawaz')
+            self.assertEqual(data['message'], randomstr)
+            return MagicMock()
 
-        with patch('urllib.request') as request:
-            request.Request = dummy_request
-            request.urlopen.return_value = None
+        with patch('kawaz.core.utils.transport.post') as post:
+            post.side_effect = dummy_post
 
             notifier = HipChatActivityNotifier(auth_token, room_id)
             notifier.send(randomstr)
+            self.assertEqual(post.call_count, 1)
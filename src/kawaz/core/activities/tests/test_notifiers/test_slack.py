@@ -1,8 +1,7 @@
 import random
 import string
 import json
-import urllib
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 from django.test import override_settings
 from django.test import TestCase
 from kawaz.core.activities.notifiers.slack import SlackActivityNotifier
@@ -19,10 +18,8 @@ class SlackActivityNotifierTestCase(TestCase):
         channel = '#notification'
         icon_emoji = ':frog:'
 
-        def dummy_request(url, data):
-            self.assertEqual(url, endpoint_url)
-            query = urllib.parse.parse_qs(data.decode('utf-8'))
-            payload = json.loads(query['payload'][0])
+        def dummy_post(url, data=None, **kwargs):
+            payload = json.loads(data['payload'])
             self.assertEqual(url, endpoint_url)
             self.assertEqual(payload['channel'], channel)
             if has_icon_url:
@@ -31,10 +28,10 @@ class SlackActivityNotifierTestCase(TestCase):
                 self.assertEqual(payload['icon_emoji'], icon_emoji)
             self.assertEqual(payload['username'], username)
             self.assertEqual(payload['text'], message)
+            return MagicMock()
 
-        with patch('urllib.request') as request:
-            request.Request = dummy_request
-            request.urlopen.return_value = None
+        with patch('kawaz.core.utils.transport.post') as post:
+            post.side_effect = dummy_post
 
             options = {
                 'username': username,
@@ -43,6 +40,7 @@ class SlackActivityNotifierTestCase(TestCase):
             }
             notifier = SlackActivityNotifier(endpoint_url, channel, options)
             notifier.send(rendered_str)
+            self.assertEqual(post.call_count, 1)
 
     def test_send(self):
         """
@@ -0,0 +1,97 @@
+from unittest.mock import patch
+from django.test import TestCase
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.contrib.contenttypes.models import ContentType
+from activities.models import Activity
+from activities.tests.models import ActivitiesTestModelA
+from kawaz.apps.blogs.tests.factories import EntryFactory
+from kawaz.core.activities.tests.factories import ActivityFactory
+from .. import polling
+from ..polling import get_activities_since
+
+
+class ActivityPollingTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        ct = ContentType.objects.get_for_model(ActivitiesTestModelA)
+        self.activities = [
+            ActivityFactory(content_type=ct, object_id=1, status='created')
+            for i in range(5)
+        ]
+
+    def _ids(self, result):
+        return [a['id'] for a in result['activities']]
+
+    def test_get_activities_since(self):
+        """since より新しいアクティビティを古い順に返す"""
+        since = self.activities[2].pk
+        result = get_activities_since(since)
+        self.assertEqual(self._ids(result),
+                         [a.pk for a in self.activities[3:]])
+        self.assertEqual(result['latest_id'], self.activities[-1].pk)
+        self.assertFalse(result['has_more'])
+
+    def test_get_activities_since_latest(self):
+        """新しいアクティビティが無い場合は since をそのまま返す"""
+        since = self.activities[-1].pk
+        result = get_activities_since(since)
+        self.assertEqual(result['activities'], [])
+        self.assertEqual(result['latest_id'], since)
+
+    def test_get_activities_since_limit(self):
+        """limit を超える場合は has_more が True となる"""
+        result = get_activities_since(self.activities[0].pk, limit=2)
+        self.assertEqual(self._ids(result),
+                         [a.pk for a in self.activities[1:3]])
+        self.assertTrue(result['has_more'])
+
+    def test_get_activities_since_shares_cache(self):
+        """キャッシュの有効期間内は異なる since でもクエリを発行しない"""
+        get_activities_since(self.activities[0].pk)
+        with self.assertNumQueries(0):
+            result = get_activities_since(self.activities[3].pk)
+        self.assertEqual(self._ids(result), [self.activities[4].pk])
+
+    def test_get_activities_since_out_of_window(self):
+        """キャッシュより古い since の場合は範囲検索を行う"""
+        with patch.object(polling, 'WINDOW_SIZE', 2):
+            result = get_activities_since(self.activities[0].pk)
+        self.assertEqual(self._ids(result),
+                         [a.pk for a in self.activities[1:]])
+
+    def test_get_activities_since_typename(self):
+        """typename が指定された場合は描画した HTML を含む"""
+        entry = EntryFactory()
+        activity = Activity.objects.get_for_object(entry).first()
+        result = get_activities_since(self.activities[-1].pk, 'root')
+        serialized = {a['id']: a for a in result['activities']}
+        self.assertTrue(serialized[activity.pk]['html'])
+
+
+class ActivityPollingViewTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_activities_activity_since_url(self):
+        """
+        name=activities_activity_sinceから/activities/since/を引ける
+        """
+        self.assertEqual(reverse('activities_activity_since'),
+                         '/activities/since/')
+
+    def test_get(self):
+        """JSON で新しいアクティビティを返す"""
+        ct = ContentType.objects.get_for_model(ActivitiesTestModelA)
+        activity = ActivityFactory(content_type=ct, object_id=1,
+                                   status='created')
+        r = self.client.get('/activities/since/', {'since': activity.pk - 1})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()['latest_id'], activity.pk)
+
+    def test_get_invalid(self):
+        """不正な since や typename は 400 を返す"""
+        r = self.client.get('/activities/since/', {'since': 'a'})
+        self.assertEqual(r.status_code, 400)
+        r = self.client.get('/activities/since/', {'typename': '../a'})
+        self.assertEqual(r.status_code, 400)
@@ -1,7 +1,7 @@
 from django.test import TestCase
 from django.contrib.contenttypes.models import ContentType
 from django.core.urlresolvers import reverse
-from activities.models import Activity
+from activities.models import Activity, Inbox, InboxEntry
 from activities.tests.models import ActivitiesTestModelA
 from activities.registry import registry
 from activities.mediator import ActivityMediator
@@ -62,3 +62,42 @@ class ActivityViewTestCase(TestCase):
         self.assertEqual(len(r.context['object_list']), 10)
         r = self.client.get('/activities/?page=3')
         self.assertEqual(len(r.context['object_list']), 10)
+
+
+class InboxViewTestCase(TestCase):
+    def setUp(self):
+        self.user = PersonaFactory()
+        for i in range(15):
+            ActivitiesTestModelA.objects.create(text="hogehoge")
+        for activity in Activity.objects.get_for_model(
+                ActivitiesTestModelA).order_by('pk'):
+            InboxEntry.objects.deliver(activity, [self.user])
+
+    def test_activities_activity_inbox_url(self):
+        """
+        name=activities_activity_inboxから/activities/inbox/を引ける
+        """
+        self.assertEqual(reverse('activities_activity_inbox'),
+                         '/activities/inbox/')
+
+    def test_get_inbox(self):
+        """
+        受信箱のActivityを10件ずつ取得でき、表示したものは既読になる
+        """
+        self.assertTrue(self.client.login(username=self.user.username,
+                                          password='password'))
+        r = self.client.get('/activities/inbox/')
+        self.assertEqual(len(r.context['object_list']), 10)
+        self.assertFalse(any(e.read for e in r.context['object_list']))
+        self.assertEqual(Inbox.objects.get_unread_count(self.user), 5)
+
+        r = self.client.get('/activities/inbox/?page=2')
+        self.assertEqual(len(r.context['object_list']), 5)
+        self.assertEqual(Inbox.objects.get_unread_count(self.user), 0)
+
+    def test_get_inbox_anonymous(self):
+        """
+        非ログインユーザーはログインページへリダイレクトされる
+        """
+        r = self.client.get('/activities/inbox/')
+        self.assertEqual(r.status_code, 302)
@@ -1,7 +1,7 @@
 from django.contrib.contenttypes.models import ContentType
 from django.template import Context
 from django.test import TestCase
-from activities.models import Activity
+from activities.models import Activity, InboxEntry
 from activities.registry import registry
 from kawaz.core.comments.tests.factories import CommentFactory
 
@@ -80,6 +80,17 @@ class BaseActivityMediatorTestCase(TestCase):
                         "context doesn't contain 'comment'")
 
 
+    def _test_recipients(self, recipients):
+        """
+        コメントされたときに、comment_addedが関係者の受信箱に配信される
+        """
+        CommentFactory(content_object=self.object)
+        activity = Activity.objects.get_for_object(self.object)[0]
+        for user in recipients:
+            entries = InboxEntry.objects.for_user(user)
+            self.assertEqual(entries[0].activity, activity)
+
+
     def _test_render(self, activity):
         mediator = registry.get(activity)
         self.assertTrue(mediator.render(activity, {}))
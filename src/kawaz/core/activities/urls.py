@@ -1,9 +1,15 @@
 from django.conf.urls import url
 
 from .views import ActivityListView
+from .views import InboxView
+from .views import ActivityPollingView
 
 
 urlpatterns = [
     url(r'^$', ActivityListView.as_view(),
         name='activities_activity_list'),
+    url(r'^inbox/$', InboxView.as_view(),
+        name='activities_activity_inbox'),
+    url(r'^since/$', ActivityPollingView.as_view(),
+        name='activities_activity_since'),
 ]
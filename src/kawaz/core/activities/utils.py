@@ -0,0 +1,113 @@
+def get_change_remarks(instance, activity, attributes):
+    """
+    指定された属性の作成・変更・削除を ``<attribute>_created`` などの文字列の
+    リストで返す
+
+    インスタンスが ``FieldTrackerMixin`` により元の値を記録している場合は
+    クエリを発行せずにそれと比較し、記録していない場合は一つ前の Activity の
+    snapshot と比較する
+
+    Args:
+        instance (model instance): 対象のモデルインスタンス
+        activity (activity): 作成中の Activity
+        attributes (iterable): 変更を調べる属性名のリスト
+
+    Returns:
+        list: 変更を表す文字列のリスト。比較対象が存在しない場合は ``None``
+    """
+    if (hasattr(instance, 'has_original_values') and
+            instance.has_original_values()):
+        get_previous = instance.get_original_value
+        get_current = instance.get_current_value
+    elif activity.previous:
+        previous = activity.previous.snapshot
+        get_previous = lambda x: getattr(previous, x)
+        get_current = lambda x: getattr(instance, x)
+    else:
+        return None
+    remarks = []
+    for attribute in attributes:
+        previous_value = get_previous(attribute)
+        current_value = get_current(attribute)
+        if not previous_value and current_value:
+            remarks.append(attribute + '_created')
+        elif (previous_value and current_value and
+                previous_value != current_value):
+            remarks.append(attribute + '_updated')
+        elif previous_value and not current_value:
+            remarks.append(attribute + '_deleted')
+    return remarks
+
+
+def get_related_user_pks(activity, field_names):
+    """
+    Activity の対象オブジェクトの指定されたユーザーのフィールド（ForeignKey
+    もしくは ManyToManyField）に含まれるユーザーの pk の集合を返す
+
+    ``ActivityMediator.get_recipients`` の実装に用いる
+
+    Args:
+        activity (activity): 保存済みの Activity
+        field_names (iterable): ユーザーを参照するフィールド名のリスト
+
+    Returns:
+        set: ユーザーの pk の集合。対象オブジェクトが存在しない場合は空
+    """
+    obj = activity._content_object
+    if obj is None:
+        return set()
+    pks = set()
+    for name in field_names:
+        field = obj._meta.get_field(name)
+        if field.many_to_many:
+            pks.update(getattr(obj, name).values_list('pk', flat=True))
+        else:
+            pks.add(getattr(obj, field.attname))
+    pks.discard(None)
+    return pks
+
+
+# snapshot からアバターを描画するユーザーのフィールド名
+USER_FIELD_NAMES = ('author', 'organizer', 'last_modifier')
+
+
+def prefetch_activity_thumbnails(activities):
+    """
+    Activity の snapshot とその作者などのユーザーのアバター・アイコンの URL を
+    まとめて解決する
+
+    ユーザーは一度のクエリでまとめて読み込み、snapshot にキャッシュするため
+    Activity ごとにユーザーを取得するクエリも発行されない。アクティビティ
+    ウォールなどで描画前に呼び出す
+
+    Args:
+        activities (iterable): 描画する Activity のリスト
+    """
+    from django.core.exceptions import FieldDoesNotExist
+    from kawaz.core.personas.models import Persona
+    from kawaz.apps.projects.models import Project
+    snapshots = [a.snapshot for a in activities]
+    snapshots = [s for s in snapshots if hasattr(s, '_meta')]
+    # [(<snapshot>, <field>), ...]
+    pending = []
+    for snapshot in snapshots:
+        for name in USER_FIELD_NAMES:
+            try:
+                field = snapshot._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if (field.many_to_one and field.related_model is Persona and
+                    not hasattr(snapshot, field.get_cache_name())):
+                pending.append((snapshot, field))
+    pks = {getattr(s, f.attname) for s, f in pending} - {None}
+    users = {}
+    if pks:
+        users = {u.pk: u for u in Persona.objects.filter(pk__in=pks)}
+    for snapshot, field in pending:
+        user = users.get(getattr(snapshot, field.attname))
+        if user is not None:
+            setattr(snapshot, field.get_cache_name(), user)
+    Persona.prefetch_avatars(
+        [s for s in snapshots if isinstance(s, Persona)] +
+        list(users.values()))
+    Project.prefetch_icons([s for s in snapshots if isinstance(s, Project)])
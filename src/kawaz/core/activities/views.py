@@ -2,15 +2,78 @@ from permission.decorators import permission_required
 
 
 
+import re
+from django.http import JsonResponse, HttpResponseBadRequest
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.views.generic import View
 from django.views.generic.list import ListView
-from activities.models import Activity
+from activities.models import Activity, InboxEntry
+from kawaz.core.views.pagination import KeysetPaginationMixin
+from .polling import get_activities_since
+from .utils import prefetch_activity_thumbnails
 
-class ActivityListView(ListView):
+# テンプレート名に用いられるため typename に指定可能な文字列を制限している
+TYPENAME_PATTERN = re.compile(r'^\w+$')
+
+class ActivityListView(KeysetPaginationMixin, ListView):
     paginate_by = 10
     model = Activity
+    keyset_ordering = ('-created_at', '-pk')
 
     def get_queryset(self):
         type = self.request.GET.get('type', None)
         if type == 'wall':
             return Activity.objects.latests()
         return super().get_queryset()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # アバター・アイコンの URL をページ単位でまとめて解決する
+        prefetch_activity_thumbnails(context['object_list'])
+        return context
+
+
+class InboxView(LoginRequiredMixin, ListView):
+    """
+    ログインユーザーに関係するアクティビティ（受信箱）の一覧
+
+    表示したページのアクティビティは既読になる
+    """
+    paginate_by = 10
+    template_name = 'activities/activity_inbox.html'
+
+    def get_queryset(self):
+        return InboxEntry.objects.for_user(self.request.user)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # 未読状態を描画するため既読にする前に評価している
+        entries = list(context['object_list'])
+        context['object_list'] = entries
+        InboxEntry.objects.mark_as_read(
+            self.request.user,
+            [entry.pk for entry in entries if not entry.read])
+        return context
+
+
+class ActivityPollingView(View):
+    """
+    指定された pk（since）より新しいアクティビティを JSON で返す
+
+    Query:
+        since: クライアントが保持している最新のアクティビティの pk
+        typename: 指定された場合は描画した HTML を ``html`` に含める
+
+    レスポンスの形式は ``kawaz.core.activities.polling.get_activities_since``
+    を参照
+    """
+    def get(self, request, *args, **kwargs):
+        since = request.GET.get('since') or None
+        typename = request.GET.get('typename') or None
+        try:
+            since = int(since) if since is not None else None
+        except ValueError:
+            return HttpResponseBadRequest()
+        if typename is not None and not TYPENAME_PATTERN.match(typename):
+            return HttpResponseBadRequest()
+        return JsonResponse(get_activities_since(since, typename))
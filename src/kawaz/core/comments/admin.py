@@ -0,0 +1,14 @@
+from django.contrib import admin
+from django_comments.admin import CommentsAdmin
+from django_comments.models import Comment
+from kawaz.core.views.pagination import ApproximateCountPaginator
+
+
+class KawazCommentsAdmin(CommentsAdmin):
+    # コメントは件数が多いため変更リストの件数に概算を用いる
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+
+# django_comments が登録した CommentsAdmin を置き換える
+admin.site.unregister(Comment)
+admin.site.register(Comment, KawazCommentsAdmin)
@@ -0,0 +1,24 @@
+"""
+件数の多い外部アプリのモデルの管理画面の変更リストで概算の件数を用いる
+
+``activities`` は Kawaz に依存しないため、ここで登録を置き換えている
+"""
+from django.contrib import admin
+from activities.admin import ActivityAdmin, ArchivedActivityAdmin
+from activities.models import Activity, ArchivedActivity
+from kawaz.core.views.pagination import ApproximateCountPaginator
+
+
+class KawazActivityAdmin(ActivityAdmin):
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+
+
+class KawazArchivedActivityAdmin(ArchivedActivityAdmin):
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+
+admin.site.unregister(Activity)
+admin.site.register(Activity, KawazActivityAdmin)
+admin.site.unregister(ArchivedActivity)
+admin.site.register(ArchivedActivity, KawazArchivedActivityAdmin)
@@ -0,0 +1,108 @@
+# coding=utf-8
+"""
+件数の多いテーブルに対する概算の件数
+
+ページネーションや管理画面は表示のたびに ``COUNT(*)`` を発行するが、
+InnoDB の ``COUNT(*)`` はテーブル全体（もしくはインデックス全体）を走査する
+ため、アクティビティのような大きなテーブルでは数百ミリ秒を要する。
+``approximate_count()`` は以下の順で件数を求める
+
+1.  絞り込みの無い QuerySet はデータベースの統計情報（MySQL の
+    ``information_schema.TABLES``、PostgreSQL の ``pg_class``）による
+    推定行数を用いる
+2.  ``KAWAZ_APPROXIMATE_COUNT_THRESHOLD`` 件までのみを数え、それ以下で
+    あれば正確な件数を返す
+3.  それより多い場合は正確な件数を ``KAWAZ_APPROXIMATE_COUNT_TIMEOUT`` 秒
+    キャッシュし、期限が切れるたびに数え直す
+
+Settings:
+    KAWAZ_APPROXIMATE_COUNT_THRESHOLD (int): 正確な件数を返す最大の件数
+    KAWAZ_APPROXIMATE_COUNT_TIMEOUT (int): 件数をキャッシュする秒数
+"""
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+CACHE_KEY_PREFIX = 'kawaz.core.db.counts'
+DEFAULT_THRESHOLD = 1000
+DEFAULT_TIMEOUT = 60 * 10
+
+# テーブルの推定行数を取得する SQL
+ESTIMATE_SQL = {
+    'mysql': ('SELECT TABLE_ROWS FROM information_schema.TABLES '
+              'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s'),
+    'postgresql': 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+}
+
+
+def get_threshold():
+    return getattr(settings, 'KAWAZ_APPROXIMATE_COUNT_THRESHOLD',
+                   DEFAULT_THRESHOLD)
+
+
+def get_timeout():
+    return getattr(settings, 'KAWAZ_APPROXIMATE_COUNT_TIMEOUT',
+                   DEFAULT_TIMEOUT)
+
+
+def get_table_estimate(model, using):
+    """
+    データベースの統計情報から指定されたモデルのテーブルの推定行数を返す
+
+    Returns:
+        int or None: 統計情報を利用できない場合は None
+    """
+    connection = connections[using]
+    sql = ESTIMATE_SQL.get(connection.vendor)
+    if sql is None:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [model._meta.db_table])
+        row = cursor.fetchone()
+    # 統計情報が収集されていないテーブルは NULL や -1 となる
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def is_unfiltered(queryset):
+    """
+    指定された QuerySet がテーブルの全ての行を対象とするか否か
+    """
+    query = queryset.query
+    return (not query.where and not query.distinct and
+            query.group_by is None and
+            query.low_mark == 0 and query.high_mark is None)
+
+
+def _get_cache_key(queryset):
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(
+        repr((queryset.db, sql, params)).encode('utf-8')).hexdigest()
+    return '{}:{}'.format(CACHE_KEY_PREFIX, digest)
+
+
+def approximate_count(queryset):
+    """
+    指定された QuerySet の（概算の）件数を返す
+
+    ``KAWAZ_APPROXIMATE_COUNT_THRESHOLD`` 件以下の場合は正確な件数を返す。
+    それより多い場合の件数は統計情報による推定値もしくは最大
+    ``KAWAZ_APPROXIMATE_COUNT_TIMEOUT`` 秒前の件数となる
+    """
+    threshold = get_threshold()
+    if is_unfiltered(queryset):
+        estimate = get_table_estimate(queryset.model, queryset.db)
+        if estimate is not None and estimate > threshold:
+            return estimate
+    # LIMIT 付きの副問い合わせで数えるため閾値を超える行は走査しない
+    count = queryset.order_by()[:threshold + 1].count()
+    if count <= threshold:
+        return count
+    key = _get_cache_key(queryset)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, get_timeout())
+    return count
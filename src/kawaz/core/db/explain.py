@@ -0,0 +1,324 @@
+# coding=utf-8
+"""
+QuerySet の実行計画（EXPLAIN）を取得・解析し、必要な複合インデックスを提案する
+
+監査対象の QuerySet は各アプリの ``queryplans.py`` で下記のように登録する
+（``autodiscover()`` により ``admin.py`` と同様に自動的に読み込まれる）
+
+    >>> from kawaz.core.db.explain import registry
+    >>> registry.register('events.Event.active',
+    ...                   lambda user: Event.objects.active(user))
+
+登録された QuerySet は ``manage.py audit_query_plans`` で監査される
+"""
+from collections import OrderedDict, namedtuple
+from django.db import connections
+from django.db.models.lookups import Lookup
+from django.db.models.expressions import Col
+from django.utils.module_loading import autodiscover_modules
+
+
+FULL_SCAN = 'full_scan'
+FILESORT = 'filesort'
+TEMPORARY = 'temporary'
+
+# インデックスの先頭に並べる等価比較の lookup
+EQUALITY_LOOKUPS = ('exact', 'iexact', 'in', 'isnull')
+# 等価比較の後に一つだけ並べることのできる範囲比較の lookup
+RANGE_LOOKUPS = ('gt', 'gte', 'lt', 'lte', 'range', 'year', 'month', 'day')
+
+EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN',
+    'mysql': 'EXPLAIN',
+    'postgresql': 'EXPLAIN',
+}
+
+
+QueryPlanReport = namedtuple('QueryPlanReport', (
+    'name', 'model', 'sql', 'plan', 'issues', 'suggestion',
+))
+
+
+class QueryPlanRegistry(object):
+    """
+    実行計画を監査する QuerySet のレジストリ
+    """
+    def __init__(self):
+        self._registry = OrderedDict()
+
+    def register(self, name, factory, per_user=True):
+        """
+        監査対象の QuerySet を登録する
+
+        Args:
+            name (str): 監査結果に表示される名前（e.g. ``'blogs.Entry.published'``）
+            factory (callable): QuerySet を返す関数。``per_user`` が ``True``
+                の場合はユーザーを引数として受け取る。``None`` を返した場合
+                その QuerySet の監査はスキップされる
+            per_user (bool): 非ログインユーザーとメンバーそれぞれで監査を
+                行うか否か（デフォルト: ``True``）
+        """
+        self._registry[name] = (factory, per_user)
+
+    def unregister(self, name):
+        del self._registry[name]
+
+    def __iter__(self):
+        return iter(self._registry.items())
+
+    def __len__(self):
+        return len(self._registry)
+
+
+# Create a global instance of registry
+registry = QueryPlanRegistry()
+
+
+def autodiscover():
+    """
+    INSTALLED_APPS の各アプリの ``queryplans.py`` を読み込む
+    """
+    autodiscover_modules('queryplans', register_to=registry)
+
+
+def get_audit_users():
+    """
+    監査に使用するユーザーを ``(<label>, <user>)`` のリストで返す
+
+    DB 上のデータには依存させないため保存されていないインスタンスを使う
+    """
+    from django.contrib.auth.models import AnonymousUser
+    from kawaz.core.personas.models import Persona
+    member = Persona(pk=1, username='query_plan_audit', role='children')
+    return [('anonymous', AnonymousUser()), ('member', member)]
+
+
+def iter_querysets(names=None):
+    """
+    登録された QuerySet を ``(<name>, <queryset>)`` の形式で順に返す
+
+    Args:
+        names (list): 指定された場合、この文字列のいずれかで始まる名前の
+            QuerySet のみを返す
+    """
+    for name, (factory, per_user) in registry:
+        if names and not any(name.startswith(n) for n in names):
+            continue
+        if per_user:
+            for label, user in get_audit_users():
+                qs = factory(user)
+                if qs is not None:
+                    yield '{} ({})'.format(name, label), qs
+        else:
+            qs = factory()
+            if qs is not None:
+                yield name, qs
+
+
+def explain(queryset, using=None):
+    """
+    指定された QuerySet の実行計画を取得し、辞書のリストとして返す
+
+    Args:
+        queryset (queryset): 対象の QuerySet
+        using (str): 使用するデータベース名（デフォルト: QuerySet の db）
+
+    Returns:
+        tuple: ``(<vendor>, <sql>, <rows>)``
+    """
+    using = using or queryset.db
+    connection = connections[using]
+    compiler = queryset.query.get_compiler(using=using)
+    sql, params = compiler.as_sql()
+    prefix = EXPLAIN_PREFIXES.get(connection.vendor, 'EXPLAIN')
+    with connection.cursor() as cursor:
+        cursor.execute('{} {}'.format(prefix, sql), params)
+        columns = [c[0] for c in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    try:
+        sql = sql % tuple(params)
+    except (TypeError, ValueError):
+        pass
+    return connection.vendor, sql, rows
+
+
+def analyze_plan(vendor, rows):
+    """
+    実行計画からフルスキャン・filesort・一時テーブルの使用を検出する
+
+    Returns:
+        list: ``(<issue type>, <description>)`` のリスト
+    """
+    issues = []
+    for row in rows:
+        if vendor == 'mysql':
+            table = row.get('table')
+            extra = row.get('Extra') or ''
+            if row.get('type') == 'ALL':
+                issues.append((FULL_SCAN,
+                               'full table scan on `{}` ({} rows)'.format(
+                                   table, row.get('rows'))))
+            if 'Using filesort' in extra:
+                issues.append((FILESORT, 'filesort on `{}`'.format(table)))
+            if 'Using temporary' in extra:
+                issues.append((TEMPORARY,
+                               'temporary table on `{}`'.format(table)))
+        elif vendor == 'sqlite':
+            detail = row.get('detail') or ''
+            if detail.startswith('SCAN') and ' USING ' not in detail:
+                issues.append((FULL_SCAN, detail))
+            if 'USE TEMP B-TREE' in detail:
+                if 'ORDER BY' in detail:
+                    issues.append((FILESORT, detail))
+                else:
+                    issues.append((TEMPORARY, detail))
+        else:
+            line = ' '.join(str(v) for v in row.values()).strip()
+            if 'Seq Scan on' in line:
+                issues.append((FULL_SCAN, line))
+            if line.lstrip('-> ').startswith('Sort '):
+                issues.append((FILESORT, line))
+    return issues
+
+
+def _iter_lookups(node):
+    for child in getattr(node, 'children', ()):
+        if isinstance(child, Lookup):
+            yield child
+        else:
+            for lookup in _iter_lookups(child):
+                yield lookup
+
+
+def _get_ordering_fields(queryset):
+    query = queryset.query
+    ordering = query.order_by or (
+        query.default_ordering and query.get_meta().ordering or ())
+    opts = queryset.model._meta
+    for name in ordering:
+        if not isinstance(name, str) or name == '?':
+            # 式や乱数による並び替えはインデックスで解決できない
+            return
+        name = name.lstrip('-')
+        if '__' in name:
+            # 結合先のテーブルによる並び替えはインデックスで解決できない
+            return
+        if name == 'pk':
+            name = opts.pk.name
+        yield opts.get_field(name)
+
+
+def suggest_index(queryset):
+    """
+    QuerySet の WHERE/ORDER BY 句から有効と思われる複合インデックスを提案する
+
+    等価比較されるカラムを先頭に並べ、範囲比較されるカラムを一つだけ続ける。
+    範囲比較が無い場合は ORDER BY のカラムを続けることで filesort を避ける。
+    結合先のテーブルに対する条件は無視される
+
+    Returns:
+        tuple: 提案するインデックスのフィールド名のタプル。既存の
+            インデックスで十分な場合や提案できない場合は ``None``
+    """
+    model = queryset.model
+    opts = model._meta
+    base_table = opts.db_table
+    equalities = []
+    ranges = []
+    for lookup in _iter_lookups(queryset.query.where):
+        lhs = lookup.lhs
+        if not isinstance(lhs, Col) or lhs.target.model is not model:
+            continue
+        if lhs.alias not in (base_table, None):
+            continue
+        field = lhs.target
+        if lookup.lookup_name in EQUALITY_LOOKUPS:
+            if field not in equalities:
+                equalities.append(field)
+        elif lookup.lookup_name in RANGE_LOOKUPS:
+            if field not in ranges:
+                ranges.append(field)
+    fields = list(equalities)
+    ranges = [f for f in ranges if f not in fields]
+    if ranges:
+        fields.append(ranges[0])
+    else:
+        for field in _get_ordering_fields(queryset):
+            if field not in fields:
+                fields.append(field)
+    if not fields or fields == [opts.pk]:
+        return None
+    names = tuple(field.name for field in fields)
+    if is_covered(model, names):
+        return None
+    return names
+
+
+def is_covered(model, names):
+    """
+    指定されたフィールドのインデックスが既存のインデックスで賄えるか否か
+    """
+    opts = model._meta
+    if len(names) == 1:
+        field = opts.get_field(names[0])
+        if field.db_index or field.unique or field.primary_key:
+            return True
+    existing = list(opts.index_together) + list(opts.unique_together)
+    for index in existing:
+        if tuple(index[:len(names)]) == tuple(names):
+            return True
+    return False
+
+
+def audit(names=None, using=None):
+    """
+    登録された全ての QuerySet の実行計画を監査し ``QueryPlanReport`` を返す
+    """
+    for name, queryset in iter_querysets(names):
+        vendor, sql, plan = explain(queryset, using=using)
+        issues = analyze_plan(vendor, plan)
+        suggestion = suggest_index(queryset) if issues else None
+        yield QueryPlanReport(name, queryset.model, sql, plan,
+                              issues, suggestion)
+
+
+def get_index_together(model, indexes):
+    """
+    提案されたインデックスを既存の ``index_together`` に加えたタプルを返す
+
+    Args:
+        model (model class): インデックスを追加するモデル
+        indexes (list): 提案されたインデックスのフィールド名のタプルのリスト
+
+    Returns:
+        tuple: モデルの ``Meta.index_together`` に指定すべきタプル
+    """
+    index_together = [tuple(i) for i in model._meta.index_together]
+    for index in indexes:
+        if tuple(index) not in index_together:
+            index_together.append(tuple(index))
+    return tuple(index_together)
+
+
+def format_meta_change(model, indexes):
+    """
+    提案されたインデックスを追加するために開発者が適用すべき ``Meta`` の
+    変更を文字列で返す
+
+    マイグレーションのみを作成するとモデルの ``Meta`` と食い違い、次の
+    ``makemigrations`` でインデックスを削除するマイグレーションが作成されて
+    しまうため、``Meta`` を変更してから ``makemigrations`` を実行する
+
+    Returns:
+        str: ``class Meta`` の ``index_together`` の記述
+    """
+    lines = [
+        '# {}'.format(model.__module__),
+        'class {}:'.format(model.__name__),
+        '    class Meta:',
+        '        index_together = (',
+    ]
+    for index in get_index_together(model, indexes):
+        lines.append('            {!r},'.format(index))
+    lines.append('        )')
+    return '\n'.join(lines)
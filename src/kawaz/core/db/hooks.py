@@ -0,0 +1,54 @@
+# coding=utf-8
+"""
+クエリの発行時に処理を差し込むためのフック
+
+Django 1.10 には ``connection.execute_wrapper`` が無いため、
+``CursorWrapper.execute`` を一度だけ置き換え、登録されたフックを順に
+呼び出す。N+1 クエリの検出（``nplusone``）や描画時間の計測
+（``rendertiming``）はそれぞれ置き換えを行わずにこのフックを利用する
+
+    >>> from kawaz.core.db import hooks
+    >>> hooks.add_execute_hook(on_execute)      # on_execute(sql)
+    >>> hooks.remove_execute_hook(on_execute)
+
+フックが一つも登録されていない場合は元の ``execute`` に戻される
+"""
+import threading
+from django.db.backends import utils
+
+_lock = threading.Lock()
+_hooks = ()
+_original_execute = None
+
+
+def _execute(self, sql, params=None):
+    for hook in _hooks:
+        hook(sql)
+    return _original_execute(self, sql, params)
+
+
+def add_execute_hook(hook):
+    """
+    クエリの発行ごとに ``hook(sql)`` が呼ばれるよう登録する
+    """
+    global _hooks, _original_execute
+    with _lock:
+        if hook in _hooks:
+            return
+        # 呼び出し中の変更の影響を受けないようタプルを置き換える
+        _hooks = _hooks + (hook,)
+        if _original_execute is None:
+            _original_execute = utils.CursorWrapper.execute
+            utils.CursorWrapper.execute = _execute
+
+
+def remove_execute_hook(hook):
+    """
+    登録されたフックを解除する
+    """
+    global _hooks, _original_execute
+    with _lock:
+        _hooks = tuple(h for h in _hooks if h is not hook)
+        if not _hooks and _original_execute is not None:
+            utils.CursorWrapper.execute = _original_execute
+            _original_execute = None
@@ -0,0 +1,274 @@
+# coding=utf-8
+"""
+同じ形のクエリの繰り返し（N+1 クエリ）の検出
+
+``detect()`` のブロック内（もしくは ``start()`` から ``stop()`` まで）に
+発行されたクエリを正規化した SQL と発行元ごとに数え、同じクエリが
+``KAWAZ_NPLUSONE_THRESHOLD`` 回を超えて発行された場合に報告する。発行元は
+クエリを発行した Kawaz のコード（``src`` 以下）の行、もしくはテンプレートの
+行である
+
+開発サーバーでは ``NPlusOneDetectionMiddleware`` がリクエストごとに警告を
+ログに出力し、テスト中は ``NPlusOneError`` を送出してテストを失敗させる
+
+意図的な繰り返しは ``KAWAZ_NPLUSONE_ALLOWLIST`` に発行元もしくは SQL に
+マッチする正規表現を指定するか ``allow()`` のブロック内で実行する
+
+    >>> from kawaz.core.db import nplusone
+    >>> with nplusone.allow():
+    ...     for entry in entries:
+    ...         entry.author.nickname
+
+Settings:
+    KAWAZ_NPLUSONE_DETECTION (bool): リクエストごとに検出を行うか
+        （デフォルト: DEBUG）
+    KAWAZ_NPLUSONE_RAISE (bool): 検出時に例外を送出するか（テスト中は True）
+    KAWAZ_NPLUSONE_THRESHOLD (int): 許容する同じクエリの発行回数
+    KAWAZ_NPLUSONE_ALLOWLIST (tuple): 報告しない発行元もしくは SQL の
+        正規表現
+"""
+import os
+import re
+import sys
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from django.conf import settings
+from . import hooks
+
+DEFAULT_THRESHOLD = 10
+
+# 発行元として扱うソースコードのディレクトリ（kawaz と lib を含む src）
+SOURCE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__)))))
+# クエリの発行を中継するだけのモジュールは発行元として扱わない
+WRAPPER_FILES = frozenset(
+    os.path.join(SOURCE_ROOT, *path.split('/')) for path in (
+        'kawaz/core/db/nplusone.py',
+        'kawaz/core/db/hooks.py',
+        'kawaz/core/utils/rendertiming.py',
+    ))
+
+STRING_PATTERN = re.compile(r"'(?:[^']|'')*'")
+NUMBER_PATTERN = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_PATTERN = re.compile(r'\bIN \((?:\?, )*\?\)', re.IGNORECASE)
+
+logger = logging.getLogger(__name__)
+
+Violation = namedtuple('Violation', ('sql', 'callsite', 'count'))
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def is_enabled():
+    return getattr(settings, 'KAWAZ_NPLUSONE_DETECTION', settings.DEBUG)
+
+
+def get_threshold():
+    return getattr(settings, 'KAWAZ_NPLUSONE_THRESHOLD', DEFAULT_THRESHOLD)
+
+
+def get_allowlist():
+    return tuple(getattr(settings, 'KAWAZ_NPLUSONE_ALLOWLIST', ()))
+
+
+def normalize_sql(sql):
+    """
+    パラメータやリテラルの値、IN 句の要素数によらず同じ形のクエリが同じ
+    文字列となるように SQL を正規化する
+    """
+    sql = ' '.join(sql.split())
+    sql = STRING_PATTERN.sub('?', sql)
+    sql = NUMBER_PATTERN.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    return IN_PATTERN.sub('IN (...)', sql)
+
+
+def _get_template_callsite(frame):
+    if frame.f_code.co_name != 'render_annotated':
+        return None
+    from django.template.base import Node
+    # isinstance() は SimpleLazyObject（request.user など）を評価してしまい
+    # クエリが発行されるため type() で判定する
+    node = frame.f_locals.get('self')
+    if not issubclass(type(node), Node):
+        return None
+    origin = getattr(node, 'origin', None)
+    token = getattr(node, 'token', None)
+    if origin is None or token is None:
+        return None
+    return '{}:{}'.format(origin.template_name, token.lineno)
+
+
+def get_callsite(frame=None):
+    """
+    クエリを発行した Kawaz のコードもしくはテンプレートの位置を
+    ``<path>:<lineno>`` の形式で返す
+    """
+    frame = frame or sys._getframe(1)
+    while frame is not None:
+        callsite = _get_template_callsite(frame)
+        if callsite:
+            return callsite
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if (filename.startswith(SOURCE_ROOT) and
+                filename not in WRAPPER_FILES):
+            return '{}:{}'.format(os.path.relpath(filename, SOURCE_ROOT),
+                                  frame.f_lineno)
+        frame = frame.f_back
+    return '<unknown>'
+
+
+class QueryRecorder(object):
+    """
+    発行されたクエリを正規化した SQL と発行元ごとに数える
+
+    Args:
+        threshold (int): 許容する同じクエリの発行回数
+        allowlist (tuple): 報告しない発行元もしくは SQL の正規表現
+    """
+    def __init__(self, threshold=None, allowlist=None):
+        if threshold is None:
+            threshold = get_threshold()
+        if allowlist is None:
+            allowlist = get_allowlist()
+        self.threshold = threshold
+        self.allowlist = [re.compile(pattern) for pattern in allowlist]
+        self.counts = OrderedDict()
+        # allow() のブロックの深さ
+        self.allowed = 0
+        self._recording = False
+
+    def record(self, sql):
+        # 発行元の特定中に発行されたクエリは記録しない
+        if self.allowed or self._recording:
+            return
+        self._recording = True
+        try:
+            key = (normalize_sql(sql), get_callsite(sys._getframe(1)))
+        finally:
+            self._recording = False
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def is_allowed(self, sql, callsite):
+        return any(pattern.search(callsite) or pattern.search(sql)
+                   for pattern in self.allowlist)
+
+    def get_violations(self):
+        """
+        許容回数を超えて発行されたクエリのリストを発行回数の多い順に返す
+        """
+        violations = [Violation(sql, callsite, count)
+                      for (sql, callsite), count in self.counts.items()
+                      if count > self.threshold and
+                      not self.is_allowed(sql, callsite)]
+        return sorted(violations, key=lambda v: -v.count)
+
+
+_local = threading.local()
+
+
+def _on_execute(sql):
+    recorder = getattr(_local, 'recorder', None)
+    if recorder is not None:
+        recorder.record(sql)
+
+
+def install():
+    """
+    全てのカーソルのクエリを記録できるようフックを登録する。記録は
+    ``start()`` したスレッドでのみ行われる
+    """
+    hooks.add_execute_hook(_on_execute)
+
+
+def uninstall():
+    """
+    ``install()`` で登録したフックを解除する
+    """
+    hooks.remove_execute_hook(_on_execute)
+
+
+def get_recorder():
+    """
+    現在のスレッドで記録中の QueryRecorder を返す
+    """
+    return getattr(_local, 'recorder', None)
+
+
+def start(threshold=None, allowlist=None):
+    """
+    現在のスレッドで発行されるクエリの記録を開始する
+    """
+    install()
+    _local.recorder = QueryRecorder(threshold, allowlist)
+    return _local.recorder
+
+
+def stop():
+    """
+    現在のスレッドのクエリの記録を終了し QueryRecorder を返す
+    """
+    recorder = get_recorder()
+    _local.recorder = None
+    return recorder
+
+
+def report(recorder, label='', raise_exception=None):
+    """
+    許容回数を超えて発行されたクエリを警告する
+
+    Raises:
+        NPlusOneError: ``raise_exception`` （デフォルト:
+            ``KAWAZ_NPLUSONE_RAISE``）が True で検出された場合
+    """
+    violations = recorder.get_violations()
+    if not violations:
+        return violations
+    lines = ['N+1 queries detected{}:'.format(
+        ' in {}'.format(label) if label else '')]
+    for violation in violations:
+        lines.append('  {0.count} times at {0.callsite}: {0.sql}'.format(
+            violation))
+    message = '\n'.join(lines)
+    if raise_exception is None:
+        raise_exception = getattr(settings, 'KAWAZ_NPLUSONE_RAISE', False)
+    if raise_exception:
+        raise NPlusOneError(message)
+    logger.warning(message)
+    return violations
+
+
+@contextmanager
+def detect(threshold=None, allowlist=None, raise_exception=True, label=''):
+    """
+    ブロック内の N+1 クエリを検出する（テスト用）
+
+        >>> with nplusone.detect():
+        ...     self.client.get('/projects/')
+    """
+    previous = get_recorder()
+    recorder = start(threshold, allowlist)
+    try:
+        yield recorder
+    finally:
+        _local.recorder = previous
+    report(recorder, label, raise_exception)
+
+
+@contextmanager
+def allow():
+    """
+    ブロック内のクエリを記録しない
+    """
+    recorder = get_recorder()
+    if recorder is not None:
+        recorder.allowed += 1
+    try:
+        yield
+    finally:
+        if recorder is not None:
+            recorder.allowed -= 1
@@ -0,0 +1,16 @@
+# coding=utf-8
+"""
+manage.py audit_query_plans で実行計画を監査する QuerySet の登録
+
+django-activities は Kawaz 外のライブラリとして公開予定のため、Activity の
+QuerySet はここで登録している
+"""
+from activities.models import Activity
+from .explain import registry
+
+registry.register('activities.Activity.latests',
+                  lambda: Activity.objects.latests(),
+                  per_user=False)
+registry.register('activities.Activity.all',
+                  lambda: Activity.objects.all(),
+                  per_user=False)
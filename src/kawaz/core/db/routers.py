@@ -0,0 +1,188 @@
+# coding=utf-8
+"""
+読み込み専用レプリカへのデータベースルーティング
+
+以下の読み込みがレプリカ（``KAWAZ_DATABASE_REPLICAS``）に振り分けられる
+
+-   GET/HEAD リクエスト中の読み込み（``ReplicaRoutingMiddleware``）
+-   ``read_only()`` が適用された QuerySet（e.g. ``published()``）
+
+書き込みを行ったユーザーは ``KAWAZ_DATABASE_STICKY_TIMEOUT`` 秒の間
+プライマリに固定され（read-your-writes）、自身の変更がレプリカの遅延に
+関わらず表示される。また、トランザクション中やリクエスト内で書き込みが
+行われた後の読み込みもプライマリが用いられる
+
+レプリカは ``KAWAZ_DATABASE_HEALTH_CHECK_INTERVAL`` 秒ごとにヘルスチェック
+され、利用できないレプリカへの読み込みはプライマリにフェイルオーバーされる
+
+Settings:
+    KAWAZ_DATABASE_REPLICAS (tuple): レプリカのデータベースのエイリアス
+    KAWAZ_DATABASE_STICKY_TIMEOUT (int): 書き込み後にプライマリに固定する
+        秒数
+    KAWAZ_DATABASE_HEALTH_CHECK_INTERVAL (int): ヘルスチェックの間隔（秒）
+"""
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PRIMARY = DEFAULT_DB_ALIAS
+DEFAULT_STICKY_TIMEOUT = 10
+DEFAULT_HEALTH_CHECK_INTERVAL = 30
+
+logger = logging.getLogger(__name__)
+
+
+def get_replicas():
+    return tuple(getattr(settings, 'KAWAZ_DATABASE_REPLICAS', ()))
+
+
+def get_sticky_timeout():
+    return getattr(settings, 'KAWAZ_DATABASE_STICKY_TIMEOUT',
+                   DEFAULT_STICKY_TIMEOUT)
+
+
+class RoutingState(threading.local):
+    """
+    現在のスレッド（リクエスト）のルーティングの状態
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # 全ての読み込みをレプリカに振り分けるか（GET リクエスト中）
+        self.replica_allowed = False
+        # プライマリに固定されているか（書き込み後の一定期間）
+        self.pinned = False
+        # 書き込みが行われたか
+        self.written = False
+
+
+state = RoutingState()
+
+
+class ReplicaHealth(object):
+    """
+    レプリカのヘルスチェックの結果を一定時間保持する
+    """
+    def __init__(self, interval=None):
+        self._interval = interval
+        self._lock = threading.Lock()
+        # {<alias>: (<healthy>, <checked_at>)}
+        self._states = {}
+
+    @property
+    def interval(self):
+        if self._interval is not None:
+            return self._interval
+        return getattr(settings, 'KAWAZ_DATABASE_HEALTH_CHECK_INTERVAL',
+                       DEFAULT_HEALTH_CHECK_INTERVAL)
+
+    def check(self, alias):
+        """
+        指定されたレプリカに接続し ``SELECT 1`` を実行できるか確認する
+        """
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except Exception:
+            logger.warning("Replica '%s' is unavailable", alias,
+                           exc_info=True)
+            return False
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            healthy, checked_at = self._states.get(alias, (None, None))
+            if checked_at is not None and now - checked_at < self.interval:
+                return healthy
+        healthy = self.check(alias)
+        with self._lock:
+            self._states[alias] = (healthy, now)
+        return healthy
+
+    def reset(self):
+        with self._lock:
+            self._states.clear()
+
+
+health = ReplicaHealth()
+
+
+def get_replica():
+    """
+    利用可能なレプリカのエイリアスを返す。利用可能なレプリカが無い場合は
+    プライマリのエイリアスを返す
+    """
+    replicas = [alias for alias in get_replicas() if health.is_healthy(alias)]
+    if not replicas:
+        return PRIMARY
+    return random.choice(replicas)
+
+
+def read_only(queryset):
+    """
+    指定された QuerySet をレプリカから読み込み可能としてマークする
+
+    プライマリに固定されている場合などはマークされていてもプライマリから
+    読み込まれる
+    """
+    queryset._hints = dict(queryset._hints, read_only=True)
+    return queryset
+
+
+@contextmanager
+def use_replica():
+    """
+    ブロック内の読み込みをレプリカに振り分ける（管理コマンドなど）
+    """
+    previous = state.replica_allowed
+    state.replica_allowed = True
+    try:
+        yield
+    finally:
+        state.replica_allowed = previous
+
+
+class ReplicaRouter(object):
+    """
+    読み込みをレプリカに、書き込みをプライマリに振り分けるルーター
+    """
+    def in_atomic_block(self):
+        return connections[PRIMARY].in_atomic_block
+
+    def _use_primary(self):
+        return state.pinned or state.written or self.in_atomic_block()
+
+    def db_for_read(self, model, **hints):
+        if not get_replicas():
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # 関連オブジェクトは元のオブジェクトと同じデータベースから読み込む
+            return instance._state.db
+        if self._use_primary():
+            return PRIMARY
+        if state.replica_allowed or hints.get('read_only'):
+            return get_replica()
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state.written = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = (PRIMARY,) + get_replicas()
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # レプリカはプライマリの複製なのでマイグレーションを行わない
+        if db in get_replicas():
+            return False
+        return None
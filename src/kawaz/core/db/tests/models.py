@@ -1,5 +1,6 @@
 from django.db import models
 from django.core.exceptions import ValidationError
+from ..tracking import FieldTrackerMixin
 
 
 class EvenNumberContainer(models.Model):
@@ -12,3 +13,12 @@ class EvenNumberContainer(models.Model):
     def clean(self):
         if self.number % 2 == 1:
             raise ValidationError('number must be even')
+
+
+class TrackedContainer(FieldTrackerMixin, models.Model):
+    """A test model which tracks changes of the fields"""
+    number = models.IntegerField('number', default=0)
+    text = models.CharField('text', max_length=30, blank=True)
+
+    class Meta:
+        app_label = 'db'
@@ -0,0 +1,67 @@
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from kawaz.core.views.pagination import ApproximateCountPaginator
+from .. import counts
+from ..counts import approximate_count, is_unfiltered
+from .models import TrackedContainer
+
+
+@override_settings(KAWAZ_APPROXIMATE_COUNT_THRESHOLD=3)
+class ApproximateCountTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i in range(5):
+            TrackedContainer.objects.create(number=i)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_is_unfiltered(self):
+        """絞り込みの無い QuerySet のみテーブル全体を対象とする"""
+        qs = TrackedContainer.objects.all()
+        self.assertTrue(is_unfiltered(qs))
+        self.assertTrue(is_unfiltered(qs.order_by('-number')))
+        self.assertFalse(is_unfiltered(qs.filter(number=1)))
+        self.assertFalse(is_unfiltered(qs.distinct()))
+        self.assertFalse(is_unfiltered(qs[:2]))
+
+    def test_exact_count_under_threshold(self):
+        """閾値以下の件数は正確に数える"""
+        qs = TrackedContainer.objects.filter(number__lt=2)
+        self.assertEqual(approximate_count(qs), 2)
+        TrackedContainer.objects.create(number=0)
+        self.assertEqual(approximate_count(qs), 3)
+
+    def test_cached_count_over_threshold(self):
+        """閾値を超える件数はキャッシュされる"""
+        qs = TrackedContainer.objects.filter(number__gte=0)
+        self.assertEqual(approximate_count(qs), 5)
+        TrackedContainer.objects.create(number=5)
+        with self.assertNumQueries(1):
+            self.assertEqual(approximate_count(qs), 5)
+        cache.clear()
+        self.assertEqual(approximate_count(qs), 6)
+
+    def test_table_estimate(self):
+        """絞り込みの無い QuerySet には統計情報による推定行数を用いる"""
+        with patch.object(counts, 'get_table_estimate', return_value=100):
+            self.assertEqual(
+                approximate_count(TrackedContainer.objects.all()), 100)
+            self.assertEqual(
+                approximate_count(TrackedContainer.objects.filter(
+                    number__gte=0)), 5)
+        with patch.object(counts, 'get_table_estimate', return_value=2):
+            # 推定行数が閾値以下の場合は正確に数える
+            self.assertEqual(
+                approximate_count(TrackedContainer.objects.all()), 5)
+
+    def test_paginator(self):
+        """ApproximateCountPaginator は概算の件数を用いる"""
+        qs = TrackedContainer.objects.order_by('pk')
+        with patch.object(counts, 'get_table_estimate', return_value=100):
+            paginator = ApproximateCountPaginator(qs, 2)
+            self.assertEqual(paginator.count, 100)
+            self.assertEqual(paginator.num_pages, 50)
+        paginator = ApproximateCountPaginator(list(qs), 2)
+        self.assertEqual(paginator.count, 5)
@@ -0,0 +1,96 @@
+from django.test import TestCase
+from .models import EvenNumberContainer
+from ..explain import (QueryPlanRegistry,
+                       analyze_plan,
+                       explain,
+                       format_meta_change,
+                       get_index_together,
+                       suggest_index,
+                       FULL_SCAN,
+                       FILESORT,
+                       TEMPORARY)
+
+
+class QueryPlanRegistryTestCase(TestCase):
+    def test_register(self):
+        """
+        登録した QuerySet の factory が取り出せる
+        """
+        registry = QueryPlanRegistry()
+        factory = lambda: EvenNumberContainer.objects.all()
+        registry.register('db.EvenNumberContainer.all', factory,
+                          per_user=False)
+        self.assertEqual(list(registry), [
+            ('db.EvenNumberContainer.all', (factory, False)),
+        ])
+        registry.unregister('db.EvenNumberContainer.all')
+        self.assertEqual(len(registry), 0)
+
+
+class ExplainTestCase(TestCase):
+    def test_explain_returns_plan(self):
+        """
+        explain は vendor, SQL, 実行計画の行を返す
+        """
+        qs = EvenNumberContainer.objects.filter(number=2)
+        vendor, sql, rows = explain(qs)
+        self.assertIn('number', sql)
+        self.assertTrue(rows)
+        self.assertTrue(all(isinstance(row, dict) for row in rows))
+
+    def test_analyze_mysql_plan(self):
+        """
+        MySQL の実行計画からフルスキャン・filesort・一時テーブルを検出する
+        """
+        rows = [{'table': 'foo', 'type': 'ALL', 'rows': 100,
+                 'Extra': 'Using where; Using temporary; Using filesort'},
+                {'table': 'bar', 'type': 'ref', 'rows': 1, 'Extra': None}]
+        issues = [i for i, d in analyze_plan('mysql', rows)]
+        self.assertEqual(issues, [FULL_SCAN, FILESORT, TEMPORARY])
+
+    def test_analyze_sqlite_plan(self):
+        """
+        SQLite の実行計画からフルスキャン・filesort を検出する
+        """
+        rows = [{'detail': 'SCAN TABLE foo'},
+                {'detail': 'SEARCH TABLE bar USING INDEX baz (id=?)'},
+                {'detail': 'USE TEMP B-TREE FOR ORDER BY'}]
+        issues = [i for i, d in analyze_plan('sqlite', rows)]
+        self.assertEqual(issues, [FULL_SCAN, FILESORT])
+
+    def test_suggest_index(self):
+        """
+        WHERE 句の等価比較されるカラムを先頭にしたインデックスが提案される
+        """
+        qs = EvenNumberContainer.objects.filter(number=2).order_by('pk')
+        self.assertEqual(suggest_index(qs), ('number', 'id'))
+
+    def test_suggest_index_with_range(self):
+        """
+        範囲比較されるカラムは等価比較のカラムの後に一つだけ並べられる
+        """
+        qs = EvenNumberContainer.objects.filter(number__gte=2)
+        self.assertEqual(suggest_index(qs), ('number',))
+
+    def test_suggest_index_returns_none_for_pk(self):
+        """
+        主キーのみで解決できる場合は何も提案しない
+        """
+        qs = EvenNumberContainer.objects.filter(pk=1)
+        self.assertIsNone(suggest_index(qs))
+
+    def test_get_index_together(self):
+        """
+        提案されたインデックスは既存の index_together に重複せず加えられる
+        """
+        index_together = get_index_together(
+            EvenNumberContainer, [('number', 'id'), ('number', 'id')])
+        self.assertEqual(index_together, (('number', 'id'),))
+
+    def test_format_meta_change(self):
+        """
+        開発者が適用すべき Meta の変更が返される
+        """
+        text = format_meta_change(EvenNumberContainer, [('number', 'id')])
+        self.assertIn('class EvenNumberContainer:', text)
+        self.assertIn("('number', 'id'),", text)
@@ -0,0 +1,90 @@
+from django.test import TestCase, RequestFactory, override_settings
+from django.http import HttpResponse
+from django.utils.functional import SimpleLazyObject, empty
+from kawaz.core.middlewares.nplusone import NPlusOneDetectionMiddleware
+from .. import nplusone
+from ..nplusone import NPlusOneError, detect, allow, normalize_sql
+from .models import TrackedContainer
+
+
+class NormalizeSQLTestCase(TestCase):
+    def test_normalize_sql(self):
+        """パラメータ・リテラル・IN 句の要素数によらず同じ形となる"""
+        self.assertEqual(
+            normalize_sql('SELECT * FROM "t"  WHERE "t"."id" = %s'),
+            'SELECT * FROM "t" WHERE "t"."id" = ?')
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE a = 'foo' LIMIT 21"),
+            'SELECT * FROM t WHERE a = ? LIMIT ?')
+        self.assertEqual(
+            normalize_sql('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+            normalize_sql('SELECT * FROM t WHERE id IN (%s)'))
+
+
+class NPlusOneDetectionTestCase(TestCase):
+    def setUp(self):
+        self.containers = [TrackedContainer.objects.create(number=i)
+                           for i in range(5)]
+
+    def tearDown(self):
+        nplusone.stop()
+
+    def _fetch_each(self):
+        for container in self.containers:
+            TrackedContainer.objects.get(pk=container.pk)
+
+    def test_detect(self):
+        """同じ発行元から同じ形のクエリが閾値を超えて発行されると失敗する"""
+        with self.assertRaises(NPlusOneError) as cm:
+            with detect(threshold=3):
+                self._fetch_each()
+        self.assertIn('5 times at kawaz/core/db/tests/test_nplusone.py',
+                      str(cm.exception))
+
+    def test_detect_under_threshold(self):
+        """閾値以下の繰り返しや一度のクエリは報告されない"""
+        with detect(threshold=5) as recorder:
+            self._fetch_each()
+            list(TrackedContainer.objects.filter(
+                pk__in=[c.pk for c in self.containers]))
+        self.assertEqual(recorder.get_violations(), [])
+
+    def test_allowlist(self):
+        """許可リストにマッチする発行元・SQL は報告されない"""
+        with detect(threshold=3, allowlist=(r'test_nplusone\.py',)):
+            self._fetch_each()
+        with detect(threshold=3, allowlist=(r'db_trackedcontainer',)):
+            self._fetch_each()
+
+    def test_allow(self):
+        """allow() のブロック内のクエリは記録されない"""
+        with detect(threshold=3) as recorder:
+            with allow():
+                self._fetch_each()
+        self.assertEqual(len(recorder.counts), 0)
+
+    def test_lazy_object(self):
+        """発行元の特定中に遅延評価されるオブジェクトを評価しない"""
+        lazy = SimpleLazyObject(lambda: TrackedContainer.objects.first())
+
+        def render_annotated(self):
+            TrackedContainer.objects.count()
+
+        with detect(threshold=3) as recorder:
+            render_annotated(lazy)
+        self.assertIs(lazy._wrapped, empty)
+        self.assertEqual(sum(recorder.counts.values()), 1)
+
+    @override_settings(KAWAZ_NPLUSONE_DETECTION=True,
+                       KAWAZ_NPLUSONE_RAISE=False,
+                       KAWAZ_NPLUSONE_THRESHOLD=3)
+    def test_middleware(self):
+        """ミドルウェアはリクエストごとに検出し警告する"""
+        middleware = NPlusOneDetectionMiddleware()
+        request = RequestFactory().get('/projects/')
+        middleware.process_request(request)
+        self._fetch_each()
+        with self.assertLogs(nplusone.logger, 'WARNING') as cm:
+            middleware.process_response(request, HttpResponse())
+        self.assertIn(request.path, cm.output[0])
+        self.assertIsNone(nplusone.get_recorder())
@@ -0,0 +1,88 @@
+from unittest.mock import MagicMock, patch
+from django.test import TestCase, override_settings
+from kawaz.core.middlewares.replica import ReplicaRoutingMiddleware
+from kawaz.core.middlewares.replica import PIN_COOKIE_NAME
+from .. import routers
+from .models import TrackedContainer
+
+
+@override_settings(KAWAZ_DATABASE_REPLICAS=('replica',))
+@patch.object(routers.ReplicaRouter, 'in_atomic_block',
+              MagicMock(return_value=False))
+@patch.object(routers.health, 'is_healthy', MagicMock(return_value=True))
+class ReplicaRouterTestCase(TestCase):
+    def setUp(self):
+        routers.state.reset()
+        self.router = routers.ReplicaRouter()
+
+    def tearDown(self):
+        routers.state.reset()
+
+    def test_db_for_read(self):
+        """GET リクエスト中もしくは read_only な読み込みはレプリカから行う"""
+        self.assertEqual(self.router.db_for_read(TrackedContainer),
+                         routers.PRIMARY)
+        self.assertEqual(self.router.db_for_read(TrackedContainer,
+                                                 read_only=True),
+                         'replica')
+        with routers.use_replica():
+            self.assertEqual(self.router.db_for_read(TrackedContainer),
+                             'replica')
+
+    def test_db_for_read_pinned(self):
+        """プライマリに固定されている場合や書き込み後はプライマリから読み込む"""
+        routers.state.replica_allowed = True
+        routers.state.pinned = True
+        self.assertEqual(self.router.db_for_read(TrackedContainer),
+                         routers.PRIMARY)
+        routers.state.pinned = False
+        self.router.db_for_write(TrackedContainer)
+        self.assertEqual(self.router.db_for_read(TrackedContainer,
+                                                 read_only=True),
+                         routers.PRIMARY)
+
+    def test_db_for_read_failover(self):
+        """利用可能なレプリカが無い場合はプライマリから読み込む"""
+        routers.state.replica_allowed = True
+        with patch.object(routers.health, 'is_healthy',
+                          MagicMock(return_value=False)):
+            self.assertEqual(self.router.db_for_read(TrackedContainer),
+                             routers.PRIMARY)
+
+    def test_read_only_queryset(self):
+        """read_only でマークされた QuerySet はレプリカから読み込まれる"""
+        qs = routers.read_only(TrackedContainer.objects.filter(number=1))
+        self.assertEqual(qs.filter(text='foo').db, 'replica')
+        self.assertEqual(TrackedContainer.objects.all().db, routers.PRIMARY)
+
+    def test_middleware(self):
+        """書き込みを行うリクエストの後はプライマリに固定する Cookie を返す"""
+        middleware = ReplicaRoutingMiddleware()
+        request = MagicMock(method='GET', COOKIES={})
+        middleware.process_request(request)
+        self.assertTrue(routers.state.replica_allowed)
+        response = MagicMock()
+        middleware.process_response(request, response)
+        self.assertFalse(response.set_cookie.called)
+
+        request = MagicMock(method='POST', COOKIES={})
+        middleware.process_request(request)
+        self.assertFalse(routers.state.replica_allowed)
+        middleware.process_response(request, response)
+        response.set_cookie.assert_called_with(
+            PIN_COOKIE_NAME, '1', max_age=routers.get_sticky_timeout(),
+            httponly=True)
+
+        request = MagicMock(method='GET', COOKIES={PIN_COOKIE_NAME: '1'})
+        middleware.process_request(request)
+        self.assertTrue(routers.state.pinned)
+
+
+class ReplicaHealthTestCase(TestCase):
+    def test_is_healthy_cached(self):
+        """ヘルスチェックの結果は一定時間保持される"""
+        health = routers.ReplicaHealth(interval=60)
+        with patch.object(health, 'check', MagicMock(return_value=False)) as m:
+            self.assertFalse(health.is_healthy('replica'))
+            self.assertFalse(health.is_healthy('replica'))
+        self.assertEqual(m.call_count, 1)
@@ -0,0 +1,64 @@
+from django.test import TestCase
+
+from ..tracking import DEFERRED
+from .models import TrackedContainer
+
+
+class FieldTrackerMixinTestCase(TestCase):
+    def test_changed_fields(self):
+        """読み込まれた時点から変更されたフィールドを返す"""
+        obj = TrackedContainer.objects.create(number=1, text='foo')
+        obj = TrackedContainer.objects.get(pk=obj.pk)
+        self.assertEqual(obj.changed_fields(), ())
+        obj.number = 2
+        self.assertEqual(obj.changed_fields(), ('number',))
+        self.assertTrue(obj.has_changed('number'))
+        self.assertFalse(obj.has_changed('text'))
+        self.assertEqual(obj.get_original_value('number'), 1)
+
+    def test_changed_fields_without_query(self):
+        """変更されたフィールドの取得でクエリは発行されない"""
+        obj = TrackedContainer.objects.create(number=1, text='foo')
+        obj = TrackedContainer.objects.get(pk=obj.pk)
+        obj.text = 'bar'
+        with self.assertNumQueries(0):
+            self.assertEqual(obj.changed_fields(), ('text',))
+
+    def test_original_values_are_updated_on_save(self):
+        """保存後は保存された値が元の値となる"""
+        obj = TrackedContainer.objects.create(number=1)
+        self.assertTrue(obj.has_original_values())
+        obj.number = 2
+        obj.save()
+        self.assertEqual(obj.changed_fields(), ())
+        self.assertEqual(obj.get_original_value('number'), 2)
+
+    def test_is_adding(self):
+        """作成のための保存中のみ is_adding は True を返す"""
+        results = []
+        obj = TrackedContainer(number=1)
+        original_save_base = obj.save_base
+
+        def save_base(*args, **kwargs):
+            results.append(obj.is_adding())
+            return original_save_base(*args, **kwargs)
+        obj.save_base = save_base
+        obj.save()
+        obj.save()
+        self.assertEqual(results, [True, False])
+        self.assertFalse(obj.is_adding())
+
+    def test_deferred_fields_are_not_tracked(self):
+        """遅延読み込みされるフィールドは追跡されない"""
+        obj = TrackedContainer.objects.create(number=1, text='foo')
+        obj = TrackedContainer.objects.only('number').get(pk=obj.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(obj.changed_fields(), ())
+
+    def test_deferred_fields_are_treated_as_changed(self):
+        """遅延読み込みされたフィールドは読み込まれると変更として扱われる"""
+        obj = TrackedContainer.objects.create(number=1, text='foo')
+        obj = TrackedContainer.objects.only('number').get(pk=obj.pk)
+        self.assertIs(obj.get_original_value('text'), DEFERRED)
+        obj.text = 'bar'
+        self.assertEqual(obj.changed_fields(), ('text',))
@@ -0,0 +1,121 @@
+from django.db.models.fields.files import FieldFile
+
+# 遅延読み込みされていたため元の値が記録されていないフィールドの値
+DEFERRED = object()
+
+
+class FieldTrackerMixin(object):
+    """
+    データベースから読み込まれた時点（もしくは最後に保存された時点）のフィールド
+    の値を記録し、クエリを発行せずに変更されたフィールドを取得するための
+    モデル Mixin
+
+    ``post_save`` シグナルは ``save()`` の内部で送出されるため、シグナル
+    レシーバ内では今回の保存で変更されたフィールドを取得できる
+
+    Usage:
+        >>> class Entry(FieldTrackerMixin, models.Model):
+        ...     tracked_fields = ('title', 'body')
+        >>> entry = Entry.objects.get(pk=1)
+        >>> entry.title = 'foo'
+        >>> entry.changed_fields()
+        ('title',)
+    """
+    # 追跡するフィールド名のタプル。None の場合は全ての concrete field
+    tracked_fields = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.capture_original_values()
+        return instance
+
+    def save(self, *args, **kwargs):
+        # 作成時の post_save 内で行われる処理（m2m の追加など）を判別できる
+        # よう保存中は作成か否かを記録しておく
+        self._tracking_adding = self._state.adding
+        self._tracking_saving = True
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            self._tracking_adding = False
+            self._tracking_saving = False
+        self.capture_original_values()
+
+    def _get_tracked_fields(self):
+        opts = self._meta
+        if self.tracked_fields is None:
+            return [f for f in opts.concrete_fields if not f.primary_key]
+        return [opts.get_field(name) for name in self.tracked_fields]
+
+    def _get_tracked_value(self, field):
+        value = getattr(self, field.attname)
+        if isinstance(value, FieldFile):
+            # FieldFile は保存時に変更されうるのでファイル名で比較する
+            value = value.name
+        return value
+
+    def capture_original_values(self):
+        """
+        現在の値を元の値として記録する。遅延読み込みされるフィールドは
+        記録しない
+        """
+        deferred = self.get_deferred_fields()
+        self._original_values = {
+            field.name: self._get_tracked_value(field)
+            for field in self._get_tracked_fields()
+            if field.attname not in deferred
+        }
+
+    def has_original_values(self):
+        """
+        元の値が記録されているか否か（データベースから読み込まれた、もしくは
+        一度保存されたインスタンスか否か）
+        """
+        return hasattr(self, '_original_values')
+
+    def is_adding(self):
+        """
+        新規作成のための ``save()`` の実行中か否か
+        """
+        return getattr(self, '_tracking_adding', False)
+
+    def is_saving(self):
+        """
+        ``save()`` の実行中（``post_save`` のシグナルレシーバ内など）か否か
+        """
+        return getattr(self, '_tracking_saving', False)
+
+    def get_original_value(self, name):
+        """
+        指定されたフィールドの元の値を返す。ForeignKey の場合は pk、
+        FileField の場合はファイル名が返される
+
+        読み込み時に遅延読み込みされていたフィールドは元の値が分からない
+        ため ``DEFERRED`` を返す（現在の値とは常に異なるものとして扱われる）
+        """
+        return self._original_values.get(name, DEFERRED)
+
+    def get_current_value(self, name):
+        return self._get_tracked_value(self._meta.get_field(name))
+
+    def changed_fields(self):
+        """
+        元の値から変更されたフィールド名のタプルを返す
+
+        元の値が記録されていないフィールドは読み込まれた（もしくは代入
+        された）時点で変更されたものとして扱う。遅延読み込みされたままの
+        フィールドは対象としない（クエリを発行しない）
+        """
+        if not self.has_original_values():
+            return ()
+        deferred = self.get_deferred_fields()
+        return tuple(
+            field.name for field in self._get_tracked_fields()
+            if field.attname not in deferred and
+            self.get_original_value(field.name) !=
+            self._get_tracked_value(field)
+        )
+
+    def has_changed(self, name):
+        return name in self.changed_fields()
@@ -0,0 +1,139 @@
+# coding=utf-8
+"""
+ThumbnailField の各サイズの URL をまとめて解決・キャッシュするユーティリティ
+
+ストレージによる URL の解決はサイズごと・描画ごとに行うと無視できないコストと
+なるため、ファイル（名）ごとに全サイズの URL を一度だけ解決し
+``{<size>: <url>}`` の辞書としてキャッシュする。キャッシュキーにファイル名を
+含めているため、ファイルが差し替えられた場合は自動的に再解決される
+"""
+import hashlib
+from django.core.cache import cache
+
+
+CACHE_KEY_PREFIX = 'kawaz.core.files.thumbnails'
+# キャッシュされる期間（秒）。ファイル名ごとのキーなので長めで問題ない
+CACHE_TIMEOUT = 60 * 60 * 24 * 7
+# 解決に失敗したサイズを含む場合のキャッシュされる期間（秒）
+# サムネイルの生成待ちなど一時的な失敗でデフォルトの URL が残り続けないよう
+# 短くする
+NEGATIVE_CACHE_TIMEOUT = 60 * 5
+
+
+def _get_instance_cache_name(field_name):
+    return '_{}_thumbnail_urls_cache'.format(field_name)
+
+
+def _get_cache_key(instance, field_name):
+    opts = instance._meta
+    name = getattr(instance, field_name).name
+    digest = hashlib.md5(name.encode('utf-8')).hexdigest()
+    return '{}:{}.{}:{}:{}'.format(CACHE_KEY_PREFIX,
+                                   opts.app_label, opts.model_name,
+                                   field_name, digest)
+
+
+def _resolve_thumbnail_urls(instance, field_name, sizes, default):
+    """
+    全サイズの URL を解決し ``(<urls>, <timeout>)`` を返す。解決に失敗した
+    サイズがある場合の timeout は NEGATIVE_CACHE_TIMEOUT となる
+    """
+    fieldfile = getattr(instance, field_name)
+    default = getattr(instance, default)
+    urls = {}
+    timeout = CACHE_TIMEOUT
+    for size in sizes:
+        try:
+            urls[size] = getattr(fieldfile, size).url
+        except Exception:
+            urls[size] = default(size)
+            timeout = NEGATIVE_CACHE_TIMEOUT
+    return urls, timeout
+
+
+def _get_memoized(instance, field_name):
+    """
+    インスタンスにメモ化された URL の辞書を返す（ファイルが変わっていたら None）
+    """
+    memo = getattr(instance, _get_instance_cache_name(field_name), None)
+    if memo and memo[0] == getattr(instance, field_name).name:
+        return memo[1]
+    return None
+
+
+def _memoize(instance, field_name, urls):
+    setattr(instance, _get_instance_cache_name(field_name),
+            (getattr(instance, field_name).name, urls))
+
+
+def get_thumbnail_urls(instance, field_name, sizes, default):
+    """
+    指定されたインスタンスの ThumbnailField の全サイズの URL を返す
+
+    ファイルが設定されていない場合や URL の解決に失敗したサイズには
+    ``instance.<default>(size)`` の値が使用される
+
+    Args:
+        instance (model instance): 対象モデルインスタンス
+        field_name (str): ThumbnailField のフィールド名
+        sizes (iterable): 解決するサイズ名のリスト
+        default (str): サイズ名を受け取りデフォルトの URL を返すメソッド名
+
+    Returns:
+        dict: ``{<size>: <url>}``
+    """
+    if not getattr(instance, field_name):
+        default = getattr(instance, default)
+        return {size: default(size) for size in sizes}
+    urls = _get_memoized(instance, field_name)
+    if urls is None:
+        key = _get_cache_key(instance, field_name)
+        urls = cache.get(key)
+        if urls is None:
+            urls, timeout = _resolve_thumbnail_urls(instance, field_name,
+                                                    sizes, default)
+            cache.set(key, urls, timeout)
+        _memoize(instance, field_name, urls)
+    return urls
+
+
+def prefetch_thumbnail_urls(instances, field_name, sizes, default):
+    """
+    複数のインスタンスの ThumbnailField の URL を一度のキャッシュ参照で解決し
+    各インスタンスにメモ化する
+
+    一覧ページなどで多数のインスタンスのアバター・アイコンを描画する前に
+    呼び出すことでインスタンスごとのキャッシュ参照を避けることができる
+
+    Args:
+        instances (iterable): 対象モデルインスタンスのリスト
+        field_name (str): ThumbnailField のフィールド名
+        sizes (iterable): 解決するサイズ名のリスト
+        default (str): サイズ名を受け取りデフォルトの URL を返すメソッド名
+
+    Returns:
+        list: 渡されたインスタンスのリスト
+    """
+    instances = list(instances)
+    pending = {}
+    for instance in instances:
+        if (getattr(instance, field_name) and
+                _get_memoized(instance, field_name) is None):
+            key = _get_cache_key(instance, field_name)
+            pending.setdefault(key, []).append(instance)
+    if not pending:
+        return instances
+    cached = cache.get_many(list(pending.keys()))
+    # {<timeout>: {<key>: <urls>}}
+    missing = {}
+    for key, targets in pending.items():
+        urls = cached.get(key)
+        if urls is None:
+            urls, timeout = _resolve_thumbnail_urls(targets[0], field_name,
+                                                    sizes, default)
+            missing.setdefault(timeout, {})[key] = urls
+        for instance in targets:
+            _memoize(instance, field_name, urls)
+    for timeout, values in missing.items():
+        cache.set_many(values, timeout)
+    return instances
@@ -0,0 +1,69 @@
+# coding=utf-8
+"""
+登録された QuerySet の実行計画を監査し、必要な複合インデックスを提案するコマンド
+"""
+
+from django.db import DEFAULT_DB_ALIAS
+from django.core.management.base import BaseCommand
+from kawaz.core.db import explain
+
+
+class Command(BaseCommand):
+    help = ("Command to execute EXPLAIN against the registered querysets "
+            "(see 'queryplans.py' of each app), report full table scans, "
+            "filesorts and temporary tables, and propose composite indexes.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*',
+                            help=("Only audit querysets whose name starts "
+                                  "with one of these (e.g. 'events.Event')."))
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help=("Nominates a database to audit. "
+                                  "Defaults to the '{}' database.").format(
+                                    DEFAULT_DB_ALIAS))
+        parser.add_argument('--fail-on-issues', action='store_true',
+                            dest='fail_on_issues', default=False,
+                            help=("Exit with status 1 when any issue is "
+                                  "found (useful for CI)."))
+
+    def handle(self, *args, **options):
+        verbosity = int(options.get('verbosity'))
+        explain.autodiscover()
+
+        suggestions = {}
+        nissues = 0
+        for report in explain.audit(options.get('names'),
+                                    using=options.get('database')):
+            if report.issues:
+                nissues += 1
+                self.stdout.write(self.style.WARNING(report.name))
+            elif verbosity > 0:
+                self.stdout.write(self.style.SUCCESS(report.name))
+            if verbosity > 1:
+                self.stdout.write("    SQL: {}".format(report.sql))
+                for row in report.plan:
+                    self.stdout.write("    PLAN: {}".format(row))
+            for issue, description in report.issues:
+                self.stdout.write("    [{}] {}".format(issue, description))
+            if report.suggestion:
+                self.stdout.write("    proposed index: {}.{} ({})".format(
+                    report.model._meta.app_label,
+                    report.model.__name__,
+                    ', '.join(report.suggestion)))
+                indexes = suggestions.setdefault(report.model, [])
+                if report.suggestion not in indexes:
+                    indexes.append(report.suggestion)
+
+        if suggestions and verbosity > 0:
+            # マイグレーションは書き出さない。Meta を変更せずにマイグレー
+            # ションのみ作成すると次の makemigrations で削除されてしまう
+            self.stdout.write("*" * 80 + "\n")
+            self.stdout.write("Apply the following changes to the Meta of "
+                              "each model and run 'makemigrations':\n")
+            for model, indexes in suggestions.items():
+                self.stdout.write(explain.format_meta_change(model, indexes))
+                self.stdout.write("")
+            self.stdout.write("*" * 80)
+
+        if nissues and options.get('fail_on_issues'):
+            raise SystemExit(1)
@@ -0,0 +1,64 @@
+# coding=utf-8
+"""
+Kawaz の起動（``django.setup()``）にかかる import 時間をモジュールごとに
+レポートするコマンド
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from kawaz.core.utils import importtime
+
+
+class Command(BaseCommand):
+    help = ("Command to report the import time of Django boot "
+            "('django.setup()') per package and module.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20,
+                            help="The number of entries to report.")
+        parser.add_argument('--modules', action='store_true',
+                            dest='modules', default=False,
+                            help=("Report cumulative time per module instead "
+                                  "of self time per top-level package."))
+        parser.add_argument('--budget', type=float, default=None,
+                            help=("Exit with status 1 when the total import "
+                                  "time exceeds this value in seconds or "
+                                  "lazily loaded integrations are imported "
+                                  "on boot. Defaults to "
+                                  "KAWAZ_IMPORTTIME_BUDGET."))
+
+    def handle(self, *args, **options):
+        try:
+            profile = importtime.profile()
+        except RuntimeError as e:
+            raise CommandError(e)
+        limit = options.get('limit')
+
+        if options.get('modules'):
+            records = sorted(profile.records,
+                             key=lambda r: r.cumulative, reverse=True)
+            self.stdout.write("{:>10}  {:>10}  module".format(
+                'cumulative', 'self'))
+            for record in records[:limit]:
+                self.stdout.write("{:>8.1f}ms  {:>8.1f}ms  {}".format(
+                    record.cumulative / 1000, record.self / 1000,
+                    record.name))
+        else:
+            self.stdout.write("{:>10}  {:>7}  package".format(
+                'self', 'modules'))
+            for package, usec, count in importtime.aggregate(
+                    profile.records)[:limit]:
+                self.stdout.write("{:>8.1f}ms  {:>7}  {}".format(
+                    usec / 1000, count, package))
+
+        elapsed = importtime.total(profile.records) / 1000000
+        budget = options.get('budget') or importtime.get_budget()
+        eager = importtime.find_eager_modules(profile.modules)
+        self.stdout.write("Total: {:.3f}s (budget: {:.3f}s)".format(
+            elapsed, budget))
+        for name in eager:
+            self.stdout.write(self.style.WARNING(
+                "'{}' is imported on boot but should be loaded on "
+                "first use".format(name)))
+
+        if options.get('budget') is not None and (elapsed > budget or eager):
+            raise CommandError("Import time budget is exceeded")
@@ -0,0 +1,34 @@
+# coding=utf-8
+"""
+開発用に SQLite のプライマリのデータベースをレプリカにコピーするコマンド
+"""
+
+import shutil
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from kawaz.core.db import routers
+
+SQLITE_ENGINE = 'django.db.backends.sqlite3'
+
+
+class Command(BaseCommand):
+    help = ("Command to copy the SQLite primary database to the SQLite "
+            "replicas listed in KAWAZ_DATABASE_REPLICAS so that the replica "
+            "routing can be checked locally.")
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES[routers.PRIMARY]
+        if primary['ENGINE'] != SQLITE_ENGINE:
+            raise CommandError("The primary database is not SQLite")
+        replicas = routers.get_replicas()
+        if not replicas:
+            raise CommandError("KAWAZ_DATABASE_REPLICAS is empty")
+        for alias in replicas:
+            replica = settings.DATABASES[alias]
+            if replica['ENGINE'] != SQLITE_ENGINE:
+                raise CommandError(
+                    "The replica '{}' is not SQLite".format(alias))
+            shutil.copyfile(primary['NAME'], replica['NAME'])
+            self.stdout.write("'{}' is copied to '{}'".format(
+                primary['NAME'], replica['NAME']))
+        routers.health.reset()
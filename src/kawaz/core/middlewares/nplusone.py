@@ -0,0 +1,31 @@
+# coding=utf-8
+"""
+リクエストごとに N+1 クエリを検出するミドルウェア
+"""
+from django.core.exceptions import MiddlewareNotUsed
+from kawaz.core.db import nplusone
+
+
+class NPlusOneDetectionMiddleware(object):
+    """
+    リクエスト中に同じ形のクエリが繰り返し発行された場合に警告する
+    （テスト中は NPlusOneError を送出する）ミドルウェア
+
+    ``KAWAZ_NPLUSONE_DETECTION`` （デフォルト: DEBUG）が False の場合は
+    無効化される
+    """
+    def __init__(self):
+        if not nplusone.is_enabled():
+            raise MiddlewareNotUsed
+
+    def process_request(self, request):
+        # テストの detect() などで既に記録中の場合はそちらに任せる
+        if nplusone.get_recorder() is None:
+            request._nplusone_recorder = nplusone.start()
+
+    def process_response(self, request, response):
+        recorder = getattr(request, '_nplusone_recorder', None)
+        if recorder is not None and nplusone.get_recorder() is recorder:
+            nplusone.stop()
+            nplusone.report(recorder, label=request.path)
+        return response
@@ -0,0 +1,77 @@
+# coding=utf-8
+"""
+リクエストをサンプリングプロファイラでプロファイルするミドルウェア
+"""
+import random
+from django.http import HttpResponse
+from django.core.urlresolvers import reverse
+from kawaz.core.db import routers
+from kawaz.core.utils.models import ProfileReport
+from kawaz.core.utils.profiling import Sampler, get_sample_rate
+
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'HTTP_X_KAWAZ_PROFILE'
+REPORT_HEADER = 'X-Kawaz-Profile-Report'
+COLLAPSED = 'collapsed'
+
+
+class SamplingProfilerMiddleware(object):
+    """
+    以下のリクエストをサンプリングプロファイラでプロファイルするミドルウェア
+
+    -   スタッフによる ``?_profile`` もしくは ``X-Kawaz-Profile`` ヘッダ付きの
+        リクエスト。値が ``collapsed`` の場合はレスポンスの代わりに
+        collapsed stacks を返し、それ以外の場合はレポートを保存して管理画面
+        の URL を ``X-Kawaz-Profile-Report`` ヘッダで返す
+    -   ``KAWAZ_PROFILING_SAMPLE_RATE`` リクエストに一度の割合でランダムに
+        選ばれたリクエスト。レポートは最新の
+        ``KAWAZ_PROFILING_BUFFER_SIZE`` 件のみ保存される
+
+    リクエストしたユーザーを判定するため AuthenticationMiddleware の後に
+    定義する必要がある
+    """
+    def get_requested_mode(self, request):
+        """
+        スタッフによりプロファイルが要求されている場合はそのモードを返す
+        """
+        if PROFILE_PARAM in request.GET:
+            mode = request.GET[PROFILE_PARAM]
+        elif PROFILE_HEADER in request.META:
+            mode = request.META[PROFILE_HEADER]
+        else:
+            return None
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_staff:
+            return None
+        return mode
+
+    def is_sampled(self):
+        rate = get_sample_rate()
+        return rate > 0 and random.randrange(rate) == 0
+
+    def process_request(self, request):
+        mode = self.get_requested_mode(request)
+        sampled = mode is None and self.is_sampled()
+        if mode is None and not sampled:
+            return
+        sampler = Sampler()
+        sampler.start()
+        request._kawaz_profile = (sampler, mode, sampled)
+
+    def process_response(self, request, response):
+        profile = getattr(request, '_kawaz_profile', None)
+        if profile is None:
+            return response
+        sampler, mode, sampled = profile
+        sampler.stop()
+        if mode == COLLAPSED:
+            return HttpResponse(sampler.collapsed,
+                                content_type='text/plain; charset=utf-8')
+        # レポートの保存によりユーザーがプライマリに固定されないようにする
+        written = routers.state.written
+        report = ProfileReport.objects.store(sampler, request, sampled)
+        routers.state.written = written
+        if mode is not None:
+            response[REPORT_HEADER] = reverse(
+                'admin:utils_profilereport_change', args=(report.pk,))
+        return response
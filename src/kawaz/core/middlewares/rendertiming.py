@@ -0,0 +1,74 @@
+# coding=utf-8
+"""
+一部のリクエストのテンプレート・テンプレートタグの描画時間を計測する
+ミドルウェア
+"""
+import random
+import logging
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from kawaz.core.utils import rendertiming
+
+SERVER_TIMING_HEADER = 'Server-Timing'
+# Server-Timing ヘッダに含める最大の件数
+SERVER_TIMING_LIMIT = 10
+
+logger = logging.getLogger(__name__)
+
+
+class RenderTimingMiddleware(object):
+    """
+    ``KAWAZ_RENDER_TIMING_SAMPLE_RATE`` リクエストに一度の割合でテンプレート
+    の描画時間を計測し、ビューごとに ``rendertiming.metrics`` に記録する。
+    記録された値は ``KAWAZ_RENDER_TIMING_FLUSH_INTERVAL`` 秒ごとにロガーに
+    書き出される
+
+    DEBUG 時もしくはスタッフのリクエストの場合は排他時間の長いものを
+    ``Server-Timing`` ヘッダで返すため、ブラウザの開発者ツールで確認できる
+    """
+    def __init__(self):
+        if rendertiming.get_sample_rate() <= 0:
+            raise MiddlewareNotUsed
+        rendertiming.install()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if random.randrange(rendertiming.get_sample_rate()) != 0:
+            return
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.view_name:
+            view = match.view_name
+        else:
+            view = '{}.{}'.format(view_func.__module__,
+                                  getattr(view_func, '__name__', ''))
+        request._render_timing = (view, rendertiming.start())
+
+    def process_response(self, request, response):
+        timing = getattr(request, '_render_timing', None)
+        if timing is None:
+            return response
+        view, collector = timing
+        if rendertiming.get_collector() is collector:
+            rendertiming.stop()
+        rendertiming.metrics.record(view, collector)
+        interval = rendertiming.get_flush_interval()
+        if interval > 0:
+            rendertiming.metrics.flush(interval,
+                                       rendertiming.get_flush_limit())
+        stats = collector.get_stats()
+        logger.debug('Render timing of %s: %s', view, stats)
+        user = getattr(request, 'user', None)
+        if settings.DEBUG or (user is not None and user.is_staff):
+            response[SERVER_TIMING_HEADER] = format_server_timing(stats)
+        return response
+
+
+def format_server_timing(stats, limit=SERVER_TIMING_LIMIT):
+    """
+    集計結果を排他時間（ミリ秒）の ``Server-Timing`` ヘッダの値にする
+    """
+    metrics = []
+    for i, (name, values) in enumerate(stats[:limit]):
+        metrics.append('r{};dur={:.1f};desc="{} ({} calls, {} queries)"'.format(
+            i, values['exclusive'] * 1000, name.replace('"', "'"),
+            values['calls'], values['exclusive_queries']))
+    return ', '.join(metrics)
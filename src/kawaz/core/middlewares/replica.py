@@ -0,0 +1,36 @@
+# coding=utf-8
+"""
+リクエストに応じてデータベースの読み込みをレプリカに振り分けるミドルウェア
+"""
+from django.core.exceptions import MiddlewareNotUsed
+from kawaz.core.db import routers
+
+# 書き込みを行ったユーザーをプライマリに固定するための Cookie
+PIN_COOKIE_NAME = 'kawaz_db_pinned'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware(object):
+    """
+    GET/HEAD リクエスト中の読み込みをレプリカに振り分け、書き込みを行った
+    ユーザーを一定時間プライマリに固定するミドルウェア
+
+    固定は Cookie で行うためセッションの読み込みもプライマリから行われる
+    """
+    def __init__(self):
+        if not routers.get_replicas():
+            # レプリカが設定されていない場合は無効化
+            raise MiddlewareNotUsed
+
+    def process_request(self, request):
+        routers.state.reset()
+        routers.state.pinned = PIN_COOKIE_NAME in request.COOKIES
+        routers.state.replica_allowed = request.method in SAFE_METHODS
+
+    def process_response(self, request, response):
+        if routers.state.written or request.method not in SAFE_METHODS:
+            response.set_cookie(PIN_COOKIE_NAME, '1',
+                                max_age=routers.get_sticky_timeout(),
+                                httponly=True)
+        routers.state.reset()
+        return response
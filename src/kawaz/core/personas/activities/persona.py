@@ -33,6 +33,12 @@ class PersonaActivityMediator(PersonaActivityMediatorBase):
         の更新は一切通知されない仕様にする
     """
 
+    def get_recipients(self, activity):
+        # プロフィールへのコメントのみ本人の受信箱に配信する
+        if activity.status == 'comment_added':
+            return (activity.object_id,)
+        return ()
+
     def alter(self, instance, activity, **kwargs):
         if activity.status in ('created', 'updated', 'deleted'):
             # 作成、更新、削除イベントは通知しない
@@ -2,6 +2,14 @@ from rest_framework import serializers
 from ..models import Persona
 
 
+class PersonaListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # アバターURLを一度のキャッシュ参照でまとめて解決する
+        if hasattr(data, 'all'):
+            data = data.all()
+        return super().to_representation(Persona.prefetch_avatars(data))
+
+
 class PersonaSerializer(serializers.ModelSerializer):
     role = serializers.CharField(read_only=True)
     small_avatar = serializers.CharField(source='get_small_avatar', read_only=True)
@@ -11,6 +19,7 @@ class PersonaSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Persona
+        list_serializer_class = PersonaListSerializer
         fields = (
             'id', 'nickname', 'quotes',
             'small_avatar', 'middle_avatar', 'large_avatar', 'huge_avatar',
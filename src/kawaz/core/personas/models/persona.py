@@ -15,11 +15,16 @@ from django.core.exceptions import ValidationError
 from thumbnailfield.fields import ThumbnailField
 
 from kawaz.core.db.decorators import validate_on_save
+from kawaz.core.db.tracking import FieldTrackerMixin
+from kawaz.core.files.thumbnails import get_thumbnail_urls
+from kawaz.core.files.thumbnails import prefetch_thumbnail_urls
 
 
 # kawaz.core.personas
 # 使用可能なユーザー名の正規表現
 VALID_USERNAME_PATTERN = re.compile(r"^[A-Za-z0-9\-\_]+$")
+# アバターとして解決するサイズ
+AVATAR_SIZES = tuple(settings.THUMBNAIL_SIZE_PATTERNS.keys())
 # 使用不可なユーザー名（URLルールなどにより）
 INVALID_USERNAMES = (
     'my',
@@ -101,7 +106,7 @@ class PersonaBase(ModelBase):
 
 
 @validate_on_save
-class Persona(AbstractUser, metaclass=PersonaBase):
+class Persona(FieldTrackerMixin, AbstractUser, metaclass=PersonaBase):
     """
     Kawazで利用する認証用カスタムユーザーモデル
 
@@ -109,6 +114,9 @@ class Persona(AbstractUser, metaclass=PersonaBase):
     `is_superuser`の値をDB上に保持しない。代わりにこれらの値は`role`の値から
     自動的に決定され、プロパティとして提供される
     """
+    # メンションの展開に利用されるフィールド
+    tracked_fields = ('username', 'nickname', 'avatar')
+
     def _get_upload_path(self, filename):
         root = os.path.join('personas', 'avatars', self.username)
         return os.path.join(root, filename)
@@ -174,17 +182,30 @@ class Persona(AbstractUser, metaclass=PersonaBase):
         filename = 'persona_avatar_{}.png'.format(size)
         return os.path.join('/statics', 'img', 'defaults', filename)
 
+    def get_avatar_urls(self):
+        """
+        全サイズのアバターURLを ``{<size>: <url>}`` の辞書で返します
+        URLはアバターごとに一度だけ解決されキャッシュされます
+        """
+        return get_thumbnail_urls(self, 'avatar', AVATAR_SIZES,
+                                  'get_default_avatar')
+
     def get_avatar(self, size):
         """
         渡したサイズのアバターURLを返します
         未設定の場合や、見つからない場合はデフォルトアバターを返します
         """
-        if self.avatar:
-            try:
-                return getattr(self.avatar, size).url
-            except:
-                return self.get_default_avatar(size)
-        return self.get_default_avatar(size)
+        url = self.get_avatar_urls().get(size)
+        return url or self.get_default_avatar(size)
+
+    @staticmethod
+    def prefetch_avatars(personas):
+        """
+        渡したユーザー全員のアバターURLを一度のキャッシュ参照で解決します
+        一覧ページなどで描画前に呼び出してください
+        """
+        return prefetch_thumbnail_urls(personas, 'avatar', AVATAR_SIZES,
+                                       'get_default_avatar')
 
     get_small_avatar = lambda self: self.get_avatar('small')
     get_middle_avatar = lambda self: self.get_avatar('middle')
@@ -233,13 +254,48 @@ from ..activities.persona import PersonaActivityMediator
 from activities.registry import registry
 registry.register(Persona, PersonaActivityMediator())
 
+from django.db.models.signals import post_save
+from django.db.models.signals import post_delete
 from django.dispatch import receiver
-from slack_invitation.slack import SlackInvitationClient, SlackInvitationException
+
+
+@receiver(post_save, sender=Persona)
+def resolve_avatar_urls(**kwargs):
+    """
+    アバターのアップロード時に全サイズのURLを予め解決しておくシグナル処理
+    """
+    instance = kwargs.get('instance')
+    if not kwargs.get('raw', False) and instance.avatar:
+        instance.get_avatar_urls()
+
+
+@receiver(post_save, sender=Persona)
+@receiver(post_delete, sender=Persona)
+def invalidate_mention_cache(**kwargs):
+    """
+    メンションの展開に利用されるフィールドが変更された場合にキャッシュされた
+    メンションを破棄するシグナル処理
+    """
+    from kawaz.apps.kfm.extras.mention import invalidate_mentions
+    instance = kwargs.get('instance')
+    usernames = {instance.username}
+    if (kwargs.get('signal') == post_save and not kwargs.get('created') and
+            instance.has_original_values()):
+        if not instance.changed_fields():
+            return
+        if instance.has_changed('username'):
+            usernames.add(instance.get_original_value('username'))
+    invalidate_mentions(*usernames)
+
+
 from registration.signals import user_accepted
 
 
 @receiver(user_accepted)
 def invite_to_slack(user, profile, request, **kwargs):
+    # ユーザーの承認時にしか使われないので初回の呼び出し時に読み込む
+    from slack_invitation.slack import (SlackInvitationClient,
+                                        SlackInvitationException)
     try:
         team = getattr(settings, 'DJANGO_SLACK_INVITATION_TEAM', None)
         token = getattr(settings, 'DJANGO_SLACK_INVITATION_TOKEN', None)
@@ -1,4 +1,4 @@
-from unittest.mock import patch
+from unittest.mock import patch, PropertyMock
 from django.test import TestCase, override_settings
 from django.core.exceptions import ValidationError
 from registration.backends.default import DefaultRegistrationBackend
@@ -126,3 +126,56 @@ class PersonaModelTestCase(TestCase):
             backend.accept(profile, request=request)
 
             invite.assert_called_with('bob@example.com')
+
+
+class PersonaAvatarTestCase(TestCase):
+    def test_get_avatar_returns_default_avatar(self):
+        """
+        アバター未設定の場合はデフォルトアバターが返る
+        """
+        user = PersonaFactory()
+        self.assertEqual(user.get_small_avatar(),
+                         '/statics/img/defaults/persona_avatar_small.png')
+        self.assertEqual(user.get_avatar_urls()['huge'],
+                         '/statics/img/defaults/persona_avatar_huge.png')
+
+    def test_get_avatar_urls_resolves_once(self):
+        """
+        アバターURLは一度だけ解決されインスタンスにメモ化される
+        """
+        user = PersonaFactory(avatar='personas/avatars/kawaztan.png')
+        urls = user.get_avatar_urls()
+        with patch('kawaz.core.files.thumbnails.cache') as cache:
+            self.assertEqual(user.get_avatar_urls(), urls)
+            self.assertFalse(cache.get.called)
+        self.assertEqual(user.get_small_avatar(), urls['small'])
+
+    def test_get_avatar_urls_failure_cached_shortly(self):
+        """
+        解決に失敗したサイズを含むアバターURLは短い期間だけキャッシュされる
+        """
+        from kawaz.core.files import thumbnails
+        user = PersonaFactory(avatar='personas/avatars/kawaztan.png')
+        user = Persona.objects.get(pk=user.pk)
+        with patch('kawaz.core.files.thumbnails.cache') as cache, \
+                patch.object(type(user.avatar), 'small', create=True,
+                             new_callable=PropertyMock,
+                             side_effect=IOError):
+            cache.get.return_value = None
+            urls = user.get_avatar_urls()
+        self.assertEqual(urls['small'], user.get_default_avatar('small'))
+        self.assertEqual(cache.set.call_args[0][2],
+                         thumbnails.NEGATIVE_CACHE_TIMEOUT)
+
+    def test_prefetch_avatars(self):
+        """
+        prefetch_avatars で複数ユーザーのアバターURLがまとめて解決される
+        """
+        users = [PersonaFactory(avatar='personas/avatars/{}.png'.format(i))
+                 for i in range(3)]
+        users = list(Persona.objects.filter(pk__in=[u.pk for u in users]))
+        Persona.prefetch_avatars(users)
+        with patch('kawaz.core.files.thumbnails.cache') as cache:
+            for user in users:
+                self.assertTrue(user.get_middle_avatar())
+            self.assertFalse(cache.get.called)
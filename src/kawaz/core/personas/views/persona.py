@@ -8,12 +8,14 @@ from django.views.generic.list import ListView
 from django.views.generic.detail import DetailView
 from django.views.generic.edit import UpdateView
 from django.shortcuts import get_object_or_404
+from django.db.models.functions import Coalesce
 from django_filters.views import FilterView
 from permission.decorators import permission_required
 from ..forms import PersonaUpdateForm
 from ..models import Persona
 from ..models import Service
 from ..filters import PersonaFilter
+from kawaz.core.views.pagination import KeysetPaginationMixin
 
 
 class PersonaDetailView(DetailView):
@@ -46,11 +48,14 @@ class PersonaDetailView(DetailView):
         return context
 
 
-class PersonaListView(FilterView):
+class PersonaListView(KeysetPaginationMixin, FilterView):
     model = Persona
     filterset_class = PersonaFilter
     template_name_suffix = '_list'
     paginate_by = 24
+    # 一度もログインしていないユーザーの last_login は NULL のため、キー
+    # セットのページネーションでは登録日時で補完した値を用いる
+    keyset_ordering = ('-last_seen', '-pk')
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -62,12 +67,17 @@ class PersonaListView(FilterView):
             '_profile__skills',
             '_profile__accounts__service',
         )
-        qs = qs.order_by('-last_login')
+        qs = qs.annotate(last_seen=Coalesce('last_login', 'date_joined'))
+        qs = qs.order_by('-last_seen', '-pk')
         return qs
 
     def get_context_data(self, **kwargs):
         data = super().get_context_data(**kwargs)
         data['all_services'] = Service.objects.all()
+        # 表示するページのユーザーのアバターURLをまとめて解決しておく
+        # QuerySet が評価されキャッシュされたインスタンスにメモ化されるため
+        # テンプレートでの描画時には URL の解決が行われない
+        Persona.prefetch_avatars(data['object_list'])
         return data
 
 
@@ -103,3 +103,4 @@ class ProfileUpdateView(SuccessMessageMixin, UpdateView):
 class ProfilePreviewView(SingleObjectPreviewViewMixin, DetailView):
     model = Profile
     template_name = "personas/profile_preview.html"
+    kfm_fields = ('remarks',)
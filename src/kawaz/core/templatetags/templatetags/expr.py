@@ -6,20 +6,41 @@ from django.utils.translation import ugettext_lazy
 register = template.Library()
 
 
+class ContextNamespace(dict):
+    """
+    式を評価する際のグローバル名前空間
+
+    コンテキストの全ての階層を事前にコピーする代わりに、式内で参照された
+    名前のみをその都度コンテキストから解決する（見つからない場合は組み込み
+    関数として扱われる）
+    """
+    def __init__(self, context):
+        super().__init__()
+        self.context = context
+
+    def __missing__(self, key):
+        try:
+            return self.context[key]
+        except KeyError:
+            if key == '_':
+                return ugettext_lazy
+            raise
+
+
 class ExprNode(template.Node):
     def __init__(self, expression, variable=None):
         self.expression = expression
         self.variable = variable
+        # 式は描画ごとではなくパース時に一度だけコンパイルする
+        self.code = compile(expression, '<expr>', 'eval')
 
     def render(self, context):
-        d = {'_': ugettext_lazy}
-        for x in iter(context):
-            d.update(x)
+        value = eval(self.code, ContextNamespace(context))
         if self.variable:
-            context[self.variable] = eval(self.expression, d)
+            context[self.variable] = value
             return ''
         else:
-            return str(eval(self.expression, d))
+            return str(value)
 
 
 expr_r = re.compile(r'(.*?)\s+as\s+(\w+)', re.DOTALL)
@@ -50,4 +71,9 @@ def do_expr(parser, token):
         expression, variable = m.groups()
     else:
         expression, variable = bits[1], None
-    return ExprNode(expression, variable)
+    try:
+        return ExprNode(expression, variable)
+    except SyntaxError as e:
+        raise template.TemplateSyntaxError(
+            "%r tag has invalid expression: %s" % (bits[0], e)
+        )
@@ -16,25 +16,38 @@ def do_shortenurl(parser, token):
     """
     ブロックで囲まれたテキストに含まれるURLを短縮するテンプレートタグ
 
+    描画結果は通知として外部サービスへ送信され後から差し替えられないため、
+    未解決の URL はその場で短縮する（デフォルトのバックエンドはネットワーク
+    を用いない）。``async`` を指定した場合、外部 API を用いるバックエンドでは
+    未解決の URL をバックグラウンドで短縮し、今回は元の URL のまま描画する
+
     Usage:
         {% shortenurl %}
         Kawazポータルです http://www.kawaz.org/
         {% endshortenurl %}
+
+        {% shortenurl async %}...{% endshortenurl %}
     """
-    ENDMARKER = "end" + token.split_contents()[0]
-    nodelist = parser.parse(ENDMARKER)
+    bits = token.split_contents()
+    if len(bits) > 2 or (len(bits) == 2 and bits[1] != 'async'):
+        raise template.TemplateSyntaxError(
+            "'{}' tag only accepts 'async' argument".format(bits[0]))
+    ENDMARKER = "end" + bits[0]
+    nodelist = parser.parse((ENDMARKER,))
     parser.delete_first_token()
-    return ShortenURLNode(nodelist)
+    return ShortenURLNode(nodelist, asynchronous=len(bits) == 2)
 
 
 class ShortenURLNode(template.Node):
-    def __init__(self, nodelist):
+    def __init__(self, nodelist, asynchronous=False):
         self.nodelist = nodelist
+        self.asynchronous = asynchronous
 
     def render(self, context):
+        from kawaz.core.utils.shortenurl import resolve
         value = self.nodelist.render(context)
-        def repl(m):
-            from kawaz.core.utils.shortenurl import shorten
-            return shorten(m.group())
-        replaced_value = PATTERN.sub(repl, value)
+        # ブロック内の全てのURLをまとめて解決する
+        resolved = resolve(PATTERN.findall(value),
+                           asynchronous=self.asynchronous)
+        replaced_value = PATTERN.sub(lambda m: resolved[m.group()], value)
         return mark_safe(replaced_value)
@@ -48,3 +48,27 @@ class ExprTemplateTagTestCase(TestCase):
         self.assertTrue('result' in c)
         self.assertEqual(c['result'], 11)
 
+    def test_expr_compiled_at_parse_time(self):
+        """
+        式はパース時にコンパイルされ、不正な式は TemplateSyntaxError となる
+        """
+        from django.template import TemplateSyntaxError
+        self.assertRaises(TemplateSyntaxError, Template,
+                          """{% load expr %}"""
+                          """{% expr 1 + %}""")
+
+    def test_expr_resolve_names_lazily(self):
+        """
+        式内の名前はコンテキストの上位の階層から解決され、組み込み関数や
+        ループ内の変数も利用可能
+        """
+        t = Template(
+            """{% load expr %}"""
+            """{% for x in items %}"""
+            """{% expr x * factor + len(items) %},"""
+            """{% endfor %}"""
+            """{% expr sum(i * factor for i in items) %}"""
+        )
+        c = Context({'items': [1, 2], 'factor': 10, 'x': 100})
+        render = t.render(c)
+        self.assertEqual(render, '12,22,30')
@@ -67,3 +67,14 @@ class KawazDiscoverRunner(MediaRootTestSuiteRunner):
         # に引っかかる可能性が高いためOAuthのポスト部分を無効化する
         #
         settings.ACTIVITIES_ENABLE_OAUTH_NOTIFICATION = False
+        #
+        # バックグラウンドのスレッドはテストのトランザクション外で動作するため
+        # テスト中はURLの短縮を同期的に行う
+        #
+        settings.KAWAZ_URL_SHORTENER_ASYNC = False
+        #
+        # N+1 クエリを含むリクエストはテストの失敗とし、本番環境に持ち込まれる
+        # 前に検出する
+        #
+        settings.KAWAZ_NPLUSONE_DETECTION = True
+        settings.KAWAZ_NPLUSONE_RAISE = True
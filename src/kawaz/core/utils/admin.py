@@ -0,0 +1,55 @@
+from django.conf.urls import url
+from django.contrib import admin
+from django.core.urlresolvers import reverse
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.html import format_html, format_html_join
+from django.utils.translation import ugettext_lazy as _
+from .models import ProfileReport
+
+
+class ProfileReportAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'duration', 'samples',
+                    'user', 'sampled')
+    list_filter = ('sampled', 'method')
+    search_fields = ('path',)
+    readonly_fields = ('method', 'path', 'user', 'duration', 'samples',
+                       'sampled', 'created_at', 'get_top_frames',
+                       'get_collapsed_link')
+    exclude = ('collapsed',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        urls = [
+            url(r'^(?P<pk>\d+)/collapsed/$',
+                self.admin_site.admin_view(self.collapsed_view),
+                name='utils_profilereport_collapsed'),
+        ]
+        return urls + super().get_urls()
+
+    def collapsed_view(self, request, pk):
+        """
+        collapsed stacks をダウンロードする（FlameGraph などで表示する）
+        """
+        report = get_object_or_404(ProfileReport, pk=pk)
+        response = HttpResponse(report.collapsed,
+                                content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = (
+            'attachment; filename="profile-{}.txt"'.format(report.pk))
+        return response
+
+    def get_top_frames(self, obj):
+        return format_html('<table>{}</table>', format_html_join(
+            '', '<tr><td>{}</td><td>{}</td></tr>',
+            ((count, frame) for frame, count in obj.get_top_frames())))
+    get_top_frames.short_description = _('Top frames')
+
+    def get_collapsed_link(self, obj):
+        url = reverse('admin:utils_profilereport_collapsed', args=(obj.pk,))
+        return format_html('<a href="{}">{}</a>', url,
+                           _('Download collapsed stacks'))
+    get_collapsed_link.short_description = _('Collapsed stacks')
+
+admin.site.register(ProfileReport, ProfileReportAdmin)
@@ -0,0 +1,130 @@
+# coding=utf-8
+"""
+Django の起動（``django.setup()``）にかかる import 時間の計測
+
+``importtimer`` （``sys.meta_path`` のファインダー）を用いて別プロセスで
+Kawaz を起動し、モジュールごとの import 時間と起動後に読み込まれている
+モジュールを取得する。起動時間のレポート（``manage.py kawaz_importtime``）と
+起動時間の予算テストで利用する
+
+Settings:
+    KAWAZ_IMPORTTIME_BUDGET (float): 起動時の import 時間の予算（秒）
+"""
+import os
+import re
+import sys
+import json
+import subprocess
+from collections import namedtuple
+from django.conf import settings
+
+DEFAULT_BUDGET = 5.0
+
+# 起動時には読み込まれるべきではない重い連携用のライブラリ
+# 初回の利用時に読み込まれる
+LAZY_MODULES = (
+    'apiclient',
+    'googleapiclient',
+    'oauth2client',
+    'httplib2',
+    'bs4',
+    'lxml',
+    'requests_oauthlib',
+    'icalendar',
+    'markdown2',
+    'slack_invitation',
+)
+
+# 計測用のスクリプト。Kawaz を読み込まずに実行できるようパスで指定する
+BOOT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'importtimer.py')
+
+PATTERN = re.compile(
+    r'^import time:\s+(?P<self>\d+)\s+\|\s+(?P<cumulative>\d+)\s+\|'
+    r'(?P<indent>\s+)(?P<name>\S+)\s*$'
+)
+
+# self/cumulative はマイクロ秒
+ImportRecord = namedtuple('ImportRecord', ('name', 'self', 'cumulative',
+                                           'depth'))
+BootProfile = namedtuple('BootProfile', ('records', 'modules'))
+
+
+def get_budget():
+    return getattr(settings, 'KAWAZ_IMPORTTIME_BUDGET', DEFAULT_BUDGET)
+
+
+def parse(output):
+    """
+    ``-X importtime`` 形式の出力をパースし ImportRecord のリストを返す
+    """
+    records = []
+    for line in output.splitlines():
+        m = PATTERN.match(line)
+        if m is None:
+            continue
+        records.append(ImportRecord(
+            name=m.group('name'),
+            self=int(m.group('self')),
+            cumulative=int(m.group('cumulative')),
+            # 出力はネストごとに2文字ずつインデントされる
+            depth=(len(m.group('indent')) - 1) // 2,
+        ))
+    return records
+
+
+def profile(settings_module=None):
+    """
+    別プロセスで ``django.setup()`` を実行し BootProfile を返す
+
+    Raises:
+        RuntimeError: 起動に失敗した場合
+    """
+    env = dict(os.environ)
+    env['DJANGO_SETTINGS_MODULE'] = (settings_module or
+                                     env.get('DJANGO_SETTINGS_MODULE') or
+                                     settings.SETTINGS_MODULE)
+    env['PYTHONPATH'] = os.pathsep.join(p for p in sys.path if p)
+    process = subprocess.run(
+        [sys.executable, BOOT_SCRIPT],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env,
+        universal_newlines=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError("Failed to boot Django:\n{}".format(
+            process.stderr))
+    return BootProfile(records=parse(process.stderr),
+                       modules=json.loads(process.stdout))
+
+
+def total(records):
+    """
+    トップレベルの import の累積時間の合計（マイクロ秒）を返す
+    """
+    return sum(r.cumulative for r in records if r.depth == 0)
+
+
+def aggregate(records):
+    """
+    トップレベルのパッケージごとに self の時間を合計する
+
+    Returns:
+        list: ``(<package>, <microseconds>, <number of modules>)`` のリスト
+            （時間の降順）
+    """
+    packages = {}
+    for record in records:
+        package = record.name.split('.')[0]
+        usec, count = packages.get(package, (0, 0))
+        packages[package] = (usec + record.self, count + 1)
+    return sorted(((package, usec, count)
+                   for package, (usec, count) in packages.items()),
+                  key=lambda x: x[1], reverse=True)
+
+
+def find_eager_modules(modules, lazy_modules=LAZY_MODULES):
+    """
+    起動時に読み込まれた遅延読み込みされるべきモジュールを返す
+    """
+    loaded = set(m.split('.')[0] for m in modules)
+    return [m for m in lazy_modules if m in loaded]
@@ -0,0 +1,115 @@
+# coding=utf-8
+"""
+モジュールごとの import 時間を計測する ``sys.meta_path`` のファインダー
+
+``python -X importtime`` は Python 3.7 以降でしか利用できないため、
+``sys.meta_path`` の先頭にファインダーを挿入し、他のファインダーが返した
+ローダーの ``exec_module`` の時間を計測する。計測結果は ``-X importtime``
+と同じ形式で出力するため ``kawaz.core.utils.importtime.parse`` で読める
+
+計測結果が Kawaz 自身の import に影響されないよう標準ライブラリのみを
+利用し、``kawaz.core.utils.importtime`` から別プロセスのスクリプトとして
+実行される::
+
+    $ python importtimer.py
+
+Django を起動（``django.setup()``）し、計測結果を標準エラー出力へ、起動後に
+読み込まれているモジュールを JSON で標準出力へ書き出す
+"""
+import sys
+import time
+
+
+class TimedLoader(object):
+    """
+    ``exec_module`` の時間を ImportTimer に記録するローダーのプロキシ
+    """
+    def __init__(self, loader, timer, name):
+        self._loader = loader
+        self._timer = timer
+        self._name = name
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        # モジュールからはプロキシではなく元のローダーが見えるようにする
+        module.__loader__ = self._loader
+        if getattr(module, '__spec__', None) is not None:
+            module.__spec__.loader = self._loader
+        self._timer.enter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timer.exit(self._name)
+
+
+class ImportTimer(object):
+    """
+    他のファインダーが返したローダーを TimedLoader で包むファインダー
+
+    Args:
+        stream (file): 計測結果の出力先（デフォルト: 標準エラー出力）
+    """
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+        # [<start>, <children time>]
+        self._stack = []
+
+    def find_spec(self, fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self:
+                continue
+            find_spec = getattr(finder, 'find_spec', None)
+            if find_spec is None:
+                continue
+            spec = find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = TimedLoader(spec.loader, self, fullname)
+        return spec
+
+    def enter(self):
+        self._stack.append([time.perf_counter(), 0.0])
+
+    def exit(self, name):
+        start, children = self._stack.pop()
+        cumulative = time.perf_counter() - start
+        if self._stack:
+            self._stack[-1][1] += cumulative
+        # -X importtime と同じくマイクロ秒でネストごとに2文字ずつ字下げする
+        self.stream.write('import time: {:9d} | {:10d} | {}{}\n'.format(
+            int((cumulative - children) * 1000000),
+            int(cumulative * 1000000),
+            '  ' * len(self._stack), name))
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        sys.meta_path.remove(self)
+
+
+def main():
+    import os
+    import json
+    # スクリプトのディレクトリが sys.path に加わり他のモジュールを隠さない
+    # ようにする
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path[:] = [p for p in sys.path if os.path.abspath(p or '.') != here]
+    timer = ImportTimer()
+    timer.install()
+    import django
+    django.setup()
+    timer.uninstall()
+    sys.stdout.write(json.dumps(sorted(sys.modules.keys())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShortenedURL',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.TextField(verbose_name='URL')),
+                ('url_hash', models.CharField(editable=False, max_length=32, unique=True)),
+                ('short_url', models.CharField(blank=True, default='', max_length=255, verbose_name='Shortened URL')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+            ],
+            options={
+                'verbose_name': 'Shortened URL',
+                'verbose_name_plural': 'Shortened URLs',
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('utils', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileReport',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(max_length=10, verbose_name='Method')),
+                ('path', models.CharField(max_length=255, verbose_name='Path')),
+                ('duration', models.FloatField(verbose_name='Duration (ms)')),
+                ('samples', models.PositiveIntegerField(verbose_name='Samples')),
+                ('collapsed', models.TextField(blank=True, verbose_name='Collapsed stacks')),
+                ('sampled', models.BooleanField(default=False, verbose_name='Sampled')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'ordering': ('-created_at',),
+                'verbose_name': 'Profile report',
+                'verbose_name_plural': 'Profile reports',
+            },
+        ),
+    ]
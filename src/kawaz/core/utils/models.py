@@ -1 +1,111 @@
-# Fake
+import hashlib
+from collections import Counter
+from django.conf import settings
+from django.db import models
+from django.utils.translation import ugettext_lazy as _
+
+
+def get_url_hash(url):
+    """
+    URL の長さに依存せずに一意制約・インデックスを張るためのハッシュを返す
+    """
+    return hashlib.md5(url.encode('utf-8')).hexdigest()
+
+
+class ShortenedURL(models.Model):
+    """
+    短縮済みの URL を表すモデル
+
+    短縮 URL の解決はテンプレートの描画ごとに外部 API を呼び出すと非常に
+    遅いため、一度短縮した URL はここに保存し再利用する
+    """
+    url = models.TextField(_('URL'))
+    url_hash = models.CharField(max_length=32, unique=True, editable=False)
+    short_url = models.CharField(_('Shortened URL'), max_length=255,
+                                 blank=True, default='')
+    created_at = models.DateTimeField(_('Created at'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Shortened URL')
+        verbose_name_plural = _('Shortened URLs')
+
+    def __str__(self):
+        return self.url
+
+    def save(self, *args, **kwargs):
+        self.url_hash = get_url_hash(self.url)
+        super().save(*args, **kwargs)
+
+
+class ProfileReportManager(models.Manager):
+
+    def store(self, sampler, request, sampled=False):
+        """
+        Sampler の結果をレポートとして保存し、古いレポートを
+        ``KAWAZ_PROFILING_BUFFER_SIZE`` 件まで削除する
+        """
+        from .profiling import get_buffer_size
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated():
+            user = None
+        report = self.create(
+            method=request.method,
+            path=request.get_full_path()[:255],
+            user=user,
+            duration=sampler.duration * 1000,
+            samples=sampler.samples,
+            collapsed=sampler.collapsed,
+            sampled=sampled,
+        )
+        self.trim(get_buffer_size())
+        return report
+
+    def trim(self, size):
+        """
+        最新の ``size`` 件を残し古いレポートを削除する
+        """
+        pks = list(self.order_by('-pk').values_list('pk', flat=True)[size:])
+        if pks:
+            self.filter(pk__in=pks).delete()
+
+
+class ProfileReport(models.Model):
+    """
+    サンプリングプロファイラによるリクエストのプロファイル結果
+
+    ``collapsed`` は collapsed stacks 形式のため、そのまま FlameGraph など
+    に読み込ませることができる
+    """
+    method = models.CharField(_('Method'), max_length=10)
+    path = models.CharField(_('Path'), max_length=255)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, verbose_name=_('User'),
+                             null=True, blank=True, related_name='+',
+                             on_delete=models.SET_NULL)
+    duration = models.FloatField(_('Duration (ms)'))
+    samples = models.PositiveIntegerField(_('Samples'))
+    collapsed = models.TextField(_('Collapsed stacks'), blank=True)
+    # 1-in-N のサンプリングにより取得されたか（スタッフの指定によるものか）
+    sampled = models.BooleanField(_('Sampled'), default=False)
+    created_at = models.DateTimeField(_('Created at'), auto_now_add=True)
+
+    objects = ProfileReportManager()
+
+    class Meta:
+        ordering = ('-created_at',)
+        verbose_name = _('Profile report')
+        verbose_name_plural = _('Profile reports')
+
+    def __str__(self):
+        return '{} {} ({:.0f} ms)'.format(self.method, self.path,
+                                          self.duration)
+
+    def get_top_frames(self, limit=20):
+        """
+        サンプル中で実行中だった（スタックの末端の）フレームを出現回数の
+        多い順に返す
+        """
+        from .profiling import parse_collapsed
+        counts = Counter()
+        for stack, count in parse_collapsed(self.collapsed).items():
+            counts[stack.rsplit(';', 1)[-1]] += count
+        return counts.most_common(limit)
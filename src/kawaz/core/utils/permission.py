@@ -1,5 +1,82 @@
 from django.core.exceptions import ObjectDoesNotExist
+from permission.conf import settings
+from permission.backends import PermissionBackend as BasePermissionBackend
+from permission.utils.handlers import registry
 from permission.utils.permissions import perm_to_permission
+from kawaz.core.db import nplusone
+
+
+class PermissionBackend(BasePermissionBackend):
+    """
+    パーミッションの存在確認と対応するハンドラの検索を完全名ごとに一度だけ
+    行う django-permission のバックエンド
+
+    ``PERMISSION_CHECK_PERMISSION_PRESENCE`` が ``True`` の場合、元の
+    バックエンドは ``has_perm`` の度にパーミッションを取得するクエリを発行する
+    ため、一覧で各オブジェクトのパーミッションを調べると N+1 クエリとなる
+    """
+    def has_perm(self, user_obj, perm, obj=None):
+        if settings.PERMISSION_CHECK_PERMISSION_PRESENCE:
+            try:
+                if not permission_exists(perm):
+                    from django.contrib.auth.models import Permission
+                    raise Permission.DoesNotExist(
+                        "Permission '{}' does not exist".format(perm))
+            except AttributeError:
+                # 'app_label.codename' の形式でないものは元のバックエンドと
+                # 同様に無視する
+                pass
+        for handler in get_handlers(perm):
+            if handler.has_perm(user_obj, perm, obj=obj):
+                return True
+        return False
+
+
+# {<perm>: (<registered handlers>, <handlers supporting the perm>)}
+_handlers_cache = {}
+
+
+def get_handlers(perm):
+    """
+    指定されたパーミッションを扱うハンドラのタプルを返す
+
+    ハンドラは対応するパーミッションをそれぞれ一度だけデータベースから取得し
+    保持する。プロセスで最初の呼び出し時のみハンドラの数だけクエリが発行
+    されるが、繰り返し発行されることはないため N+1 クエリとして扱わない
+    """
+    handlers = registry.get_handlers()
+    cached = _handlers_cache.get(perm)
+    if cached is None or cached[0] != handlers:
+        with nplusone.allow():
+            supported = tuple(h for h in handlers
+                              if perm in h.get_supported_permissions())
+        cached = (handlers, supported)
+        _handlers_cache[perm] = cached
+    return cached[1]
+
+
+def permission_exists(perm):
+    """
+    指定された完全名のパーミッションが存在するか調べる
+
+    結果は完全名ごとに保持されるため ``perm_to_permission`` は完全名ごとに
+    一度しか呼ばれない
+
+    Raises:
+        AttributeError: 完全名の形式が不正な場合
+    """
+    if perm in permission_exists._existing_permissions:
+        return True
+    if perm in check_object_permission._missing_permissions:
+        return False
+    try:
+        perm_to_permission(perm)
+    except ObjectDoesNotExist:
+        check_object_permission._missing_permissions.add(perm)
+        return False
+    permission_exists._existing_permissions.add(perm)
+    return True
+permission_exists._existing_permissions = set()
 
 
 def check_object_permission(user_obj, codename, obj):
@@ -15,39 +92,71 @@ def check_object_permission(user_obj, codename, obj):
         bool or None: 指定されたパーミッションが存在する場合は`True`/`False`を
             返し、存在しない場合は`None`を返す
     """
-    # 以前に codename が存在しているか調べ、結果が missing として保持されて
-    # 居る場合は即 None を返す
-    if codename in check_object_permission._missing_codenames:
+    # 以前にパーミッションが存在しているか調べ、結果が missing として保持
+    # されて居る場合は即 None を返す。パーミッションの有無はモデルごとに
+    # 異なるため完全名で保持する
+    perm = get_full_permission_name(codename, obj)
+    if perm in check_object_permission._missing_permissions:
         return None
     # user_obj インスタンスにキャッシュが保存されている場合はそれを利用し
     # ない場合は _check_object_permission を実行し結果をキャッシュする
+    # 異なるモデルのオブジェクトの pk が衝突しないよう完全名を含める
     cachename = '_object_perms_cache'
     if not hasattr(user_obj, cachename):
         setattr(user_obj, cachename, {})
     cache = getattr(user_obj, cachename)
-    cachekey = "{} {}".format(codename, hash(obj))
-    if not cachekey in cache:
+    # 保存前のオブジェクトは pk で区別できないためキャッシュしない
+    cachekey = "{} {}".format(perm, obj.pk) if obj.pk is not None else None
+    if cachekey is None or not cachekey in cache:
         r = _check_object_permission(user_obj, codename, obj)
         if r is None:
-            check_object_permission._missing_codenames.append(codename)
+            check_object_permission._missing_permissions.add(perm)
             return None
+        elif cachekey is None:
+            return r
         else:
             cache[cachekey] = r
     return cache[cachekey]
-check_object_permission._missing_codenames = []
+check_object_permission._missing_permissions = set()
 
 def _check_object_permission(user_obj, codename, obj):
+    perm = get_full_permission_name(codename, obj)
+    if not permission_exists(perm):
+        # 指定されたパーミッションが存在しないため None を返す
+        return None
     try:
-        perm = get_full_permission_name(codename, obj)
-        # 文字列 permission を実体に変換（してみる）
-        perm_to_permission(perm)
         # 指定されたパーミッションが存在するためチェックを行う
         return user_obj.has_perm(perm, obj=obj)
     except ObjectDoesNotExist:
-        # 指定されたパーミッションが存在しないため None を返す
         return None
 
 
+def has_view_permission(user_obj, obj):
+    """
+    指定ユーザが指定オブジェクトを閲覧可能か調べる
+
+    モデルが `view` パーミッションを定義している場合はそのパーミッションを
+    調べ、定義していない場合は `pub_state` （存在する場合）を
+    `PublishmentPermissionLogic` と同様に調べる
+
+    Args:
+        user_obj (user instance): 対象ユーザインスタンス
+        obj (model instance): 対象モデルインスタンス
+
+    Returns:
+        bool: 閲覧可能な場合は`True`
+    """
+    codename = 'view_{}'.format(obj._meta.model_name)
+    if any(c == codename for c, name in obj._meta.permissions):
+        return user_obj.has_perm(get_full_permission_name('view', obj), obj)
+    pub_state = getattr(obj, 'pub_state', None)
+    if pub_state is None or pub_state == 'public':
+        return True
+    elif pub_state == 'protected':
+        return user_obj.is_authenticated() and user_obj.is_member
+    return False
+
+
 def get_full_permission_name(codename, obj):
     """
     省略形パーミッションとオブジェクトからパーミッションの完全名を取得
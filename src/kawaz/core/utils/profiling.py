@@ -0,0 +1,137 @@
+# coding=utf-8
+"""
+本番環境のリクエストのサンプリングプロファイラ
+
+別スレッドから一定間隔（``KAWAZ_PROFILING_INTERVAL`` 秒）でリクエストを処理
+しているスレッドのスタックを取得し、同じスタックの出現回数を数える。
+計測対象のコードには手を加えないため、決定的プロファイラ（cProfile）と
+異なりオーバーヘッドは間隔に比例した小さなものとなる
+
+結果は FlameGraph（``flamegraph.pl``）や speedscope が読み込める collapsed
+stacks 形式（``<frame>;<frame>;... <count>``）で出力する
+
+Settings:
+    KAWAZ_PROFILING_INTERVAL (float): サンプリングの間隔（秒）
+    KAWAZ_PROFILING_SAMPLE_RATE (int): N リクエストに一度の割合で全ての
+        リクエストをプロファイルする（0 の場合は無効）
+    KAWAZ_PROFILING_BUFFER_SIZE (int): 保存するレポートの最大件数
+"""
+import sys
+import time
+import threading
+from collections import Counter
+from django.conf import settings
+
+DEFAULT_INTERVAL = 0.005
+DEFAULT_SAMPLE_RATE = 0
+DEFAULT_BUFFER_SIZE = 100
+
+
+def get_interval():
+    return getattr(settings, 'KAWAZ_PROFILING_INTERVAL', DEFAULT_INTERVAL)
+
+
+def get_sample_rate():
+    return getattr(settings, 'KAWAZ_PROFILING_SAMPLE_RATE',
+                   DEFAULT_SAMPLE_RATE)
+
+
+def get_buffer_size():
+    return getattr(settings, 'KAWAZ_PROFILING_BUFFER_SIZE',
+                   DEFAULT_BUFFER_SIZE)
+
+
+def format_frame(frame):
+    """
+    フレームを ``<module>:<function>`` 形式の文字列にする
+    """
+    module = frame.f_globals.get('__name__', '?')
+    return '{}:{}'.format(module, frame.f_code.co_name)
+
+
+def collapse_stack(frame):
+    """
+    フレームから呼び出し元を辿り、最も外側のフレームから ``;`` で連結した
+    文字列を返す
+    """
+    frames = []
+    while frame is not None:
+        frames.append(format_frame(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(frames))
+
+
+def format_collapsed(counts):
+    """
+    スタックごとの出現回数を collapsed stacks 形式の文字列にする
+    """
+    return '\n'.join('{} {}'.format(stack, count)
+                     for stack, count in counts.most_common())
+
+
+def parse_collapsed(collapsed):
+    """
+    collapsed stacks 形式の文字列をスタックごとの出現回数に戻す
+    """
+    counts = Counter()
+    for line in collapsed.splitlines():
+        stack, _, count = line.rpartition(' ')
+        if stack:
+            counts[stack] += int(count)
+    return counts
+
+
+class Sampler(object):
+    """
+    指定されたスレッドのスタックを一定間隔で取得するサンプリングプロファイラ
+
+    Args:
+        thread_id (int): 対象のスレッドの ID（デフォルト: 現在のスレッド）
+        interval (float): サンプリングの間隔（秒）
+
+    Usage:
+        sampler = Sampler()
+        sampler.start()
+        ...
+        sampler.stop()
+        print(sampler.collapsed)
+    """
+    def __init__(self, thread_id=None, interval=None):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval or get_interval()
+        self.counts = Counter()
+        self.started_at = None
+        self.duration = 0.0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def samples(self):
+        return sum(self.counts.values())
+
+    @property
+    def collapsed(self):
+        return format_collapsed(self.counts)
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is not None:
+            self.counts[collapse_stack(frame)] += 1
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run,
+                                        name='kawaz-profiler')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.duration = time.monotonic() - self.started_at
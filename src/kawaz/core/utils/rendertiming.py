@@ -0,0 +1,309 @@
+# coding=utf-8
+"""
+テンプレート・テンプレートタグごとの描画時間の計測
+
+``Node.render_annotated`` と ``Template._render`` を置き換え、計測中の
+スレッドでのみ以下の描画時間（包括・排他）とクエリ数を名前ごとに集計する。
+クエリ数は ``kawaz.core.db.hooks`` のフックで数える
+
+-   ``template <name>``: テンプレート全体
+-   ``include <template>``: ``{% include %}``
+-   ``tag <name>``: Django 以外のライブラリのタグ（``render_activity`` など）
+-   ``filter <name>``: Django 以外のフィルタを含む変数（``kfm`` など）
+
+Django 組み込みのタグ（``if`` や ``for`` など）は計測しないため、その中身の
+時間は外側の計測対象の排他時間に含まれる。計測していないスレッドでの
+オーバーヘッドはノードの描画ごとのスレッドローカル変数の参照のみである
+
+集計結果はビューごとに ``metrics`` （``RenderMetrics``）に記録される。
+``metrics`` はプロセスごとのメモリ上にあるため、一定時間ごとにビューごとの
+排他時間の長いものをロガー（``kawaz.core.utils.rendertiming``）に INFO で
+書き出し、消去する
+
+Settings:
+    KAWAZ_RENDER_TIMING_SAMPLE_RATE (int): N リクエストに一度の割合で計測
+        する（0 の場合は無効）
+    KAWAZ_RENDER_TIMING_FLUSH_INTERVAL (int): 集計結果をロガーに書き出す
+        間隔（秒）。0 の場合は書き出さない
+    KAWAZ_RENDER_TIMING_FLUSH_LIMIT (int): 書き出すビューごとの最大の件数
+"""
+import time
+import logging
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.template.base import Node, Template, VariableNode, TOKEN_BLOCK
+from django.template.library import TagHelperNode
+from kawaz.core.db import hooks
+
+DEFAULT_SAMPLE_RATE = 0
+DEFAULT_FLUSH_INTERVAL = 300
+DEFAULT_FLUSH_LIMIT = 10
+
+FIELDS = ('calls', 'inclusive', 'exclusive', 'queries', 'exclusive_queries')
+
+logger = logging.getLogger(__name__)
+
+
+def get_sample_rate():
+    return getattr(settings, 'KAWAZ_RENDER_TIMING_SAMPLE_RATE',
+                   DEFAULT_SAMPLE_RATE)
+
+
+def get_flush_interval():
+    return getattr(settings, 'KAWAZ_RENDER_TIMING_FLUSH_INTERVAL',
+                   DEFAULT_FLUSH_INTERVAL)
+
+
+def get_flush_limit():
+    return getattr(settings, 'KAWAZ_RENDER_TIMING_FLUSH_LIMIT',
+                   DEFAULT_FLUSH_LIMIT)
+
+
+def _is_custom(obj):
+    module = getattr(obj, '__module__', None) or ''
+    return not module.startswith('django.')
+
+
+def _get_node_name(node):
+    if isinstance(node, VariableNode):
+        names = [func.__name__ for func, args
+                 in node.filter_expression.filters if _is_custom(func)]
+        if names:
+            return 'filter {}'.format('|'.join(names))
+        return None
+    token = getattr(node, 'token', None)
+    if token is None or token.token_type != TOKEN_BLOCK:
+        return None
+    bits = token.split_contents()
+    if bits[0] == 'include' and len(bits) > 1:
+        return 'include {}'.format(bits[1])
+    # simple_tag などで登録されたタグは django.template.library のノードとなる
+    if isinstance(node, TagHelperNode) or _is_custom(type(node)):
+        return 'tag {}'.format(bits[0])
+    return None
+
+
+def get_node_name(node):
+    """
+    計測対象のノードの名前を返す。計測対象でない場合は None
+
+    ノードはテンプレートと共にキャッシュされるため、名前はノードごとに
+    一度だけ求める
+    """
+    try:
+        return node._render_timing_name
+    except AttributeError:
+        name = node._render_timing_name = _get_node_name(node)
+        return name
+
+
+class RenderCollector(object):
+    """
+    一つのリクエストの描画時間とクエリ数を名前ごとに集計する
+
+    同じ名前のノードが入れ子になる場合（再帰的な include など）、包括時間は
+    重複して加算される
+    """
+    def __init__(self):
+        self.stats = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+        self.queries = 0
+        # [<name>, <start>, <children time>, <start queries>, <children queries>]
+        self._stack = []
+
+    def enter(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0, self.queries, 0])
+
+    def exit(self):
+        name, start, children, queries, child_queries = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        queries = self.queries - queries
+        stats = self.stats[name]
+        stats['calls'] += 1
+        stats['inclusive'] += elapsed
+        stats['exclusive'] += elapsed - children
+        stats['queries'] += queries
+        stats['exclusive_queries'] += queries - child_queries
+        if self._stack:
+            self._stack[-1][2] += elapsed
+            self._stack[-1][4] += queries
+
+    def get_stats(self):
+        """
+        名前ごとの集計結果を排他時間の長い順に返す
+        """
+        return sorted(((name, dict(stats))
+                       for name, stats in self.stats.items()),
+                      key=lambda item: -item[1]['exclusive'])
+
+
+class RenderMetrics(object):
+    """
+    ビューごと・名前ごとの描画時間とクエリ数の合計を記録する
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = defaultdict(
+            lambda: defaultdict(lambda: dict.fromkeys(FIELDS, 0)))
+        self._requests = defaultdict(int)
+        self._flushed_at = time.monotonic()
+
+    def record(self, view, collector):
+        with self._lock:
+            self._requests[view] += 1
+            metrics = self._metrics[view]
+            for name, stats in collector.stats.items():
+                for field in FIELDS:
+                    metrics[name][field] += stats[field]
+
+    def get(self, view=None):
+        """
+        記録された値のコピーを返す。``view`` が指定された場合はそのビューの
+        値（``{'requests': <int>, 'stats': {<name>: {...}}}``）のみを返す
+        """
+        with self._lock:
+            if view is not None:
+                return self._get(view)
+            return {v: self._get(v) for v in self._metrics}
+
+    def _get(self, view):
+        return {
+            'requests': self._requests[view],
+            'stats': {name: dict(stats)
+                      for name, stats in self._metrics[view].items()},
+        }
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self._metrics.clear()
+        self._requests.clear()
+        self._flushed_at = time.monotonic()
+
+    def flush(self, interval=0, limit=None):
+        """
+        前回の書き出しから ``interval`` 秒以上経過している場合、記録された値を
+        ロガーに書き出して消去する
+
+        Args:
+            interval (int): 書き出す間隔（秒）
+            limit (int): 書き出すビューごとの最大の件数（排他時間の長い順）
+
+        Returns:
+            書き出した値（``get()`` と同じ形式）。書き出さなかった場合は None
+        """
+        with self._lock:
+            if time.monotonic() - self._flushed_at < interval:
+                return None
+            flushed = {v: self._get(v) for v in self._metrics}
+            self._reset()
+        for view, recorded in sorted(flushed.items()):
+            stats = sorted(recorded['stats'].items(),
+                           key=lambda item: -item[1]['exclusive'])
+            logger.info('Render timing of %s (%d requests): %s',
+                        view, recorded['requests'],
+                        format_stats(stats[:limit]))
+        return flushed
+
+
+def format_stats(stats):
+    """
+    ``(name, stats)`` のリストをログ用の文字列にする（時間はミリ秒）
+    """
+    return '; '.join(
+        '{} calls={} inclusive={:.1f} exclusive={:.1f} queries={} '
+        'exclusive_queries={}'.format(
+            name, values['calls'], values['inclusive'] * 1000,
+            values['exclusive'] * 1000, values['queries'],
+            values['exclusive_queries'])
+        for name, values in stats)
+
+
+metrics = RenderMetrics()
+
+_local = threading.local()
+_install_lock = threading.Lock()
+_originals = {}
+
+
+def get_collector():
+    return getattr(_local, 'collector', None)
+
+
+def _render_annotated(self, context):
+    render_annotated = _originals['render_annotated']
+    collector = getattr(_local, 'collector', None)
+    if collector is None:
+        return render_annotated(self, context)
+    name = get_node_name(self)
+    if name is None:
+        return render_annotated(self, context)
+    collector.enter(name)
+    try:
+        return render_annotated(self, context)
+    finally:
+        collector.exit()
+
+
+def _template_render(self, context):
+    render = _originals['template_render']
+    collector = getattr(_local, 'collector', None)
+    if collector is None:
+        return render(self, context)
+    collector.enter('template {}'.format(self.name))
+    try:
+        return render(self, context)
+    finally:
+        collector.exit()
+
+
+def _on_execute(sql):
+    collector = getattr(_local, 'collector', None)
+    if collector is not None:
+        collector.queries += 1
+
+
+def install():
+    """
+    描画時間とクエリ数を計測できるようノードの描画などを置き換える
+    """
+    with _install_lock:
+        if _originals:
+            return
+        _originals['render_annotated'] = Node.render_annotated
+        _originals['template_render'] = Template._render
+        Node.render_annotated = _render_annotated
+        Template._render = _template_render
+        hooks.add_execute_hook(_on_execute)
+
+
+def uninstall():
+    """
+    ``install()`` で置き換えたノードの描画などを元に戻す
+    """
+    with _install_lock:
+        if not _originals:
+            return
+        Node.render_annotated = _originals.pop('render_annotated')
+        Template._render = _originals.pop('template_render')
+        hooks.remove_execute_hook(_on_execute)
+
+
+def start():
+    """
+    現在のスレッドでの計測を開始する
+    """
+    install()
+    _local.collector = RenderCollector()
+    return _local.collector
+
+
+def stop():
+    """
+    現在のスレッドでの計測を終了し RenderCollector を返す
+    """
+    collector = get_collector()
+    _local.collector = None
+    return collector
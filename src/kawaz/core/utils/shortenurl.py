@@ -1,34 +1,277 @@
-import json
+"""
+URL の短縮と短縮済み URL の保存・解決
+
+短縮済みの URL は ``ShortenedURL`` テーブルとキャッシュに保存され、
+``resolve()`` によりまとめて解決される。保存されていない URL はバックエンドに
+より短縮される。デフォルトの ``LocalURLShortenerBackend`` は Kawaz 自身の
+短縮 URL を発行するためネットワークを待たずに最終的な短縮 URL が得られる。
+外部 API を用いるバックエンド（goo.gl の API は提供が終了している）は
+設定で明示した場合のみ利用され、未解決の URL はバックグラウンドのスレッドで
+短縮される
+
+Settings:
+    KAWAZ_URL_SHORTENER_BACKEND (str): バックエンドクラスへのパス
+        （デフォルト: ``LocalURLShortenerBackend``）
+    KAWAZ_URL_SHORTENER_ASYNC (bool): 外部 API を用いるバックエンドの場合に
+        ``resolve()`` が未解決の URL をバックグラウンドで短縮するか
+        （デフォルト: True）。外部サービスへ送信される通知の描画などでは
+        ``resolve(urls, asynchronous=False)`` で同期的に短縮する
+"""
+import queue
 import logging
+import threading
+from functools import lru_cache
 from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from . import transport
 
 API_URL = 'https://www.googleapis.com/urlshortener/v1/url'
+DEFAULT_BACKEND = 'kawaz.core.utils.shortenurl.LocalURLShortenerBackend'
 
+CACHE_KEY_PREFIX = 'kawaz.core.utils.shortenurl'
+# 短縮 URL は変化しないので長めにキャッシュする
+CACHE_TIMEOUT = 60 * 60 * 24 * 30
 
-def shorten(url):
+BASE62 = '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+# ShortenedURL の pk（AutoField）の最大値
+MAX_CODE_VALUE = 2 ** 31 - 1
+
+logger = logging.getLogger('kawaz.core.utils')
+
+
+def encode_base62(value):
+    code = ''
+    while True:
+        value, r = divmod(value, len(BASE62))
+        code = BASE62[r] + code
+        if value == 0:
+            return code
+
+
+def decode_base62(code, max_value=MAX_CODE_VALUE):
+    """
+    base62 の文字列を整数に戻す
+
+    Raises:
+        ValueError: base62 でない文字を含む場合、もしくは ``max_value`` を
+            超える場合
+    """
+    value = 0
+    for c in code:
+        value = value * len(BASE62) + BASE62.index(c)
+        if value > max_value:
+            raise ValueError("'{}' exceeds the maximum value".format(code))
+    return value
+
+
+class BaseURLShortenerBackend(object):
+    """
+    URL 短縮バックエンドの基底クラス
+    """
+    # ネットワーク越しに短縮を行うか否か。True の場合、未解決の URL は
+    # バックグラウンドで短縮される
+    remote = True
+
+    def shorten(self, url):
+        """
+        与えられた URL を短縮して返す。失敗した場合は例外を送出する
+        """
+        raise NotImplementedError
+
+
+class GoogleURLShortenerBackend(BaseURLShortenerBackend):
     """
-    与えられたURLをgoo.glを使って短縮します
+    goo.gl を使って URL を短縮するバックエンド
 
     settings.GOOGLE_URL_SHORTENER_API_KEYが設定されているときはそれを使って短縮します。
     詳細は以下を参照してください
     https://developers.google.com/url-shortener/v1/getting_started#auth
     """
-    from urllib.request import urlopen, Request
-
-    api_key = getattr(settings, 'GOOGLE_URL_SHORTENER_API_KEY', None)
-    try:
+    def shorten(self, url):
+        api_key = getattr(settings, 'GOOGLE_URL_SHORTENER_API_KEY', None)
         api_url = API_URL
         if api_key:
             api_url = '{}?key={}'.format(api_url, api_key)
-        data = json.dumps({'longUrl': url})
-        data = data.encode('utf-8')
-        request = Request(api_url, data)
-        request.add_header('Content-Type', 'application/json')
-        r = urlopen(request)
-        json_string = r.read().decode("utf-8")
-        return json.loads(json_string)['id']
+        r = transport.post(api_url, json={'longUrl': url})
+        r.raise_for_status()
+        return r.json()['id']
+
+
+class LocalURLShortenerBackend(BaseURLShortenerBackend):
+    """
+    ``ShortenedURL`` の pk を元に Kawaz 自身の短縮 URL（``/s/<code>/``）を
+    発行するバックエンド
+    """
+    remote = False
+
+    def shorten(self, url):
+        from django.contrib.sites.models import Site
+        from django.core.urlresolvers import reverse
+        from .models import ShortenedURL, get_url_hash
+        obj, created = ShortenedURL.objects.get_or_create(
+            url_hash=get_url_hash(url), defaults=dict(url=url))
+        path = reverse('utils_shortened_url_redirect',
+                       kwargs=dict(code=encode_base62(obj.pk)))
+        return 'http://{}{}'.format(Site.objects.get_current().domain, path)
+
+
+@lru_cache()
+def _load_backend(path):
+    return import_string(path)()
+
+
+def get_backend():
+    """
+    settings.KAWAZ_URL_SHORTENER_BACKEND のバックエンドのインスタンスを返す
+    """
+    return _load_backend(getattr(settings, 'KAWAZ_URL_SHORTENER_BACKEND',
+                                 DEFAULT_BACKEND))
+
+
+def shorten(url):
+    """
+    与えられたURLをバックエンドを使って短縮します
+
+    短縮に失敗した場合は与えられたURLをそのまま返します
+    """
+    try:
+        return get_backend().shorten(url)
     except Exception as e:
         # fail silently
-        logger = logging.getLogger('kawaz.core.utils')
         logger.exception("Failed to shorten `{}`".format(url))
         return url
+
+
+def _get_cache_key(url_hash):
+    return '{}:{}'.format(CACHE_KEY_PREFIX, url_hash)
+
+
+def lookup(urls):
+    """
+    保存済みの短縮 URL を一度のキャッシュ参照と（キャッシュに無い場合）
+    一度のクエリで取得する
+
+    Returns:
+        dict: ``{<url>: <short url>}`` 保存されていない URL は含まれない
+    """
+    from .models import ShortenedURL, get_url_hash
+    hashes = {get_url_hash(url): url for url in urls}
+    keys = {_get_cache_key(h): h for h in hashes}
+    found = {}
+    for key, short_url in cache.get_many(list(keys.keys())).items():
+        found[hashes[keys[key]]] = short_url
+    missing = [h for h in hashes if hashes[h] not in found]
+    if missing:
+        qs = ShortenedURL.objects.filter(url_hash__in=missing)
+        qs = qs.exclude(short_url='').values_list('url_hash', 'short_url')
+        stored = dict(qs)
+        for url_hash, short_url in stored.items():
+            found[hashes[url_hash]] = short_url
+        if stored:
+            cache.set_many({_get_cache_key(h): s for h, s in stored.items()},
+                           CACHE_TIMEOUT)
+    return found
+
+
+def store(url, short_url):
+    """
+    短縮 URL をデータベースとキャッシュに保存する
+    """
+    from .models import ShortenedURL, get_url_hash
+    url_hash = get_url_hash(url)
+    ShortenedURL.objects.update_or_create(
+        url_hash=url_hash, defaults=dict(url=url, short_url=short_url))
+    cache.set(_get_cache_key(url_hash), short_url, CACHE_TIMEOUT)
+
+
+def fill(urls):
+    """
+    指定された URL をバックエンドで短縮して保存する
+
+    Returns:
+        dict: ``{<url>: <short url>}`` 短縮に失敗した URL は含まれない
+    """
+    resolved = {}
+    for url in urls:
+        short_url = shorten(url)
+        if short_url and short_url != url:
+            store(url, short_url)
+            resolved[url] = short_url
+    return resolved
+
+
+class ShortenURLWorker(threading.Thread):
+    """
+    未解決の URL をバックグラウンドで短縮・保存するスレッド
+    """
+    def __init__(self):
+        super().__init__(name='ShortenURLWorker', daemon=True)
+        self.queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def enqueue(self, urls):
+        with self._lock:
+            urls = [url for url in urls if url not in self._pending]
+            self._pending.update(urls)
+        for url in urls:
+            self.queue.put(url)
+
+    def run(self):
+        from django.db import close_old_connections
+        while True:
+            url = self.queue.get()
+            try:
+                fill([url])
+            except Exception:
+                logger.exception("Failed to store `{}`".format(url))
+            finally:
+                with self._lock:
+                    self._pending.discard(url)
+                close_old_connections()
+                self.queue.task_done()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = ShortenURLWorker()
+            _worker.start()
+        return _worker
+
+
+def resolve(urls, asynchronous=None):
+    """
+    指定された URL の短縮 URL をまとめて解決する
+
+    保存されていない URL はバックエンドが外部 API を用いる場合
+    バックグラウンドで短縮され、今回は元の URL のまま返される
+
+    Args:
+        urls (iterable): 解決する URL
+        asynchronous (bool): 未解決の URL をバックグラウンドで短縮するか
+            （デフォルト: ``KAWAZ_URL_SHORTENER_ASYNC``）
+
+    Returns:
+        dict: ``{<url>: <short url or url>}``
+    """
+    urls = list(set(urls))
+    if not urls:
+        return {}
+    resolved = lookup(urls)
+    misses = [url for url in urls if url not in resolved]
+    if misses:
+        if asynchronous is None:
+            asynchronous = getattr(settings, 'KAWAZ_URL_SHORTENER_ASYNC',
+                                   True)
+        if get_backend().remote and asynchronous:
+            get_worker().enqueue(misses)
+        else:
+            resolved.update(fill(misses))
+    return {url: resolved.get(url, url) for url in urls}
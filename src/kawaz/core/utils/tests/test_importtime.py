@@ -0,0 +1,74 @@
+import io
+import sys
+from django.test import TestCase
+from kawaz.core.utils import importtime
+from kawaz.core.utils.importtimer import ImportTimer
+
+OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   _frozen_importlib_external
+import time:        50 |         50 |     django.utils.version
+import time:       200 |        250 |   django.utils
+import time:       300 |        550 | django
+import time:        40 |         40 | markdown2
+Traceback (most recent call last):
+"""
+
+
+class ImportTimeTestCase(TestCase):
+    def test_parse(self):
+        """
+        -X importtime の出力をパースしてネストの深さと共に返す
+        """
+        records = importtime.parse(OUTPUT)
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[1], importtime.ImportRecord(
+            name='django.utils.version', self=50, cumulative=50, depth=2))
+        self.assertEqual(records[3].depth, 0)
+        self.assertEqual(importtime.total(records), 590)
+
+    def test_aggregate(self):
+        """
+        トップレベルのパッケージごとに self の時間を合計する
+        """
+        records = importtime.parse(OUTPUT)
+        self.assertEqual(importtime.aggregate(records), [
+            ('django', 550, 3),
+            ('_frozen_importlib_external', 100, 1),
+            ('markdown2', 40, 1),
+        ])
+
+    def test_find_eager_modules(self):
+        modules = ['django', 'markdown2', 'bs4.element']
+        self.assertEqual(importtime.find_eager_modules(modules),
+                         ['bs4', 'markdown2'])
+
+
+class ImportTimerTestCase(TestCase):
+    def test_import_timer(self):
+        """
+        ファインダーは import 時間を -X importtime と同じ形式で出力する
+        """
+        sys.modules.pop('colorsys', None)
+        stream = io.StringIO()
+        timer = ImportTimer(stream)
+        timer.install()
+        try:
+            import colorsys
+        finally:
+            timer.uninstall()
+        records = importtime.parse(stream.getvalue())
+        self.assertEqual([(r.name, r.depth) for r in records],
+                         [('colorsys', 0)])
+        self.assertIs(colorsys.__loader__, colorsys.__spec__.loader)
+
+
+class BootImportTimeBudgetTestCase(TestCase):
+    def test_boot_within_budget(self):
+        """
+        起動時に重い連携用のライブラリが読み込まれず、import 時間が予算内に
+        収まっている
+        """
+        profile = importtime.profile()
+        self.assertEqual(importtime.find_eager_modules(profile.modules), [])
+        elapsed = importtime.total(profile.records) / 1000000
+        self.assertLessEqual(elapsed, importtime.get_budget())
@@ -0,0 +1,29 @@
+from django.test import TestCase
+from kawaz.core.personas.tests.factories import PersonaFactory
+from ..permission import permission_exists, get_handlers
+
+
+class PermissionExistsTestCase(TestCase):
+    def test_permission_exists(self):
+        """存在の確認は完全名ごとに一度だけクエリを発行する"""
+        permission_exists('personas.add_persona')
+        with self.assertNumQueries(0):
+            self.assertTrue(permission_exists('personas.add_persona'))
+
+    def test_missing_permission(self):
+        """存在しないパーミッションは False を返しクエリを発行しない"""
+        self.assertFalse(permission_exists('personas.unknown_persona'))
+        with self.assertNumQueries(0):
+            self.assertFalse(permission_exists('personas.unknown_persona'))
+
+
+class PermissionBackendTestCase(TestCase):
+    def test_has_perm_does_not_repeat_queries(self):
+        """has_perm はパーミッションの取得を繰り返さない"""
+        user = PersonaFactory()
+        personas = [PersonaFactory() for i in range(3)]
+        user.has_perm('personas.change_persona', personas[0])
+        get_handlers('personas.change_persona')
+        with self.assertNumQueries(0):
+            for persona in personas:
+                user.has_perm('personas.change_persona', persona)
@@ -0,0 +1,100 @@
+import time
+from django.test import TestCase, override_settings
+from kawaz.core.personas.tests.factories import PersonaFactory
+from kawaz.core.middlewares.profiling import REPORT_HEADER
+from ..models import ProfileReport
+from ..profiling import Sampler, format_collapsed, parse_collapsed
+
+
+def busy_loop(seconds):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        pass
+
+
+class SamplerTestCase(TestCase):
+    def test_sample(self):
+        """対象のスレッドのスタックを一定間隔で取得する"""
+        sampler = Sampler(interval=0.001)
+        sampler.start()
+        busy_loop(0.1)
+        sampler.stop()
+        self.assertGreater(sampler.samples, 0)
+        self.assertIn('{}:busy_loop'.format(__name__), sampler.collapsed)
+        self.assertGreaterEqual(sampler.duration, 0.1)
+
+    def test_collapsed(self):
+        """collapsed stacks 形式に変換し元に戻せる"""
+        sampler = Sampler()
+        sampler.counts['a:main;b:foo'] += 3
+        sampler.counts['a:main;c:bar'] += 1
+        collapsed = format_collapsed(sampler.counts)
+        self.assertEqual(collapsed, 'a:main;b:foo 3\na:main;c:bar 1')
+        self.assertEqual(parse_collapsed(collapsed), sampler.counts)
+
+
+class ProfileReportTestCase(TestCase):
+    def _create(self, collapsed=''):
+        return ProfileReport.objects.create(
+            method='GET', path='/', duration=1.0, samples=1,
+            collapsed=collapsed)
+
+    def test_trim(self):
+        """最新のレポートのみを残し古いレポートを削除する"""
+        reports = [self._create() for i in range(5)]
+        ProfileReport.objects.trim(3)
+        self.assertEqual(
+            sorted(ProfileReport.objects.values_list('pk', flat=True)),
+            [r.pk for r in reports[2:]])
+
+    def test_get_top_frames(self):
+        """スタックの末端のフレームを出現回数の多い順に返す"""
+        report = self._create('a:main;b:foo 3\na:main;c:bar 1\nb:foo 2')
+        self.assertEqual(report.get_top_frames(),
+                         [('b:foo', 5), ('c:bar', 1)])
+
+
+class SamplingProfilerMiddlewareTestCase(TestCase):
+    def setUp(self):
+        self.staff = PersonaFactory(role='nerv')
+        self.user = PersonaFactory(role='children')
+
+    def _login(self, user):
+        self.assertTrue(self.client.login(username=user.username,
+                                          password='password'))
+
+    def test_collapsed(self):
+        """スタッフは ?_profile=collapsed で collapsed stacks を取得できる"""
+        self._login(self.staff)
+        r = self.client.get('/members/?_profile=collapsed')
+        self.assertEqual(r['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertFalse(ProfileReport.objects.exists())
+
+    def test_store(self):
+        """スタッフは ?_profile でレポートを保存できる"""
+        self._login(self.staff)
+        r = self.client.get('/members/', HTTP_X_KAWAZ_PROFILE='1')
+        report = ProfileReport.objects.get()
+        self.assertEqual(report.path, '/members/')
+        self.assertEqual(report.user, self.staff)
+        self.assertFalse(report.sampled)
+        self.assertTrue(r[REPORT_HEADER].endswith(
+            '/{}/change/'.format(report.pk)))
+
+    def test_non_staff(self):
+        """スタッフ以外の要求は無視される"""
+        self._login(self.user)
+        r = self.client.get('/members/?_profile=collapsed')
+        self.assertEqual(r.status_code, 200)
+        self.assertNotEqual(r['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertFalse(ProfileReport.objects.exists())
+
+    @override_settings(KAWAZ_PROFILING_SAMPLE_RATE=1,
+                       KAWAZ_PROFILING_BUFFER_SIZE=2)
+    def test_sampled(self):
+        """1-in-N のサンプリングでは最新のレポートのみを保存する"""
+        for i in range(3):
+            r = self.client.get('/members/')
+            self.assertFalse(r.has_header(REPORT_HEADER))
+        self.assertEqual(ProfileReport.objects.count(), 2)
+        self.assertTrue(all(r.sampled for r in ProfileReport.objects.all()))
@@ -0,0 +1,122 @@
+from django.test import TestCase, RequestFactory, override_settings
+from django.http import HttpResponse
+from django.template import Template, Context
+from django.template.base import Node
+from kawaz.core.middlewares.rendertiming import RenderTimingMiddleware
+from kawaz.core.middlewares.rendertiming import SERVER_TIMING_HEADER
+from kawaz.core.personas.models import Persona
+from .. import rendertiming
+
+
+class RenderTimingTestCase(TestCase):
+    def setUp(self):
+        rendertiming.metrics.reset()
+
+    def tearDown(self):
+        rendertiming.stop()
+        rendertiming.uninstall()
+        rendertiming.metrics.reset()
+
+    def _render(self, source, **context):
+        collector = rendertiming.start()
+        try:
+            Template(source).render(Context(context))
+        finally:
+            rendertiming.stop()
+        return dict(collector.get_stats())
+
+    def test_custom_tag(self):
+        """Django 以外のタグは計測され組み込みのタグは計測されない"""
+        stats = self._render(
+            '{% for i in items %}{% expr i * 2 %}{% endfor %}',
+            items=range(3))
+        self.assertEqual(stats['tag expr']['calls'], 3)
+        self.assertFalse(any(name.startswith('tag for') for name in stats))
+
+    def test_include(self):
+        """include は包括・排他時間が計測される"""
+        inner = Template('{% expr 1 + 1 %}')
+        stats = self._render('{% include inner %}', inner=inner)
+        include = stats['include inner']
+        self.assertEqual(include['calls'], 1)
+        self.assertGreaterEqual(include['inclusive'],
+                                stats['tag expr']['inclusive'])
+        self.assertLessEqual(include['exclusive'], include['inclusive'])
+
+    def test_queries(self):
+        """描画中に発行されたクエリ数を計測する"""
+        stats = self._render('{% expr list(qs) %}',
+                             qs=Persona.objects.all())
+        self.assertEqual(stats['tag expr']['queries'], 1)
+        self.assertEqual(stats['tag expr']['exclusive_queries'], 1)
+
+    def test_not_collecting(self):
+        """計測中でないスレッドでは集計されない"""
+        rendertiming.install()
+        Template('{% expr 1 %}').render(Context())
+        self.assertIsNone(rendertiming.get_collector())
+
+    def test_uninstall(self):
+        """uninstall() で置き換えたメソッドが元に戻る"""
+        render_annotated = Node.render_annotated
+        template_render = Template._render
+        rendertiming.install()
+        self.assertIsNot(Node.render_annotated, render_annotated)
+        rendertiming.uninstall()
+        self.assertIs(Node.render_annotated, render_annotated)
+        self.assertIs(Template._render, template_render)
+
+    @override_settings(KAWAZ_RENDER_TIMING_SAMPLE_RATE=1,
+                       KAWAZ_RENDER_TIMING_FLUSH_INTERVAL=0, DEBUG=True)
+    def test_middleware(self):
+        """ミドルウェアはビューごとに記録し Server-Timing ヘッダを返す"""
+        middleware = RenderTimingMiddleware()
+        request = RequestFactory().get('/')
+        request.resolver_match = None
+
+        def view(request):
+            return HttpResponse(Template('{% expr 1 %}').render(Context()))
+
+        middleware.process_view(request, view, (), {})
+        response = middleware.process_response(request, view(request))
+        name = '{}.view'.format(__name__)
+        recorded = rendertiming.metrics.get(name)
+        self.assertEqual(recorded['requests'], 1)
+        self.assertEqual(recorded['stats']['tag expr']['calls'], 1)
+        self.assertIn('tag expr', response[SERVER_TIMING_HEADER])
+
+    def test_flush(self):
+        """flush() はビューごとの集計結果をロガーに書き出して消去する"""
+        collector = rendertiming.start()
+        Template('{% expr 1 %}').render(Context())
+        rendertiming.stop()
+        rendertiming.metrics.record('view', collector)
+        with self.assertLogs(rendertiming.logger, 'INFO') as logs:
+            flushed = rendertiming.metrics.flush()
+        self.assertEqual(flushed['view']['requests'], 1)
+        self.assertIn('Render timing of view (1 requests): ', logs.output[0])
+        self.assertIn('tag expr calls=1', logs.output[0])
+        self.assertEqual(rendertiming.metrics.get(), {})
+
+    def test_flush_interval(self):
+        """flush() は前回から interval 秒以上経過するまで書き出さない"""
+        rendertiming.metrics.record('view', rendertiming.RenderCollector())
+        self.assertIsNone(rendertiming.metrics.flush(interval=60))
+        self.assertEqual(rendertiming.metrics.get('view')['requests'], 1)
+
+    @override_settings(KAWAZ_RENDER_TIMING_SAMPLE_RATE=1,
+                       KAWAZ_RENDER_TIMING_FLUSH_INTERVAL=1)
+    def test_middleware_flush(self):
+        """ミドルウェアは一定時間ごとに集計結果をロガーに書き出す"""
+        middleware = RenderTimingMiddleware()
+        request = RequestFactory().get('/')
+        request.resolver_match = None
+
+        def view(request):
+            return HttpResponse(Template('{% expr 1 %}').render(Context()))
+
+        rendertiming.metrics._flushed_at -= 1
+        middleware.process_view(request, view, (), {})
+        with self.assertLogs(rendertiming.logger, 'INFO'):
+            middleware.process_response(request, view(request))
+        self.assertEqual(rendertiming.metrics.get(), {})
@@ -1,25 +1,26 @@
-import json
 from unittest.mock import MagicMock, patch
 from django.test import TestCase, override_settings
 from kawaz.core.utils import shortenurl
+from kawaz.core.utils.models import ShortenedURL
 
 URL = "http://www.kawaz.org"
+GOOGLE_BACKEND = 'kawaz.core.utils.shortenurl.GoogleURLShortenerBackend'
 
 
-@override_settings(GOOGLE_URL_SHORTENER_API_KEY='key')
+@override_settings(GOOGLE_URL_SHORTENER_API_KEY='key',
+                   KAWAZ_URL_SHORTENER_BACKEND=GOOGLE_BACKEND)
 class ShortenURLTestCase(TestCase):
     def test_shortenurl(self):
         """
         GoogleのURL短縮APIを使ってURLが短縮できる
         """
-        def dummy_urlopen(request):
+        def dummy_post(url, **kwargs):
             mock = MagicMock()
-            json_string = json.dumps({'id': 'http://goo.gl/hogehoge'})
-            mock.read.return_value = json_string.encode('utf-8')
+            mock.json.return_value = {'id': 'http://goo.gl/hogehoge'}
             return mock
 
-        with patch('urllib.request.urlopen') as urlopen:
-            urlopen.side_effect = dummy_urlopen
+        with patch('kawaz.core.utils.transport.post') as post:
+            post.side_effect = dummy_post
             url = shortenurl.shorten(URL)
 
         self.assertRegex(url, r'^http:\/\/goo\.gl\/.+$')
@@ -28,11 +29,103 @@ class ShortenURLTestCase(TestCase):
         """
          APIの実行が失敗したとき、元のURLを返す
         """
-        def dummy_urlopen(request):
+        def dummy_post(url, **kwargs):
             raise Exception("Something went wrong")
 
-        with patch('urllib.request.urlopen') as urlopen:
-            urlopen.side_effect = dummy_urlopen
+        with patch('kawaz.core.utils.transport.post') as post:
+            post.side_effect = dummy_post
             url = shortenurl.shorten(URL)
 
         self.assertEqual(url, URL)
+
+
+@override_settings(KAWAZ_URL_SHORTENER_ASYNC=False)
+class ShortenURLStoreTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_resolve_stores_shortened_url(self):
+        """
+        一度短縮したURLは保存され、再度外部APIが呼ばれることはない
+        """
+        with patch('kawaz.core.utils.shortenurl.shorten') as shorten:
+            shorten.return_value = 'http://goo.gl/hogehoge'
+            resolved = shortenurl.resolve([URL])
+            self.assertEqual(resolved, {URL: 'http://goo.gl/hogehoge'})
+            resolved = shortenurl.resolve([URL])
+            self.assertEqual(resolved, {URL: 'http://goo.gl/hogehoge'})
+        self.assertEqual(shorten.call_count, 1)
+        self.assertTrue(ShortenedURL.objects.filter(url=URL).exists())
+
+    def test_resolve_from_database(self):
+        """
+        キャッシュに無い場合でもデータベースから解決される
+        """
+        ShortenedURL.objects.create(url=URL, short_url='http://goo.gl/db')
+        with patch('kawaz.core.utils.shortenurl.shorten') as shorten:
+            resolved = shortenurl.resolve([URL])
+        self.assertFalse(shorten.called)
+        self.assertEqual(resolved, {URL: 'http://goo.gl/db'})
+
+    def test_resolve_failed(self):
+        """
+        短縮に失敗したURLは保存されず、元のURLが返される
+        """
+        with patch('kawaz.core.utils.shortenurl.shorten') as shorten:
+            shorten.side_effect = lambda url: url
+            resolved = shortenurl.resolve([URL])
+        self.assertEqual(resolved, {URL: URL})
+        self.assertFalse(ShortenedURL.objects.filter(url=URL).exists())
+
+    @override_settings(KAWAZ_URL_SHORTENER_ASYNC=True,
+                       KAWAZ_URL_SHORTENER_BACKEND=GOOGLE_BACKEND)
+    def test_resolve_remote_misses_in_background(self):
+        """
+        外部APIを用いる場合、未解決のURLはバックグラウンドで短縮され
+        元のURLがそのまま返される
+        """
+        with patch('kawaz.core.utils.shortenurl.get_worker') as get_worker:
+            resolved = shortenurl.resolve([URL])
+        self.assertEqual(resolved, {URL: URL})
+        get_worker().enqueue.assert_called_with([URL])
+
+    @override_settings(KAWAZ_URL_SHORTENER_ASYNC=True)
+    def test_resolve_synchronously(self):
+        """
+        asynchronous=False の場合は設定によらずその場で短縮される
+        """
+        with patch('kawaz.core.utils.shortenurl.shorten') as shorten:
+            shorten.return_value = 'http://goo.gl/hogehoge'
+            resolved = shortenurl.resolve([URL], asynchronous=False)
+        self.assertEqual(resolved, {URL: 'http://goo.gl/hogehoge'})
+
+    @override_settings(KAWAZ_URL_SHORTENER_ASYNC=True)
+    def test_default_backend_is_local(self):
+        """
+        デフォルトのバックエンドはネットワークを用いずにその場で短縮する
+        """
+        with patch('kawaz.core.utils.transport.post') as post, \
+                patch('kawaz.core.utils.shortenurl.get_worker') as get_worker:
+            short_url = shortenurl.resolve([URL])[URL]
+        self.assertFalse(post.called)
+        self.assertFalse(get_worker.called)
+        self.assertRegex(short_url, r'^http://[^/]+/s/[0-9a-zA-Z]+/$')
+
+    def test_local_backend(self):
+        """
+        ローカルバックエンドで短縮したURLは元のURLにリダイレクトされる
+        """
+        short_url = shortenurl.resolve([URL])[URL]
+        self.assertRegex(short_url, r'^http://[^/]+/s/[0-9a-zA-Z]+/$')
+        path = '/' + short_url.split('/', 3)[3]
+        r = self.client.get(path)
+        self.assertEqual(r.status_code, 301)
+        self.assertTrue(r['Location'].startswith(URL))
+
+    def test_local_backend_invalid_code(self):
+        """
+        pk の範囲外のコードは 404 を返す
+        """
+        r = self.client.get('/s/zzzzzzzzzzzzzzzzzzzz/')
+        self.assertEqual(r.status_code, 404)
@@ -0,0 +1,119 @@
+from unittest.mock import patch
+import requests
+from requests.models import Response
+from requests.adapters import HTTPAdapter
+from django.test import TestCase, override_settings
+from kawaz.core.utils import transport
+
+URL = "http://www.kawaz.org/"
+HOST = "www.kawaz.org"
+
+
+def dummy_response(status_code=200):
+    response = Response()
+    response.status_code = status_code
+    return response
+
+
+class CircuitBreakerTestCase(TestCase):
+    def setUp(self):
+        self.breaker = transport.CircuitBreaker(threshold=2, reset_timeout=60)
+
+    def test_open_after_consecutive_failures(self):
+        """
+        閾値の回数だけ連続で失敗したホストへの通信は遮断される
+        """
+        self.breaker.record_failure(HOST)
+        self.assertTrue(self.breaker.allow(HOST))
+        self.breaker.record_failure(HOST)
+        self.assertFalse(self.breaker.allow(HOST))
+        # 他のホストには影響しない
+        self.assertTrue(self.breaker.allow('example.com'))
+
+    def test_success_resets_failures(self):
+        """
+        成功すると連続失敗回数はリセットされる
+        """
+        self.breaker.record_failure(HOST)
+        self.breaker.record_success(HOST)
+        self.breaker.record_failure(HOST)
+        self.assertTrue(self.breaker.allow(HOST))
+
+    def test_half_open_after_reset_timeout(self):
+        """
+        遮断時間を過ぎると再度通信が許可される
+        """
+        self.breaker.record_failure(HOST)
+        self.breaker.record_failure(HOST)
+        with patch('time.monotonic', return_value=10 ** 9):
+            self.assertTrue(self.breaker.allow(HOST))
+
+    def test_half_open_allows_single_trial(self):
+        """
+        half-open の間は一つのリクエストのみ通信が許可される
+        """
+        self.breaker.record_failure(HOST)
+        self.breaker.record_failure(HOST)
+        with patch('time.monotonic', return_value=10 ** 9):
+            self.assertTrue(self.breaker.allow(HOST))
+            self.assertFalse(self.breaker.allow(HOST))
+            self.assertTrue(self.breaker.is_open(HOST))
+            self.breaker.record_success(HOST)
+            self.assertTrue(self.breaker.allow(HOST))
+            self.assertTrue(self.breaker.allow(HOST))
+
+    def test_half_open_failure_reopens(self):
+        """
+        half-open の試行に失敗すると再び遮断される
+        """
+        self.breaker.record_failure(HOST)
+        self.breaker.record_failure(HOST)
+        with patch('time.monotonic', return_value=10 ** 9):
+            self.assertTrue(self.breaker.allow(HOST))
+            self.breaker.record_failure(HOST)
+            self.assertFalse(self.breaker.allow(HOST))
+
+
+class KawazHTTPAdapterTestCase(TestCase):
+    def setUp(self):
+        self.breaker = transport.CircuitBreaker(threshold=2, reset_timeout=60)
+        self.adapter = transport.KawazHTTPAdapter(breaker=self.breaker)
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+
+    @override_settings(KAWAZ_HTTP_TIMEOUT=(1, 2))
+    def test_default_timeout(self):
+        """
+        タイムアウトが指定されていない場合は設定値が使用される
+        """
+        with patch.object(HTTPAdapter, 'send',
+                          return_value=dummy_response()) as send:
+            self.session.get(URL)
+        self.assertEqual(send.call_args[1]['timeout'], (1, 2))
+
+    def test_fail_fast_when_circuit_is_open(self):
+        """
+        失敗が続いたホストへの通信は行われず CircuitOpenError が送出される
+        """
+        error = requests.exceptions.ConnectTimeout("timeout")
+        with patch.object(HTTPAdapter, 'send', side_effect=error) as send:
+            for i in range(2):
+                self.assertRaises(requests.exceptions.ConnectTimeout,
+                                  self.session.get, URL)
+            self.assertRaises(transport.CircuitOpenError,
+                              self.session.get, URL)
+        self.assertEqual(send.call_count, 2)
+        metrics = self.adapter.metrics.get(HOST)
+        self.assertEqual(metrics['requests'], 2)
+        self.assertEqual(metrics['failures'], 2)
+        self.assertEqual(metrics['rejected'], 1)
+
+    def test_server_errors_are_failures(self):
+        """
+        5xx のレスポンスは失敗として記録される
+        """
+        with patch.object(HTTPAdapter, 'send',
+                          return_value=dummy_response(503)):
+            self.session.get(URL)
+            self.session.get(URL)
+        self.assertFalse(self.breaker.allow(HOST))
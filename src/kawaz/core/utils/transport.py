@@ -0,0 +1,230 @@
+# coding=utf-8
+"""
+外部サービスへの HTTP 通信をまとめて扱うトランスポート層
+
+Slack/HipChat/Twitter への通知や URL 短縮、はてなブログのフィード取得など
+全ての外部通信はこのモジュールの ``session`` （もしくは ``adapter`` を
+マウントしたセッション）を経由させる。これにより
+
+-   ホストごとに keep-alive なコネクションプールを共有する
+-   接続・読み込みのタイムアウトを必ず設定する
+-   失敗が続いたホストへの通信はサーキットブレーカーにより即座に失敗させる
+-   ホストごとのレイテンシ・失敗数を記録する
+
+が保証され、一つの外部サービスが応答しなくなってもワーカーが
+ブロックされ続けることが無くなる
+
+Settings:
+    KAWAZ_HTTP_TIMEOUT (tuple): ``(<connect>, <read>)`` のタイムアウト（秒）
+    KAWAZ_HTTP_POOL_MAXSIZE (int): ホストごとのコネクションプールのサイズ
+    KAWAZ_HTTP_BREAKER_THRESHOLD (int): ブレーカーが開くまでの連続失敗回数
+    KAWAZ_HTTP_BREAKER_RESET_TIMEOUT (int): ブレーカーが開いてから再度
+        通信を試みるまでの秒数
+"""
+import time
+import logging
+import threading
+from collections import defaultdict
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = (3.05, 10)
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_RESET_TIMEOUT = 60
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """
+    サーキットブレーカーが開いているため通信を行わなかったことを表す例外
+
+    既存のコードが ``requests`` の例外として扱えるよう
+    ``ConnectionError`` を継承している
+    """
+    pass
+
+
+class CircuitBreaker(object):
+    """
+    ホストごとの連続失敗回数を記録し、閾値を超えたホストへの通信を一定時間
+    遮断するサーキットブレーカー
+
+    遮断時間を過ぎると一つのリクエストのみ通信を試み（half-open）、成功すれば
+    閉じ、失敗すれば再び遮断する。試行中の他のリクエストは遮断される
+    """
+    def __init__(self, threshold=None, reset_timeout=None):
+        self._threshold = threshold
+        self._reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        # {<host>: (<連続失敗回数>, <遮断された時刻>, <試行中か>)}
+        self._states = {}
+
+    @property
+    def threshold(self):
+        if self._threshold is not None:
+            return self._threshold
+        return getattr(settings, 'KAWAZ_HTTP_BREAKER_THRESHOLD',
+                       DEFAULT_BREAKER_THRESHOLD)
+
+    @property
+    def reset_timeout(self):
+        if self._reset_timeout is not None:
+            return self._reset_timeout
+        return getattr(settings, 'KAWAZ_HTTP_BREAKER_RESET_TIMEOUT',
+                       DEFAULT_BREAKER_RESET_TIMEOUT)
+
+    def allow(self, host):
+        """
+        指定されたホストへの通信を許可するか否か
+        """
+        with self._lock:
+            failures, opened_at, trying = self._states.get(
+                host, (0, None, False))
+            if opened_at is None:
+                return True
+            if trying or time.monotonic() - opened_at < self.reset_timeout:
+                return False
+            # half-open: この一回の結果で開閉を決める
+            self._states[host] = (failures, opened_at, True)
+            return True
+
+    def is_open(self, host):
+        with self._lock:
+            failures, opened_at, trying = self._states.get(
+                host, (0, None, False))
+        return opened_at is not None and (
+            trying or time.monotonic() - opened_at < self.reset_timeout)
+
+    def record_success(self, host):
+        with self._lock:
+            self._states.pop(host, None)
+
+    def record_failure(self, host):
+        with self._lock:
+            failures = self._states.get(host, (0, None, False))[0] + 1
+            opened_at = None
+            if failures >= self.threshold:
+                opened_at = time.monotonic()
+                logger.warning("Circuit for '%s' is opened after %d "
+                               "consecutive failures", host, failures)
+            self._states[host] = (failures, opened_at, False)
+
+    def reset(self):
+        with self._lock:
+            self._states.clear()
+
+
+class TransportMetrics(object):
+    """
+    ホストごとのリクエスト数・失敗数・遮断数・合計レイテンシを記録する
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = defaultdict(lambda: dict(
+            requests=0, failures=0, rejected=0, latency=0.0,
+        ))
+
+    def record(self, host, latency=None, failed=False, rejected=False):
+        with self._lock:
+            metrics = self._metrics[host]
+            if rejected:
+                metrics['rejected'] += 1
+                return
+            metrics['requests'] += 1
+            metrics['latency'] += latency or 0.0
+            if failed:
+                metrics['failures'] += 1
+
+    def get(self, host=None):
+        """
+        記録された値のコピーを返す。``host`` が指定された場合はそのホストの
+        値のみを返す
+        """
+        with self._lock:
+            if host is not None:
+                return dict(self._metrics[host])
+            return {h: dict(m) for h, m in self._metrics.items()}
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+class KawazHTTPAdapter(HTTPAdapter):
+    """
+    タイムアウトの強制・サーキットブレーカー・メトリクス記録を行う
+    ``requests`` の HTTPAdapter
+
+    アダプタのインスタンスはコネクションプールを保持するため、
+    複数のセッションに同じインスタンスをマウントすることでプールを共有できる
+    """
+    def __init__(self, breaker=None, metrics=None, **kwargs):
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = metrics or TransportMetrics()
+        maxsize = getattr(settings, 'KAWAZ_HTTP_POOL_MAXSIZE',
+                          DEFAULT_POOL_MAXSIZE)
+        kwargs.setdefault('pool_maxsize', maxsize)
+        super().__init__(**kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        host = urlsplit(request.url).netloc
+        if not self.breaker.allow(host):
+            self.metrics.record(host, rejected=True)
+            raise CircuitOpenError(
+                "Circuit for '{}' is open".format(host), request=request)
+        if timeout is None:
+            timeout = getattr(settings, 'KAWAZ_HTTP_TIMEOUT', DEFAULT_TIMEOUT)
+        start = time.monotonic()
+        try:
+            response = super().send(request, timeout=timeout, **kwargs)
+        except Exception:
+            self.breaker.record_failure(host)
+            self.metrics.record(host, time.monotonic() - start, failed=True)
+            raise
+        # サーバーエラーはホストの障害として扱う
+        failed = response.status_code >= 500
+        if failed:
+            self.breaker.record_failure(host)
+        else:
+            self.breaker.record_success(host)
+        self.metrics.record(host, time.monotonic() - start, failed=failed)
+        return response
+
+
+# 全ての外部通信で共有するアダプタ・セッション
+adapter = KawazHTTPAdapter()
+
+
+def mount(session):
+    """
+    指定されたセッション（e.g. ``OAuth1Session``）に共有アダプタを
+    マウントして返す
+    """
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+session = mount(requests.Session())
+
+
+def request(method, url, **kwargs):
+    """
+    共有セッションを用いてリクエストを送信する
+
+    ``requests.request`` と同じ引数を受け取る
+    """
+    return session.request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, data=None, json=None, **kwargs):
+    return request('POST', url, data=data, json=json, **kwargs)
@@ -0,0 +1,9 @@
+from django.conf.urls import url
+
+from .views import ShortenedURLRedirectView
+
+
+urlpatterns = [
+    url(r'^(?P<code>[0-9a-zA-Z]+)/$', ShortenedURLRedirectView.as_view(),
+        name='utils_shortened_url_redirect'),
+]
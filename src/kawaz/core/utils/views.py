@@ -0,0 +1,22 @@
+from django.views.generic.base import RedirectView
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from .models import ShortenedURL
+from .shortenurl import decode_base62
+
+
+class ShortenedURLRedirectView(RedirectView):
+    """
+    LocalURLShortenerBackend で発行された短縮 URL を元の URL へ
+    リダイレクトする View
+    """
+    permanent = True
+
+    def get_redirect_url(self, *args, **kwargs):
+        try:
+            pk = decode_base62(kwargs['code'])
+        except ValueError:
+            # pk の範囲外のコードはデータベースに渡さない
+            raise Http404
+        obj = get_object_or_404(ShortenedURL, pk=pk)
+        return obj.url
@@ -0,0 +1,290 @@
+"""
+キーセット（シーク）方式のページネーション
+
+Django の Paginator は OFFSET/LIMIT と COUNT(*) を用いるため、深いページ
+ほど遅くなる。キーセット方式では直前のページの最後（最初）のオブジェクトの
+並び替えキーをカーソルとし、``(created_at, pk) < (<created_at>, <pk>)`` の
+ようにインデックスを用いた範囲検索で次（前）のページを取得するため、
+ページの深さに関わらず一定のコストで取得できる
+
+カーソルは ``?after=<cursor>`` （次のページ）、``?before=<cursor>`` （前の
+ページ）として渡される。従来の ``?page=<number>`` は ``MAX_OFFSET_PAGE``
+ページまでのみ OFFSET で処理し、それより深いページは 404 とする
+
+ページ番号によるページネーションを行うビューや管理画面では
+``ApproximateCountPaginator`` を用い、大きなテーブルの ``COUNT(*)`` を避ける
+"""
+import json
+import base64
+from urllib.parse import urlencode
+from django.http import Http404
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from kawaz.core.db.counts import approximate_count
+
+AFTER_KWARG = 'after'
+BEFORE_KWARG = 'before'
+PAGE_KWARG = 'page'
+# 従来の ?page= で取得可能な最大のページ番号
+MAX_OFFSET_PAGE = 10
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _split(ordering):
+    """
+    ``'-created_at'`` を ``('created_at', True)`` （降順）に分割する
+    """
+    if ordering.startswith('-'):
+        return ordering[1:], True
+    return ordering, False
+
+
+class KeysetObjectList(list):
+    """
+    キーセット方式のページのオブジェクトのリスト
+
+    通常のページの ``object_list`` （QuerySet）と同様に引数無しの
+    ``count()`` で件数を返す
+    """
+    def count(self, *args):
+        if args:
+            return super().count(*args)
+        return len(self)
+
+
+class KeysetPage(object):
+    """
+    キーセット方式のページ
+
+    ``paginator.html`` は ``is_keyset`` により通常のページと区別し、
+    ``next_querystring`` / ``previous_querystring`` をリンクに用いる
+    """
+    is_keyset = True
+
+    def __init__(self, paginator, object_list, has_next, has_previous,
+                 query=None):
+        self.paginator = paginator
+        self.object_list = KeysetObjectList(object_list)
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.query = query
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def _get_querystring(self, kwarg, obj):
+        query = self.query.copy() if self.query is not None else {}
+        for name in (AFTER_KWARG, BEFORE_KWARG, PAGE_KWARG):
+            query.pop(name, None)
+        query[kwarg] = self.paginator.encode_cursor(obj)
+        if hasattr(query, 'urlencode'):
+            return query.urlencode()
+        return urlencode(query)
+
+    @property
+    def next_querystring(self):
+        if not self._has_next:
+            return ''
+        return self._get_querystring(AFTER_KWARG, self.object_list[-1])
+
+    @property
+    def previous_querystring(self):
+        if not self._has_previous:
+            return ''
+        return self._get_querystring(BEFORE_KWARG, self.object_list[0])
+
+
+class KeysetPaginator(object):
+    """
+    指定された並び替えキーによるキーセット方式のページネーター
+
+    並び替えキーの最後には一意なフィールド（通常は ``pk``）を指定する必要が
+    ある。また、NULL を含むフィールドは Coalesce などで annotate した値を
+    用いる
+
+    Args:
+        queryset (queryset): ページネーション対象の QuerySet
+        per_page (int): 1ページあたりのオブジェクト数
+        ordering (tuple): 並び替えキー（e.g. ``('-created_at', '-pk')``）
+    """
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+
+    @cached_property
+    def count(self):
+        """
+        全オブジェクト数（概算）。ページの取得には不要なため参照された場合
+        のみ数える
+        """
+        return approximate_count(self.queryset)
+
+    def _get_field(self, name):
+        annotations = self.queryset.query.annotations
+        if name in annotations:
+            return annotations[name].output_field
+        if name == 'pk':
+            return self.queryset.model._meta.pk
+        return self.queryset.model._meta.get_field(name)
+
+    def encode_cursor(self, obj):
+        """
+        オブジェクトの並び替えキーの値をカーソル文字列に変換する
+        """
+        values = []
+        for ordering in self.ordering:
+            value = getattr(obj, _split(ordering)[0])
+            # マイクロ秒まで保持しないと同じ時刻のオブジェクトを取りこぼす
+            # ため DjangoJSONEncoder ではなく isoformat を用いている
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            values.append(value)
+        value = json.dumps(values, separators=(',', ':'))
+        return base64.urlsafe_b64encode(value.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        """
+        カーソル文字列を並び替えキーの値のリストに変換する
+
+        Raises:
+            InvalidCursor: カーソルが不正な場合
+        """
+        try:
+            value = base64.urlsafe_b64decode(cursor.encode('ascii'))
+            values = json.loads(value.decode('utf-8'))
+            if (not isinstance(values, list) or
+                    len(values) != len(self.ordering)):
+                raise ValueError
+            return [self._get_field(_split(ordering)[0]).to_python(value)
+                    for ordering, value in zip(self.ordering, values)]
+        except Exception:
+            raise InvalidCursor(cursor)
+
+    def _filter(self, values, reverse=False):
+        """
+        カーソルより後（``reverse`` の場合は前）のオブジェクトに絞り込む
+
+        ``(a, b) > (x, y)`` を ``a > x OR (a = x AND b > y)`` に展開している
+        """
+        q = Q()
+        for i, ordering in enumerate(self.ordering):
+            name, desc = _split(ordering)
+            lookup = 'lt' if desc != reverse else 'gt'
+            condition = Q(**{'{}__{}'.format(name, lookup): values[i]})
+            for prev, value in zip(self.ordering[:i], values[:i]):
+                condition &= Q(**{_split(prev)[0]: value})
+            q |= condition
+        return self.queryset.filter(q)
+
+    def _reversed_ordering(self):
+        return tuple(ordering[1:] if ordering.startswith('-')
+                     else '-' + ordering for ordering in self.ordering)
+
+    def page(self, after=None, before=None, number=None, query=None):
+        """
+        指定されたカーソル（もしくはページ番号）のページを返す
+
+        Raises:
+            InvalidCursor: カーソルもしくはページ番号が不正な場合
+        """
+        limit = self.per_page
+        if after:
+            qs = self._filter(self.decode_cursor(after))
+            objects = list(qs.order_by(*self.ordering)[:limit + 1])
+            return KeysetPage(self, objects[:limit], len(objects) > limit,
+                              True, query)
+        if before:
+            qs = self._filter(self.decode_cursor(before), reverse=True)
+            objects = list(qs.order_by(*self._reversed_ordering())[:limit + 1])
+            has_previous = len(objects) > limit
+            objects = list(reversed(objects[:limit]))
+            return KeysetPage(self, objects, True, has_previous, query)
+        try:
+            number = int(number or 1)
+        except (TypeError, ValueError):
+            raise InvalidCursor(number)
+        if not 1 <= number <= MAX_OFFSET_PAGE:
+            raise InvalidCursor(number)
+        offset = (number - 1) * limit
+        qs = self.queryset.order_by(*self.ordering)
+        objects = list(qs[offset:offset + limit + 1])
+        if number > 1 and not objects:
+            raise InvalidCursor(number)
+        return KeysetPage(self, objects[:limit], len(objects) > limit,
+                          number > 1, query)
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    件数に ``approximate_count()`` による概算の件数を用いる Paginator
+
+    件数が ``KAWAZ_APPROXIMATE_COUNT_THRESHOLD`` 件を超える場合、ページ数は
+    概算となるため、最後のページには表示されないオブジェクトや空のページが
+    生じうる
+
+    Usage:
+        class EventListView(ListView):
+            paginate_by = 10
+            paginator_class = ApproximateCountPaginator
+
+        class ActivityAdmin(admin.ModelAdmin):
+            paginator = ApproximateCountPaginator
+            show_full_result_count = False
+    """
+    @cached_property
+    def count(self):
+        if isinstance(self.object_list, QuerySet):
+            return approximate_count(self.object_list)
+        return len(self.object_list)
+
+
+class KeysetPaginationMixin(object):
+    """
+    MultipleObjectMixin のページネーションをキーセット方式に置き換える Mixin
+
+    Usage:
+        class ActivityListView(KeysetPaginationMixin, ListView):
+            paginate_by = 10
+            keyset_ordering = ('-created_at', '-pk')
+
+    Note:
+        ページ数（``paginator.num_pages``）は COUNT(*) を避けるため提供しない
+    """
+    keyset_ordering = ('-pk',)
+
+    def get_keyset_ordering(self):
+        return self.keyset_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size,
+                                    self.get_keyset_ordering())
+        params = self.request.GET
+        try:
+            page = paginator.page(after=params.get(AFTER_KWARG),
+                                  before=params.get(BEFORE_KWARG),
+                                  number=params.get(PAGE_KWARG),
+                                  query=params)
+        except InvalidCursor:
+            raise Http404
+        return (paginator, page, page.object_list, page.has_other_pages())
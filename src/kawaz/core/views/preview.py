@@ -1,4 +1,13 @@
 import json
+from django.http import JsonResponse
+
+# 差分プレビューにおいてクライアントが保持しているブロックのハッシュを渡す
+# ためのキー
+BLOCKS_KEY = '_blocks'
+# 差分プレビューにおいて KFM フィールドの代わりにテンプレートに渡す値
+PLACEHOLDER = 'kfmpreviewplaceholder{}'
+PLACEHOLDER_ELEMENT = '<div class="kfm-blocks" data-kfm-field="{}"></div>'
+
 
 class SingleObjectPreviewViewMixin(object):
 
@@ -11,12 +20,35 @@ class SingleObjectPreviewViewMixin(object):
     インスタンスを生成し返すため、このMixinが適用されたビューはモデルの保存
     などを行わずしてテンプレートにてモデルインスタンスのように扱うことが可能
 
+    POST されたパラメータに ``_blocks`` （``{<field>: [<hash>, ...]}``）が
+    含まれる場合は差分プレビューとして ``kfm_fields`` をブロックごとに描画
+    し、以下の JSON を返す
+
+        {
+            "html": <KFM フィールドを PLACEHOLDER_ELEMENT に置き換えた HTML>,
+            "fields": {
+                <field>: [{"hash": <hash>, "html": <html>}, ...]
+            }
+        }
+
+    クライアントが既に保持しているブロックの ``html`` は省略される
+
     Note:
         実際に返されるオブジェクトは辞書であるためテンプレート以外では動かない
 
         RESTの原則的にはGETで行うのがふさわしいが、GETだと、長い本文を送信したときに
         413エラーを送出してしまうため、POSTで行っている
     """
+    # 差分プレビューにおいてブロックごとに描画する KFM のフィールド
+    kfm_fields = ('body',)
+
+    def get_params(self):
+        if not hasattr(self, '_params'):
+            # Ref https://docs.djangoproject.com/en/dev/releases/1.5/#non-form-data-in-http-requests
+            # http://stackoverflow.com/questions/1208067/wheres-my-json-data-in-my-incoming-django-request
+            # Django1.5からAjaxではrequest.POSTでQueryDictを取れなくなったので、JSONに変換している
+            self._params = json.loads(self.request.body.decode('utf-8'))
+        return self._params
 
     def get_object(self, queryset=None):
         """
@@ -27,14 +59,36 @@ class SingleObjectPreviewViewMixin(object):
         # Use 'model' of queryset or 'model' attribute
         model = getattr(queryset, 'model', self.model)
         fields = [f.name for f in model._meta.get_fields()]
-        # Ref https://docs.djangoproject.com/en/dev/releases/1.5/#non-form-data-in-http-requests
-        # http://stackoverflow.com/questions/1208067/wheres-my-json-data-in-my-incoming-django-request
-        # Django1.5からAjaxではrequest.POSTでQueryDictを取れなくなったので、JSONに変換している
-        params = json.loads(self.request.body.decode('utf-8'))
+        params = self.get_params()
         # filter field values
         return {k: v for k, v in params.items() if k in fields}
 
+    def render_blocks_to_response(self, known):
+        """
+        KFM フィールドをブロックごとに描画し差分プレビューの JSON を返す
+        """
+        from kawaz.apps.kfm.blocks import render_blocks
+        fields = {}
+        for name in self.kfm_fields:
+            value = self.object.get(name)
+            if value is None:
+                continue
+            blocks = render_blocks(value, known=known.get(name) or ())
+            fields[name] = [dict(hash=h) if html is None else
+                            dict(hash=h, html=html) for h, html in blocks]
+            self.object[name] = PLACEHOLDER.format(name)
+        context = self.get_context_data(object=self.object)
+        response = self.render_to_response(context)
+        html = response.render().content.decode('utf-8')
+        for name in fields:
+            html = html.replace('<p>{}</p>'.format(PLACEHOLDER.format(name)),
+                                PLACEHOLDER_ELEMENT.format(name))
+        return JsonResponse(dict(html=html, fields=fields))
+
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
+        known = self.get_params().get(BLOCKS_KEY)
+        if isinstance(known, dict):
+            return self.render_blocks_to_response(known)
         context = self.get_context_data(object=self.object)
         return self.render_to_response(context)
@@ -0,0 +1,90 @@
+import datetime
+from django.test import TestCase
+from django.http import QueryDict
+from django.utils import timezone
+from django.contrib.contenttypes.models import ContentType
+from activities.models import Activity
+from activities.tests.models import ActivitiesTestModelA
+from kawaz.core.activities.tests.factories import ActivityFactory
+from ..pagination import KeysetPaginator, InvalidCursor, MAX_OFFSET_PAGE
+
+
+class KeysetPaginatorTestCase(TestCase):
+    def setUp(self):
+        ct = ContentType.objects.get_for_model(ActivitiesTestModelA)
+        self.activities = [
+            ActivityFactory(content_type=ct, object_id=1, status='created')
+            for i in range(7)
+        ]
+        # 同じ作成日時のアクティビティを含める
+        now = timezone.now()
+        for i, activity in enumerate(self.activities):
+            created_at = now - datetime.timedelta(minutes=i // 2)
+            Activity.objects.filter(pk=activity.pk).update(
+                created_at=created_at)
+        self.paginator = KeysetPaginator(Activity.objects.all(), 3,
+                                         ('-created_at', '-pk'))
+        self.expected = list(Activity.objects.order_by('-created_at', '-pk'))
+
+    def test_first_page(self):
+        """カーソルが指定されない場合は最初のページを返す"""
+        page = self.paginator.page()
+        self.assertEqual(list(page), self.expected[:3])
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+        self.assertEqual(page.object_list.count(), 3)
+
+    def test_after(self):
+        """after カーソルより後のオブジェクトを取りこぼし無く返す"""
+        objects = []
+        page = self.paginator.page()
+        objects.extend(page)
+        while page.has_next():
+            cursor = self.paginator.encode_cursor(page.object_list[-1])
+            page = self.paginator.page(after=cursor)
+            self.assertTrue(page.has_previous())
+            objects.extend(page)
+        self.assertEqual(objects, self.expected)
+
+    def test_before(self):
+        """before カーソルより前のオブジェクトを返す"""
+        cursor = self.paginator.encode_cursor(self.expected[5])
+        page = self.paginator.page(before=cursor)
+        self.assertEqual(list(page), self.expected[2:5])
+        self.assertTrue(page.has_next())
+        self.assertTrue(page.has_previous())
+
+        cursor = self.paginator.encode_cursor(self.expected[3])
+        page = self.paginator.page(before=cursor)
+        self.assertEqual(list(page), self.expected[:3])
+        self.assertFalse(page.has_previous())
+
+    def test_invalid_cursor(self):
+        """不正なカーソルは InvalidCursor となる"""
+        for cursor in ('invalid', 'W10=', 'WyJmb28iLDFd'):
+            self.assertRaises(InvalidCursor,
+                              self.paginator.page, after=cursor)
+
+    def test_legacy_page(self):
+        """?page= は MAX_OFFSET_PAGE ページまで OFFSET で処理される"""
+        page = self.paginator.page(number='2')
+        self.assertEqual(list(page), self.expected[3:6])
+        self.assertTrue(page.has_previous())
+        self.assertRaises(InvalidCursor, self.paginator.page, number='4')
+        self.assertRaises(InvalidCursor, self.paginator.page,
+                          number=str(MAX_OFFSET_PAGE + 1))
+        self.assertRaises(InvalidCursor, self.paginator.page, number='foo')
+
+    def test_querystring(self):
+        """ページのリンクは他のパラメータを保持する"""
+        query = QueryDict('type=wall&page=2')
+        page = self.paginator.page(number='2', query=query)
+        next_query = QueryDict(page.next_querystring)
+        self.assertEqual(next_query['type'], 'wall')
+        self.assertFalse('page' in next_query)
+        self.assertEqual(
+            self.paginator.decode_cursor(next_query['after'])[1],
+            self.expected[5].pk)
+        previous_query = QueryDict(page.previous_querystring)
+        self.assertEqual(previous_query['type'], 'wall')
+        self.assertTrue('before' in previous_query)
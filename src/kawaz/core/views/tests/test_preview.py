@@ -1,5 +1,5 @@
 import json
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from django.test import TestCase
 from ..preview import SingleObjectPreviewViewMixin
 from .models import Article
@@ -48,3 +48,26 @@ class KawazSingleObjectPreviewViewMixinTestCase(TestCase):
         instance = self.instance
         self.assertEqual(sorted(expected),
                          sorted(list(instance.get_object(queryset))))
+
+    @patch('kawaz.apps.kfm.blocks.render_blocks')
+    def test_post_with_blocks(self, render_blocks):
+        """_blocks が指定された場合は KFM フィールドをブロックごとに返す"""
+        params = dict(foo='foo', bar='bar', _blocks=dict(bar=['known']))
+        self.request.body = json.dumps(params).encode('utf-8')
+        render_blocks.return_value = [('known', None), ('new', '<p>new</p>')]
+        response = MagicMock()
+        response.render.return_value.content = (
+            b'<h1>foo</h1><p>kfmpreviewplaceholderbar</p>')
+        instance = self.instance
+        instance.model = Article
+        instance.kfm_fields = ('bar',)
+        instance.get_context_data = MagicMock(return_value={})
+        instance.render_to_response = MagicMock(return_value=response)
+        r = instance.post(self.request)
+        render_blocks.assert_called_with('bar', known=['known'])
+        self.assertEqual(json.loads(r.content.decode('utf-8')), dict(
+            html=('<h1>foo</h1>'
+                  '<div class="kfm-blocks" data-kfm-field="bar"></div>'),
+            fields=dict(bar=[dict(hash='known'),
+                             dict(hash='new', html='<p>new</p>')]),
+        ))
@@ -58,6 +58,17 @@ if PRODUCT:
         }
     }
 
+# 読み込み専用レプリカの設定
+# 開発時は `manage.py sync_sqlite_replicas` で db.sqlite3 をコピーすることで
+# レプリカへのルーティングを確認できる
+# if not PRODUCT:
+#     DATABASES['replica'] = {
+#         'ENGINE': 'django.db.backends.sqlite3',
+#         'NAME': os.path.join(REPOSITORY_ROOT, 'db.replica.sqlite3'),
+#         'TEST': {'MIRROR': 'default'},
+#     }
+#     KAWAZ_DATABASE_REPLICAS = ('replica',)
+
 # ログ関係の設定
 if PRODUCT:
     LOGGING = {
@@ -157,6 +168,10 @@ ACTIVITIES_DEFAULT_NOTIFIERS = (
 )
 
 # utils
+# 通知の URL はデフォルトで Kawaz 自身の短縮 URL（/s/<code>/）に短縮される
+# 外部 API を利用する場合のみ下記のようにバックエンドを指定する
+# KAWAZ_URL_SHORTENER_BACKEND = (
+#     'kawaz.core.utils.shortenurl.GoogleURLShortenerBackend')
 if PRODUCT:
     GOOGLE_URL_SHORTENER_API_KEY = ''
 
@@ -40,7 +40,6 @@ INSTALLED_APPS = (
     'crispy_forms',
     'compressor',
     'activities',
-    'slack_invitation',
     'google_calendar',
     'kawaz.core.management',
     'kawaz.core.db',
@@ -60,6 +59,7 @@ INSTALLED_APPS = (
     'kawaz.apps.products',
     'kawaz.apps.stars',
     'kawaz.apps.kfm',
+    'kawaz.apps.trendings',
 )
 
 # 利用しているミドルウェア
@@ -67,10 +67,18 @@ MIDDLEWARE_CLASSES = (
     'kawaz.core.middlewares.exception.UserBasedExceptionMiddleware',
     # UserBasedExceptionは例外を補足し詳細なエラーレポートを返すので先頭
     # で定義する必要がある（例外処理は応答フェーズなので逆順実行なため）
+    # 全てのミドルウェアのクエリを数えるため前方で定義（DEBUG 時のみ有効）
+    'kawaz.core.middlewares.nplusone.NPlusOneDetectionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    # 以降のミドルウェアでの読み込みもレプリカに振り分けられるよう前方で定義
+    'kawaz.core.middlewares.replica.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # スタッフによる ?_profile 付きのリクエストをプロファイルする
+    'kawaz.core.middlewares.profiling.SamplingProfilerMiddleware',
+    # 一部のリクエストのテンプレート・タグごとの描画時間を計測する
+    'kawaz.core.middlewares.rendertiming.RenderTimingMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -114,6 +122,46 @@ DATABASES = {
     }
 }
 
+# 読み込み専用レプリカへのルーティング
+# レプリカは DATABASES に定義し KAWAZ_DATABASE_REPLICAS にエイリアスを指定する
+# 開発時は `manage.py sync_sqlite_replicas` でコピーした SQLite をレプリカとして
+# 利用できる（local_settings.sample.py を参照）
+DATABASE_ROUTERS = ('kawaz.core.db.routers.ReplicaRouter',)
+KAWAZ_DATABASE_REPLICAS = ()
+KAWAZ_DATABASE_STICKY_TIMEOUT = 10
+KAWAZ_DATABASE_HEALTH_CHECK_INTERVAL = 30
+
+# 一覧ページ・管理画面の件数（kawaz.core.db.counts を参照）
+# この件数までは正確に数え、それより多い場合は統計情報による推定値か
+# KAWAZ_APPROXIMATE_COUNT_TIMEOUT 秒ごとに数え直した件数を用いる
+KAWAZ_APPROXIMATE_COUNT_THRESHOLD = 1000
+KAWAZ_APPROXIMATE_COUNT_TIMEOUT = 60 * 10
+
+# N+1 クエリの検出（kawaz.core.db.nplusone を参照）
+# DEBUG 時はリクエストごとに同じ形のクエリの発行回数を数え、閾値を超えた場合に
+# 警告する（テスト中は例外となりテストが失敗する）。意図的な繰り返しは発行元
+# （e.g. 'kawaz/apps/blogs/views.py:42'）か SQL の正規表現を許可リストに追加する
+KAWAZ_NPLUSONE_THRESHOLD = 10
+KAWAZ_NPLUSONE_ALLOWLIST = ()
+
+# サンプリングプロファイラ（kawaz.core.utils.profiling を参照）
+# スタッフは ?_profile=collapsed で collapsed stacks を、?_profile で管理画面
+# に保存されたレポートを取得できる。KAWAZ_PROFILING_SAMPLE_RATE を N とすると
+# N リクエストに一度の割合でプロファイルし、最新の
+# KAWAZ_PROFILING_BUFFER_SIZE 件のレポートを保存する（0 の場合は無効）
+KAWAZ_PROFILING_INTERVAL = 0.005
+KAWAZ_PROFILING_SAMPLE_RATE = 0
+KAWAZ_PROFILING_BUFFER_SIZE = 100
+
+# テンプレート・テンプレートタグごとの描画時間の計測
+# （kawaz.core.utils.rendertiming を参照）
+# N リクエストに一度の割合で計測しビューごとに集計する（0 の場合は無効）
+KAWAZ_RENDER_TIMING_SAMPLE_RATE = 0
+# 集計結果を N 秒ごとにビューごとの上位 KAWAZ_RENDER_TIMING_FLUSH_LIMIT 件
+# だけ kawaz.core.utils.rendertiming ロガーに書き出す（0 の場合は無効）
+KAWAZ_RENDER_TIMING_FLUSH_INTERVAL = 300
+KAWAZ_RENDER_TIMING_FLUSH_LIMIT = 10
+
 # キャッシュシステムの設定
 CACHES = {
     'default': {
@@ -209,7 +257,13 @@ if PRODUCT:
             'mail_admins': {
                 'level': 'ERROR',
                 'class': 'django.utils.log.AdminEmailHandler',
-            }
+            },
+            'render_timing': {
+                'level': 'INFO',
+                'class': 'logging.FileHandler',
+                'filename': os.path.join(LOG_BASE_DIR, 'org.kawaz.render_timing.log'),
+                'formatter': 'verbose'
+            },
         },
         'loggers': {
             'django.request': {
@@ -220,6 +274,11 @@ if PRODUCT:
             'kawaz.core.utils': {
                 'handlers': ['file',],
                 'level': 'ERROR',
+            },
+            'kawaz.core.utils.rendertiming': {
+                'handlers': ['render_timing',],
+                'level': 'INFO',
+                'propagate': False,
             }
         }
     }
@@ -238,8 +297,11 @@ THUMBNAIL_SIZE_PATTERNS = {
 # django-permission
 AUTHENTICATION_BACKENDS = (
     'django.contrib.auth.backends.ModelBackend',
-    'permission.backends.PermissionBackend',
+    'kawaz.core.utils.permission.PermissionBackend',
 )
+# django-permission のバックエンドを継承したものを利用するため、元の
+# バックエンドが指定されているかの確認は行わない
+PERMISSION_CHECK_AUTHENTICATION_BACKENDS = False
 # 指定されたパーミッションが存在するかどうかテストを行う
 PERMISSION_CHECK_PERMISSION_PRESENCE = True
 
@@ -284,6 +346,8 @@ ACTIVITIES_DEFAULT_NOTIFIERS = (
     'twitter_kawaz_info',
 )
 
+ACTIVITIES_HTTP_ADAPTER = 'kawaz.core.utils.transport.adapter'
+
 ACTIVITIES_TEMPLATE_EXTENSIONS = {
     'twitter': '.txt',
     'slack': '.txt',
@@ -367,6 +431,25 @@ MESSAGE_TAGS = {
     messages.ERROR: 'danger'
 }
 
+# アクティビティのポーリング API で最新のアクティビティをキャッシュする秒数
+# 全クライアントがこの間隔ごとに一度のクエリを共有する
+KAWAZ_ACTIVITY_POLLING_TTL = 5
+
+# トップページの「注目のコンテンツ」に用いるトレンドスコアの設定
+# スコアはスター・コメント・ダウンロードの重みを半減期（秒）で減衰させた総和
+KAWAZ_TRENDING_HALF_LIFE = 60 * 60 * 24
+KAWAZ_TRENDING_WEIGHTS = {
+    'star': 1.0,
+    'comment': 2.0,
+    'download': 1.0,
+}
+KAWAZ_TRENDING_MODELS = (
+    'blogs.entry',
+    'products.product',
+    'projects.project',
+    'events.event',
+)
+
 # 神、いわゆるゴッド
 GEEKDRUMS_NAME = 'clpsplug'
 
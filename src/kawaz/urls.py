@@ -23,6 +23,7 @@ urlpatterns = [
     url(r'^members/', include('kawaz.core.personas.urls')),
     url(r'^registration/', include('kawaz.core.registrations.urls')),
     url(r'^comments/', include('django_comments.urls')),
+    url(r'^s/', include('kawaz.core.utils.urls')),
     url(r'^__debug__/', include(debug_toolbar.urls)),
 ]
 
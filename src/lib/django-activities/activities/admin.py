@@ -5,6 +5,8 @@
 from django.contrib import admin
 from django.utils.translation import ugettext_lazy as _
 from .models import Activity
+from .models import ArchivedActivity
+from .models import InboxEntry
 
 
 class ActivityAdmin(admin.ModelAdmin):
@@ -30,3 +32,20 @@ class ActivityAdmin(admin.ModelAdmin):
     get_content_object.short_description = _('Content object')
 
 admin.site.register(Activity, ActivityAdmin)
+
+
+class ArchivedActivityAdmin(ActivityAdmin):
+    list_display = (
+        'pk', 'created_at', 'archived_at', 'status',
+        'get_content_object'
+    )
+
+admin.site.register(ArchivedActivity, ArchivedActivityAdmin)
+
+
+class InboxEntryAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'user', 'activity', 'read')
+    list_filter = ('read',)
+    raw_id_fields = ('user', 'activity')
+
+admin.site.register(InboxEntry, InboxEntryAdmin)
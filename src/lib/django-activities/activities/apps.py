@@ -7,6 +7,7 @@ from importlib import import_module
 from django.apps import AppConfig
 from django.core.exceptions import ImproperlyConfigured
 from .conf import settings
+from .notifiers.base import LazyActivityNotifier
 from .notifiers.registry import registry as notifier_registry
 
 
@@ -52,5 +53,10 @@ class ActivitiesConfig(AppConfig):
                 name = None
                 path = notifier
                 args = []
-            cls = get_class(path)
-            notifier_registry.register(cls(*args), name, overwrite=True)
+            if name:
+                # named notifiers are imported on first use. unnamed ones
+                # are registered by their class thus have to be imported
+                notifier = LazyActivityNotifier(path, *args)
+            else:
+                notifier = get_class(path)(*args)
+            notifier_registry.register(notifier, name, overwrite=True)
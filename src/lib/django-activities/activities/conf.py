@@ -19,3 +19,29 @@ class ActivitiesAppConf(AppConf):
     DEFAULT_NOTIFIERS = ()
     ENABLE_NOTIFICATION = True
     ENABLE_OAUTH_NOTIFICATION = False
+
+    # A dotted path to a `requests` transport adapter instance which is
+    # mounted to sessions of OAuth notifiers (e.g. to share connection pools
+    # and enforce timeouts). The default adapter of `requests` is used if None
+    HTTP_ADAPTER = None
+
+    # Activities older than this number of days are moved into the archive
+    # table by `archive_activities` command (the latest activity of each
+    # object is kept in the hot table)
+    ARCHIVE_AFTER = 180
+    # Number of activities moved in a single transaction
+    ARCHIVE_BATCH_SIZE = 500
+
+    # Snapshots are stored as deltas against a keyframe snapshot of the same
+    # object and a new keyframe is stored every this number of activities.
+    # Set 0 to disable delta encoding
+    SNAPSHOT_KEYFRAME_INTERVAL = 10
+
+    # Deliver activities into inboxes of users returned by
+    # `ActivityMediator.get_recipients` when activities are created
+    # (fan-out on write)
+    ENABLE_INBOX = True
+    # Number of inbox entries kept for each user. Older entries are removed
+    # when the inbox exceeds this number by INBOX_TRIM_THRESHOLD entries
+    INBOX_RETENTION = 200
+    INBOX_TRIM_THRESHOLD = 20
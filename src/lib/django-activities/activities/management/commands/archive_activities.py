@@ -0,0 +1,42 @@
+# coding=utf-8
+"""
+Move old activities into the archive table
+"""
+
+import datetime
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from activities.conf import settings
+from activities.models import Activity
+
+
+class Command(BaseCommand):
+    help = (
+        "Move activities older than ACTIVITIES_ARCHIVE_AFTER days into the "
+        "archive table. The latest activity of each object is kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ACTIVITIES_ARCHIVE_AFTER,
+            help="Archive activities older than this number of days "
+                 "(default: %(default)s)")
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.ACTIVITIES_ARCHIVE_BATCH_SIZE,
+            help="Number of activities moved in a single transaction "
+                 "(default: %(default)s)")
+        parser.add_argument(
+            '--dry-run', action='store_true', default=False,
+            help="Only report the number of archivable activities")
+
+    def handle(self, *args, **options):
+        before = timezone.now() - datetime.timedelta(days=options['days'])
+        if options['dry_run']:
+            count = Activity.objects.archivables(before).count()
+            self.stdout.write(
+                "{} activities would be archived.".format(count))
+            return
+        count = Activity.objects.archive(before,
+                                         batch_size=options['batch_size'])
+        self.stdout.write("{} activities were archived.".format(count))
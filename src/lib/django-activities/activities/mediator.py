@@ -11,6 +11,7 @@ from django.db.models.signals import (post_save,
 from django.contrib.contenttypes.models import ContentType
 from .conf import settings
 from .models import Activity
+from .models import InboxEntry
 from .notifiers.registry import registry as notifier_registry
 
 
@@ -129,6 +130,9 @@ class ActivityMediator(object):
             )
             # save the activity into the database
             activity.save()
+            # deliver the activity into inboxes of recipients
+            if settings.ACTIVITIES_ENABLE_INBOX:
+                InboxEntry.objects.deliver(activity)
             # notify
             if settings.ACTIVITIES_ENABLE_NOTIFICATION:
                 for notifier in self.get_notifiers():
@@ -218,6 +222,26 @@ class ActivityMediator(object):
         """
         return activity
 
+    def get_recipients(self, activity):
+        """
+        Return users (or primary keys of users) whose inbox the activity is
+        delivered into. Users can override this method to deliver activities
+        of the model to related users. No user is returned in default.
+
+        Note:
+            The mediator of the model of the activity is used thus this
+            method may receive activities created by other mediators (e.g.
+            an activity of a comment which is translated into an activity of
+            the commented object).
+
+        Args:
+            activity (instance): A saved instance of an Activity model
+
+        Returns:
+            An iterable of users or primary keys of users
+        """
+        return ()
+
     def prepare_snapshot(self, instance, activity, **kwargs):
         """
         Prepare snapshot which automatically saved to the activity instance
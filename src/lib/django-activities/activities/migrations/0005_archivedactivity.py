@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0001_initial'),
+        ('activities', '0004_auto_20161002_2154'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedActivity',
+            fields=[
+                ('status', models.CharField(max_length=30)),
+                ('remarks', models.TextField(default='')),
+                ('object_id', models.PositiveIntegerField(verbose_name='Object ID')),
+                ('_snapshot', models.BinaryField(default=None, null=True)),
+                ('id', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType')),
+            ],
+            options={
+                'verbose_name': 'Archived activity',
+                'verbose_name_plural': 'Archived activities',
+                'ordering': ('-pk',),
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('activities', '0005_archivedactivity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Inbox',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='activity_inbox', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total', models.IntegerField(default=0)),
+                ('unread', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Inbox',
+                'verbose_name_plural': 'Inboxes',
+            },
+        ),
+        migrations.CreateModel(
+            name='InboxEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read', models.BooleanField(default=False)),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_entries', to='activities.Activity')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_inbox_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Inbox entry',
+                'verbose_name_plural': 'Inbox entries',
+                'ordering': ('-pk',),
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='inboxentry',
+            index_together=set([('user', 'id')]),
+        ),
+    ]
@@ -2,16 +2,25 @@
 """
 """
 
+import zlib
 import pickle
+import datetime
+from itertools import chain
 from django.db import models
-from django.db.models import Max
+from django.db import transaction
+from django.db.models.signals import pre_delete, post_delete
+from django.db.models import F, Max, Sum, Count, Case, When, IntegerField
+from django.utils import timezone
 from django.core import serializers
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.utils.translation import ugettext as _
+from .conf import settings
+from . import snapshots
 
 
 SNAPSHOT_CACHE_NAME = '_snapshot_cached'
+PREVIOUS_CACHE_NAME = '_previous_cached'
 
 
 class ActivityManager(models.Manager):
@@ -30,12 +39,8 @@ class ActivityManager(models.Manager):
         # it use 'pk' instead of 'created_at' to filter latest while
         #   - more than two activities which has same 'created_at' is possible
         #   - newer activity have grater pk
-        qs = super().get_queryset()
-        qs = qs.values('content_type_id', 'object_id')
-        qs = qs.annotate(pk=Max('pk'))
-        pks = qs.values_list('pk', flat=True)
         # return activities corresponding to the latests
-        return self.filter(pk__in=pks)
+        return self.filter(pk__in=self._get_latest_pks())
 
     def get_for_model(self, model):
         """
@@ -51,11 +56,156 @@ class ActivityManager(models.Manager):
         ct = ContentType.objects.get_for_model(obj)
         return self.filter(content_type=ct, object_id=obj.pk)
 
+    def _get_latest_pks(self):
+        # the default ordering (created_at) must be cleared, otherwise it is
+        # added to GROUP BY and older activities are treated as the latests
+        qs = super().get_queryset().order_by()
+        qs = qs.values('content_type_id', 'object_id')
+        qs = qs.annotate(pk=Max('pk'))
+        return qs.values_list('pk', flat=True)
+
+    def _get_archive_before(self, before=None):
+        if before is None:
+            before = timezone.now() - datetime.timedelta(
+                days=settings.ACTIVITIES_ARCHIVE_AFTER)
+        return before
+
+    def archivables(self, before=None):
+        """
+        Return activities which should be moved into the archive table.
+
+        Activities created before `before` (default: `ACTIVITIES_ARCHIVE_AFTER`
+        days ago) are archivable except the latest activity of each particular
+        content_objects which is required by `latests()`.
+        """
+        before = self._get_archive_before(before)
+        qs = super().get_queryset()
+        qs = qs.filter(created_at__lt=before)
+        qs = qs.exclude(pk__in=self._get_latest_pks())
+        return qs.order_by('pk')
 
-class Activity(models.Model):
+    def archive(self, before=None, batch_size=None):
+        """
+        Move archivable activities into the archive table and return the
+        number of archived activities.
+
+        Activities are moved in batches of `batch_size` (default:
+        `ACTIVITIES_ARCHIVE_BATCH_SIZE`) and each batch is moved in a single
+        transaction so the activity never disappears from both tables.
+        """
+        batch_size = batch_size or settings.ACTIVITIES_ARCHIVE_BATCH_SIZE
+        before = self._get_archive_before(before)
+        # the latest activities are computed once (instead of grouping the
+        # whole table per batch). activities created while archiving only
+        # make them older, thus the stale set never archives a latest one
+        latests = set(self._get_latest_pks())
+        qs = super().get_queryset().filter(created_at__lt=before)
+        qs = qs.order_by('pk')
+        archived = 0
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                candidates = list(qs.filter(pk__gt=last_pk)[:batch_size])
+                if not candidates:
+                    break
+                last_pk = candidates[-1].pk
+                batch = [activity for activity in candidates
+                         if activity.pk not in latests]
+                if not batch:
+                    continue
+                ArchivedActivity.objects.bulk_create([
+                    ArchivedActivity.from_activity(activity)
+                    for activity in batch
+                ])
+                pks = [activity.pk for activity in batch]
+                # keep unread counters of inboxes consistent
+                InboxEntry.objects.discard(
+                    InboxEntry.objects.filter(activity__in=pks))
+                # the pk is kept in the archive table thus snapshots which
+                # refer the moved activities do not have to be re-based
+                with snapshots.moving():
+                    super().get_queryset().filter(pk__in=pks).delete()
+            archived += len(batch)
+        return archived
+
+
+class ChainedActivities(object):
     """
-    A model wihch represent create/update/delete (and user specified status
-    changes) activity of specified models
+    A read only sequence of related activities in the hot table followed by
+    those in the archive table.
+
+    Activities in the archive table are always older than any related
+    activities in the hot table thus chaining keeps the order. Only the
+    subset of the queryset API used for related activities is provided.
+    """
+    def __init__(self, *querysets):
+        self.querysets = querysets
+        self._result_cache = None
+
+    def _fetch_all(self):
+        if self._result_cache is None:
+            self._result_cache = list(chain.from_iterable(self.querysets))
+        return self._result_cache
+
+    def __iter__(self):
+        return iter(self._fetch_all())
+
+    def __len__(self):
+        return len(self._fetch_all())
+
+    def __bool__(self):
+        return bool(self._fetch_all())
+
+    def __getitem__(self, k):
+        return self._fetch_all()[k]
+
+    def __repr__(self):
+        return '<ChainedActivities: {!r}>'.format(self._fetch_all())
+
+    def count(self):
+        if self._result_cache is not None:
+            return len(self._result_cache)
+        return sum(qs.count() for qs in self.querysets)
+
+    def exists(self):
+        if self._result_cache is not None:
+            return bool(self._result_cache)
+        return any(qs.exists() for qs in self.querysets)
+
+    def first(self):
+        for qs in self.querysets:
+            obj = qs.first()
+            if obj is not None:
+                return obj
+        return None
+
+    def filter(self, *args, **kwargs):
+        return ChainedActivities(*(qs.filter(*args, **kwargs)
+                                   for qs in self.querysets))
+
+    def exclude(self, *args, **kwargs):
+        return ChainedActivities(*(qs.exclude(*args, **kwargs)
+                                   for qs in self.querysets))
+
+
+class ArchivedActivityManager(ActivityManager):
+
+    def latests(self):
+        raise NotImplementedError(
+            "Archived activities never contain the latest activities. "
+            "Use Activity.objects.latests() instead."
+        )
+
+    def archivables(self, before=None):
+        return self.none()
+
+    def archive(self, before=None, batch_size=None):
+        return 0
+
+
+class BaseActivity(models.Model):
+    """
+    An abstract model which is shared by `Activity` and `ArchivedActivity`
     """
     status = models.CharField(max_length=30)
     remarks = models.TextField(default='')
@@ -65,14 +215,8 @@ class Activity(models.Model):
     _snapshot = models.BinaryField(default=None, null=True)
     _content_object = GenericForeignKey()
 
-    created_at = models.DateTimeField(auto_now_add=True)
-
-    objects = ActivityManager()
-
     class Meta:
-        ordering = ('-created_at',)
-        verbose_name = _('Activity')
-        verbose_name_plural = _('Activities')
+        abstract = True
 
     def __repr__(self):
         return "<Activity: {}:{}:{}>".format(self.content_type.model,
@@ -92,7 +236,9 @@ class Activity(models.Model):
         if not hasattr(self, SNAPSHOT_CACHE_NAME):
             snapshot = None
             if self._snapshot:
-                serialized_obj = pickle.loads(self._snapshot)
+                serialized_obj = snapshots.reconstruct(
+                    pickle.loads(self.decode_snapshot())
+                )
                 if serialized_obj and isinstance(serialized_obj, dict):
                     snapshot = self.mediator.deserialize_snapshot(
                         serialized_obj
@@ -109,7 +255,11 @@ class Activity(models.Model):
         """
         if value:
             serialized_obj = self.mediator.serialize_snapshot(value)
-            snapshot = pickle.dumps(serialized_obj)
+            if not self.pk:
+                # store only the difference from the previous snapshot
+                serialized_obj = snapshots.encode(serialized_obj,
+                                                  self.previous)
+            snapshot = self.encode_snapshot(pickle.dumps(serialized_obj))
         else:
             snapshot = None
         self._snapshot = snapshot
@@ -117,6 +267,31 @@ class Activity(models.Model):
         if hasattr(self, SNAPSHOT_CACHE_NAME):
             delattr(self, SNAPSHOT_CACHE_NAME)
 
+    def save(self, *args, **kwargs):
+        created = self.pk is None
+        super().save(*args, **kwargs)
+        snapshots.raw_snapshot_cache.invalidate(self.pk)
+        if created:
+            # querysets cached before saving do not exclude the activity
+            # itself (`previous` is still valid while the activity is the
+            # newest one)
+            for cache_name in ('_related_cache',
+                               '_previous_activities_cache'):
+                if hasattr(self, cache_name):
+                    delattr(self, cache_name)
+
+    def encode_snapshot(self, value):
+        """
+        Encode a pickled snapshot before it is stored into database
+        """
+        return value
+
+    def decode_snapshot(self):
+        """
+        Decode a stored snapshot into a pickled snapshot
+        """
+        return self._snapshot
+
     @property
     def previous(self):
         """
@@ -127,24 +302,41 @@ class Activity(models.Model):
             qs = activity.get_previous_activities()
             previous = qs.first()
 
+        The result is cached in the instance while the property is used
+        several times in a single activity template.
         """
-        qs = self.get_previous_activities()
-        return qs.first()
+        if not hasattr(self, PREVIOUS_CACHE_NAME):
+            qs = self.get_previous_activities()
+            setattr(self, PREVIOUS_CACHE_NAME, qs.first())
+        return getattr(self, PREVIOUS_CACHE_NAME)
+
+    def _get_related_querysets(self):
+        """
+        Return querysets of activities which have same content_type and
+        object_id as this activity instance in the hot and the archive table
+        """
+        lookup = dict(content_type=self.content_type,
+                      object_id=self.object_id)
+        qs = Activity.objects.filter(**lookup)
+        archived = ArchivedActivity.objects.filter(**lookup)
+        if self.pk:
+            qs = qs.exclude(pk=self.pk)
+            archived = archived.exclude(pk=self.pk)
+        return qs, archived
 
     def get_related_activities(self):
         """
         Get a queryset of activities which have same content_type and object_id
         as this activity instance except the activity itself.
+        Archived activities follow the activities in the hot table (see
+        `ChainedActivities`).
         Note that the queryset is cached in the instance thus you may need to
         re-get the instance from a database to update the cache.
         """
         cache_name = '_related_cache'
         if not hasattr(self, cache_name):
-            qs = Activity.objects.filter(content_type=self.content_type,
-                                         object_id=self.object_id)
-            if self.pk:
-                qs = qs.exclude(pk=self.pk)
-            setattr(self, cache_name, qs)
+            qs, archived = self._get_related_querysets()
+            setattr(self, cache_name, ChainedActivities(qs, archived))
         return getattr(self, cache_name)
 
     def get_previous_activities(self):
@@ -153,10 +345,14 @@ class Activity(models.Model):
         by `get_related_activities` method but only older activities are
         contained.
         """
-        qs = self.get_related_activities()
-        if self.pk:
-            qs = qs.exclude(pk__gte=self.pk)
-        return qs
+        cache_name = '_previous_activities_cache'
+        if not hasattr(self, cache_name):
+            qs, archived = self._get_related_querysets()
+            if self.pk:
+                qs = qs.exclude(pk__gte=self.pk)
+                archived = archived.exclude(pk__gte=self.pk)
+            setattr(self, cache_name, ChainedActivities(qs, archived))
+        return getattr(self, cache_name)
 
     def get_next_activities(self):
         """
@@ -168,3 +364,227 @@ class Activity(models.Model):
         if self.pk:
             qs = qs.exclude(pk__lte=self.pk)
         return qs
+
+
+class Activity(BaseActivity):
+    """
+    A model wihch represent create/update/delete (and user specified status
+    changes) activity of specified models
+    """
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ActivityManager()
+
+    class Meta:
+        ordering = ('-created_at',)
+        verbose_name = _('Activity')
+        verbose_name_plural = _('Activities')
+
+
+class ArchivedActivity(BaseActivity):
+    """
+    An activity which was moved from the hot table by `archive_activities`
+    command. The primary key of the original activity is kept and the
+    snapshot is stored compressed.
+    """
+    id = models.PositiveIntegerField(primary_key=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ArchivedActivityManager()
+
+    class Meta:
+        # archived activities of an object usually share almost same
+        # created_at thus use the original pk to keep the order
+        ordering = ('-pk',)
+        verbose_name = _('Archived activity')
+        verbose_name_plural = _('Archived activities')
+
+    @classmethod
+    def from_activity(cls, activity):
+        """
+        Create (unsaved) archived activity from the activity
+        """
+        snapshot = activity._snapshot
+        if snapshot:
+            snapshot = zlib.compress(bytes(snapshot))
+        return cls(id=activity.pk,
+                   status=activity.status,
+                   remarks=activity.remarks,
+                   content_type_id=activity.content_type_id,
+                   object_id=activity.object_id,
+                   _snapshot=snapshot,
+                   created_at=activity.created_at)
+
+    def encode_snapshot(self, value):
+        return zlib.compress(value)
+
+    def decode_snapshot(self):
+        return zlib.decompress(bytes(self._snapshot))
+
+
+class InboxManager(models.Manager):
+
+    def get_unread_count(self, user):
+        """
+        Return the number of unread entries in the inbox of the user
+        """
+        counts = self.filter(user=user).values_list('unread', flat=True)
+        return next(iter(counts), 0)
+
+    def increment(self, user_ids, total=1, unread=1):
+        """
+        Increment counters of inboxes of the users (inboxes are created if
+        they do not exist yet)
+        """
+        user_ids = set(user_ids)
+        existing = set(self.filter(user_id__in=user_ids).values_list(
+            'user_id', flat=True))
+        for user_id in user_ids - existing:
+            self.get_or_create(user_id=user_id)
+        self.filter(user_id__in=user_ids).update(
+            total=F('total') + total,
+            unread=F('unread') + unread,
+        )
+
+
+class Inbox(models.Model):
+    """
+    Counters of the activity inbox of a user. The counters are updated
+    together with inbox entries thus the number of unread entries can be
+    displayed without counting entries.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL,
+                                primary_key=True,
+                                related_name='activity_inbox')
+    total = models.IntegerField(default=0)
+    unread = models.IntegerField(default=0)
+
+    objects = InboxManager()
+
+    class Meta:
+        verbose_name = _('Inbox')
+        verbose_name_plural = _('Inboxes')
+
+
+class InboxEntryManager(models.Manager):
+
+    def for_user(self, user):
+        """
+        Return entries in the inbox of the user from newer ones
+        """
+        qs = self.filter(user=user).order_by('-pk')
+        return qs.select_related('activity', 'activity__content_type')
+
+    def deliver(self, activity, users=None):
+        """
+        Deliver the activity into inboxes of the users and return the number
+        of delivered entries.
+
+        Users returned by `get_recipients` method of the mediator of the
+        activity are used when `users` is not specified.
+        Inboxes exceeding `ACTIVITIES_INBOX_RETENTION` by
+        `ACTIVITIES_INBOX_TRIM_THRESHOLD` entries are trimmed.
+        """
+        if users is None:
+            try:
+                users = activity.mediator.get_recipients(activity)
+            except KeyError:
+                # the model of the activity is not registered
+                return 0
+        user_ids = {getattr(user, 'pk', user) for user in users or ()}
+        user_ids.discard(None)
+        if not user_ids:
+            return 0
+        with transaction.atomic():
+            self.bulk_create([
+                self.model(user_id=user_id, activity=activity)
+                for user_id in user_ids
+            ])
+            Inbox.objects.increment(user_ids)
+        limit = (settings.ACTIVITIES_INBOX_RETENTION +
+                 settings.ACTIVITIES_INBOX_TRIM_THRESHOLD)
+        for user_id in Inbox.objects.filter(
+                user_id__in=user_ids, total__gt=limit).values_list(
+                    'user_id', flat=True):
+            self.trim(user_id)
+        return len(user_ids)
+
+    def discard(self, queryset):
+        """
+        Delete entries in the queryset and update counters of the inboxes
+        """
+        counts = queryset.order_by().values('user_id').annotate(
+            total=Count('pk'),
+            unread=Sum(Case(When(read=False, then=1), default=0,
+                            output_field=IntegerField())),
+        )
+        counts = list(counts)
+        with transaction.atomic():
+            queryset.delete()
+            for count in counts:
+                Inbox.objects.filter(user_id=count['user_id']).update(
+                    total=F('total') - count['total'],
+                    unread=F('unread') - (count['unread'] or 0),
+                )
+
+    def trim(self, user_id, retention=None):
+        """
+        Remove entries older than the latest `retention` (default:
+        `ACTIVITIES_INBOX_RETENTION`) entries from the inbox of the user
+        """
+        if retention is None:
+            retention = settings.ACTIVITIES_INBOX_RETENTION
+        qs = self.filter(user_id=user_id)
+        pks = qs.order_by('-pk').values_list('pk', flat=True)
+        oldest = next(iter(pks[retention - 1:retention]), None)
+        if oldest is not None:
+            self.discard(qs.filter(pk__lt=oldest))
+
+    def mark_as_read(self, user, pks=None):
+        """
+        Mark entries (all entries if `pks` is not specified) in the inbox of
+        the user as read and return the number of marked entries
+        """
+        qs = self.filter(user=user, read=False)
+        if pks is not None:
+            qs = qs.filter(pk__in=pks)
+        with transaction.atomic():
+            count = qs.update(read=True)
+            if count:
+                Inbox.objects.filter(user=user).update(
+                    unread=F('unread') - count)
+        return count
+
+
+class InboxEntry(models.Model):
+    """
+    An activity delivered into the inbox of a user
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             related_name='activity_inbox_entries')
+    activity = models.ForeignKey(Activity, related_name='inbox_entries')
+    read = models.BooleanField(default=False)
+
+    objects = InboxEntryManager()
+
+    class Meta:
+        ordering = ('-pk',)
+        # entries are always read per user from newer ones
+        index_together = (('user', 'id'),)
+        verbose_name = _('Inbox entry')
+        verbose_name_plural = _('Inbox entries')
+
+
+def _collect_snapshot_dependents(sender, instance, **kwargs):
+    instance._snapshot_dependents = snapshots.collect_dependents(instance)
+
+
+def _rebase_snapshot_dependents(sender, instance, **kwargs):
+    collected = getattr(instance, '_snapshot_dependents', None)
+    snapshots.rebase_dependents(instance, collected)
+
+
+for model in (Activity, ArchivedActivity):
+    pre_delete.connect(_collect_snapshot_dependents, sender=model)
+    post_delete.connect(_rebase_snapshot_dependents, sender=model)
@@ -1,2 +1,4 @@
-from .oauth.base import OAuth1ActivityNotifier
-from .oauth.twitter import TwitterActivityNotifier
+# the notifiers depend on heavy third party libraries (e.g.
+# `requests_oauthlib`) and this package is imported on boot by
+# `ActivitiesConfig` thus import them from the submodules, e.g.
+# `activities.notifiers.oauth.twitter.TwitterActivityNotifier`
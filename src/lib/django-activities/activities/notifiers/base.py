@@ -52,3 +52,49 @@ class ActivityNotifierBase(object):
         raise NotImplementedError(
             "Subclass of ActivityNotifierBase must override 'send' method"
         )
+
+
+class LazyActivityNotifier(ActivityNotifierBase):
+    """
+    A proxy of activity notifier which imports and instantiates the actual
+    notifier class on first use.
+
+    Notifiers often depend on heavy third party libraries (e.g.
+    `requests_oauthlib`) thus importing them in `AppConfig.ready` makes every
+    process (including management commands) pay the import cost even if it
+    never notifies anything.
+    """
+    def __init__(self, path, *args):
+        self.path = path
+        self.args = args
+        self._notifier = None
+
+    @property
+    def notifier(self):
+        if self._notifier is None:
+            from ..apps import get_class
+            self._notifier = get_class(self.path)(*self.args)
+        return self._notifier
+
+    @property
+    def enable(self):
+        return self.notifier.enable
+
+    @property
+    def typename(self):
+        return self.notifier.typename
+
+    def get_typename(self):
+        return self.notifier.get_typename()
+
+    def render(self, activity, context, typename=None):
+        return self.notifier.render(activity, context, typename)
+
+    def notify(self, activity, context=None, typename=None):
+        return self.notifier.notify(activity, context, typename)
+
+    def send(self, rendered_content):
+        return self.notifier.send(rendered_content)
+
+    def __repr__(self):
+        return '<LazyActivityNotifier: {}>'.format(self.path)
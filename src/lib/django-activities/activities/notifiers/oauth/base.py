@@ -57,6 +57,14 @@ class OAuth1ActivityNotifier(ActivityNotifierBase):
             params = dict(params)
             params.update(credentials)
             self.oauth_session = OAuth1Session(**params)
+            adapter = getattr(settings, 'ACTIVITIES_HTTP_ADAPTER', None)
+            if adapter:
+                if isinstance(adapter, str):
+                    # apps imports notifiers thus import it lazily
+                    from ...apps import get_class
+                    adapter = get_class(adapter)
+                self.oauth_session.mount('http://', adapter)
+                self.oauth_session.mount('https://', adapter)
 
     @tolerate
     def send(self, rendered_content):
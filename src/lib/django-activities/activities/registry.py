@@ -2,7 +2,7 @@
 from django.db.models import Model
 from django.contrib.contenttypes.models import ContentType
 from .mediator import ActivityMediator
-from .models import Activity
+from .models import BaseActivity
 
 
 class Registry(object):
@@ -52,7 +52,7 @@ class Registry(object):
         Get connected activity mediator of a model which the model connected
         or the activity has
         """
-        if isinstance(model_or_activity, Activity):
+        if isinstance(model_or_activity, BaseActivity):
             model_or_activity = model_or_activity.content_type.model_class()
         elif isinstance(model_or_activity, Model):
             model_or_activity = model_or_activity.__class__
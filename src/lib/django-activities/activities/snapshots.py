@@ -0,0 +1,310 @@
+# coding=utf-8
+"""
+Delta encoding of serialized snapshots
+
+A serialized snapshot (a dictionary returned by
+`ActivityMediator.serialize_snapshot`) is stored in one of the following forms
+
+keyframe:
+    The serialized snapshot itself.
+delta:
+    A dictionary which only contains `fields`/`extra_fields` changed from the
+    keyframe activity of the same object. The keyframe is referred by
+    `__keyframe__` (pk of the keyframe activity).
+reference:
+    A dictionary which only contains `__ref__` (pk of the previous activity)
+    which is used when the snapshot is identical to the snapshot of the
+    previous activity (deduplication).
+
+Deltas are always computed against the keyframe (not against the previous
+delta) thus reconstruction requires at most three rows (reference -> delta ->
+keyframe) regardless of the number of activities. A new keyframe is written
+every `ACTIVITIES_SNAPSHOT_KEYFRAME_INTERVAL` deltas.
+
+When an activity is deleted, snapshots of the later activities which depend
+on it (a delta of a deleted keyframe or a reference of a deleted activity)
+are re-based; the first of them is rewritten as a new keyframe and the others
+are re-encoded against it (see `collect_dependents` and `rebase_dependents`).
+"""
+
+import pickle
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+from .conf import settings
+
+
+KEYFRAME = '__keyframe__'
+REFERENCE = '__ref__'
+DEPTH = '__depth__'
+REMOVED = '__removed__'
+DELTA_KEYS = ('fields', 'extra_fields')
+
+
+def is_keyframe(data):
+    return (isinstance(data, dict) and
+            KEYFRAME not in data and REFERENCE not in data)
+
+
+class RawSnapshotCache(object):
+    """
+    A small in-process LRU cache of raw (pickled) snapshots keyed by pk.
+
+    Keyframes are shared by many activities thus caching them makes
+    reconstruction of `activity.snapshot` cost (almost) no extra query.
+    Entries are invalidated when an activity is saved (see
+    `BaseActivity.save`).
+    """
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+
+    def get(self, pk):
+        with self._lock:
+            if pk not in self._cache:
+                raise KeyError(pk)
+            self._cache.move_to_end(pk)
+            return self._cache[pk]
+
+    def set(self, pk, raw):
+        with self._lock:
+            self._cache[pk] = raw
+            self._cache.move_to_end(pk)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def invalidate(self, pk):
+        with self._lock:
+            self._cache.pop(pk, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+raw_snapshot_cache = RawSnapshotCache()
+
+
+def _load_raw(pk):
+    """
+    Load a raw (pickled) snapshot of the activity from the hot or the archive
+    table
+    """
+    from .models import Activity, ArchivedActivity
+    try:
+        return raw_snapshot_cache.get(pk)
+    except KeyError:
+        pass
+    raw = None
+    for model in (Activity, ArchivedActivity):
+        # the default manager prefetches content_type which is not required
+        qs = model.objects.filter(pk=pk).prefetch_related(None)
+        activity = qs.only('_snapshot').first()
+        if activity is not None:
+            if activity._snapshot:
+                raw = activity.decode_snapshot()
+            break
+    raw_snapshot_cache.set(pk, raw)
+    return raw
+
+
+def load(pk):
+    """
+    Load a stored (possibly delta encoded) snapshot of the activity
+    """
+    raw = _load_raw(pk)
+    return pickle.loads(raw) if raw else None
+
+
+def reconstruct(data):
+    """
+    Reconstruct a serialized snapshot from stored data
+    """
+    if not isinstance(data, dict):
+        return data
+    if REFERENCE in data:
+        data = load(data[REFERENCE])
+        if not isinstance(data, dict) or REFERENCE in data:
+            # references always point an activity which is not a reference
+            return data
+    if KEYFRAME not in data:
+        return data
+    keyframe = load(data[KEYFRAME])
+    if not is_keyframe(keyframe):
+        return None
+    serialized = dict(keyframe)
+    for key in ('pk', 'model', 'version'):
+        if key in data:
+            serialized[key] = data[key]
+    removed = data.get(REMOVED, {})
+    for key in DELTA_KEYS:
+        values = dict(keyframe.get(key) or {})
+        values.update(data.get(key, {}))
+        for name in removed.get(key, ()):
+            values.pop(name, None)
+        serialized[key] = values
+    return serialized
+
+
+def _diff(base, serialized):
+    delta = {}
+    removed = {}
+    for key in DELTA_KEYS:
+        old = base.get(key) or {}
+        new = serialized.get(key) or {}
+        delta[key] = {name: value for name, value in new.items()
+                      if name not in old or old[name] != value}
+        names = [name for name in old if name not in new]
+        if names:
+            removed[key] = names
+    if removed:
+        delta[REMOVED] = removed
+    for key in ('pk', 'model', 'version'):
+        if base.get(key) != serialized.get(key):
+            delta[key] = serialized.get(key)
+    return delta
+
+
+def encode(serialized, previous):
+    """
+    Encode a serialized snapshot against the previous activity of the same
+    object
+
+    Args:
+        serialized (dict): A serialized snapshot
+        previous (activity): The previous activity or None
+
+    Returns:
+        A dictionary which should be pickled into the activity
+    """
+    if not isinstance(serialized, dict) or previous is None:
+        return serialized
+    if not previous.pk or not previous._snapshot:
+        return serialized
+    stored = pickle.loads(previous.decode_snapshot())
+    if not isinstance(stored, dict):
+        # legacy snapshot (a pickled model instance)
+        return serialized
+    if REFERENCE in stored:
+        previous_pk = stored[REFERENCE]
+        stored = load(previous_pk)
+    else:
+        previous_pk = previous.pk
+    if not isinstance(stored, dict) or REFERENCE in stored:
+        return serialized
+    if reconstruct(stored) == serialized:
+        return {REFERENCE: previous_pk}
+    if KEYFRAME in stored:
+        keyframe_pk = stored[KEYFRAME]
+        depth = stored.get(DEPTH, 0) + 1
+        keyframe = load(keyframe_pk)
+    else:
+        keyframe_pk = previous_pk
+        depth = 1
+        keyframe = stored
+    interval = settings.ACTIVITIES_SNAPSHOT_KEYFRAME_INTERVAL
+    if not is_keyframe(keyframe) or not interval or depth >= interval:
+        return serialized
+    delta = _diff(keyframe, serialized)
+    delta[KEYFRAME] = keyframe_pk
+    delta[DEPTH] = depth
+    return delta
+
+
+_local = threading.local()
+
+
+@contextmanager
+def moving():
+    """
+    A context manager which disables re-basing while activities deleted in
+    the block are moved into another table with the same pk (e.g. archiving)
+    """
+    previous = getattr(_local, 'moving', False)
+    _local.moving = True
+    try:
+        yield
+    finally:
+        _local.moving = previous
+
+
+def _get_later_activities(activity):
+    from .models import Activity, ArchivedActivity
+    lookup = dict(content_type_id=activity.content_type_id,
+                  object_id=activity.object_id,
+                  pk__gt=activity.pk)
+    activities = []
+    for model in (Activity, ArchivedActivity):
+        qs = model.objects.filter(**lookup).exclude(_snapshot=None)
+        activities.extend(qs.only('_snapshot').order_by())
+    activities.sort(key=lambda activity: activity.pk)
+    return activities
+
+
+def collect_dependents(activity):
+    """
+    Reconstruct snapshots of the later activities of the same object before
+    the activity is deleted (called on `pre_delete`)
+
+    Returns:
+        A dictionary of reconstructed snapshots keyed by pk (or None when
+        there is nothing to re-base)
+    """
+    if getattr(_local, 'moving', False) or not activity.pk:
+        return None
+    collected = {}
+    for later in _get_later_activities(activity):
+        data = pickle.loads(later.decode_snapshot())
+        if isinstance(data, dict):
+            collected[later.pk] = reconstruct(data)
+    return collected or None
+
+
+def rebase_dependents(activity, collected):
+    """
+    Rewrite snapshots which referred the deleted activity (called on
+    `post_delete` with the result of `collect_dependents`)
+
+    Returns:
+        A list of pk of the rewritten activities
+    """
+    raw_snapshot_cache.invalidate(activity.pk)
+    if not collected:
+        return []
+    survivors = [later for later in _get_later_activities(activity)
+                 if later.pk in collected]
+    alive = {later.pk for later in survivors}
+    interval = settings.ACTIVITIES_SNAPSHOT_KEYFRAME_INTERVAL
+    # (pk, serialized snapshot, depth) of the new keyframe
+    base = None
+    rewritten = []
+    for later in survivors:
+        stored = pickle.loads(later.decode_snapshot())
+        if not isinstance(stored, dict):
+            continue
+        target = stored.get(REFERENCE, stored.get(KEYFRAME))
+        if target is None or target in alive or target < activity.pk:
+            # keyframes and snapshots whose base still exists are kept as
+            # they are
+            continue
+        serialized = collected[later.pk]
+        if not isinstance(serialized, dict):
+            continue
+        if base is None or not interval or base[2] + 1 >= interval:
+            data = serialized
+            base = (later.pk, serialized, 0)
+        elif REFERENCE in stored and serialized == base[1]:
+            # a reference never becomes a delta thus references to this
+            # activity are kept valid
+            data = {REFERENCE: base[0]}
+        else:
+            data = _diff(base[1], serialized)
+            data[KEYFRAME] = base[0]
+            data[DEPTH] = base[2] + 1
+            base = (base[0], base[1], base[2] + 1)
+        type(later).objects.filter(pk=later.pk).update(
+            _snapshot=later.encode_snapshot(pickle.dumps(data)))
+        raw_snapshot_cache.invalidate(later.pk)
+        rewritten.append(later.pk)
+    return rewritten
@@ -7,6 +7,7 @@ from django.template import TemplateSyntaxError
 from django.utils.safestring import mark_safe
 from django.contrib.contenttypes.models import ContentType
 from ..models import Activity
+from ..models import Inbox
 from ..registry import registry
 
 
@@ -115,3 +116,20 @@ def get_activities_of(model_or_object):
     else:
         return Activity.objects.get_for_object(model_or_object)
 
+
+
+@register.assignment_tag
+def get_inbox_unread_count(user):
+    """
+    Get the number of unread activities in the inbox of the user
+
+    Usage:
+        {% get_inbox_unread_count <user> as <variable> %}
+
+    Example:
+        {% get_inbox_unread_count user as unread %}
+        {% if unread %}<span class="badge">{{ unread }}</span>{% endif %}
+    """
+    if not user.is_authenticated():
+        return 0
+    return Inbox.objects.get_unread_count(user)
@@ -0,0 +1,96 @@
+# coding=utf-8
+"""
+"""
+
+from unittest.mock import MagicMock, PropertyMock, patch
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.contrib.contenttypes.models import ContentType
+from kawaz.core.personas.tests.factories import PersonaFactory
+from .models import ActivitiesTestModelA as ModelA
+from ..models import Activity
+from ..models import ArchivedActivity
+from ..models import Inbox
+from ..models import InboxEntry
+
+
+class ActivitiesInboxTestCase(TestCase):
+    def setUp(self):
+        self.users = [PersonaFactory() for i in range(3)]
+        self.model = ModelA.objects.create(text='a')
+        self.ct = ContentType.objects.get_for_model(self.model)
+
+    def create_activity(self, status='created'):
+        return Activity.objects.create(content_type=self.ct,
+                                       object_id=self.model.pk,
+                                       status=status)
+
+    def test_deliver(self):
+        activity = self.create_activity()
+        count = InboxEntry.objects.deliver(activity, self.users[:2])
+        self.assertEqual(count, 2)
+        for user in self.users[:2]:
+            entries = InboxEntry.objects.for_user(user)
+            self.assertEqual([e.activity for e in entries], [activity])
+            self.assertEqual(Inbox.objects.get_unread_count(user), 1)
+        self.assertFalse(InboxEntry.objects.for_user(self.users[2]).exists())
+        self.assertEqual(Inbox.objects.get_unread_count(self.users[2]), 0)
+
+    def test_deliver_recipients_of_mediator(self):
+        mediator = MagicMock()
+        mediator.get_recipients.return_value = [self.users[0].pk]
+        activity = self.create_activity()
+        with patch('activities.models.BaseActivity.mediator',
+                   new_callable=PropertyMock, return_value=mediator):
+            InboxEntry.objects.deliver(activity)
+        mediator.get_recipients.assert_called_with(activity)
+        self.assertEqual(InboxEntry.objects.for_user(self.users[0]).count(), 1)
+
+    def test_for_user_order(self):
+        activities = [self.create_activity() for i in range(3)]
+        for activity in activities:
+            InboxEntry.objects.deliver(activity, self.users[:1])
+        entries = InboxEntry.objects.for_user(self.users[0])
+        self.assertEqual([e.activity for e in entries],
+                         list(reversed(activities)))
+
+    def test_mark_as_read(self):
+        for i in range(3):
+            InboxEntry.objects.deliver(self.create_activity(), self.users[:1])
+        user = self.users[0]
+        entry = InboxEntry.objects.for_user(user).first()
+        self.assertEqual(InboxEntry.objects.mark_as_read(user, [entry.pk]), 1)
+        self.assertEqual(Inbox.objects.get_unread_count(user), 2)
+        # already read entries are not counted twice
+        self.assertEqual(InboxEntry.objects.mark_as_read(user, [entry.pk]), 0)
+        self.assertEqual(InboxEntry.objects.mark_as_read(user), 2)
+        self.assertEqual(Inbox.objects.get_unread_count(user), 0)
+
+    @override_settings(ACTIVITIES_INBOX_RETENTION=3,
+                       ACTIVITIES_INBOX_TRIM_THRESHOLD=2)
+    def test_trim(self):
+        user = self.users[0]
+        activities = [self.create_activity() for i in range(6)]
+        for activity in activities[:5]:
+            InboxEntry.objects.deliver(activity, [user])
+        # not trimmed until the threshold is exceeded
+        self.assertEqual(InboxEntry.objects.for_user(user).count(), 5)
+        InboxEntry.objects.deliver(activities[5], [user])
+        entries = InboxEntry.objects.for_user(user)
+        self.assertEqual([e.activity for e in entries],
+                         list(reversed(activities[3:])))
+        inbox = Inbox.objects.get(user=user)
+        self.assertEqual(inbox.total, 3)
+        self.assertEqual(inbox.unread, 3)
+
+    def test_archive(self):
+        user = self.users[0]
+        old = self.create_activity()
+        InboxEntry.objects.deliver(old, [user])
+        InboxEntry.objects.deliver(self.create_activity('updated'), [user])
+        Activity.objects.filter(pk=old.pk).update(
+            created_at=old.created_at.replace(year=2000))
+        Activity.objects.archive()
+        self.assertTrue(ArchivedActivity.objects.filter(pk=old.pk).exists())
+        self.assertEqual(InboxEntry.objects.for_user(user).count(), 1)
+        self.assertEqual(Inbox.objects.get_unread_count(user), 1)
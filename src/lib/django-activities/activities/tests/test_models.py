@@ -2,12 +2,15 @@
 """
 """
 
+import datetime
 from django.test import TestCase
+from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
 from .models import ActivitiesTestModelA as ModelA
 from .models import ActivitiesTestModelB as ModelB
 from .models import ActivitiesTestModelC as ModelC
 from ..models import Activity
+from ..models import ArchivedActivity
 from ..registry import registry
 
 
@@ -225,3 +228,82 @@ class ActivitiesModelsActivityTestCase(TestCase):
                                  transform=lambda x: x.pk)
 
 
+class ActivitiesModelsArchivedActivityTestCase(TestCase):
+    def setUp(self):
+        self.model1 = ModelA.objects.create(text='a')
+        self.model2 = ModelB.objects.create(text='b')
+        # the models might be registered by other tests and the activities
+        # created by the mediators should not be counted
+        Activity.objects.all().delete()
+        ct1 = ContentType.objects.get_for_model(self.model1)
+        ct2 = ContentType.objects.get_for_model(self.model2)
+        self.activities = [
+            Activity.objects.create(content_type=ct1,
+                                    object_id=self.model1.pk,
+                                    status=status)
+            for status in ('created', 'updated', 'updated', 'updated')
+        ]
+        self.activities.append(
+            Activity.objects.create(content_type=ct2,
+                                    object_id=self.model2.pk,
+                                    status='created'))
+        # make all activities except the last one of model1 old enough
+        old = timezone.now() - datetime.timedelta(days=365)
+        pks = [a.pk for a in self.activities[:3] + self.activities[4:]]
+        Activity.objects.filter(pk__in=pks).update(created_at=old)
+        self.before = timezone.now() - datetime.timedelta(days=30)
+
+    def test_archivables(self):
+        qs = Activity.objects.archivables(self.before)
+        # the latest activity of each object is never archived
+        self.assertQuerysetEqual(qs,
+                                 [a.pk for a in self.activities[:3]],
+                                 transform=lambda x: x.pk)
+
+    def test_archive(self):
+        count = Activity.objects.archive(self.before, batch_size=2)
+        self.assertEqual(count, 3)
+        self.assertEqual(Activity.objects.count(), 2)
+        self.assertEqual(ArchivedActivity.objects.count(), 3)
+        # latests should not be changed
+        self.assertEqual(Activity.objects.latests().count(), 2)
+        # primary keys of the original activities are kept
+        archived = ArchivedActivity.objects.get(pk=self.activities[0].pk)
+        self.assertEqual(archived.status, 'created')
+
+    def test_previous_fallback_to_archive(self):
+        Activity.objects.archive(self.before)
+        latest = Activity.objects.get(pk=self.activities[3].pk)
+        self.assertEqual(latest.previous.pk, self.activities[2].pk)
+        self.assertIsInstance(latest.previous, ArchivedActivity)
+        self.assertEqual(latest.previous.previous.pk, self.activities[1].pk)
+        self.assertQuerysetEqual(latest.get_previous_activities(),
+                                 [a.pk for a in reversed(self.activities[:3])],
+                                 transform=lambda x: x.pk)
+        self.assertQuerysetEqual(latest.get_related_activities(),
+                                 [a.pk for a in reversed(self.activities[:3])],
+                                 transform=lambda x: x.pk)
+        # object which does not have any older activities
+        other = Activity.objects.get(pk=self.activities[4].pk)
+        self.assertEqual(other.previous, None)
+
+    def test_related_activities_chain_archive(self):
+        # only a part of the older activities are archived
+        Activity.objects.filter(pk=self.activities[2].pk).update(
+            created_at=timezone.now())
+        Activity.objects.archive(self.before)
+        latest = Activity.objects.get(pk=self.activities[3].pk)
+        self.assertQuerysetEqual(latest.get_related_activities(),
+                                 [a.pk for a in reversed(self.activities[:3])],
+                                 transform=lambda x: x.pk)
+        self.assertIsInstance(latest.get_related_activities()[0], Activity)
+        self.assertIsInstance(latest.get_related_activities()[1],
+                              ArchivedActivity)
+        self.assertEqual(latest.get_related_activities().count(), 3)
+
+    def test_snapshot_is_compressed(self):
+        activity = self.activities[0]
+        activity._snapshot = b'snapshot' * 10
+        archived = ArchivedActivity.from_activity(activity)
+        self.assertNotEqual(archived._snapshot, activity._snapshot)
+        self.assertEqual(archived.decode_snapshot(), activity._snapshot)
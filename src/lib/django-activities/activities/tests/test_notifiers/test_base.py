@@ -6,6 +6,7 @@ from unittest.mock import MagicMock, patch
 from django.test import TestCase
 from django.test.utils import override_settings
 from ...notifiers.base import ActivityNotifierBase
+from ...notifiers.base import LazyActivityNotifier
 
 
 class ActivityNotifierBaseTestCase(TestCase):
@@ -77,3 +78,22 @@ class ActivityNotifierBaseTestCase(TestCase):
         self.assertRaises(NotImplementedError,
                           notifier.send,
                           rendered_content)
+
+
+class LazyActivityNotifierTestCase(TestCase):
+    @patch('activities.apps.get_class')
+    def test_import_on_first_use(self, get_class):
+        cls = MagicMock()
+        get_class.return_value = cls
+        notifier = LazyActivityNotifier('foo.bar.Notifier', 'arg1', 'arg2')
+        self.assertFalse(get_class.called)
+
+        activity = MagicMock()
+        notifier.notify(activity)
+        get_class.assert_called_once_with('foo.bar.Notifier')
+        cls.assert_called_once_with('arg1', 'arg2')
+        cls.return_value.notify.assert_called_with(activity, None, None)
+
+        notifier.send('foo')
+        self.assertEqual(cls.call_count, 1)
+        cls.return_value.send.assert_called_with('foo')
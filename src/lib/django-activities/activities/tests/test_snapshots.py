@@ -0,0 +1,135 @@
+# coding=utf-8
+"""
+"""
+
+import pickle
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.contrib.contenttypes.models import ContentType
+from .models import ActivitiesTestModelA as ModelA
+from ..models import Activity, ArchivedActivity
+from .. import snapshots
+
+
+def serialized(pk=1, **fields):
+    return {
+        'pk': pk,
+        'model': 'activities.activitiestestmodela',
+        'version': 1,
+        'fields': fields,
+        'extra_fields': {},
+    }
+
+
+@override_settings(ACTIVITIES_SNAPSHOT_KEYFRAME_INTERVAL=3)
+class ActivitiesSnapshotsTestCase(TestCase):
+    def setUp(self):
+        snapshots.raw_snapshot_cache.clear()
+        self.model = ModelA.objects.create(text='a')
+        self.ct = ContentType.objects.get_for_model(self.model)
+        # the previous activity is tracked in the test instead of querying
+        # the table while ModelA may be registered (and creates activities)
+        # by other test cases
+        self.previous = None
+
+    def tearDown(self):
+        snapshots.raw_snapshot_cache.clear()
+
+    def create_activity(self, serialized_obj):
+        data = snapshots.encode(serialized_obj, self.previous)
+        activity = Activity.objects.create(content_type=self.ct,
+                                           object_id=self.model.pk,
+                                           status='updated',
+                                           _snapshot=pickle.dumps(data))
+        self.previous = activity
+        return activity, data
+
+    def load(self, activity):
+        snapshots.raw_snapshot_cache.clear()
+        activity = type(activity).objects.get(pk=activity.pk)
+        return snapshots.reconstruct(
+            pickle.loads(activity.decode_snapshot()))
+
+    def test_first_snapshot_is_keyframe(self):
+        s = serialized(text='a', body='long body')
+        activity, data = self.create_activity(s)
+        self.assertEqual(data, s)
+
+    def test_delta_contains_only_changed_fields(self):
+        s1 = serialized(text='a', body='long body')
+        s2 = serialized(text='b', body='long body')
+        activity1, data1 = self.create_activity(s1)
+        activity2, data2 = self.create_activity(s2)
+        self.assertEqual(data2['fields'], {'text': 'b'})
+        self.assertEqual(data2[snapshots.KEYFRAME], activity1.pk)
+        self.assertEqual(snapshots.reconstruct(data2), s2)
+
+    def test_identical_snapshot_is_deduplicated(self):
+        s = serialized(text='a', body='long body')
+        activity1, data1 = self.create_activity(s)
+        activity2, data2 = self.create_activity(dict(s))
+        self.assertEqual(data2, {snapshots.REFERENCE: activity1.pk})
+        self.assertEqual(snapshots.reconstruct(data2), s)
+
+    def test_keyframe_interval(self):
+        datas = []
+        for i in range(4):
+            activity, data = self.create_activity(
+                serialized(text=str(i), body='long body'))
+            datas.append(data)
+        self.assertTrue(snapshots.is_keyframe(datas[0]))
+        self.assertFalse(snapshots.is_keyframe(datas[1]))
+        self.assertFalse(snapshots.is_keyframe(datas[2]))
+        # a new keyframe is stored every 3 activities
+        self.assertTrue(snapshots.is_keyframe(datas[3]))
+
+    def test_removed_fields(self):
+        s1 = serialized(text='a', body='long body')
+        s2 = serialized(text='a')
+        self.create_activity(s1)
+        activity2, data2 = self.create_activity(s2)
+        self.assertEqual(snapshots.reconstruct(data2), s2)
+
+    def test_delete_keyframe(self):
+        """deltas of a deleted keyframe are re-based"""
+        ss = [serialized(text=str(i), body='long body') for i in range(3)]
+        activities = [self.create_activity(s)[0] for s in ss]
+        activities[0].delete()
+        data1 = snapshots.load(activities[1].pk)
+        data2 = snapshots.load(activities[2].pk)
+        self.assertTrue(snapshots.is_keyframe(data1))
+        self.assertEqual(data2[snapshots.KEYFRAME], activities[1].pk)
+        self.assertEqual(self.load(activities[1]), ss[1])
+        self.assertEqual(self.load(activities[2]), ss[2])
+
+    def test_delete_referred_activity(self):
+        """references of a deleted activity are re-based"""
+        s1 = serialized(text='a', body='long body')
+        s2 = serialized(text='b', body='long body')
+        activity1, data1 = self.create_activity(s1)
+        activity2, data2 = self.create_activity(s2)
+        activity3, data3 = self.create_activity(dict(s2))
+        self.assertEqual(data3, {snapshots.REFERENCE: activity2.pk})
+        activity2.delete()
+        self.assertEqual(self.load(activity3), s2)
+
+    def test_delete_multiple_activities(self):
+        """deleting a keyframe and its deltas together keeps the others"""
+        ss = [serialized(text=str(i), body='long body') for i in range(3)]
+        activities = [self.create_activity(s)[0] for s in ss]
+        Activity.objects.filter(
+            pk__in=[activities[0].pk, activities[1].pk]).delete()
+        self.assertEqual(self.load(activities[2]), ss[2])
+
+    def test_archive_does_not_rebase(self):
+        """activities moved into the archive table are not re-based"""
+        s1 = serialized(text='a', body='long body')
+        s2 = serialized(text='b', body='long body')
+        activity1, data1 = self.create_activity(s1)
+        activity2, data2 = self.create_activity(s2)
+        ArchivedActivity.objects.bulk_create([
+            ArchivedActivity.from_activity(activity1)])
+        with snapshots.moving():
+            activity1.delete()
+        self.assertEqual(snapshots.load(activity2.pk), data2)
+        self.assertEqual(self.load(activity2), s2)
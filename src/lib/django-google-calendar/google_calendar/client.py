@@ -50,7 +50,9 @@ class GoogleCalendarClient(object):
             ).format(COMMAND_NAME), category=ImproperlyConfiguredWarning)
             self.enabled = False
         else:
-            http = credentials.authorize(http=httplib2.Http())
+            http = credentials.authorize(
+                http=httplib2.Http(timeout=settings.GOOGLE_CALENDAR_HTTP_TIMEOUT)
+            )
             self.service = discovery.build('calendar', 'v3', http=http)
             self.enabled = True
 
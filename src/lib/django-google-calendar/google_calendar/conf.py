@@ -23,3 +23,6 @@ class GoogleCalendarAppConf(AppConf):
 
     # Google OAuth2 credentials file (json)
     CREDENTIALS = None
+
+    # Timeout (seconds) of HTTP requests to Google Calendar API
+    HTTP_TIMEOUT = 10
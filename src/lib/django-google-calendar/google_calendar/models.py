@@ -11,7 +11,6 @@ from django.core.exceptions import ImproperlyConfigured
 
 from .conf import settings
 from .utils import resolve_relation_lazy
-from .backend import get_backend
 
 DISPATCH_UID = 'gcal_google_calendar_bridge'
 
@@ -38,12 +37,16 @@ def update_google_calendar(sender, instance, created, **kwargs):
     # Ignore when events models are created by fixtures.
     if kwargs.get('raw', False):
         return
+    # the backend depends on googleapiclient/oauth2client/httplib2 thus it is
+    # imported on first use rather than when models are loaded
+    from .backend import get_backend
     backend = get_backend()
     send_notifications = getattr(settings, 'GOOGLE_CALENDER_ENABLE_NOTIFICATIONS', False)
     backend.update(instance, sendNotifications=send_notifications)
 
 
 def delete_google_calendar(sender, instance, **kwargs):
+    from .backend import get_backend
     backend = get_backend()
     backend.delete(instance)
 